@@ -2,28 +2,31 @@ import os
 import json
 from typing import Dict, Any, Optional
 from django.conf import settings
-from openai import OpenAI
+from ai_consultant.services.llm_gateway import get_llm_gateway
+from ai_consultant.utils.log_buffer import buffered_log
 from .models import AgentLog
 
 class BaseAgent:
     """
     Base class for all agents in the system.
-    Handles OpenAI client initialization, common logging, and error handling.
+    Uses the shared LLM gateway (pooled client, retries, circuit breaker), common logging, and error handling.
     """
     def __init__(self, agent_name: str):
         self.agent_name = agent_name
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.gateway = get_llm_gateway()
+        self.client = self.gateway.client
         self.model = getattr(settings, 'OPENAI_MODEL', 'gpt-3.5-turbo')
 
     def log_action(self, action: str, details: str = ""):
         """
         Log an action to the database.
+        Rows go through the process log buffer and are bulk-inserted in the background.
         """
-        AgentLog.objects.create(
+        buffered_log(AgentLog(
             agent_name=self.agent_name,
             action=action,
             details=details
-        )
+        ))
 
     def _get_system_prompt(self) -> str:
         """
@@ -38,7 +41,7 @@ class BaseAgent:
         sys_prompt = system_prompt or self._get_system_prompt()
         
         try:
-            response = self.client.chat.completions.create(
+            response = self.gateway.chat_completion(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": sys_prompt},
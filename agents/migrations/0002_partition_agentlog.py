@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def partition_agent_log(apps, schema_editor):
+    """Помесячное RANGE партиционирование AgentLog (только PostgreSQL)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    from ai_consultant.utils.log_storage import LOG_TABLES, convert_to_partitioned
+
+    with schema_editor.connection.cursor() as cursor:
+        convert_to_partitioned(LOG_TABLES['agent_logs'], cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_agent_log, migrations.RunPython.noop),
+    ]
@@ -47,7 +47,7 @@ class UserCompanionAgent(BaseAgent):
         messages.append({"role": "user", "content": user_message})
         
         try:
-            response = self.client.chat.completions.create(
+            response = self.gateway.chat_completion(
                 model=self.model,
                 messages=messages,
                 temperature=0.7
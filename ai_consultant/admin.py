@@ -1,5 +1,8 @@
 from django.contrib import admin
+from django.utils.html import format_html, format_html_join
+
 from .models import ChatSession, ChatMessage, AIContext, ChatAnalytics
+from .utils.log_storage import get_archived_session_messages
 
 
 @admin.register(ChatSession)
@@ -7,13 +10,25 @@ class ChatSessionAdmin(admin.ModelAdmin):
     list_display = ('user', 'created_at', 'updated_at', 'is_active', 'message_count')
     list_filter = ('is_active', 'created_at')
     search_fields = ('user__phone', 'user__first_name', 'user__last_name')
-    readonly_fields = ('created_at', 'updated_at', 'message_count')
+    readonly_fields = ('created_at', 'updated_at', 'message_count', 'archived_messages')
     ordering = ('-updated_at',)
 
     def message_count(self, obj):
         return obj.messages.count()
     message_count.short_description = 'Кол-во сообщений'
 
+    def archived_messages(self, obj):
+        """Сообщения, вынесенные из базы в архив журналов"""
+        rows = get_archived_session_messages(obj)
+        if not rows:
+            return '—'
+        return format_html(
+            '<table><tbody>{}</tbody></table>',
+            format_html_join('', '<tr><td>{}</td><td>{}</td><td>{}</td></tr>',
+                             ((row['created_at'], row['role'], row['content']) for row in rows)),
+        )
+    archived_messages.short_description = 'Сообщения из архива'
+
 
 @admin.register(ChatMessage)
 class ChatMessageAdmin(admin.ModelAdmin):
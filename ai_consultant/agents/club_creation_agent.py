@@ -10,16 +10,10 @@ from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import asyncio
 
-from django.conf import settings
-from django.core.cache import cache
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
 from django.utils import timezone
 
-# NLP and AI
-import openai
-from sentence_transformers import SentenceTransformer
-from transformers import pipeline
-
 # Django models
 from clubs.models import Club, ClubCategory, UserInterest, UserInteraction
 
@@ -27,6 +21,11 @@ from clubs.models import Club, ClubCategory, UserInterest, UserInteraction
 from ai_consultant.rag.enhanced_rag_service import get_enhanced_rag_service
 from ai_consultant.recommendations.recommendation_engine import get_recommendation_engine
 from ai_consultant.knowledge.platform_knowledge_base import platform_knowledge
+from ai_consultant.services.conversation_store import (
+    ConversationConflictError, ConversationRecord, get_conversation_store,
+)
+from ai_consultant.services.llm_gateway import get_llm_gateway
+from ai_consultant.utils.warmup import get_sentence_model
 
 logger = logging.getLogger(__name__)
 
@@ -37,16 +36,19 @@ class ClubCreationAgent:
     Ведет естественный разговор и помогает пользователю создать клуб
     """
 
+    FLOW = 'club_creation_agent'
+
     def __init__(self):
-        self.openai_client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.llm_gateway = get_llm_gateway()
+        self.openai_client = self.llm_gateway.client
+        self.embedding_model = get_sentence_model('all-MiniLM-L6-v2')
 
         # Enhanced AI components
         self.rag_service = get_enhanced_rag_service()
         self.recommendation_engine = get_recommendation_engine()
 
-        # Состояние диалога
-        self.conversation_states = {}
+        # Состояние диалога — в общем хранилище (services/conversation_store.py), не в процессе
+        self.store = get_conversation_store()
 
         # Этапы создания клуба
         self.creation_stages = [
@@ -79,7 +81,8 @@ class ClubCreationAgent:
         self.max_name_suggestions = 8
         self.max_description_suggestions = 3
 
-        # Advanced NLU components
+        # Advanced NLU components (transformers импортируется только при создании агента)
+        from transformers import pipeline
         self.intent_classifier = pipeline("text-classification",
                                         model="distilbert-base-uncased-finetuned-sst-2-english",
                                         return_all_scores=True)
@@ -94,8 +97,9 @@ class ClubCreationAgent:
         """
         try:
             # Получаем или создаем состояние диалога
-            session = self._get_or_create_session(user_id)
-            session['last_activity'] = timezone.now()
+            record = await sync_to_async(self.store.load)(self.FLOW, user_id)
+            session = self._session_from_record(user_id, record)
+            session['last_activity'] = timezone.now().isoformat()
 
             # Анализируем сообщение
             message_analysis = await self._analyze_message(message, session)
@@ -117,7 +121,7 @@ class ClubCreationAgent:
             response = await self._generate_agent_response(next_action, session, context)
 
             # Обновляем состояние
-            self._update_session(user_id, session)
+            await sync_to_async(self._update_session)(record, session)
 
             # Проверяем завершение создания
             if session.get('club_creation_complete'):
@@ -140,28 +144,34 @@ class ClubCreationAgent:
                 'session_state': 'error'
             }
 
+    def _session_from_record(self, user_id: int, record: ConversationRecord) -> Dict[str, Any]:
+        """Сессия из записи хранилища или новая сессия"""
+        if record.exists:
+            return record.data
+        return {
+            'user_id': user_id,
+            'start_time': timezone.now().isoformat(),
+            'current_stage': 'greeting',
+            'current_action': 'greet_user',
+            'message_history': [],
+            'club_data': {},
+            'suggestions': [],
+            'completed_stages': [],
+            'current_step_data': {}
+        }
+
     def _get_or_create_session(self, user_id: int) -> Dict[str, Any]:
         """Получаем или создаем сессию пользователя"""
-        cache_key = f"club_creation_session_{user_id}"
-        session = cache.get(cache_key)
-
-        if not session:
-            session = {
-                'user_id': user_id,
-                'start_time': timezone.now(),
-                'current_stage': 'greeting',
-                'current_action': 'greet_user',
-                'message_history': [],
-                'club_data': {},
-                'suggestions': [],
-                'completed_stages': [],
-                'current_step_data': {}
-            }
-            cache.set(cache_key, session, 3600)  # 1 час
-
-        self.conversation_states[user_id] = session
+        record = self.store.load(self.FLOW, user_id)
+        session = self._session_from_record(user_id, record)
+        if not record.exists:
+            self._update_session(record, session)
         return session
 
+    def reset_session(self, user_id: int):
+        """Удаляем сессию пользователя (перезапуск диалога)"""
+        self.store.delete(self.FLOW, user_id)
+
     async def _analyze_message(self, message: str, session: Dict[str, Any]) -> Dict[str, Any]:
         """
         🧠 Расширенный анализ сообщения пользователя с использованием RAG и NLU
@@ -191,7 +201,7 @@ class ClubCreationAgent:
             """
 
             response = await asyncio.to_thread(
-                self.openai_client.chat.completions.create,
+                self.llm_gateway.chat_completion,
                 model="gpt-4",
                 messages=[{"role": "user", "content": analysis_prompt}],
                 max_tokens=500,
@@ -324,7 +334,7 @@ class ClubCreationAgent:
                 temperature = 0.7
 
             response = await asyncio.to_thread(
-                self.openai_client.chat.completions.create,
+                self.llm_gateway.chat_completion,
                 model=model,
                 messages=[
                     {"role": "system", "content": self._get_agent_system_prompt()},
@@ -942,7 +952,7 @@ class ClubCreationAgent:
             """
 
             response = await asyncio.to_thread(
-                self.openai_client.chat.completions.create,
+                self.llm_gateway.chat_completion,
                 model="gpt-4",
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=400,
@@ -997,7 +1007,7 @@ class ClubCreationAgent:
             """
 
             response = await asyncio.to_thread(
-                self.openai_client.chat.completions.create,
+                self.llm_gateway.chat_completion,
                 model="gpt-4",
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=800,
@@ -1058,10 +1068,15 @@ class ClubCreationAgent:
         🚀 Присоединяйтесь к нам и станьте частью удивительного сообщества!
         """
 
-    def _update_session(self, user_id: int, session: Dict[str, Any]):
-        """Обновляем сессию в кэше"""
-        cache_key = f"club_creation_session_{user_id}"
-        cache.set(cache_key, session, 3600)  # 1 час
+    def _update_session(self, record: ConversationRecord, session: Dict[str, Any]):
+        """Сохраняем сессию compare-and-set по версии, прочитанной в начале обработки"""
+        record.stage = session.get('current_stage', '')
+        record.data = session
+        try:
+            self.store.save(record)
+        except ConversationConflictError:
+            # Параллельное сообщение того же пользователя уже сохранило свое состояние
+            logger.warning(f"⚠️ Сессия {record.key} изменена параллельным запросом, состояние не перезаписано")
 
 
 # Глобальный экземпляр агента
@@ -11,10 +11,14 @@ import time
 from datetime import datetime
 from typing import Dict, List, Any
 
+from ai_consultant.services.conversation_store import ConversationRecord, get_conversation_store
+
 # Легкая альтернатива тяжелым AI библиотекам
 class LightweightClubCreationAgent:
     """🤖 Облегченный AI агент для создания клубов"""
 
+    FLOW = 'lightweight_club_creation'
+
     def __init__(self):
         self.creation_stages = [
             'greeting',
@@ -28,22 +32,29 @@ class LightweightClubCreationAgent:
         ]
         self.current_stage = 'greeting'
         self.club_data = {}
-        self.session_data = {}
 
     def process_message(self, message: str, session_id: str = "1") -> Dict[str, Any]:
         """🤖 Обработка сообщения пользователя"""
 
-        # Получаем сессию
-        session = self._get_or_create_session(session_id)
-
         # Анализируем сообщение
         analysis = self._analyze_message_simple(message)
 
-        # Генерируем ответ на основе анализа
-        response = self._generate_response(message, analysis, session)
+        def advance(record: ConversationRecord):
+            # Сессия из общего хранилища: следующее сообщение может прийти в другой воркер
+            session = self._get_or_create_session(session_id, record)
+
+            # Генерируем ответ на основе анализа
+            response = self._generate_response(message, analysis, session)
+
+            # Обновляем прогресс
+            progress = self._update_progress(message, session)
+
+            record.stage = session['current_stage']
+            record.data = session
+            return response, progress
 
-        # Обновляем прогресс
-        progress = self._update_progress(message, session)
+        record, (response, progress) = get_conversation_store().update(self.FLOW, session_id, advance)
+        session = record.data
 
         return {
             'response': response,
@@ -53,11 +64,11 @@ class LightweightClubCreationAgent:
             'timestamp': datetime.now().isoformat()
         }
 
-    def _get_or_create_session(self, session_id: str) -> Dict[str, Any]:
+    def _get_or_create_session(self, session_id: str, record: ConversationRecord) -> Dict[str, Any]:
         """📊 Получение или создание сессии"""
 
-        if session_id not in self.session_data:
-            self.session_data[session_id] = {
+        if not record.exists:
+            record.data = {
                 'session_id': session_id,
                 'created_at': datetime.now().isoformat(),
                 'messages_count': 0,
@@ -66,7 +77,7 @@ class LightweightClubCreationAgent:
                 'club_data': {}
             }
 
-        return self.session_data[session_id]
+        return record.data
 
     def _analyze_message_simple(self, message: str) -> Dict[str, Any]:
         """🔍 Простой анализ сообщения (без тяжелых AI библиотек)"""
@@ -5,6 +5,8 @@ Working без dependency проблем
 """
 
 import json
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
@@ -15,6 +17,7 @@ class LightweightAIConsultant:
     def __init__(self):
         self.conversation_state = "greeting"
         self.collected_data = {}
+        self.lock = threading.Lock()
 
     def process_message(self, message: str, session_id: str) -> Dict[str, Any]:
         """🤖 Обрабатываем сообщение пользователя"""
@@ -406,10 +409,24 @@ class LightweightAIConsultant:
         }
 
 
-# Глобальный экземпляр агента
-ai_consultant = LightweightAIConsultant()
+# Состояние диалога — отдельный консультант на сессию (последние MAX_SESSIONS сессий)
+MAX_SESSIONS = 10000
+_sessions: "OrderedDict[str, LightweightAIConsultant]" = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def get_consultant(session_id: str) -> LightweightAIConsultant:
+    """Консультант сессии; давно неактивные сессии вытесняются"""
+    with _sessions_lock:
+        consultant = _sessions.pop(session_id, None) or LightweightAIConsultant()
+        _sessions[session_id] = consultant
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+    return consultant
 
 
 def get_ai_response(message: str, session_id: str = "default") -> Dict[str, Any]:
-    """🎯 Получаем AI ответ"""
-    return ai_consultant.process_message(message, session_id)
\ No newline at end of file
+    """🎯 Получаем AI ответ (сообщения одной сессии обрабатываются по очереди)"""
+    consultant = get_consultant(session_id)
+    with consultant.lock:
+        return consultant.process_message(message, session_id)
\ No newline at end of file
@@ -9,14 +9,9 @@ from django.conf import settings
 from .registry import AgentRegistry
 from .base import BaseAgent
 
-class AgentRouter:
-    """
-    Analyzes user intent and routes to the best available agent.
-    """
-    
-    def __init__(self, openai_service):
-        self.openai_service = openai_service
-        self.system_prompt = """Ты - интеллектуальный маршрутизатор запросов платформы "ЦЕНТР СОБЫТИЙ".
+# Статический промпт: собирается один раз при импорте и не зависит от запроса,
+# поэтому префикс запроса маршрутизации всегда одинаковый (prompt caching)
+ROUTER_SYSTEM_PROMPT = """Ты - интеллектуальный маршрутизатор запросов платформы "ЦЕНТР СОБЫТИЙ".
 
 🎯 ТВОЯ ЗАДАЧА:
 Определить, какой специалист лучше всего подходит для ответа на запрос пользователя.
@@ -111,35 +106,63 @@ class AgentRouter:
 - "Хочу изучать Python" → {"agent": "mentor_specialist", "reason": "развитие навыков"}
 """
 
+
+class AgentRouter:
+    """
+    Analyzes user intent and routes to the best available agent.
+    """
+    
+    def __init__(self, openai_service):
+        self.openai_service = openai_service
+        self.system_prompt = ROUTER_SYSTEM_PROMPT
+
     def route(self, message: str, history: List[Dict]) -> str:
         """
         Decides which agent should handle the message.
         Returns the name of the agent.
         """
         try:
-            # Prepare context for routing
-            messages = [
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": f"User message: {message}"}
-            ]
-            
             # Call OpenAI to decide (using JSON mode if available, or just parsing)
             response = self.openai_service.chat_completion(
-                messages,
+                self._build_routing_messages(message),
                 response_format={"type": "json_object"}
             )
-            
-            content = response.get('content', '{}')
-            decision = json.loads(content)
-            
-            agent_name = decision.get('agent', 'orchestrator')
-            
-            # Verify agent exists
-            if not AgentRegistry.get_agent(agent_name):
-                return 'orchestrator'
-                
-            return agent_name
-            
-        except Exception as e:
+            return self._parse_decision(response)
+
+        except Exception:
             # Fallback to orchestrator on error
             return 'orchestrator'
+
+    async def aroute(self, message: str, history: List[Dict]) -> str:
+        """
+        Async variant of route() for the ASGI chat path.
+        """
+        try:
+            response = await self.openai_service.achat_completion(
+                self._build_routing_messages(message),
+                response_format={"type": "json_object"}
+            )
+            return self._parse_decision(response)
+
+        except Exception:
+            return 'orchestrator'
+
+    def _build_routing_messages(self, message: str) -> List[Dict[str, str]]:
+        """Prepare context for routing"""
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": f"User message: {message}"}
+        ]
+
+    def _parse_decision(self, response: Dict[str, Any]) -> str:
+        """Extract agent name from the routing response"""
+        content = response.get('content', '{}')
+        decision = json.loads(content)
+
+        agent_name = decision.get('agent', 'orchestrator')
+
+        # Verify agent exists
+        if not AgentRegistry.get_agent(agent_name):
+            return 'orchestrator'
+
+        return agent_name
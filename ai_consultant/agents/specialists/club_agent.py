@@ -38,7 +38,15 @@ class ClubAgent(BaseAgent):
                             },
                             "city": {
                                 "type": "string",
-                                "description": "City to filter by"
+                                "description": "City to search near; results are ranked by distance from it"
+                            },
+                            "latitude": {
+                                "type": "number",
+                                "description": "User latitude, if known; takes precedence over city"
+                            },
+                            "longitude": {
+                                "type": "number",
+                                "description": "User longitude, if known"
                             },
                             "limit": {
                                 "type": "integer",
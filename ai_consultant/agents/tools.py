@@ -1,7 +1,8 @@
 import logging
-import json
 from typing import Dict, Any, Optional
 
+from ..utils import fast_json
+
 logger = logging.getLogger(__name__)
 
 class ToolExecutor:
@@ -14,7 +15,19 @@ class ToolExecutor:
 
     def execute(self, agent_name: str, tool_name: str, tool_args: Dict[str, Any], user) -> str:
         """
-        Executes a tool and returns the result as a string.
+        Executes a tool and returns the result as a string (the content of the LLM tool message).
+        """
+        result = self.run(agent_name, tool_name, tool_args, user)
+        try:
+            return self.encode(result)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Tool result encoding error: {e}")
+            return f"Error executing tool {tool_name}: {str(e)}"
+
+    def run(self, agent_name: str, tool_name: str, tool_args: Dict[str, Any], user) -> Any:
+        """
+        Executes a tool and returns its structured result (dict/list) or a text answer.
+        Callers that read the result themselves skip the JSON encode/decode round trip.
         """
         logger.info(f"Executing tool {tool_name} for agent {agent_name} with args {tool_args}")
         
@@ -32,13 +45,42 @@ class ToolExecutor:
             logger.error(f"Tool execution error: {e}")
             return f"Error executing tool {tool_name}: {str(e)}"
 
-    def _execute_club_tools(self, tool_name: str, args: Dict, user) -> str:
+    @staticmethod
+    def encode(result: Any) -> str:
+        """
+        Compact JSON for structured results (fewer prompt tokens), text answers as is.
+        """
+        if isinstance(result, str):
+            return result
+        return fast_json.dumps(result)
+
+    @staticmethod
+    def _search_origin(args: Dict, user):
+        """
+        Point to rank club search results by distance: explicit coordinates,
+        otherwise the requested city or the user's profile city (clubs/geo.py).
+        """
+        from clubs import geo
+
+        if args.get('latitude') is not None and args.get('longitude') is not None:
+            try:
+                return geo.parse_point(args['latitude'], args['longitude'])
+            except geo.GeoQueryError:
+                pass
+        city = args.get('city') or getattr(getattr(user, 'profile', None), 'city', None)
+        return geo.city_point(city)
+
+    def _execute_club_tools(self, tool_name: str, args: Dict, user) -> Any:
         if tool_name == 'search_clubs':
             query = args.get('query', '')
             limit = args.get('limit', 5)
             
             # Use the method from AIConsultantServiceV2 (service_provider)
-            result = self.service_provider.get_clubs_by_interest_keywords(query, limit)
+            near = self._search_origin(args, user)
+            if near is None:
+                result = self.service_provider.get_clubs_by_interest_keywords(query, limit)
+            else:
+                result = self.service_provider.get_clubs_by_interest_keywords(query, limit, near=near)
             return self.service_provider.format_club_recommendations(result)
             
         elif tool_name == 'create_club':
@@ -68,13 +110,13 @@ class ToolExecutor:
                     for suggestion in result['suggestions']:
                         success_msg += f"{suggestion}\n"
                 
-                return json.dumps({
+                return {
                     "status": "success",
                     "message": success_msg,
                     "link": result['link'],
                     "club_id": result['club_id'],
                     "club_name": result['club_name']
-                }, ensure_ascii=False)
+                }
             else:
                 # Handle validation errors
                 error_msg = result.get('error', 'Unknown error')
@@ -87,17 +129,17 @@ class ToolExecutor:
                 elif result.get('duplicate'):
                     error_msg += "\n\n💡 Попробуйте добавить город или специализацию к названию."
                 
-                return json.dumps({
+                return {
                     "status": "error",
                     "message": error_msg,
                     "validation_errors": result.get('validation_errors', [])
-                }, ensure_ascii=False)
+                }
 
         elif tool_name == 'get_my_clubs':
             clubs = self.service_provider.club_management_service.get_user_managed_clubs(user)
             if not clubs:
                 return "You don't manage any clubs yet."
-            return json.dumps(clubs, ensure_ascii=False)
+            return clubs
 
         elif tool_name == 'update_club':
             club_id = args.get('club_id')
@@ -107,7 +149,7 @@ class ToolExecutor:
             result = self.service_provider.club_management_service.update_club_details(
                 user, club_id, **update_data
             )
-            return json.dumps(result, ensure_ascii=False)
+            return result
 
         elif tool_name == 'create_event':
             club_id = args.get('club_id')
@@ -125,7 +167,7 @@ class ToolExecutor:
                 user, club_id, title, description, start_datetime, end_datetime, location,
                 min_age=min_age, max_age=max_age, entry_requirements=entry_requirements
             )
-            return json.dumps(result, ensure_ascii=False)
+            return result
 
         elif tool_name == 'create_post':
             club_id = args.get('club_id')
@@ -135,17 +177,17 @@ class ToolExecutor:
             result = self.service_provider.club_management_service.create_post(
                 user, club_id, title, content
             )
-            return json.dumps(result, ensure_ascii=False)
+            return result
 
         return f"Error: Unknown tool {tool_name} for Club Agent"
 
-    def _execute_support_tools(self, tool_name: str, args: Dict, user) -> str:
+    def _execute_support_tools(self, tool_name: str, args: Dict, user) -> Any:
         if tool_name == 'get_platform_status':
             # Assuming PlatformServiceManager has get_status
             # If not, we might need to mock or implement it
             if hasattr(self.service_provider.platform_service_manager, 'get_status'):
                 status = self.service_provider.platform_service_manager.get_status()
-                return json.dumps(status, ensure_ascii=False)
+                return status
             return "Platform status: All systems operational (Mocked)"
             
         elif tool_name == 'search_knowledge_base':
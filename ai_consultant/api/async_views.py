@@ -0,0 +1,103 @@
+"""
+⚡ Асинхронные API Views для ИИ-консультанта (ASGI)
+Чат не занимает поток воркера на время ожидания ответа OpenAI
+"""
+
+import json
+import logging
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.request import Request
+
+from ..services_v2 import AIServiceFactory
+from ..models import ChatSession
+from .serializers import ChatRequestSerializer
+from .views_v2 import validate_message_content
+
+logger = logging.getLogger(__name__)
+
+
+def _authenticate(request):
+    """
+    Аутентификация теми же классами, что и у DRF views (сессия + токен).
+    SessionAuthentication также проверяет CSRF.
+    """
+    drf_request = Request(request, authenticators=[SessionAuthentication(), TokenAuthentication()])
+    user = drf_request.user
+    return user if user and user.is_authenticated else None
+
+
+def _get_or_create_session(service, user, session_id):
+    """Получает активную сессию пользователя или создает новую"""
+    if session_id:
+        return ChatSession.objects.select_related('user').get(
+            id=session_id,
+            user=user,
+            is_active=True
+        )
+    return service.create_chat_session(user)
+
+
+@csrf_exempt
+async def chat_async_v2(request):
+    """
+    Отправить сообщение и получить ответ от ИИ (асинхронно)
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    try:
+        user = await sync_to_async(_authenticate)(request)
+    except exceptions.APIException as e:
+        return JsonResponse({'error': 'Authentication failed', 'details': str(e.detail)}, status=403)
+
+    if user is None:
+        return JsonResponse({'error': 'Authentication credentials were not provided.'}, status=401)
+
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+
+    serializer = ChatRequestSerializer(data=payload)
+    if not serializer.is_valid():
+        return JsonResponse({'error': 'Invalid data', 'details': serializer.errors}, status=400)
+
+    message = serializer.validated_data['message']
+    session_id = serializer.validated_data.get('session_id')
+
+    try:
+        validate_message_content(message)
+    except ValidationError as e:
+        return JsonResponse({'error': 'Invalid message', 'details': str(e)}, status=400)
+
+    try:
+        ai_service = await sync_to_async(AIServiceFactory.get_shared_chat_service)()
+
+        try:
+            session = await sync_to_async(_get_or_create_session)(ai_service, user, session_id)
+        except ChatSession.DoesNotExist:
+            return JsonResponse({'error': 'Session not found'}, status=404)
+
+        response_data = await ai_service.asend_message(session=session, message=message)
+
+        logger.info(f"Сообщение обработано (async)", {
+            'user_id': user.id,
+            'session_id': session.id,
+            'tokens_used': response_data.get('tokens_used', 0)
+        })
+
+        return JsonResponse({
+            'response': response_data['response'],
+            'session_id': str(session.id),
+            'message_id': str(response_data['message_id']) if response_data.get('message_id') else None,
+            'tokens_used': response_data.get('tokens_used', 0)
+        }, json_dumps_params={'ensure_ascii': False})
+
+    except Exception as e:
+        logger.error(f"Ошибка асинхронной обработки сообщения: {e}", exc_info=True)
+        return JsonResponse({'error': 'Internal server error', 'details': str(e)}, status=500)
@@ -9,6 +9,7 @@ import re
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 
+from asgiref.sync import sync_to_async
 from django.http import HttpRequest, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
@@ -113,12 +114,10 @@ class ClubCreationAgentView(View):
         """Перезапуск диалога"""
         try:
             # Очищаем сессию
-            cache_key = f"club_creation_session_{user_id}"
-            from django.core.cache import cache
-            cache.delete(cache_key)
+            await sync_to_async(self.agent.reset_session)(user_id)
 
             # Создаем новую сессию
-            session = self.agent._get_or_create_session(user_id)
+            session = await sync_to_async(self.agent._get_or_create_session)(user_id)
 
             return {
                 'success': True,
@@ -139,7 +138,7 @@ class ClubCreationAgentView(View):
     async def get_conversation_status(self, user_id: int) -> Dict[str, Any]:
         """Получение статуса диалога"""
         try:
-            session = self.agent._get_or_create_session(user_id)
+            session = await sync_to_async(self.agent._get_or_create_session)(user_id)
             progress = self.agent._calculate_progress(session)
 
             return {
@@ -12,13 +12,21 @@ from django.conf import settings
 from django.utils import timezone
 from django.db.models import Q, Count
 
+from clubs import http_cache
 from clubs.models import Club, ClubCategory, City
 from ai_consultant.services.enhanced_ai_service import EnhancedAIConsultantService
 
 logger = logging.getLogger('ai_consultant')
 
-# Глобальный экземпляр сервиса для эффективности
-ai_service = EnhancedAIConsultantService()
+# Глобальный экземпляр сервиса создается при первом запросе, а не при импорте urls
+_ai_service = None
+
+
+def get_ai_service() -> EnhancedAIConsultantService:
+    global _ai_service
+    if _ai_service is None:
+        _ai_service = EnhancedAIConsultantService()
+    return _ai_service
 
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -61,7 +69,7 @@ def enhanced_ai_chat(request):
             }, status=400)
 
         # Обрабатываем сообщение через улучшенный AI сервис
-        result = ai_service.process_user_message(message)
+        result = get_ai_service().process_user_message(message)
 
         # Собираем метаданные для ответа
         metadata = {
@@ -194,7 +202,7 @@ def club_search_api(request):
             search_params['interests'] = [query]
 
         # Используем AI сервис для поиска
-        clubs = ai_service.search_clubs(search_params, limit)
+        clubs = get_ai_service().search_clubs(search_params, limit)
 
         # Форматируем результат
         clubs_data = []
@@ -227,6 +235,7 @@ def club_search_api(request):
         }, status=500)
 
 @require_http_methods(["GET"])
+@http_cache.conditional_get(http_cache.CATEGORY, http_cache.CLUB)
 def club_categories_api(request):
     """
     API для получения списка категорий
@@ -256,6 +265,7 @@ def club_categories_api(request):
         }, status=500)
 
 @require_http_methods(["GET"])
+@http_cache.conditional_get(http_cache.CITY, http_cache.CLUB)
 def cities_api(request):
     """
     API для получения списка городов
@@ -18,11 +18,9 @@ from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 
-import openai
-from openai import OpenAI
-
 from ai_consultant.rag.enhanced_rag_service import get_enhanced_rag_service
 from ai_consultant.recommendations.recommendation_engine import get_recommendation_engine
+from ai_consultant.services.message_analysis import MessageAnalysis
 from ai_consultant.services_v2 import AIConsultantServiceV2
 from ai_consultant.knowledge.platform_knowledge_base import platform_knowledge
 
@@ -72,11 +70,12 @@ class EnhancedAIChatView(View):
                                      user_id: int = None) -> Dict[str, Any]:
         """Get enhanced AI response with RAG and recommendations"""
         try:
-            # 1. Analyze query intent
-            intent_analysis = self.rag_service.analyze_query_intent(user_message)
+            # 1. Analyze query intent (the message is analysed once for the whole turn)
+            analysis = MessageAnalysis.of(user_message)
+            intent_analysis = self.rag_service.analyze_query_intent(user_message, analysis)
 
             # 2. Get RAG context
-            rag_context = await self.get_rag_context(user_message, user_context, user_id)
+            rag_context = await self.get_rag_context(user_message, user_context, user_id, analysis)
 
             # 3. Get personalized recommendations
             recommendations = []
@@ -113,17 +112,21 @@ class EnhancedAIChatView(View):
             }
 
     async def get_rag_context(self, query: str, user_context: Dict[str, Any],
-                            user_id: int = None) -> Dict[str, Any]:
+                            user_id: int = None, analysis: MessageAnalysis = None) -> Dict[str, Any]:
         """Get RAG-enhanced context"""
         try:
             # Search in different collections
             search_tasks = []
             collections_to_search = ['clubs', 'documentation', 'faq', 'events']
 
+            # Keywords are computed once here rather than in each parallel search thread
+            analysis = analysis or MessageAnalysis.of(query)
+            analysis.keywords
+
             for collection in collections_to_search:
                 task = asyncio.to_thread(
                     self.rag_service.semantic_search_enhanced,
-                    collection, query, n_results=3, user_context=user_context
+                    collection, query, n_results=3, user_context=user_context, analysis=analysis
                 )
                 search_tasks.append(task)
 
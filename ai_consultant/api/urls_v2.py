@@ -4,12 +4,14 @@
 
 from django.urls import path
 from . import views_v2
+from . import async_views
 
 app_name = 'ai_consultant_api_v2'
 
 urlpatterns = [
     # Основные эндпоинты чата
     path('chat/v2/', views_v2.ChatAPIViewV2.as_view(), name='chat_v2'),
+    path('chat/v2/async/', async_views.chat_async_v2, name='chat_async_v2'),
     path('sessions/v2/create/', views_v2.create_chat_session_v2, name='create_chat_session_v2'),
     path('sessions/v2/', views_v2.chat_sessions_v2, name='chat_sessions_v2'),
     path('sessions/v2/<uuid:session_id>/delete/', views_v2.delete_chat_session_v2, name='delete_chat_session_v2'),
@@ -10,6 +10,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import authentication
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import ensure_csrf_cookie
@@ -63,9 +64,9 @@ class ChatAPIViewV2(APIView):
     """
     permission_classes = [permissions.IsAuthenticated]
 
-    def __init__(self):
-        super().__init__()
-        self.ai_service = AIServiceFactory.create_chat_service()
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.ai_service = AIServiceFactory.get_shared_chat_service()
 
     def post(self, request):
         """
@@ -216,7 +217,7 @@ def create_chat_session_v2(request):
     Создать новую чат-сессию
     """
     try:
-        ai_service = AIServiceFactory.create_chat_service()
+        ai_service = AIServiceFactory.get_shared_chat_service()
         session = ai_service.create_chat_session(request.user)
 
         serializer = ChatSessionSerializer(session)
@@ -246,7 +247,7 @@ def chat_sessions_v2(request):
     Получить список сессий пользователя
     """
     try:
-        ai_service = AIServiceFactory.create_chat_service()
+        ai_service = AIServiceFactory.get_shared_chat_service()
         limit = int(request.query_params.get('limit', 10))
 
         sessions = ai_service.get_user_sessions(request.user, limit)
@@ -278,7 +279,7 @@ def delete_chat_session_v2(request, session_id):
             is_active=True
         )
 
-        ai_service = AIServiceFactory.create_chat_service()
+        ai_service = AIServiceFactory.get_shared_chat_service()
         success = ai_service.delete_session(session)
 
         if success:
@@ -310,7 +311,7 @@ def chat_analytics_v2(request):
     Получить аналитику чата
     """
     try:
-        ai_service = AIServiceFactory.create_chat_service()
+        ai_service = AIServiceFactory.get_shared_chat_service()
         analytics = ai_service.get_analytics_data(request.user)
 
         return Response({
@@ -371,7 +372,7 @@ def update_session_title_v2(request, session_id):
             is_active=True
         )
 
-        ai_service = AIServiceFactory.create_chat_service()
+        ai_service = AIServiceFactory.get_shared_chat_service()
         success = ai_service.update_session_title(session, title)
 
         if success:
@@ -407,7 +408,7 @@ def archive_session_v2(request, session_id):
             is_active=True
         )
 
-        ai_service = AIServiceFactory.create_chat_service()
+        ai_service = AIServiceFactory.get_shared_chat_service()
         success = ai_service.archive_session(session)
 
         if success:
@@ -465,7 +466,7 @@ def service_status_v2(request):
     Получить статус сервисов v2
     """
     try:
-        ai_service = AIServiceFactory.create_chat_service()
+        ai_service = AIServiceFactory.get_shared_chat_service()
 
         status_data = {
             'ai_consultant': ai_service.health_check(),
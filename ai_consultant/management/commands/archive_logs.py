@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from ai_consultant.utils.log_storage import (
+    PARQUET_AVAILABLE,
+    archive_old_logs,
+    maintain_partitions,
+    retention_cutoff,
+)
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming log partitions and move months past retention into the file archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=None,
+                            help='Months of logs to keep in the database (AI_LOG_RETENTION_MONTHS)')
+        parser.add_argument('--format', choices=['jsonl', 'parquet'], default='jsonl',
+                            help='Archive format: gzipped JSONL or Parquet (needs pyarrow)')
+        parser.add_argument('--dry-run', action='store_true', help='Only list months that would be archived')
+
+    def handle(self, *args, **options):
+        if options['format'] == 'parquet' and not PARQUET_AVAILABLE:
+            self.stderr.write(self.style.ERROR("❌ pyarrow is not installed, use --format jsonl"))
+            return
+
+        tables = maintain_partitions()
+        if tables:
+            self.stdout.write(f"🧩 Partitions ensured for: {', '.join(tables)}")
+
+        cutoff = retention_cutoff(options['months'])
+        self.stdout.write(f"🚀 Archiving logs older than {cutoff:%Y-%m}...")
+
+        results = archive_old_logs(cutoff, fmt=options['format'], dry_run=options['dry_run'])
+        for result in results:
+            rows = 'dry run' if result['rows'] is None else f"{result['rows']} rows"
+            self.stdout.write(f"  {result['table']} {result['month'][:7]}: {rows} -> {result['path']}")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(results)} month(s) processed"))
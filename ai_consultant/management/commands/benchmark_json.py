@@ -0,0 +1,173 @@
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+
+from ai_consultant.utils import fast_json
+
+WORDS = ('клуб', 'шахматы', 'турнир', 'музыка', 'встреча', 'спорт', 'Алматы', 'друзья', 'club', 'event')
+
+
+def _text(words):
+    return ' '.join(WORDS[i % len(WORDS)] for i in range(words))
+
+
+def _stamp(i=0):
+    return (datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(hours=i)).isoformat().replace('+00:00', 'Z')
+
+
+def _user(i):
+    return {'id': i, 'first_name': f'Имя {i}', 'last_name': f'Фамилия {i}', 'email': f'user{i}@example.com',
+            'phone': f'+7701{i:07d}', 'avatar': f'https://fan-club.kz/media/avatars/{i}.jpg'}
+
+
+def _club(i):
+    return {
+        'id': str(uuid.UUID(int=i + 1)), 'name': f'Клуб {_text(3)} {i}',
+        'category': {'id': str(uuid.UUID(int=1000 + i % 12)), 'name': 'Спорт'},
+        'logo': f'https://fan-club.kz/media/clubs/logos/{i}.png', 'description': _text(60),
+        'members_count': 40 + i, 'likes_count': 7 * i, 'is_private': i % 5 == 0, 'created_at': _stamp(i),
+    }
+
+
+def top_payloads():
+    """The ten hottest response and tool payloads, shaped like the real ones"""
+    clubs = [_club(i) for i in range(20)]
+    return {
+        'chat_response': {
+            'success': True, 'response': _text(250), 'session_id': str(uuid.uuid4()), 'message_id': 123456,
+            'tokens_used': 812, 'agent': 'club_specialist', 'response_time': 1.234,
+        },
+        'club_list_page': {'count': 480, 'next': 'https://fan-club.kz/api/v1/clubs/?page=2', 'previous': None,
+                           'results': clubs},
+        'club_detail': {
+            **_club(1), 'city': {'id': str(uuid.uuid4()), 'name': 'Алматы'}, 'activities': _text(40),
+            'members': [_user(i) for i in range(200)], 'likes': [_user(i) for i in range(60)],
+            'managers': [_user(i) for i in range(3)], 'creater': _user(0), 'partners': clubs[:5],
+        },
+        'club_search': {'success': True, 'data': {'total': 20, 'query': 'шахматы', 'clubs': [
+            {**club, 'city': 'Алматы', 'relevance_score': 7.3 - i * 0.1} for i, club in enumerate(clubs)
+        ]}},
+        'recommendations': {'success': True, 'recommendations': [
+            {'club': club, 'score': 0.91 - i * 0.01,
+             'match_reasons': ['📍 В вашем городе (Алматы)', '🎯 По интересам: шахмат', '👥 Популярный клуб']}
+            for i, club in enumerate(clubs)
+        ]},
+        'categories': {'count': 30, 'next': None, 'previous': None, 'results': [
+            {'id': str(uuid.UUID(int=1000 + i)), 'name': f'Категория {i}'} for i in range(30)
+        ]},
+        'cities': {'count': 100, 'next': None, 'previous': None, 'results': [
+            {'id': str(uuid.UUID(int=2000 + i)), 'name': f'Город {i}'} for i in range(100)
+        ]},
+        'events_page': {'count': 20, 'next': None, 'previous': None, 'results': [
+            {'id': str(uuid.UUID(int=3000 + i)), 'title': f'Турнир {i}', 'description': _text(80),
+             'banner': f'https://fan-club.kz/media/clubs/event_banners/{i}.jpg', 'location': 'Алматы, Абая 1',
+             'start_datetime': _stamp(i), 'end_datetime': _stamp(i + 2), 'min_age': 12, 'max_age': None,
+             'entry_requirements': None, 'created_at': _stamp(), 'updated_at': _stamp(), 'club': str(uuid.UUID(int=i + 1))}
+            for i in range(20)
+        ]},
+        'tool_my_clubs': [
+            {'id': club['id'], 'name': club['name'], 'members_count': club['members_count'],
+             'link': f"https://fan-club.kz/clubs/{club['id']}/", 'description': club['description']}
+            for club in clubs[:10]
+        ],
+        'llm_messages': [
+            {'role': 'system', 'content': _text(400)},
+            *({'role': 'user' if i % 2 else 'assistant', 'content': _text(30)} for i in range(18)),
+            {'role': 'assistant', 'content': '', 'tool_calls': [
+                {'id': 'call_1', 'type': 'function',
+                 'function': {'name': 'search_clubs', 'arguments': '{"query": "шахматы", "limit": 5}'}}
+            ]},
+        ],
+    }
+
+
+def _best(func, repeat, number):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = (time.perf_counter() - started) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e6
+
+
+class Command(BaseCommand):
+    help = 'Compare stdlib json with the fast_json (orjson) path on the ten hottest API and tool payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=200, help='Encodes/decodes per timed pass')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed passes, the best one is reported')
+        parser.add_argument('--serializers', type=int, default=0, metavar='N',
+                            help='Also time ClubListSerializer against the values() serializer on N clubs from the DB')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        number, repeat = options['number'], options['repeat']
+        report = {'orjson': fast_json.ORJSON_AVAILABLE, 'payloads': {}}
+
+        for name, payload in top_payloads().items():
+            escaped = json.dumps(payload).encode()
+            stdlib = json.dumps(payload, ensure_ascii=False).encode()
+            compact = fast_json.dumps_bytes(payload)
+            row = {
+                'escaped_bytes': len(escaped),
+                'compact_bytes': len(compact),
+                'stdlib_dumps_us': _best(lambda: json.dumps(payload, ensure_ascii=False).encode(), repeat, number),
+                'fast_dumps_us': _best(lambda: fast_json.dumps_bytes(payload), repeat, number),
+                'stdlib_loads_us': _best(lambda: json.loads(stdlib), repeat, number),
+                'fast_loads_us': _best(lambda: fast_json.loads(compact), repeat, number),
+                'same_data': fast_json.loads(compact) == json.loads(stdlib),
+            }
+            row['dumps_speedup'] = row['stdlib_dumps_us'] / max(row['fast_dumps_us'], 1e-9)
+            row['loads_speedup'] = row['stdlib_loads_us'] / max(row['fast_loads_us'], 1e-9)
+            report['payloads'][name] = row
+
+        if options['serializers']:
+            report['serializers'] = self._serializers(options['serializers'], repeat)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f"🧪 fast_json backend: {'orjson' if report['orjson'] else 'stdlib json (orjson not installed)'}")
+        self.stdout.write(f"  {'payload':<16}{'escaped':>9}{'compact':>9}{'dumps µs':>18}{'loads µs':>18}")
+        for name, row in report['payloads'].items():
+            self.stdout.write(
+                f"  {name:<16}{row['escaped_bytes']:>9}{row['compact_bytes']:>9}"
+                f"{row['stdlib_dumps_us']:>8.1f} → {row['fast_dumps_us']:<7.1f}"
+                f"{row['stdlib_loads_us']:>8.1f} → {row['fast_loads_us']:<7.1f}"
+                f"  x{row['dumps_speedup']:.1f}/x{row['loads_speedup']:.1f}"
+            )
+        serializers = report.get('serializers')
+        if serializers:
+            self.stdout.write(
+                f"📋 {serializers['clubs']} clubs: ClubListSerializer {serializers['model_ms']:.1f}мс, "
+                f"values() {serializers['values_ms']:.1f}мс (x{serializers['speedup']:.1f})"
+            )
+        if all(row['same_data'] for row in report['payloads'].values()):
+            self.stdout.write(self.style.SUCCESS('✅ fast_json decodes to the same data on every payload'))
+        else:
+            self.stdout.write(self.style.WARNING('⚠️ Some payloads decode differently'))
+
+    @staticmethod
+    def _serializers(limit, repeat):
+        from clubs.api.serializers import ClubListSerializer, ClubListValuesSerializer
+        from clubs.models import Club
+
+        queryset = Club.objects.filter(is_active=True)
+        clubs = min(queryset.count(), limit)
+
+        def model_path():
+            return ClubListSerializer(queryset.select_related('category', 'city')[:limit], many=True).data
+
+        def values_path():
+            return ClubListValuesSerializer(ClubListValuesSerializer.get_values(queryset)[:limit]).data
+
+        model_ms = _best(model_path, repeat, 1) / 1000
+        values_ms = _best(values_path, repeat, 1) / 1000
+        return {'clubs': clubs, 'model_ms': model_ms, 'values_ms': values_ms,
+                'speedup': model_ms / max(values_ms, 1e-9)}
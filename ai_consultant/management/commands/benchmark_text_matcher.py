@@ -0,0 +1,151 @@
+import json
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_consultant.models import ChatMessage
+from ai_consultant.rag.enhanced_rag_service import QUERY_INTENT_PATTERNS
+from ai_consultant.security import SecurityValidator
+from ai_consultant.services.message_processor import INTENT_PATTERNS as PROCESSOR_INTENTS, SENTIMENT_WORDS
+from ai_consultant.utils.context_analyzer import (
+    ENTITY_PATTERNS, INTENT_PATTERNS, NEGATIVE_WORDS, POSITIVE_WORDS, URGENCY_PATTERNS,
+)
+from ai_consultant.utils.text_matcher import text_matcher
+
+
+def legacy_scan(text):
+    """The per-pattern loops the analyzers ran before the shared matcher, one dictionary at a time"""
+    cleaned = text.lower()
+    words = cleaned.split()
+    context_intents = {
+        intent: sum(len(re.findall(pattern, cleaned, re.IGNORECASE)) for pattern in patterns)
+        for intent, patterns in INTENT_PATTERNS.items()
+    }
+    entities = sorted(
+        (match.start(), match.end(), entity_type)
+        for entity_type, patterns in ENTITY_PATTERNS.items()
+        for pattern in patterns
+        for match in re.finditer(pattern, cleaned, re.IGNORECASE)
+    )
+    return {
+        'context_intents': {intent: score for intent, score in context_intents.items() if score},
+        'entities': entities,
+        'sentiment': (sum(1 for word in words if word in POSITIVE_WORDS),
+                      sum(1 for word in words if word in NEGATIVE_WORDS)),
+        'urgency': sum(1 for pattern in URGENCY_PATTERNS['urgent'] if re.search(pattern, cleaned, re.IGNORECASE)),
+        'processor_intents': [
+            intent for intent, patterns in PROCESSOR_INTENTS.items()
+            if any(re.search(re.escape(pattern), cleaned) for pattern in patterns)
+        ],
+        'processor_sentiment': tuple(
+            sum(1 for word in SENTIMENT_WORDS[label] if word in cleaned) for label in ('positive', 'negative')
+        ),
+        'rag_intents': {
+            intent: sum(1 for pattern in patterns if pattern in cleaned)
+            for intent, patterns in QUERY_INTENT_PATTERNS.items()
+        },
+        'profanity': any(word in cleaned for word in SecurityValidator.FORBIDDEN_WORDS),
+        'spam': any(re.search(pattern, cleaned) for pattern in SecurityValidator.SPAM_PATTERNS),
+        'urls': len(re.findall(r'http[s]?://', cleaned)),
+    }
+
+
+def matcher_scan(text, use_cache=False):
+    """The same answers from one pass of the shared matcher"""
+    scan = text_matcher.scan(text.lower(), use_cache=use_cache)
+    context_intents = scan.counts('context.intent')
+    return {
+        'context_intents': {intent: context_intents[intent] for intent in INTENT_PATTERNS if context_intents[intent]},
+        'entities': sorted((m.start, m.end, m.label) for m in scan.group('context.entity')),
+        'sentiment': (scan.counts('context.sentiment')['positive'], scan.counts('context.sentiment')['negative']),
+        'urgency': len(scan.patterns('context.urgency')),
+        'processor_intents': [intent for intent in PROCESSOR_INTENTS if scan.has('processor.intent', intent)],
+        'processor_sentiment': tuple(
+            len(scan.patterns('processor.sentiment', label)) for label in ('positive', 'negative')
+        ),
+        'rag_intents': {
+            intent: len(scan.patterns('rag.intent', intent)) for intent in QUERY_INTENT_PATTERNS
+        },
+        'profanity': scan.has('security.profanity'),
+        'spam': scan.has('security.spam'),
+        'urls': len(scan.group('security.url')),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare the shared one-pass text matcher with the per-pattern analyzer loops on real chat messages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=None,
+                            help='Corpus file: one message per line, or JSON/JSONL with "message" or "content"')
+        parser.add_argument('--limit', type=int, default=5000,
+                            help='Number of most recent user messages to read from ChatMessage')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed passes over the corpus')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        corpus = self._load_corpus(options['file'], options['limit'])
+        if not corpus:
+            raise CommandError('No messages to benchmark: the chat history is empty, pass --file')
+
+        text_matcher.compile()
+        mismatches = [text for text in corpus if legacy_scan(text) != matcher_scan(text)]
+
+        report = {
+            'messages': len(corpus),
+            'avg_chars': sum(map(len, corpus)) / len(corpus),
+            'patterns': len(text_matcher),
+            'mismatches': len(mismatches),
+        }
+        for name, scan in (('loops', legacy_scan), ('matcher', matcher_scan)):
+            best = None
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                for text in corpus:
+                    scan(text)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            report[f'{name}_us_per_message'] = best / len(corpus) * 1e6
+        report['speedup'] = report['loops_us_per_message'] / max(report['matcher_us_per_message'], 1e-9)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"📨 {report['messages']} messages, {report['avg_chars']:.0f} chars avg, {report['patterns']} patterns"
+        )
+        self.stdout.write(f"  per-pattern loops {report['loops_us_per_message']:>9.1f} µs/message")
+        self.stdout.write(f"  one-pass matcher  {report['matcher_us_per_message']:>9.1f} µs/message")
+        self.stdout.write(f"⚡ speedup x{report['speedup']:.1f}")
+        if mismatches:
+            self.stdout.write(self.style.WARNING(f"⚠️ {len(mismatches)} messages differ, e.g. {mismatches[0][:80]!r}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ Same results on every message'))
+
+    @staticmethod
+    def _load_corpus(path, limit):
+        if not path:
+            return list(
+                ChatMessage.objects.filter(role='user').order_by('-created_at')
+                .values_list('content', flat=True)[:limit]
+            )
+
+        with open(path, encoding='utf-8') as handle:
+            raw = handle.read()
+        try:
+            items = json.loads(raw)
+            items = items if isinstance(items, list) else [items]
+        except json.JSONDecodeError:
+            items = []
+            for line in raw.splitlines():
+                try:
+                    items.append(json.loads(line))
+                except json.JSONDecodeError:
+                    items.append(line)
+        texts = [
+            item.get('message') or item.get('content') if isinstance(item, dict) else item
+            for item in items
+        ]
+        return [text for text in texts if isinstance(text, str) and text.strip()][:limit]
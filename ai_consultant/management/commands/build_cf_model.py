@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from ai_consultant.recommendations.collaborative import ItemSimilarityModel
+
+
+class Command(BaseCommand):
+    help = 'Train the offline item-item collaborative filtering model used by club recommendations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=None, help='Neighbours stored per club')
+
+    def handle(self, *args, **options):
+        model = ItemSimilarityModel()
+        self.stdout.write(f"🚀 Training collaborative filtering model into {model.path}...")
+
+        stats = model.train(top_k=options['top_k'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {stats['clubs']} clubs, {stats['users']} users, {stats['nonzero']} interactions"
+        ))
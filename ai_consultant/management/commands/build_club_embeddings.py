@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from ai_consultant.recommendations.club_embeddings import ClubEmbeddingIndex
+
+
+class Command(BaseCommand):
+    help = 'Build the precomputed club embedding matrix used by content-based recommendations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only re-encode clubs changed since the last build',
+        )
+
+    def handle(self, *args, **options):
+        from sentence_transformers import SentenceTransformer
+
+        index = ClubEmbeddingIndex(SentenceTransformer('all-MiniLM-L6-v2'))
+        self.stdout.write(f"🚀 Building club embeddings in {index.directory}...")
+
+        if options['incremental'] and index.exists():
+            count = index.sync(force=True)
+            self.stdout.write(self.style.SUCCESS(f"✅ Updated {count} clubs ({len(index)} in matrix)"))
+        else:
+            count = index.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"✅ Encoded {count} clubs"))
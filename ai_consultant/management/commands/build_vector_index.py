@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from ai_consultant.rag.vector_index import (
+    VECTOR_STORES,
+    chroma_store_path,
+    copy_collection,
+    get_vector_client,
+    resolve_ann_method,
+)
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the in-process vector index (local backend) from the Chroma store and swap it in atomically'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', choices=VECTOR_STORES, default='enhanced_rag',
+                            help='Which service store to rebuild')
+        parser.add_argument('--collections', nargs='*', default=None,
+                            help='Collections to copy (default: all collections of the Chroma store)')
+        parser.add_argument('--chroma-path', default=None, help='Chroma persist directory of the store')
+
+    def handle(self, *args, **options):
+        store = options['store']
+        source = get_vector_client(options['chroma_path'] or chroma_store_path(store), store=store, backend='chroma')
+        target = get_vector_client(store=store, backend='local')
+
+        names = options['collections'] or [
+            getattr(collection, 'name', collection) for collection in source.list_collections()
+        ]
+        self.stdout.write(f"🚀 Rebuilding '{store}' into {target.path} (ANN: {resolve_ann_method()})...")
+
+        for name in names:
+            count = copy_collection(source.get_collection(name), target.get_or_create_collection(name))
+            self.stdout.write(f"  {name}: {count} vectors")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(names)} collection(s) swapped in"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_consultant.utils.import_budget import check_budget, forbidden_imports, measure_startup
+
+
+class Command(BaseCommand):
+    help = 'Measure Django startup with python -X importtime and fail if it exceeds the import budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget-ms', type=float, default=None,
+                            help='Import time budget in ms (default: AI_IMPORT_BUDGET_MS)')
+        parser.add_argument('--settings-module', default=None,
+                            help='DJANGO_SETTINGS_MODULE for the measured process')
+        parser.add_argument('--top', type=int, default=15, help='Number of slowest imports to show')
+
+    def handle(self, *args, **options):
+        profile = measure_startup(options['settings_module'])
+
+        for record in profile.slowest(options['top']):
+            self.stdout.write(f"  {record.module:<48}{record.cumulative_us / 1000:>9.1f} ms")
+        heavy = forbidden_imports(profile)
+        if heavy:
+            self.stdout.write(f"  heavy packages: {', '.join(heavy)}")
+        self.stdout.write(f"⏱️ imports {profile.total_ms:.0f} ms, wall {profile.wall_seconds:.2f}s")
+
+        violations = check_budget(profile, options['budget_ms'])
+        if violations:
+            raise CommandError('\n'.join(violations))
+        self.stdout.write(self.style.SUCCESS('✅ Startup within budget'))
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ai_consultant.services.analytics_rollup import rollup_range
+from ai_consultant.utils.context_analyzer import ContextAnalyzer
+
+
+class Command(BaseCommand):
+    help = 'Rebuild chat_analytics_daily rollups used by the analytics dashboards (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help='Number of days up to today to recompute')
+        parser.add_argument('--skip-nlp', action='store_true',
+                            help='Skip intent/sentiment/keyword analysis of message contents')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        start = today - timedelta(days=max(options['days'], 1) - 1)
+        analyzer = None if options['skip_nlp'] else ContextAnalyzer()
+
+        self.stdout.write(f"🚀 Rolling up chat analytics {start} — {today}...")
+        rows = rollup_range(start, today, context_analyzer=analyzer)
+
+        for row in rows:
+            self.stdout.write(f"  {row.date}: {row.sessions} sessions, {row.total_messages} messages, "
+                              f"{row.replies} replies")
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(rows)} days rolled up"))
@@ -0,0 +1,28 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from ai_consultant.utils.warmup import warmup_registry
+
+
+class Command(BaseCommand):
+    help = 'Load the heavy models and indexes the gunicorn master preloads and report the startup time of each'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        report = warmup_registry.warm_up()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2, ensure_ascii=False))
+            return
+
+        for resource in sorted(report['resources'], key=lambda r: r['seconds'], reverse=True):
+            line = f"  {resource['name']:<28}{resource['seconds']:>8.2f}s  {resource['status']}"
+            if resource.get('error'):
+                line += f" ({resource['error']})"
+            self.stdout.write(line)
+
+        style = self.style.SUCCESS if report['state'] == 'ready' else self.style.WARNING
+        self.stdout.write(style(f"🔥 {report['state']} in {report['total_seconds']:.2f}s"))
@@ -66,6 +66,13 @@ class MetricsCollector:
             'Total cache misses'
         )
 
+        # Метрики prompt caching провайдера
+        self.prompt_tokens = Counter(
+            'ai_consultant_prompt_tokens_total',
+            'Prompt tokens by provider-side prompt cache status',
+            ['model', 'cache']
+        )
+
     def record_request(self, status: str = 'success', request_type: str = 'chat'):
         """Запись метрики запроса"""
         if PROMETHEUS_AVAILABLE:
@@ -95,3 +102,9 @@ class MetricsCollector:
         """Запись промаха кэша"""
         if PROMETHEUS_AVAILABLE:
             self.cache_misses.inc()
+
+    def record_prompt_tokens(self, prompt_tokens: int, cached_tokens: int, model: str = 'gpt-4o'):
+        """Запись токенов промпта: попавших и не попавших в prompt cache провайдера"""
+        if PROMETHEUS_AVAILABLE:
+            self.prompt_tokens.labels(model=model, cache='hit').inc(cached_tokens)
+            self.prompt_tokens.labels(model=model, cache='miss').inc(max(0, prompt_tokens - cached_tokens))
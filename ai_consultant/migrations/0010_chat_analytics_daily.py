@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_consultant', '0009_add_city_stage_choice'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatAnalyticsDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Дата')),
+                ('sessions', models.PositiveIntegerField(default=0, verbose_name='Сессий')),
+                ('anonymous_sessions', models.PositiveIntegerField(default=0, verbose_name='Анонимных сессий')),
+                ('total_messages', models.PositiveIntegerField(default=0, verbose_name='Сообщений')),
+                ('user_messages', models.PositiveIntegerField(default=0, verbose_name='Сообщений пользователей')),
+                ('assistant_messages', models.PositiveIntegerField(default=0, verbose_name='Ответов ассистента')),
+                ('tokens_used', models.PositiveBigIntegerField(default=0, verbose_name='Использовано токенов')),
+                ('replies', models.PositiveIntegerField(default=0, verbose_name='Отвеченных запросов')),
+                ('reply_seconds_total', models.FloatField(default=0.0, verbose_name='Суммарное время ответа, с')),
+                ('reply_latency_histogram', models.JSONField(default=dict, verbose_name='Гистограмма времени ответа')),
+                ('message_lengths', models.JSONField(default=dict, verbose_name='Длины сообщений')),
+                ('hourly_messages', models.JSONField(default=dict, verbose_name='Сообщения по часам')),
+                ('intents', models.JSONField(default=dict, verbose_name='Интенты')),
+                ('sentiments', models.JSONField(default=dict, verbose_name='Тональность')),
+                ('keywords', models.JSONField(default=dict, verbose_name='Ключевые слова')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Дневная аналитика чата',
+                'verbose_name_plural': 'Дневная аналитика чата',
+                'db_table': 'chat_analytics_daily',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['session', 'created_at'], name='ai_consulta_session_97e10d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['created_at'], name='ai_consulta_created_cd2f4e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['created_at'], name='ai_consulta_created_8a72dc_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def partition_log_tables(apps, schema_editor):
+    """Помесячное RANGE партиционирование журналов (только PostgreSQL)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    from ai_consultant.utils.log_storage import LOG_TABLES, convert_to_partitioned
+
+    with schema_editor.connection.cursor() as cursor:
+        for name in ('chat_messages', 'ai_session_logs'):
+            convert_to_partitioned(LOG_TABLES[name], cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_consultant', '0010_chat_analytics_daily'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_log_tables, migrations.RunPython.noop),
+    ]
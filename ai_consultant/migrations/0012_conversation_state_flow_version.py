@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_consultant', '0011_partition_log_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationstate',
+            name='flow',
+            field=models.CharField(db_index=True, default='interactive', help_text='Сценарий диалога, которому принадлежит состояние', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='conversationstate',
+            name='version',
+            field=models.PositiveIntegerField(default=0, help_text='Версия для compare-and-set обновлений'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_consultant', '0012_conversation_state_flow_version'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='chatmessage',
+            name='ai_consulta_session_97e10d_idx',
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['session', '-created_at'], name='chatmsg_session_recent_idx'),
+        ),
+    ]
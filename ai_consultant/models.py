@@ -42,6 +42,9 @@ class ChatSession(models.Model):
         verbose_name = _('Сессия чата')
         verbose_name_plural = _('Сессии чата')
         ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
 
     def __str__(self):
         user_display = self.user if self.user else 'Анонимный пользователь'
@@ -78,6 +81,11 @@ class ChatMessage(models.Model):
         verbose_name = _('Сообщение чата')
         verbose_name_plural = _('Сообщения чата')
         ordering = ['created_at']
+        indexes = [
+            # Последние сообщения сессии (services/history_buffer.py); по возрастанию — обратным обходом
+            models.Index(fields=['session', '-created_at'], name='chatmsg_session_recent_idx'),
+            models.Index(fields=['created_at']),
+        ]
 
     def __str__(self):
         return f'{self.role}: {self.content[:50]}...'
@@ -128,6 +136,38 @@ class ChatAnalytics(models.Model):
         return f'{self.event_type} - {self.session}'
 
 
+class ChatAnalyticsDaily(models.Model):
+    """
+    Дневной срез аналитики чата (rollup).
+    Заполняется командой rollup_chat_analytics, дашборды читают его вместо сырых сообщений.
+    """
+    date = models.DateField(unique=True, verbose_name=_('Дата'))
+    sessions = models.PositiveIntegerField(default=0, verbose_name=_('Сессий'))
+    anonymous_sessions = models.PositiveIntegerField(default=0, verbose_name=_('Анонимных сессий'))
+    total_messages = models.PositiveIntegerField(default=0, verbose_name=_('Сообщений'))
+    user_messages = models.PositiveIntegerField(default=0, verbose_name=_('Сообщений пользователей'))
+    assistant_messages = models.PositiveIntegerField(default=0, verbose_name=_('Ответов ассистента'))
+    tokens_used = models.PositiveBigIntegerField(default=0, verbose_name=_('Использовано токенов'))
+    replies = models.PositiveIntegerField(default=0, verbose_name=_('Отвеченных запросов'))
+    reply_seconds_total = models.FloatField(default=0.0, verbose_name=_('Суммарное время ответа, с'))
+    reply_latency_histogram = models.JSONField(default=dict, verbose_name=_('Гистограмма времени ответа'))
+    message_lengths = models.JSONField(default=dict, verbose_name=_('Длины сообщений'))
+    hourly_messages = models.JSONField(default=dict, verbose_name=_('Сообщения по часам'))
+    intents = models.JSONField(default=dict, verbose_name=_('Интенты'))
+    sentiments = models.JSONField(default=dict, verbose_name=_('Тональность'))
+    keywords = models.JSONField(default=dict, verbose_name=_('Ключевые слова'))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_('Обновлено'))
+
+    class Meta:
+        db_table = 'chat_analytics_daily'
+        verbose_name = _('Дневная аналитика чата')
+        verbose_name_plural = _('Дневная аналитика чата')
+        ordering = ['-date']
+
+    def __str__(self):
+        return f'{self.date}: {self.sessions} сессий, {self.total_messages} сообщений'
+
+
 class PlatformService(models.Model):
     """
     Модель для хранения информации об услугах платформы
@@ -658,6 +698,18 @@ class ConversationState(models.Model):
         help_text="Данные, собранные на текущем этапе"
     )
 
+    # Общее хранилище состояний диалогов (services/conversation_store.py)
+    flow = models.CharField(
+        max_length=50,
+        default='interactive',
+        db_index=True,
+        help_text="Сценарий диалога, которому принадлежит состояние"
+    )
+    version = models.PositiveIntegerField(
+        default=0,
+        help_text="Версия для compare-and-set обновлений"
+    )
+
     # Метаданные
     last_question = models.CharField(
         max_length=100,
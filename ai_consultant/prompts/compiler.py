@@ -0,0 +1,111 @@
+"""
+🧱 Компиляция статических промптов
+Статические промпты рендерятся один раз на версию базы знаний и хэшируются.
+Побайтно стабильный префикс (tools + system) попадает в prompt cache провайдера,
+поэтому динамические данные пользователя всегда идут после него.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'prompt_compiler:knowledge_version'
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    name: str
+    text: str
+    digest: str
+
+
+class PromptCompiler:
+    """
+    Реестр статических промптов.
+
+    Версия базы знаний (PlatformKnowledgeBase, активные категории клубов,
+    системные AIContext и AI_PROMPT_VERSION) хранится в общем кэше, чтобы
+    инвалидация из сигналов доходила до всех воркеров. Пока версия не изменилась,
+    промпты отдаются из памяти процесса без повторного рендеринга.
+    """
+
+    def __init__(self):
+        self._builders: Dict[str, Callable[[], str]] = {}
+        self._compiled: Dict[str, CompiledPrompt] = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def register(self, name: str, builder: Callable[[], str]):
+        """Регистрирует функцию рендеринга статического промпта"""
+        self._builders[name] = builder
+        self._compiled.pop(name, None)
+
+    def get(self, name: str) -> CompiledPrompt:
+        version = self.knowledge_version()
+        compiled = self._compiled.get(name) if version == self._version else None
+        if compiled is not None:
+            return compiled
+
+        with self._lock:
+            if version != self._version:
+                self._compiled = {}
+                self._version = version
+            compiled = self._compiled.get(name)
+            if compiled is None:
+                text = self._builders[name]()
+                compiled = CompiledPrompt(name=name, text=text, digest=hashlib.sha256(text.encode()).hexdigest()[:16])
+                self._compiled[name] = compiled
+                logger.info(f"🧱 Промпт '{name}' скомпилирован: {compiled.digest} (база знаний {version})")
+        return compiled
+
+    def text(self, name: str) -> str:
+        return self.get(name).text
+
+    def compile_all(self) -> int:
+        """Компилирует все зарегистрированные промпты (прогрев до fork)"""
+        for name in list(self._builders):
+            self.get(name)
+        return len(self._builders)
+
+    def knowledge_version(self) -> str:
+        version = cache.get(VERSION_CACHE_KEY)
+        if version is None:
+            version = self._compute_knowledge_version()
+            cache.set(VERSION_CACHE_KEY, version, getattr(settings, 'AI_PROMPT_VERSION_TTL', 3600))
+        return version
+
+    def invalidate(self):
+        """Вызывается при изменении данных, из которых строятся промпты"""
+        cache.delete(VERSION_CACHE_KEY)
+
+    @staticmethod
+    def _compute_knowledge_version() -> str:
+        from ..knowledge.platform_knowledge_base import platform_knowledge
+
+        parts = {
+            'deploy': getattr(settings, 'AI_PROMPT_VERSION', ''),
+            'knowledge': platform_knowledge.get_platform_context(),
+            'categories': platform_knowledge.get_active_categories(),
+        }
+        try:
+            from ..models import AIContext
+            parts['contexts'] = list(
+                AIContext.objects.filter(is_active=True).order_by('key').values_list('key', 'updated_at')
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ AIContext недоступен для версии промптов: {e}")
+
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:12]
+
+
+# Глобальный реестр промптов
+prompt_compiler = PromptCompiler()
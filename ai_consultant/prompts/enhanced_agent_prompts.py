@@ -3,6 +3,7 @@
 """
 
 from ..knowledge.platform_knowledge_base import platform_knowledge
+from .compiler import prompt_compiler
 
 
 class EnhancedAgentPrompts:
@@ -340,17 +341,24 @@ class EnhancedAgentPrompts:
 Всегда вдохновляй на рост и развитие!"""
 
 
+AGENT_PROMPT_BUILDERS = {
+    'orchestrator': EnhancedAgentPrompts.get_orchestrator_prompt,
+    'club_specialist': EnhancedAgentPrompts.get_club_specialist_prompt,
+    'support_specialist': EnhancedAgentPrompts.get_support_specialist_prompt,
+    'mentor_specialist': EnhancedAgentPrompts.get_mentor_specialist_prompt,
+}
+
+for _agent_type, _builder in AGENT_PROMPT_BUILDERS.items():
+    prompt_compiler.register(_agent_type, _builder)
+
+
 # Фабрика для создания промптов
 class PromptFactory:
     """Фабрика для получения улучшенных промптов"""
 
     @staticmethod
     def get_prompt(agent_type: str) -> str:
-        """Получить улучшенный промпт для типа агента"""
-        prompts = {
-            'orchestrator': EnhancedAgentPrompts.get_orchestrator_prompt(),
-            'club_specialist': EnhancedAgentPrompts.get_club_specialist_prompt(),
-            'support_specialist': EnhancedAgentPrompts.get_support_specialist_prompt(),
-            'mentor_specialist': EnhancedAgentPrompts.get_mentor_specialist_prompt(),
-        }
-        return prompts.get(agent_type, prompts['orchestrator'])
\ No newline at end of file
+        """Получить улучшенный промпт для типа агента (рендерится один раз на версию базы знаний)"""
+        if agent_type not in AGENT_PROMPT_BUILDERS:
+            agent_type = 'orchestrator'
+        return prompt_compiler.text(agent_type)
\ No newline at end of file
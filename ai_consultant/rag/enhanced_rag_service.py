@@ -8,21 +8,10 @@ import json
 import logging
 import uuid
 import asyncio
+from contextlib import ExitStack
 from typing import List, Dict, Optional, Any, Tuple, Union
 from datetime import datetime, timedelta
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
-import re
-import nltk
-from nltk.tokenize import sent_tokenize
-from nltk.corpus import stopwords
-
-# ML and Vector Database
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
-from transformers import pipeline
 
 # Django and ML Integration
 from django.conf import settings
@@ -30,19 +19,26 @@ from django.core.cache import cache
 from django.contrib.auth.models import User
 from django.utils import timezone
 
-# OpenAI Integration
-import openai
+from .lexical_index import BM25Index, reciprocal_rank_fusion
+from .vector_index import get_vector_client
+from .ranking import document_features, merge_candidates, mmr_select, normalize_rows, score_candidates
+from ai_consultant.services.message_analysis import MessageAnalysis, cyrillic_ratio, extract_keywords
+from ai_consultant.utils.text_matcher import text_matcher
+from ai_consultant.utils.warmup import ensure_nltk_data, get_sentence_model, get_sentiment_pipeline
 
 logger = logging.getLogger(__name__)
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('punkt')
-    nltk.download('stopwords')
+# Query intent keywords, matched in one pass by the shared text matcher
+QUERY_INTENT_PATTERNS = {
+    'club_creation': ['создать', 'создание', 'основать', 'зарегистрировать', 'новый клуб'],
+    'club_search': ['найти', 'поиск', 'где', 'какой', 'показать'],
+    'join_club': ['вступить', 'присоединиться', 'вступлю', 'хочу в'],
+    'get_help': ['помощь', 'помогите', 'что делать', 'как', 'почему'],
+    'event_info': ['мероприятие', 'событие', 'фестиваль', 'конференция'],
+    'general_info': ['что такое', 'расскажи', 'информация', 'о чем']
+}
 
+text_matcher.register_phrases('rag.intent', QUERY_INTENT_PATTERNS)
 
 class AdvancedRAGService:
     """
@@ -55,53 +51,72 @@ class AdvancedRAGService:
         self.recommendation_model_name = getattr(settings, 'RECOMMENDATION_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
         self.semantic_search_threshold = getattr(settings, 'SEMANTIC_SEARCH_THRESHOLD', 0.3)
         self.max_results_per_query = getattr(settings, 'MAX_RAG_RESULTS', 10)
+        self.mmr_lambda = getattr(settings, 'RAG_MMR_LAMBDA', 0.7)
+        self.duplicate_threshold = getattr(settings, 'RAG_DUPLICATE_THRESHOLD', 0.95)
 
         # Initialize models
-        self.embedding_model = SentenceTransformer(self.embedding_model_name)
-        self.recommendation_model = SentenceTransformer(self.recommendation_model_name)
+        # Shared per-process models, preloaded in the gunicorn master (utils/warmup.py)
+        ensure_nltk_data()
+        self.embedding_model = get_sentence_model(self.embedding_model_name)
+        self.recommendation_model = get_sentence_model(self.recommendation_model_name)
 
         # Sentiment analysis for user feedback
         try:
-            self.sentiment_analyzer = pipeline("sentiment-analysis", model="cardiffnlp/twitter-roberta-base-sentiment")
+            self.sentiment_analyzer = get_sentiment_pipeline()
         except:
             self.sentiment_analyzer = None
             logger.warning("⚠️ Sentiment analysis model not available")
 
-        # Initialize ChromaDB
-        self.chroma_client = chromadb.PersistentClient(
-            path=getattr(settings, 'CHROMA_DB_PATH', './chroma_db_enhanced')
+        # Vector store: ChromaDB or the in-process index (RAG_VECTOR_BACKEND)
+        self.chroma_client = get_vector_client(
+            getattr(settings, 'CHROMA_DB_PATH', './chroma_db_enhanced'), store='enhanced_rag'
         )
 
         # Collection definitions with metadata
         self.collections_config = {
             'clubs': {
                 'description': 'Club information and descriptions',
+                'retrieval': 'hybrid',
                 'metadata': {'type': 'club_data', 'priority': 'high'}
             },
             'documentation': {
                 'description': 'Platform documentation and guides',
+                'retrieval': 'hybrid',
                 'metadata': {'type': 'documentation', 'priority': 'medium'}
             },
             'faq': {
                 'description': 'Frequently asked questions and answers',
+                'retrieval': 'hybrid',
                 'metadata': {'type': 'faq', 'priority': 'medium'}
             },
             'user_interactions': {
                 'description': 'User interaction history and preferences',
+                'retrieval': 'dense',
                 'metadata': {'type': 'interaction_data', 'priority': 'low'}
             },
             'events': {
                 'description': 'Events and announcements',
+                'retrieval': 'hybrid',
                 'metadata': {'type': 'event_data', 'priority': 'medium'}
             },
             'recommendations': {
                 'description': 'Personalized recommendations',
+                'retrieval': 'dense',
                 'metadata': {'type': 'recommendation_data', 'priority': 'high'}
             }
         }
 
+        # Retrieval per collection: 'dense', 'lexical' (BM25) or 'hybrid' (RRF of both)
+        retrieval_overrides = getattr(settings, 'RAG_RETRIEVAL_MODES', {})
+        self.retrieval_modes = {
+            name: retrieval_overrides.get(name, config['retrieval'])
+            for name, config in self.collections_config.items()
+        }
+        self.lexical_candidates = getattr(settings, 'RAG_LEXICAL_CANDIDATES', 20)
+
         # Initialize collections
         self.collections = {}
+        self.lexical_indexes = {}
         self._init_collections()
 
         # Caches
@@ -120,6 +135,8 @@ class AdvancedRAGService:
                         name=collection_name,
                         metadata=config['metadata']
                     )
+                    if self.retrieval_modes[collection_name] != 'dense':
+                        self.lexical_indexes[collection_name] = BM25Index(collection_name)
                     logger.info(f"✅ Collection '{collection_name}' initialized")
                 except Exception as e:
                     logger.error(f"❌ Error initializing collection '{collection_name}': {e}")
@@ -182,6 +199,9 @@ class AdvancedRAGService:
             if metadata:
                 enhanced_metadata.update(metadata)
 
+            # Precomputed ranking features (see rag/ranking.py)
+            enhanced_metadata.update(document_features(text, metadata))
+
             # Get embedding
             embedding = self.get_embedding(text).tolist()
 
@@ -192,6 +212,8 @@ class AdvancedRAGService:
                 metadatas=[enhanced_metadata],
                 ids=[doc_id]
             )
+            if collection_name in self.lexical_indexes:
+                self.lexical_indexes[collection_name].add(doc_id, text)
 
             logger.info(f"✅ Enhanced document added to {collection_name}: {doc_id[:8]}...")
             return True
@@ -201,22 +223,35 @@ class AdvancedRAGService:
             return False
 
     def semantic_search_enhanced(self, collection_name: str, query: str,
-                               n_results: int = 5, user_context: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-        """Enhanced semantic search with user context and ranking"""
+                               n_results: int = 5, user_context: Dict[str, Any] = None,
+                               analysis: MessageAnalysis = None) -> List[Dict[str, Any]]:
+        """
+        Enhanced semantic search with user context and ranking.
+
+        analysis is the chat turn's MessageAnalysis, shared by the parallel per-collection searches.
+        """
         if collection_name not in self.collections:
             return []
 
         try:
-            # Generate multiple search queries
-            search_queries = self._generate_enhanced_queries(query, user_context)
-
+            mode = self.retrieval_modes.get(collection_name, 'dense')
             all_results = []
-            for search_query in search_queries:
-                results = self._search_single_query(collection_name, search_query, n_results)
-                all_results.extend(results)
+
+            if mode != 'lexical':
+                # Generate multiple search queries
+                search_queries = self._generate_enhanced_queries(query, user_context, analysis)
+                # BM25 covers exact names, so hybrid dense recall needs fewer candidates
+                dense_candidates = n_results if mode == 'hybrid' else min(n_results * 2, 20)
+                for search_query in search_queries:
+                    results = self._search_single_query(collection_name, search_query, dense_candidates)
+                    all_results.extend(results)
+
+            similarity = None
+            if mode != 'dense' and collection_name in self.lexical_indexes:
+                all_results, similarity = self._fuse_lexical_results(collection_name, query, all_results)
 
             # Deduplicate and rank results
-            ranked_results = self._rank_and_deduplicate_results(all_results, query, user_context)
+            ranked_results = self._rank_and_deduplicate_results(all_results, query, user_context, similarity)
 
             return ranked_results[:n_results]
 
@@ -224,12 +259,13 @@ class AdvancedRAGService:
             logger.error(f"❌ Error in enhanced semantic search: {e}")
             return []
 
-    def _generate_enhanced_queries(self, original_query: str, user_context: Dict[str, Any] = None) -> List[str]:
+    def _generate_enhanced_queries(self, original_query: str, user_context: Dict[str, Any] = None,
+                                   analysis: MessageAnalysis = None) -> List[str]:
         """Generate multiple enhanced search queries"""
         queries = [original_query]
 
         # Extract keywords and create variations
-        keywords = self._extract_keywords(original_query)
+        keywords = analysis.keywords if analysis is not None else self._extract_keywords(original_query)
 
         # Create keyword-focused queries
         if len(keywords) >= 2:
@@ -291,10 +327,11 @@ class AdvancedRAGService:
 
             results = self.collections[collection_name].query(
                 query_embeddings=[query_embedding],
-                n_results=min(n_results * 2, 20),  # Get more results for ranking
+                n_results=n_results,
                 where={
                     'collection': collection_name
-                }
+                },
+                include=['documents', 'metadatas', 'distances', 'embeddings']
             )
 
             formatted_results = []
@@ -304,6 +341,7 @@ class AdvancedRAGService:
                     'text': results['documents'][0][i],
                     'metadata': results['metadatas'][0][i],
                     'distance': results['distances'][0][i] if 'distances' in results else 0,
+                    'embedding': results['embeddings'][0][i] if results.get('embeddings') is not None else None,
                     'query_matched': query
                 })
 
@@ -313,105 +351,69 @@ class AdvancedRAGService:
             logger.error(f"❌ Error in single query search: {e}")
             return []
 
-    def _rank_and_deduplicate_results(self, results: List[Dict[str, Any]], query: str,
-                                    user_context: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-        """Rank and deduplicate search results"""
-        if not results:
-            return []
-
-        # Deduplicate by text similarity
-        unique_results = self._deduplicate_by_similarity(results)
-
-        # Calculate ranking scores
-        scored_results = []
-        query_embedding = self.get_embedding(query)
-
-        for result in unique_results:
-            score = self._calculate_ranking_score(result, query_embedding, query, user_context)
-            scored_results.append({
-                'result': result,
-                'score': score
-            })
-
-        # Sort by score (higher is better)
-        scored_results.sort(key=lambda x: x['score'], reverse=True)
-
-        # Return ranked results
-        return [item['result'] for item in scored_results]
-
-    def _deduplicate_by_similarity(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Deduplicate results based on text similarity"""
-        if len(results) <= 1:
-            return results
-
-        unique_results = []
-        seen_texts = set()
-
-        for result in results:
-            text = result['text'].lower().strip()
-            text_hash = hash(text[:100])  # Hash first 100 chars
-
-            if text_hash not in seen_texts and len(text) > 20:
-                seen_texts.add(text_hash)
-                unique_results.append(result)
-
-        return unique_results
-
-    def _calculate_ranking_score(self, result: Dict[str, Any], query_embedding: np.ndarray,
-                               query: str, user_context: Dict[str, Any] = None) -> float:
-        """Calculate ranking score for a result"""
-        score = 0.0
-
-        # Base similarity score (inverse of distance)
-        distance = result.get('distance', 1.0)
-        similarity = max(0.0, 1.0 - distance)
-        score += similarity * 0.4
-
-        # Metadata-based scoring
-        metadata = result.get('metadata', {})
-
-        # Recency bonus
-        created_at = metadata.get('created_at')
-        if created_at:
-            try:
-                created_date = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                days_old = (datetime.now() - created_date.replace(tzinfo=None)).days
-                recency_bonus = max(0.0, 1.0 - (days_old / 365))  # Decay over 1 year
-                score += recency_bonus * 0.2
-            except:
-                pass
-
-        # User context personalization
-        if user_context:
-            user_city = user_context.get('city')
-            user_interests = user_context.get('interests', [])
-
-            # Location relevance
-            if user_city and user_city.lower() in result['text'].lower():
-                score += 0.15
+    def _fuse_lexical_results(self, collection_name: str, query: str,
+                              dense_results: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+        """
+        Reciprocal rank fusion of dense and BM25 rankings.
 
-            # Interest relevance
-            for interest in user_interests:
-                if interest.lower() in result['text'].lower():
-                    score += 0.1
-                    break
+        Returns candidates (lexical-only hits are fetched from Chroma by id)
+        and fused scores normalized to [0, 1] by document id.
+        """
+        lexical_hits = self.lexical_indexes[collection_name].search(query, k=self.lexical_candidates)
+        dense_ranking = [r['id'] for r in sorted(dense_results, key=lambda r: r.get('distance', 1.0))]
+        rankings = [list(dict.fromkeys(dense_ranking)), [doc_id for doc_id, _ in lexical_hits]]
+        fused = reciprocal_rank_fusion([ranking for ranking in rankings if ranking])
+        if not fused:
+            return dense_results, {}
+
+        known = {r['id'] for r in dense_results}
+        missing = [doc_id for doc_id, _ in fused if doc_id not in known]
+        results = list(dense_results)
+        if missing:
+            fetched = self.collections[collection_name].get(
+                ids=missing, include=['documents', 'metadatas', 'embeddings']
+            )
+            embeddings = fetched.get('embeddings')
+            for i, doc_id in enumerate(fetched['ids']):
+                results.append({
+                    'id': doc_id,
+                    'text': fetched['documents'][i],
+                    'metadata': fetched['metadatas'][i],
+                    'embedding': embeddings[i] if embeddings is not None else None,
+                    'query_matched': query
+                })
 
-        # Content quality indicators
-        text_length = len(result['text'])
-        if 100 <= text_length <= 1000:  # Good length
-            score += 0.1
-        elif text_length > 1000:  # Very long content
-            score += 0.05
+        top = fused[0][1]
+        return results, {doc_id: score / top for doc_id, score in fused}
 
-        # Query term matching
-        query_words = set(query.lower().split())
-        text_words = set(result['text'].lower().split())
-        overlap = len(query_words & text_words)
-        if overlap > 0:
-            keyword_match = overlap / len(query_words)
-            score += keyword_match * 0.15
+    def _rank_and_deduplicate_results(self, results: List[Dict[str, Any]], query: str,
+                                    user_context: Dict[str, Any] = None,
+                                    similarity: Dict[str, float] = None) -> List[Dict[str, Any]]:
+        """Rank all candidates with array operations and drop near-duplicates with MMR"""
+        candidates = merge_candidates(results)
+        if not candidates:
+            return []
 
-        return score
+        fused = None
+        if similarity:
+            fused = np.array([similarity.get(c['id'], 0.0) for c in candidates])
+        scores = score_candidates(candidates, query, user_context, similarity=fused)
+        order = mmr_select(
+            self._candidate_embeddings(candidates), scores, k=len(candidates),
+            lambda_=self.mmr_lambda, duplicate_threshold=self.duplicate_threshold
+        )
+        return [candidates[i] for i in order]
+
+    def _candidate_embeddings(self, candidates: List[Dict[str, Any]]) -> np.ndarray:
+        """Stored Chroma embeddings; texts without one are encoded in a single batch"""
+        missing = [i for i, c in enumerate(candidates) if c.get('embedding') is None]
+        if missing:
+            encoded = self.embedding_model.encode(
+                [candidates[i]['text'] for i in missing], convert_to_numpy=True
+            )
+            for i, embedding in zip(missing, encoded):
+                candidates[i]['embedding'] = embedding
+        return np.vstack([np.asarray(c['embedding'], dtype=np.float32) for c in candidates])
 
     def get_personalized_recommendations(self, user_id: int, query: str = None,
                                        category: str = None, n_recommendations: int = 5) -> List[Dict[str, Any]]:
@@ -610,8 +612,8 @@ class AdvancedRAGService:
         ranked_recs.sort(key=lambda x: x['score'], reverse=True)
         return [item['recommendation'] for item in ranked_recs]
 
-    def analyze_query_intent(self, query: str) -> Dict[str, Any]:
-        """Analyze user query intent"""
+    def analyze_query_intent(self, query: str, analysis: MessageAnalysis = None) -> Dict[str, Any]:
+        """Analyze user query intent, reusing the turn's MessageAnalysis when given"""
         intent_analysis = {
             'primary_intent': 'general',
             'confidence': 0.5,
@@ -621,21 +623,12 @@ class AdvancedRAGService:
         }
 
         try:
-            # Intent classification
-            intent_patterns = {
-                'club_creation': ['создать', 'создание', 'основать', 'зарегистрировать', 'новый клуб'],
-                'club_search': ['найти', 'поиск', 'где', 'какой', 'показать'],
-                'join_club': ['вступить', 'присоединиться', 'вступлю', 'хочу в'],
-                'get_help': ['помощь', 'помогите', 'что делать', 'как', 'почему'],
-                'event_info': ['мероприятие', 'событие', 'фестиваль', 'конференция'],
-                'general_info': ['что такое', 'расскажи', 'информация', 'о чем']
-            }
-
-            query_lower = query.lower()
+            # Intent classification: share of each intent's keywords present in the query
+            scan = analysis.scan if analysis is not None else text_matcher.scan(query.lower())
             intent_scores = {}
 
-            for intent, patterns in intent_patterns.items():
-                score = sum(1 for pattern in patterns if pattern in query_lower)
+            for intent, patterns in QUERY_INTENT_PATTERNS.items():
+                score = len(scan.patterns('rag.intent', intent))
                 intent_scores[intent] = score / len(patterns)
                 intent_analysis['intents'][intent] = score / len(patterns)
 
@@ -650,7 +643,9 @@ class AdvancedRAGService:
             intent_analysis['entities'] = self._extract_entities(query)
 
             # Extract keywords
-            intent_analysis['keywords'] = self._extract_keywords(query)
+            intent_analysis['keywords'] = (
+                list(analysis.keywords) if analysis is not None else self._extract_keywords(query)
+            )
 
         except Exception as e:
             logger.error(f"❌ Error analyzing query intent: {e}")
@@ -658,23 +653,9 @@ class AdvancedRAGService:
         return intent_analysis
 
     def _extract_keywords(self, text: str) -> List[str]:
-        """Extract keywords using TF-IDF approach"""
+        """Top 5 frequent words without stopwords (stopwords are loaded once per process)"""
         try:
-            stop_words = set(stopwords.words('russian') + stopwords.words('english'))
-
-            # Simple keyword extraction
-            words = re.findall(r'\b[a-zA-Zа-яА-Я]{3,}\b', text.lower())
-            filtered_words = [word for word in words if word not in stop_words]
-
-            # Get most frequent words
-            word_freq = {}
-            for word in filtered_words:
-                word_freq[word] = word_freq.get(word, 0) + 1
-
-            # Return top 5 keywords
-            sorted_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
-            return [word for word, freq in sorted_words[:5]]
-
+            return extract_keywords(text)
         except Exception as e:
             logger.error(f"❌ Error extracting keywords: {e}")
             return []
@@ -701,17 +682,13 @@ class AdvancedRAGService:
         """Detect text language"""
         try:
             # Simple language detection based on Cyrillic characters
-            cyrillic_chars = sum(1 for char in text if '\u0400' <= char <= '\u04FF')
-            total_chars = len(text.replace(' ', ''))
-
-            if total_chars == 0:
+            ratio = cyrillic_ratio(text)
+            if ratio is None:
                 return 'unknown'
 
-            cyrillic_ratio = cyrillic_chars / total_chars
-
-            if cyrillic_ratio > 0.3:
+            if ratio > 0.3:
                 return 'russian'
-            elif cyrillic_ratio < 0.1:
+            elif ratio < 0.1:
                 return 'english'
             else:
                 return 'mixed'
@@ -783,17 +760,29 @@ class AdvancedRAGService:
                     except Exception as e:
                         logger.error(f"❌ Error clearing {collection_name}: {e}")
 
+            for lexical_index in self.lexical_indexes.values():
+                lexical_index.clear()
+
             # Reinitialize
             self._init_collections()
 
-            # Index platform knowledge
-            self._index_platform_knowledge()
+            with ExitStack() as stack:
+                # One lexical index save per collection instead of one per document
+                for lexical_index in self.lexical_indexes.values():
+                    stack.enter_context(lexical_index.deferred_save())
+                # Local vector backend: one generation per collection
+                for collection in self.collections.values():
+                    if hasattr(collection, 'deferred_write'):
+                        stack.enter_context(collection.deferred_write())
+
+                # Index platform knowledge
+                self._index_platform_knowledge()
 
-            # Index existing clubs
-            self._index_clubs_data()
+                # Index existing clubs
+                self._index_clubs_data()
 
-            # Index documentation
-            self._index_documentation_data()
+                # Index documentation
+                self._index_documentation_data()
 
             logger.info("✅ Enhanced RAG index rebuilt successfully")
 
@@ -958,15 +947,11 @@ class AdvancedRAGService:
             # Deduplicate and rank results across all collections
             if all_results:
                 # Convert to numpy array for similarity calculations
-                query_embedding = self.embedding_model.encode([query])[0]
+                query_embedding = normalize_rows([self.embedding_model.encode([query])[0]])[0]
 
                 for result in all_results:
                     if 'embedding' in result:
-                        similarity = cosine_similarity(
-                            [query_embedding],
-                            [result['embedding']]
-                        )[0][0]
-                        result['similarity'] = similarity
+                        result['similarity'] = float(normalize_rows([result['embedding']])[0] @ query_embedding)
 
                 # Sort by similarity
                 all_results.sort(key=lambda x: x.get('similarity', 0), reverse=True)
@@ -0,0 +1,266 @@
+"""
+🔤 Persistent BM25 lexical index for the enhanced RAG service
+
+Dense MiniLM search misses exact club and city names in Russian/Kazakh text.
+This index keeps BM25 postings over lemmatized tokens next to each Chroma
+collection. It is updated incrementally on every added document and persisted
+as JSON (atomic replace). Other processes pick up changes by file mtime.
+
+Several workers write the same file, so a save never writes this process's
+copy blindly: under an fcntl lock it re-reads the file, replays the changes
+made here since the last save and only then replaces it.
+"""
+
+import fcntl
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pymorphy3
+    PYMORPHY_AVAILABLE = True
+except ImportError:
+    PYMORPHY_AVAILABLE = False
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+KAZAKH_LETTERS_RE = re.compile('[әғқңөұүһі]')
+
+# Common inflection endings, longest first
+RUSSIAN_SUFFIXES = sorted({
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'иях', 'ах', 'ях',
+    'ов', 'ев', 'ей', 'ий', 'ый', 'ой', 'ая', 'яя', 'ое', 'ее', 'ие', 'ые', 'ую', 'юю',
+    'ом', 'ем', 'ам', 'ям', 'ию', 'ия', 'ии', 'а', 'я', 'ы', 'и', 'у', 'ю', 'е', 'о',
+}, key=len, reverse=True)
+KAZAKH_SUFFIXES = sorted({
+    'лары', 'лері', 'дары', 'дері', 'тары', 'тері', 'лар', 'лер', 'дар', 'дер', 'тар', 'тер',
+    'ның', 'нің', 'дың', 'дің', 'тың', 'тің', 'дан', 'ден', 'тан', 'тен', 'нан', 'нен',
+    'ға', 'ге', 'қа', 'ке', 'да', 'де', 'та', 'те',
+}, key=len, reverse=True)
+MIN_STEM_LENGTH = 3
+
+STOP_WORDS = {
+    'и', 'в', 'во', 'на', 'с', 'со', 'по', 'для', 'к', 'ко', 'о', 'об', 'от', 'до', 'из', 'у',
+    'не', 'что', 'как', 'это', 'а', 'но', 'или', 'же', 'ли', 'бы', 'мы', 'вы', 'я', 'он', 'она',
+    'және', 'мен', 'үшін', 'бұл', 'да', 'де', 'the', 'a', 'an', 'of', 'and', 'to', 'in', 'for',
+}
+
+
+class Lemmatizer:
+    """pymorphy3 lemmas for Russian when installed, suffix stripping otherwise (and for Kazakh)"""
+
+    def __init__(self):
+        self.morph = pymorphy3.MorphAnalyzer() if PYMORPHY_AVAILABLE else None
+        self.lemma = lru_cache(maxsize=100_000)(self._lemma)
+
+    def _lemma(self, token: str) -> str:
+        if self.morph is not None and not KAZAKH_LETTERS_RE.search(token) and self.morph.word_is_known(token):
+            return self.morph.parse(token)[0].normal_form
+        # Kazakh case ending, then Russian ending, so «Алматыда» and «Алматы» share a stem
+        return self._strip(self._strip(token, KAZAKH_SUFFIXES), RUSSIAN_SUFFIXES)
+
+    @staticmethod
+    def _strip(token: str, suffixes: List[str]) -> str:
+        for suffix in suffixes:
+            if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+                return token[:-len(suffix)]
+        return token
+
+    def tokens(self, text: str) -> List[str]:
+        return [
+            self.lemma(token)
+            for token in TOKEN_RE.findall((text or '').lower())
+            if token not in STOP_WORDS and (len(token) > 1 or token.isdigit())
+        ]
+
+
+_lemmatizer = None
+
+
+def get_lemmatizer() -> Lemmatizer:
+    global _lemmatizer
+    if _lemmatizer is None:
+        _lemmatizer = Lemmatizer()
+    return _lemmatizer
+
+
+class BM25Index:
+    """BM25 postings for one collection: term -> {doc_id: tf}"""
+
+    def __init__(self, name: str, directory: str = None, k1: float = None, b: float = None):
+        self.name = name
+        self.directory = directory or getattr(
+            settings, 'RAG_LEXICAL_INDEX_DIR', os.path.join(settings.BASE_DIR, 'data', 'lexical_index')
+        )
+        self.path = os.path.join(self.directory, f'{name}.json')
+        self.k1 = k1 if k1 is not None else getattr(settings, 'RAG_BM25_K1', 1.5)
+        self.b = b if b is not None else getattr(settings, 'RAG_BM25_B', 0.75)
+        self.lemmatizer = get_lemmatizer()
+
+        self._lock = threading.RLock()
+        self._file_id = None
+        self._deferred = 0
+        # Changes not yet saved: ('add', doc_id, term counts), ('remove', doc_id, None), ('clear', None, None)
+        self._pending: List[Tuple[str, Optional[str], Optional[Dict[str, int]]]] = []
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.doc_lengths: Dict[str, int] = {}
+        self.doc_terms: Dict[str, List[str]] = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        # os.replace gives every save a new inode, so equal mtimes cannot hide a change
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _load(self):
+        """Picks up other processes' saves; unsaved local changes are kept until save() merges them"""
+        if self._pending:
+            return
+        file_id = self._stat()
+        if file_id is None or file_id == self._file_id:
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Error loading lexical index '{self.name}': {e}")
+            return
+        self._reset()
+        self.postings.update(data['postings'])
+        self.doc_lengths = data['doc_lengths']
+        self.total_length = sum(self.doc_lengths.values())
+        for term, docs in self.postings.items():
+            for doc_id in docs:
+                self.doc_terms.setdefault(doc_id, []).append(term)
+        self._file_id = file_id
+
+    def save(self):
+        """Merges unsaved changes into the file as other workers left it"""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(f'{self.path}.lock', 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    pending, self._pending = self._pending, []
+                    self._reset()
+                    self._file_id = None
+                    self._load()
+                    for op in pending:
+                        self._apply(*op)
+
+                    tmp_path = f'{self.path}.{os.getpid()}.tmp'
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        json.dump({'postings': self.postings, 'doc_lengths': self.doc_lengths}, f, ensure_ascii=False)
+                    os.replace(tmp_path, self.path)
+                    self._file_id = self._stat()
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def deferred_save(self):
+        """Bulk indexing: one save at the end instead of one per document"""
+        self._deferred += 1
+        try:
+            yield self
+        finally:
+            self._deferred -= 1
+            if not self._deferred and self._pending:
+                self.save()
+
+    def _record(self, op: str, doc_id: Optional[str] = None, counts: Optional[Dict[str, int]] = None):
+        self._apply(op, doc_id, counts)
+        self._pending.append((op, doc_id, counts))
+        if not self._deferred:
+            self.save()
+
+    def _apply(self, op: str, doc_id: Optional[str], counts: Optional[Dict[str, int]]):
+        """Applies one change; replaying it over a newer file gives the same result"""
+        if op == 'clear':
+            self._reset()
+            return
+        self._remove(doc_id)
+        if op == 'add':
+            for term, tf in counts.items():
+                self.postings[term][doc_id] = tf
+            self.doc_terms[doc_id] = list(counts)
+            length = sum(counts.values())
+            self.doc_lengths[doc_id] = length
+            self.total_length += length
+
+    def add(self, doc_id: str, text: str):
+        counts = dict(Counter(self.lemmatizer.tokens(text)))
+        with self._lock:
+            self._load()
+            self._record('add', doc_id, counts)
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._load()
+            if doc_id in self.doc_lengths:
+                self._record('remove', doc_id)
+
+    def _remove(self, doc_id: str) -> bool:
+        length = self.doc_lengths.pop(doc_id, None)
+        if length is None:
+            return False
+        self.total_length -= length
+        for term in self.doc_terms.pop(doc_id, ()):
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[term]
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._record('clear')
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """[(doc_id, bm25 score)] by descending score"""
+        with self._lock:
+            self._load()
+            n = len(self.doc_lengths)
+            if not n:
+                return []
+            avg_length = self.total_length / n
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(self.lemmatizer.tokens(query)):
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, tf in docs.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: Optional[int] = None) -> List[Tuple[str, float]]:
+    """RRF: score(d) = Σ 1 / (k + rank of d in each ranking)"""
+    k = k if k is not None else getattr(settings, 'RAG_RRF_K', 60)
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,204 @@
+"""
+📐 Vectorized ranking for the enhanced RAG service
+
+Ranking features (recency, length bucket, city/category tokens, word set) are
+computed once at index time and stored in document metadata. At query time
+all candidates are scored together as NumPy array operations, and
+near-duplicates are removed with maximal marginal relevance (MMR) over one
+cosine similarity matrix instead of hashing the first characters of each text.
+"""
+
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# Score weights (same balance as the former per-result scoring)
+SIMILARITY_WEIGHT = 0.4
+RECENCY_WEIGHT = 0.2
+CITY_WEIGHT = 0.15
+INTEREST_WEIGHT = 0.1
+KEYWORD_WEIGHT = 0.15
+
+# Bonus per length bucket: short (< 100), good (100-1000), very long (> 1000)
+LENGTH_BONUS = np.array([0.0, 0.1, 0.05])
+RECENCY_HORIZON_SECONDS = 365 * 24 * 3600
+
+MIN_TEXT_LENGTH = 20
+MAX_INDEXED_TERMS = 256
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def length_bucket(length: int) -> int:
+    if length > 1000:
+        return 2
+    return 1 if length >= 100 else 0
+
+
+def document_features(text: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Ranking features stored in metadata when a document is indexed.
+
+    Chroma metadata values must be scalars, so token sets are space-joined strings.
+    """
+    metadata = metadata or {}
+    place_tokens = []
+    for key in ('city', 'category', 'category_name'):
+        place_tokens.extend(tokenize(str(metadata.get(key) or '')))
+
+    terms = list(dict.fromkeys(tokenize(text)))[:MAX_INDEXED_TERMS]
+    return {
+        'rank_created_ts': time.time(),
+        'rank_length_bucket': length_bucket(len(text)),
+        'rank_tokens': ' '.join(dict.fromkeys(place_tokens)),
+        'rank_terms': ' '.join(terms),
+    }
+
+
+def _created_ts(metadata: Dict[str, Any]) -> float:
+    """Timestamp for documents indexed before rank_created_ts existed"""
+    created_at = metadata.get('created_at')
+    if not created_at:
+        return np.nan
+    try:
+        return datetime.fromisoformat(str(created_at).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return np.nan
+
+
+def term_hits(token_lists: Sequence[Iterable[str]], terms: Sequence[str]) -> np.ndarray:
+    """Boolean matrix (documents × terms): term occurs in document"""
+    hits = np.zeros((len(token_lists), len(terms)), dtype=bool)
+    if not terms:
+        return hits
+    index = {term: j for j, term in enumerate(terms)}
+    rows, cols = [], []
+    for row, tokens in enumerate(token_lists):
+        for token in tokens:
+            j = index.get(token)
+            if j is not None:
+                rows.append(row)
+                cols.append(j)
+    hits[rows, cols] = True
+    return hits
+
+
+def score_candidates(results: List[Dict[str, Any]], query: str,
+                     user_context: Optional[Dict[str, Any]] = None,
+                     now: Optional[float] = None,
+                     similarity: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Ranking scores for all candidates at once.
+
+    similarity in [0, 1] replaces 1 − distance (e.g. normalized RRF scores of hybrid retrieval).
+    """
+    n = len(results)
+    if not n:
+        return np.zeros(0)
+    now = time.time() if now is None else now
+    metadatas = [result.get('metadata') or {} for result in results]
+
+    if similarity is None:
+        distances = np.array([result.get('distance', 1.0) for result in results], dtype=float)
+        similarity = 1.0 - distances
+    scores = SIMILARITY_WEIGHT * np.clip(np.asarray(similarity, dtype=float), 0.0, None)
+
+    created = np.array([m.get('rank_created_ts', np.nan) for m in metadatas], dtype=float)
+    missing = np.isnan(created)
+    if missing.any():
+        created[missing] = [_created_ts(metadatas[i]) for i in np.flatnonzero(missing)]
+    recency = np.clip(1.0 - (now - created) / RECENCY_HORIZON_SECONDS, 0.0, None)
+    scores += RECENCY_WEIGHT * np.nan_to_num(recency, nan=0.0)
+
+    buckets = np.array([
+        m['rank_length_bucket'] if 'rank_length_bucket' in m else length_bucket(len(result['text']))
+        for m, result in zip(metadatas, results)
+    ], dtype=int)
+    scores += LENGTH_BONUS[buckets]
+
+    doc_terms = [
+        m['rank_terms'].split() if 'rank_terms' in m else tokenize(result['text'])
+        for m, result in zip(metadatas, results)
+    ]
+
+    query_terms = list(dict.fromkeys(tokenize(query)))
+    if query_terms:
+        scores += KEYWORD_WEIGHT * term_hits(doc_terms, query_terms).mean(axis=1)
+
+    if user_context:
+        doc_tokens = [terms + m.get('rank_tokens', '').split() for terms, m in zip(doc_terms, metadatas)]
+
+        city_terms = tokenize(user_context.get('city') or '')
+        if city_terms:
+            scores += CITY_WEIGHT * term_hits(doc_tokens, city_terms).all(axis=1)
+
+        interests = [tokenize(interest) for interest in user_context.get('interests', [])]
+        interests = [terms for terms in interests if terms]
+        if interests:
+            flat = list(dict.fromkeys(term for terms in interests for term in terms))
+            hits = term_hits(doc_tokens, flat)
+            columns = [[flat.index(term) for term in terms] for terms in interests]
+            matched = np.column_stack([hits[:, cols].all(axis=1) for cols in columns])
+            scores += INTEREST_WEIGHT * matched.any(axis=1)
+
+    return scores
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def mmr_select(embeddings: np.ndarray, relevance: np.ndarray, k: int,
+               lambda_: float = 0.7, duplicate_threshold: float = 0.95) -> List[int]:
+    """
+    Maximal marginal relevance over one cosine similarity matrix.
+
+    Each step picks argmax(λ·relevance − (1−λ)·max similarity to already
+    selected). Candidates whose similarity to a selected document reaches
+    duplicate_threshold are dropped as duplicates.
+    """
+    n = len(relevance)
+    if not n or k <= 0:
+        return []
+
+    vectors = normalize_rows(embeddings)
+    similarity = vectors @ vectors.T
+
+    relevance = np.asarray(relevance, dtype=np.float32)
+    max_similarity = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    selected = []
+
+    while available.any() and len(selected) < k:
+        penalty = np.where(np.isfinite(max_similarity), max_similarity, 0.0)
+        mmr = lambda_ * relevance - (1.0 - lambda_) * penalty
+        mmr[~available] = -np.inf
+        best = int(np.argmax(mmr))
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, similarity[best])
+        available &= max_similarity < duplicate_threshold
+
+    return selected
+
+
+def merge_candidates(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One entry per document id (several expanded queries hit the same documents); keeps the closest match"""
+    best: Dict[str, Dict[str, Any]] = {}
+    for result in results:
+        if len((result.get('text') or '').strip()) <= MIN_TEXT_LENGTH:
+            continue
+        current = best.get(result['id'])
+        if current is None or result.get('distance', 1.0) < current.get('distance', 1.0):
+            best[result['id']] = result
+    return list(best.values())
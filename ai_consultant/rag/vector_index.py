@@ -0,0 +1,613 @@
+"""
+🗂️ Pluggable vector index backends for the RAG services
+
+get_vector_client() returns an object with the subset of the chromadb client
+API the services use (get_or_create_collection, delete_collection, and on
+collections add/upsert/query/get/count/delete), so call sites do not depend
+on the backend chosen by RAG_VECTOR_BACKEND:
+
+- 'chroma': chromadb.PersistentClient (SQLite-backed, opened by every worker)
+- 'local':  in-process index. Every write produces a new immutable generation
+  directory (memory-mapped float32 vectors + records + FAISS/hnswlib ANN
+  index) and atomically swaps the CURRENT pointer under a file lock. Workers
+  memory-map the current generation read-only and pick up swaps by mtime.
+
+Bulk loads should go through collection.deferred_write() (one generation per
+batch), e.g. python manage.py build_vector_index.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from django.conf import settings
+
+from ai_consultant.utils.lazy_imports import is_available, lazy_import
+
+logger = logging.getLogger(__name__)
+
+# Imported on first use: chromadb alone costs ~0.7 s at startup
+chromadb = lazy_import('chromadb')
+faiss = lazy_import('faiss')
+hnswlib = lazy_import('hnswlib')
+CHROMADB_AVAILABLE = is_available('chromadb')
+FAISS_AVAILABLE = is_available('faiss')
+HNSWLIB_AVAILABLE = is_available('hnswlib')
+
+DEFAULT_INCLUDE = ('documents', 'metadatas', 'distances')
+KEEP_GENERATIONS = 2
+
+
+def normalize(vectors) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def available_ann_methods() -> List[str]:
+    methods = []
+    if FAISS_AVAILABLE:
+        methods.append('faiss')
+    if HNSWLIB_AVAILABLE:
+        methods.append('hnswlib')
+    return methods + ['exact']
+
+
+def resolve_ann_method(method: str = None) -> str:
+    method = method or getattr(settings, 'RAG_VECTOR_ANN', 'auto')
+    available = available_ann_methods()
+    if method == 'auto':
+        return available[0]
+    if method not in available:
+        logger.warning(f"⚠️ ANN method '{method}' is not installed, using exact search")
+        return 'exact'
+    return method
+
+
+def matches_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Chroma-style metadata filter: equality, $eq, $ne, $in, $and, $or"""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == '$and':
+            if not all(matches_where(metadata, c) for c in condition):
+                return False
+        elif key == '$or':
+            if not any(matches_where(metadata, c) for c in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, expected in condition.items():
+                if op == '$eq' and value != expected:
+                    return False
+                if op == '$ne' and value == expected:
+                    return False
+                if op == '$in' and value not in expected:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+# 🧭 ANN indexes over normalized vectors; distance = 1 − cosine similarity
+
+class ExactIndex:
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    def search(self, queries: np.ndarray, k: int, rows: Optional[np.ndarray] = None):
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        k = min(k, len(vectors))
+        if not k:
+            return np.zeros((len(queries), 0), dtype=np.int64), np.zeros((len(queries), 0), dtype=np.float32)
+        similarity = queries @ vectors.T
+        top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        top_similarity = np.take_along_axis(similarity, top, axis=1)
+        order = np.argsort(-top_similarity, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        distances = 1.0 - np.take_along_axis(top_similarity, order, axis=1)
+        if rows is not None:
+            top = rows[top]
+        return top, distances
+
+
+class FaissIndex:
+    FILE = 'index.faiss'
+
+    def __init__(self, index):
+        self.index = index
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, path: str):
+        index = faiss.IndexHNSWFlat(vectors.shape[1], getattr(settings, 'RAG_VECTOR_HNSW_M', 32),
+                                    faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = getattr(settings, 'RAG_VECTOR_HNSW_EF_CONSTRUCTION', 200)
+        index.add(np.ascontiguousarray(vectors))
+        faiss.write_index(index, os.path.join(path, cls.FILE))
+
+    @classmethod
+    def open(cls, path: str):
+        # IO_FLAG_MMAP: the graph and vectors stay in the page cache shared by all workers
+        return cls(faiss.read_index(os.path.join(path, cls.FILE), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY))
+
+    def search(self, queries: np.ndarray, k: int):
+        self.index.hnsw.efSearch = max(k * 2, getattr(settings, 'RAG_VECTOR_HNSW_EF_SEARCH', 64))
+        similarity, rows = self.index.search(np.ascontiguousarray(queries), k)
+        return rows, 1.0 - similarity
+
+
+class HnswlibIndex:
+    FILE = 'index.hnsw'
+
+    def __init__(self, index):
+        self.index = index
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, path: str):
+        index = hnswlib.Index(space='cosine', dim=vectors.shape[1])
+        index.init_index(
+            max_elements=len(vectors),
+            M=getattr(settings, 'RAG_VECTOR_HNSW_M', 32),
+            ef_construction=getattr(settings, 'RAG_VECTOR_HNSW_EF_CONSTRUCTION', 200),
+        )
+        index.add_items(vectors, np.arange(len(vectors)))
+        index.save_index(os.path.join(path, cls.FILE))
+
+    @classmethod
+    def open(cls, path: str, dim: int):
+        index = hnswlib.Index(space='cosine', dim=dim)
+        index.load_index(os.path.join(path, cls.FILE))
+        return cls(index)
+
+    def search(self, queries: np.ndarray, k: int):
+        self.index.set_ef(max(k * 2, getattr(settings, 'RAG_VECTOR_HNSW_EF_SEARCH', 64)))
+        rows, distances = self.index.knn_query(queries, k=k)
+        return rows.astype(np.int64), distances
+
+
+ANN_INDEXES = {'faiss': FaissIndex, 'hnswlib': HnswlibIndex}
+
+
+class Generation:
+    """One immutable snapshot of a collection"""
+
+    VECTORS_FILE = 'vectors.npy'
+    RECORDS_FILE = 'records.json'
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, self.RECORDS_FILE), encoding='utf-8') as f:
+            records = json.load(f)
+        self.ids: List[str] = records['ids']
+        self.documents: List[Optional[str]] = records['documents']
+        self.metadatas: List[Optional[Dict[str, Any]]] = records['metadatas']
+        self.rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self.vectors = np.load(os.path.join(path, self.VECTORS_FILE), mmap_mode='r')
+        self.exact = ExactIndex(self.vectors)
+
+        self.ann = None
+        method = records.get('ann', 'exact')
+        if method == 'faiss' and FAISS_AVAILABLE:
+            self.ann = FaissIndex.open(path)
+        elif method == 'hnswlib' and HNSWLIB_AVAILABLE:
+            self.ann = HnswlibIndex.open(path, self.vectors.shape[1])
+        self._masks: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def write(cls, path: str, ids: List[str], vectors: np.ndarray, documents: List, metadatas: List,
+              ann_method: str) -> None:
+        os.makedirs(path)
+        np.save(os.path.join(path, cls.VECTORS_FILE), vectors.astype(np.float32))
+        min_size = getattr(settings, 'RAG_VECTOR_ANN_MIN_SIZE', 1000)
+        if ann_method in ANN_INDEXES and len(ids) >= min_size:
+            ANN_INDEXES[ann_method].build(vectors, path)
+        else:
+            # Small collections: exact search is faster and has perfect recall
+            ann_method = 'exact'
+        with open(os.path.join(path, cls.RECORDS_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'ids': ids, 'documents': documents, 'metadatas': metadatas, 'ann': ann_method},
+                      f, ensure_ascii=False, default=str)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def mask(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Row numbers matching where, None when every row matches"""
+        if not where:
+            return None
+        key = json.dumps(where, sort_keys=True, default=str)
+        if key not in self._masks:
+            matched = np.array([matches_where(m or {}, where) for m in self.metadatas], dtype=bool)
+            self._masks[key] = None if matched.all() else np.flatnonzero(matched)
+        return self._masks[key]
+
+    def search(self, queries: np.ndarray, k: int, where: Optional[Dict[str, Any]] = None):
+        rows = self.mask(where)
+        if rows is None and self.ann is not None:
+            return self.ann.search(queries, min(k, len(self)))
+        return self.exact.search(queries, k, rows)
+
+
+class LocalVectorCollection:
+    """Chroma-compatible collection backed by memory-mapped generations"""
+
+    CURRENT_FILE = 'CURRENT'
+    LOCK_FILE = 'write.lock'
+
+    def __init__(self, name: str, directory: str, metadata: Dict[str, Any] = None,
+                 embedding_function=None, ann_method: str = None):
+        self.name = name
+        self.directory = directory
+        self.metadata = metadata or {}
+        self.embedding_function = embedding_function
+        self.ann_method = resolve_ann_method(ann_method)
+
+        # Writer lock: held for a whole deferred_write() batch, readers never take it
+        self._lock = threading.RLock()
+        # Guards only the switch to a newer generation
+        self._reload_lock = threading.Lock()
+        self._generation: Optional[Generation] = None
+        self._current_mtime = None
+        self._deferred = 0
+        self._pending = None
+        self._lock_depth = 0
+
+    # 📁 Generations
+
+    @property
+    def current_path(self) -> str:
+        return os.path.join(self.directory, self.CURRENT_FILE)
+
+    def _reload(self):
+        """Switches to the generation CURRENT points to, if another process swapped it"""
+        with self._reload_lock:
+            try:
+                mtime = os.stat(self.current_path).st_mtime_ns
+            except FileNotFoundError:
+                self._generation, self._current_mtime = None, None
+                return
+            if mtime == self._current_mtime:
+                return
+            with open(self.current_path, encoding='utf-8') as f:
+                name = f.read().strip()
+            self._generation = Generation(os.path.join(self.directory, name))
+            self._current_mtime = mtime
+
+    def _snapshot(self) -> Optional[Generation]:
+        """Current generation for a reader; generations are immutable, so the reference is enough"""
+        self._reload()
+        return self._generation
+
+    @contextmanager
+    def _write_lock(self):
+        """Single writer across processes; reentrant inside deferred_write()"""
+        with self._lock:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, self.LOCK_FILE), 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._lock_depth = 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth = 0
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _records(self) -> Dict[str, Any]:
+        """Mutable copy of the current generation (or of the deferred batch)"""
+        if self._pending is not None:
+            return self._pending
+        return self._load_records()
+
+    def _load_records(self) -> Dict[str, Any]:
+        self._reload()
+        generation = self._generation
+        if generation is None:
+            return {'ids': [], 'vectors': [], 'documents': [], 'metadatas': []}
+        return {
+            'ids': list(generation.ids),
+            'vectors': list(np.asarray(generation.vectors)),
+            'documents': list(generation.documents),
+            'metadatas': list(generation.metadatas),
+        }
+
+    def _commit(self, records: Dict[str, Any]):
+        if self._deferred:
+            self._pending = records
+            return
+        self._publish(records)
+
+    def _publish(self, records: Dict[str, Any]):
+        name = f'gen-{time.time_ns()}'
+        dim = len(records['vectors'][0]) if records['vectors'] else 0
+        vectors = np.vstack(records['vectors']) if records['vectors'] else np.zeros((0, dim), dtype=np.float32)
+        Generation.write(os.path.join(self.directory, name), records['ids'], vectors,
+                         records['documents'], records['metadatas'], self.ann_method)
+
+        tmp_path = f'{self.current_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(name)
+        os.replace(tmp_path, self.current_path)
+        self._reload()
+        self._cleanup(keep=name)
+        logger.info(f"🗂️ Vector collection '{self.name}': generation {name} ({len(records['ids'])} vectors)")
+
+    def _cleanup(self, keep: str):
+        """Old generations stay for KEEP_GENERATIONS swaps so readers mid-query are not broken"""
+        generations = sorted(d for d in os.listdir(self.directory) if d.startswith('gen-'))
+        for name in generations[:-KEEP_GENERATIONS]:
+            if name != keep:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    @contextmanager
+    def deferred_write(self):
+        """Bulk loading: publish one generation for the whole batch"""
+        with self._write_lock():
+            if not self._deferred:
+                self._pending = self._load_records()
+            self._deferred += 1
+            try:
+                yield self
+            finally:
+                self._deferred -= 1
+                if not self._deferred:
+                    records, self._pending = self._pending, None
+                    self._publish(records)
+
+    # ✍️ Chroma collection API
+
+    def _embed(self, documents: Sequence[str]) -> List:
+        if self.embedding_function is None:
+            raise ValueError(f"Collection '{self.name}' has no embedding function; pass embeddings")
+        return list(self.embedding_function(list(documents)))
+
+    def upsert(self, ids: Sequence[str], embeddings=None, documents=None, metadatas=None):
+        if embeddings is None:
+            embeddings = self._embed(documents)
+        vectors = normalize(embeddings)
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+
+        with self._write_lock():
+            records = self._records()
+            rows = {doc_id: row for row, doc_id in enumerate(records['ids'])}
+            for doc_id, vector, document, metadata in zip(ids, vectors, documents, metadatas):
+                row = rows.get(doc_id)
+                if row is None:
+                    rows[doc_id] = len(records['ids'])
+                    records['ids'].append(doc_id)
+                    records['vectors'].append(vector)
+                    records['documents'].append(document)
+                    records['metadatas'].append(metadata)
+                else:
+                    records['vectors'][row] = vector
+                    records['documents'][row] = document
+                    records['metadatas'][row] = metadata
+            self._commit(records)
+
+    add = upsert
+
+    def delete(self, ids: Sequence[str] = None, where: Dict[str, Any] = None):
+        with self._write_lock():
+            records = self._records()
+            drop = set(ids or [])
+            keep = [
+                row for row, doc_id in enumerate(records['ids'])
+                if not (doc_id in drop or (ids is None and matches_where(records['metadatas'][row] or {}, where)))
+            ]
+            self._commit({key: [values[row] for row in keep] for key, values in records.items()})
+
+    def count(self) -> int:
+        generation = self._snapshot()
+        return len(generation) if generation is not None else 0
+
+    def query(self, query_embeddings=None, query_texts=None, n_results: int = 10,
+              where: Dict[str, Any] = None, include: Sequence[str] = DEFAULT_INCLUDE) -> Dict[str, Any]:
+        if query_embeddings is None:
+            query_embeddings = self._embed(query_texts)
+        queries = normalize(query_embeddings)
+        include = set(include)
+
+        result = {key: [] for key in ('ids', 'documents', 'metadatas', 'distances', 'embeddings')}
+        generation = self._snapshot()
+        if generation is None or not len(generation):
+            for key in result:
+                result[key] = [[] for _ in range(len(queries))]
+            return self._only(result, include)
+
+        rows, distances = generation.search(queries, n_results, where)
+        for query_rows, query_distances in zip(rows, distances):
+            valid = query_rows >= 0
+            query_rows, query_distances = query_rows[valid], query_distances[valid]
+            result['ids'].append([generation.ids[r] for r in query_rows])
+            result['documents'].append([generation.documents[r] for r in query_rows])
+            result['metadatas'].append([generation.metadatas[r] for r in query_rows])
+            result['distances'].append([float(d) for d in query_distances])
+            result['embeddings'].append([np.asarray(generation.vectors[r]) for r in query_rows])
+        return self._only(result, include)
+
+    def get(self, ids: Sequence[str] = None, where: Dict[str, Any] = None, limit: int = None,
+            include: Sequence[str] = ('documents', 'metadatas')) -> Dict[str, Any]:
+        generation = self._snapshot()
+        result = {key: [] for key in ('ids', 'documents', 'metadatas', 'embeddings')}
+        if generation is not None:
+            if ids is not None:
+                rows = [generation.rows[doc_id] for doc_id in ids if doc_id in generation.rows]
+            else:
+                rows = [r for r, m in enumerate(generation.metadatas) if matches_where(m or {}, where)]
+            for r in rows[:limit]:
+                result['ids'].append(generation.ids[r])
+                result['documents'].append(generation.documents[r])
+                result['metadatas'].append(generation.metadatas[r])
+                result['embeddings'].append(np.asarray(generation.vectors[r]))
+        return self._only(result, set(include))
+
+    @staticmethod
+    def _only(result: Dict[str, Any], include) -> Dict[str, Any]:
+        return {key: (value if key == 'ids' or key in include else None) for key, value in result.items()}
+
+
+class LocalVectorClient:
+    """Chroma-compatible client over LocalVectorCollection directories"""
+
+    def __init__(self, path: str, ann_method: str = None):
+        self.path = path
+        self.ann_method = ann_method
+        self._collections: Dict[str, LocalVectorCollection] = {}
+        self._lock = threading.Lock()
+
+    def get_or_create_collection(self, name: str, metadata: Dict[str, Any] = None, embedding_function=None):
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                collection = LocalVectorCollection(
+                    name, os.path.join(self.path, name), metadata, embedding_function, self.ann_method
+                )
+                self._collections[name] = collection
+            elif embedding_function is not None:
+                collection.embedding_function = embedding_function
+            return collection
+
+    get_collection = get_or_create_collection
+
+    def list_collections(self) -> List[str]:
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(
+            name for name in os.listdir(self.path)
+            if os.path.exists(os.path.join(self.path, name, LocalVectorCollection.CURRENT_FILE))
+        )
+
+    def delete_collection(self, name: str):
+        with self._lock:
+            self._collections.pop(name, None)
+        shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+
+# Shared clients per (backend, path)
+_clients: Dict[tuple, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_vector_client(chroma_path: str = None, store: str = 'default', backend: str = None):
+    """
+    Vector store client for RAG_VECTOR_BACKEND ('chroma' or 'local').
+
+    chroma_path is the Chroma persist directory; the local backend keeps each
+    store (services with overlapping collection names) in RAG_VECTOR_INDEX_DIR/<store>.
+    """
+    backend = backend or getattr(settings, 'RAG_VECTOR_BACKEND', 'chroma')
+    if backend == 'local':
+        path = os.path.join(
+            getattr(settings, 'RAG_VECTOR_INDEX_DIR', os.path.join(settings.BASE_DIR, 'data', 'vector_index')), store
+        )
+    else:
+        path = chroma_path or getattr(settings, 'CHROMA_DB_PATH', './chroma_db')
+
+    key = (backend, os.path.abspath(path))
+    with _clients_lock:
+        if key not in _clients:
+            if backend == 'local':
+                _clients[key] = LocalVectorClient(path)
+            elif CHROMADB_AVAILABLE:
+                _clients[key] = chromadb.PersistentClient(path=path)
+            else:
+                raise ImportError("chromadb is not installed; set RAG_VECTOR_BACKEND = 'local'")
+            logger.info(f"🗂️ Vector backend '{backend}' at {path}")
+        return _clients[key]
+
+
+# Chroma directories of the services sharing the vector backend
+def chroma_store_path(store: str) -> str:
+    if store == 'knowledge':
+        return os.path.join(settings.BASE_DIR, 'chroma_db')
+    default = './chroma_db_enhanced' if store == 'enhanced_rag' else './chroma_db'
+    return getattr(settings, 'CHROMA_DB_PATH', default)
+
+
+VECTOR_STORES = ('knowledge', 'rag', 'enhanced_rag')
+
+
+def read_collection(collection, batch_size: int = 1000) -> Dict[str, list]:
+    """All ids, embeddings, documents and metadatas of a collection (Chroma or local)"""
+    data = {'ids': [], 'embeddings': [], 'documents': [], 'metadatas': []}
+    total = collection.count()
+    include = ['embeddings', 'documents', 'metadatas']
+    if isinstance(collection, LocalVectorCollection):
+        page = collection.get(include=include)
+        for key in data:
+            data[key].extend(page[key])
+        return data
+    for offset in range(0, total, batch_size):
+        page = collection.get(include=include, limit=batch_size, offset=offset)
+        for key in data:
+            data[key].extend(page[key])
+    return data
+
+
+def copy_collection(source, target: LocalVectorCollection) -> int:
+    """Replaces the target with the source contents as a single new generation"""
+    data = read_collection(source)
+    with target.deferred_write():
+        target.delete()
+        if data['ids']:
+            target.upsert(ids=data['ids'], embeddings=data['embeddings'],
+                          documents=data['documents'], metadatas=data['metadatas'])
+    return len(data['ids'])
+
+
+def benchmark_ann(vectors: np.ndarray, queries: np.ndarray, k: int = 10,
+                  methods: Sequence[str] = None) -> List[Dict[str, Any]]:
+    """
+    recall@k against exact search and per-query latency for each ANN method.
+
+    Vectors and queries are normalized; every method is built in a temporary generation directory.
+    """
+    import tempfile
+
+    vectors, queries = normalize(vectors), normalize(queries)
+    k = min(k, len(vectors))
+    truth, _ = ExactIndex(vectors).search(queries, k)
+    report = []
+
+    for method in methods or available_ann_methods():
+        with tempfile.TemporaryDirectory() as directory:
+            started = time.perf_counter()
+            if method in ANN_INDEXES:
+                ANN_INDEXES[method].build(vectors, directory)
+                index = FaissIndex.open(directory) if method == 'faiss' else HnswlibIndex.open(directory, vectors.shape[1])
+            else:
+                index = ExactIndex(vectors)
+            build_seconds = time.perf_counter() - started
+
+            latencies, hits = [], 0
+            for query, expected in zip(queries, truth):
+                started = time.perf_counter()
+                rows, _ = index.search(query[None, :], k)
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits += len(set(rows[0].tolist()) & set(expected.tolist()))
+
+        report.append({
+            'method': method,
+            'vectors': len(vectors),
+            'recall_at_k': hits / (len(queries) * k) if k else 0.0,
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'build_seconds': build_seconds,
+        })
+    return report
@@ -0,0 +1,269 @@
+"""
+🗂️ Снимок каталога активных клубов для поиска и подбора кандидатов
+
+Эндпоинты поиска клубов (core/api_ai_consultant.py, core/api_clubs_views.py)
+раньше загружали все активные клубы и считали релевантность в цикле по
+моделям, с ленивой загрузкой club.category/club.city на каждый клуб.
+Снимок строится одним values_list запросом и хранит каталог столбцами:
+коды города и категории (int32), счетчики, полноту профиля и текстовые поля
+в нижнем регистре, склеенные в одну строку с массивом смещений. Подстрока
+ищется str.find по склеенной строке, номер клуба — бинарным поиском по
+смещениям, а баллы считаются операциями над масками numpy.
+Полные строки из БД загружаются только для итогового top-k.
+
+Версия каталога хранится в общем кэше и меняется сигналами Club, City и
+ClubCategory (ai_consultant/signals.py), поэтому изменения доходят до всех
+воркеров; AI_CLUB_CATALOG_MAX_AGE страхует от массовых update() без сигналов.
+Сохранения только счетчиков (лайк, вступление — save(update_fields=...))
+версию не меняют: иначе каждое действие пользователя заставляло бы все
+воркеры пересобирать каталог. Счетчики и порядок по ним обновляются по
+AI_CLUB_CATALOG_MAX_AGE.
+"""
+
+import logging
+import threading
+from bisect import bisect_right
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'club_catalog:version'
+TEXT_FIELDS = ('name', 'description', 'activities', 'skills_developed', 'target_audience')
+# Поля Club, изменение которых требует новой версии снимка (счетчики — нет)
+SNAPSHOT_FIELDS = frozenset({
+    *TEXT_FIELDS, 'is_active', 'city', 'city_id', 'category', 'category_id', 'logo',
+})
+SEPARATOR = '\x00'
+
+
+class TextColumn:
+    """Текстовое поле всех клубов одной строкой в нижнем регистре"""
+
+    def __init__(self, values: Iterable[Optional[str]]):
+        parts = [(value or '').lower().replace(SEPARATOR, ' ') for value in values]
+        lengths = np.fromiter((len(part) + 1 for part in parts), dtype=np.int64, count=len(parts))
+        # Начало каждого поля в склеенной строке; список, а не массив — bisect быстрее np.searchsorted на скаляре
+        self.offsets = [0, *np.cumsum(lengths).tolist()]
+        self.empty = lengths == 1
+        self.text = SEPARATOR.join(parts)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def contains(self, term: str) -> np.ndarray:
+        """Маска клубов, в поле которых есть подстрока term (без учета регистра)"""
+        term = term.lower()
+        mask = np.zeros(len(self), dtype=bool)
+        if not term:
+            mask[:] = True
+            return mask
+        if SEPARATOR in term:
+            return mask
+
+        text, offsets = self.text, self.offsets
+        position = text.find(term)
+        while position != -1:
+            row = bisect_right(offsets, position) - 1
+            mask[row] = True
+            # Остальные вхождения в этом клубе не нужны — ищем со следующего
+            position = text.find(term, offsets[row + 1])
+        return mask
+
+    def contains_any(self, terms: Iterable[str]) -> np.ndarray:
+        mask = np.zeros(len(self), dtype=bool)
+        for term in terms:
+            mask |= self.contains(term)
+        return mask
+
+
+class ClubCatalog:
+    """Неизменяемый снимок активных клубов в порядке Club.Meta.ordering"""
+
+    def __init__(self, rows: Sequence[tuple], version: str):
+        self.version = version
+        self.built_at = time.time()
+
+        (ids, names, descriptions, activities, skills, audiences,
+         city_ids, city_names, category_ids, category_names,
+         members, likes, partners, logos) = zip(*rows) if rows else ((),) * 14
+
+        self.ids = list(ids)
+        self.names = list(names)
+        self._rows = {str(club_id): row for row, club_id in enumerate(self.ids)}
+
+        self.city_codes, self.city_names = self._encode(city_ids, city_names)
+        self.category_codes, self.category_names = self._encode(category_ids, category_names)
+
+        self.members_count = np.asarray(members, dtype=np.int64)
+        self.likes_count = np.asarray(likes, dtype=np.int64)
+        self.partners_count = np.asarray(partners, dtype=np.int64)
+        self.has_logo = np.fromiter((bool(logo) for logo in logos), dtype=bool, count=len(self.ids))
+
+        self.columns: Dict[str, TextColumn] = {
+            field: TextColumn(values)
+            for field, values in zip(TEXT_FIELDS, (names, descriptions, activities, skills, audiences))
+        }
+
+        # Полнота профиля: описание 1, деятельность, навыки и логотип по 0.5, нормировано до 1 балла
+        self.completeness = (
+            ~self.columns['description'].empty * 1.0
+            + ~self.columns['activities'].empty * 0.5
+            + ~self.columns['skills_developed'].empty * 0.5
+            + self.has_logo * 0.5
+        ) / 2.5
+
+    @staticmethod
+    def _encode(keys: Sequence, labels: Sequence):
+        """Коды строк справочника (-1 — не указан) и подписи по коду"""
+        index: Dict = {}
+        names: List[str] = []
+        codes = np.full(len(keys), -1, dtype=np.int32)
+        for row, (key, label) in enumerate(zip(keys, labels)):
+            if key is None:
+                continue
+            code = index.get(key)
+            if code is None:
+                code = index[key] = len(names)
+                names.append(label or '')
+            codes[row] = code
+        return codes, names
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row(self, club_id) -> Optional[int]:
+        return self._rows.get(str(club_id))
+
+    def text_contains(self, fields: Iterable[str], term: str) -> np.ndarray:
+        """Маска клубов, у которых term есть хотя бы в одном из полей"""
+        mask = np.zeros(len(self), dtype=bool)
+        for field in fields:
+            mask |= self.columns[field].contains(term)
+        return mask
+
+    def city_matches(self, location: str) -> np.ndarray:
+        """Маска клубов, в названии города которых есть location"""
+        return self._label_matches(self.city_codes, self.city_names, location)
+
+    @staticmethod
+    def _label_matches(codes: np.ndarray, names: List[str], term: str) -> np.ndarray:
+        term = term.lower()
+        matched = [code for code, name in enumerate(names) if term in name.lower()]
+        return np.isin(codes, matched)
+
+    def city_name(self, row: int) -> Optional[str]:
+        code = self.city_codes[row]
+        return self.city_names[code] if code >= 0 else None
+
+    def category_name(self, row: int) -> Optional[str]:
+        code = self.category_codes[row]
+        return self.category_names[code] if code >= 0 else None
+
+    @staticmethod
+    def top_rows(scores: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Номера k клубов с наибольшим баллом.
+        При равных баллах сохраняется порядок каталога (стабильная сортировка).
+        """
+        rows = np.flatnonzero(mask) if mask is not None else np.arange(len(scores))
+        if not len(rows) or k <= 0:
+            return rows[:0]
+        order = np.argsort(-scores[rows], kind='stable')
+        return rows[order[:k]]
+
+    def fetch(self, rows: Iterable[int], queryset=None) -> list:
+        """Полные модели Club для строк снимка, в том же порядке (выключенные с момента сборки пропускаются)"""
+        from clubs.models import Club
+
+        ids = [self.ids[row] for row in rows]
+        if queryset is None:
+            queryset = Club.objects.filter(is_active=True).select_related('city', 'category')
+        clubs = {club.pk: club for club in queryset.filter(pk__in=ids)}
+        return [clubs[club_id] for club_id in ids if club_id in clubs]
+
+
+def load_catalog_rows() -> List[tuple]:
+    """Все активные клубы одним запросом в порядке сортировки модели"""
+    from clubs.models import Club
+
+    return list(Club.objects.filter(is_active=True).values_list(
+        'id', *TEXT_FIELDS, 'city_id', 'city__name', 'category_id', 'category__name',
+        'members_count', 'likes_count', 'partners_count', 'logo',
+    ).iterator())
+
+
+class ClubCatalogStore:
+    """
+    Снимок каталога процесса с проверкой версии в общем кэше.
+
+    Пока снимок перестраивается, другие потоки получают предыдущий, а не ждут.
+    """
+
+    def __init__(self):
+        self._catalog: Optional[ClubCatalog] = None
+        self._lock = threading.Lock()
+
+    def version(self) -> str:
+        version = cache.get(VERSION_CACHE_KEY)
+        if version is None:
+            cache.add(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+            version = cache.get(VERSION_CACHE_KEY)
+        return version
+
+    def invalidate(self):
+        """Вызывается сигналами при изменении клубов, городов и категорий"""
+        cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+    def _is_fresh(self, catalog: ClubCatalog, version: str) -> bool:
+        max_age = getattr(settings, 'AI_CLUB_CATALOG_MAX_AGE', 300)
+        return catalog.version == version and time.time() - catalog.built_at < max_age
+
+    def get(self) -> ClubCatalog:
+        version = self.version()
+        catalog = self._catalog
+        if catalog is not None and self._is_fresh(catalog, version):
+            return catalog
+
+        if catalog is not None and not self._lock.acquire(blocking=False):
+            return catalog
+        if catalog is None:
+            self._lock.acquire()
+        try:
+            catalog = self._catalog
+            if catalog is None or not self._is_fresh(catalog, version):
+                catalog = self._catalog = self.build(version)
+            return catalog
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def build(version: str) -> ClubCatalog:
+        started = time.perf_counter()
+        catalog = ClubCatalog(load_catalog_rows(), version)
+        logger.info(f"🗂️ Каталог клубов собран за {(time.perf_counter() - started) * 1000:.0f}мс: "
+                    f"{len(catalog)} клубов (версия {version[:8]})")
+        return catalog
+
+
+_catalog_store = None
+_catalog_store_lock = threading.Lock()
+
+
+def get_club_catalog_store() -> ClubCatalogStore:
+    global _catalog_store
+    if _catalog_store is None:
+        with _catalog_store_lock:
+            if _catalog_store is None:
+                _catalog_store = ClubCatalogStore()
+    return _catalog_store
+
+
+def get_club_catalog() -> ClubCatalog:
+    """Актуальный снимок каталога клубов"""
+    return get_club_catalog_store().get()
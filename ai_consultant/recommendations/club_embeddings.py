@@ -0,0 +1,280 @@
+"""
+🧮 Матрица эмбеддингов клубов для content-based рекомендаций
+
+Эмбеддинги всех активных клубов хранятся в memory-mapped .npy (float32,
+L2-нормированные строки) и карте club_id ↔ строка в JSON рядом с ним
+(id клубов — UUID, поэтому хранятся строками).
+Похожесть считается одним матрично-векторным произведением по всему каталогу,
+top-k выбирается через argpartition.
+
+Строки обновляются инкрементально: не чаще AI_CLUB_EMBEDDINGS_SYNC_INTERVAL
+секунд индекс перекодирует только клубы с updated_at новее сохраненной отметки
+и убирает строки клубов, которых больше нет среди активных (удалены или
+деактивированы). Полная пересборка — только из прогрева и команды
+python manage.py build_club_embeddings: пока индекса нет, запрос обходится
+прямым подсчетом (RecommendationEngine), а не кодирует весь каталог.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CLUB_FIELDS = ('id', 'name', 'description', 'category__name', 'is_active', 'updated_at')
+
+
+class ClubEmbeddingIndex:
+    """
+    Персистентная матрица эмбеддингов клубов.
+
+    Файлы разделяются воркерами: запись идет под файловой блокировкой, а читатели
+    переоткрывают матрицу, когда меняется файл метаданных.
+    """
+
+    MATRIX_FILE = 'club_embeddings.npy'
+    META_FILE = 'club_embeddings.json'
+    LOCK_FILE = 'club_embeddings.lock'
+    MIN_CAPACITY = 64
+
+    def __init__(self, encoder, directory: str = None):
+        self.encoder = encoder
+        self.directory = directory or getattr(
+            settings, 'AI_CLUB_EMBEDDINGS_DIR', os.path.join(settings.BASE_DIR, 'data', 'club_embeddings')
+        )
+        self.sync_interval = getattr(settings, 'AI_CLUB_EMBEDDINGS_SYNC_INTERVAL', 60)
+        self.batch_size = getattr(settings, 'AI_CLUB_EMBEDDINGS_BATCH_SIZE', 256)
+
+        self._lock = threading.RLock()
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._valid: Optional[np.ndarray] = None
+        self._synced_until: Optional[str] = None
+        self._meta_mtime = None
+        self._last_sync = 0.0
+
+    # 📁 Файлы
+
+    @property
+    def matrix_path(self) -> str:
+        return os.path.join(self.directory, self.MATRIX_FILE)
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.directory, self.META_FILE)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.meta_path) and os.path.exists(self.matrix_path)
+
+    @contextmanager
+    def _write_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(os.path.join(self.directory, self.LOCK_FILE), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._reload(force=True)
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _reload(self, force: bool = False):
+        """Переоткрывает матрицу, если другой процесс обновил индекс"""
+        try:
+            mtime = os.stat(self.meta_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if not force and mtime == self._meta_mtime:
+            return
+
+        with open(self.meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        self._matrix = np.load(self.matrix_path, mmap_mode='r+')
+        self._set_ids(meta['ids'])
+        self._synced_until = meta.get('synced_until')
+        self._meta_mtime = mtime
+
+    def _set_ids(self, ids: List[Optional[str]]):
+        self._ids = ids
+        self._rows = {club_id: row for row, club_id in enumerate(ids) if club_id is not None}
+        self._valid = np.array([club_id is not None for club_id in ids], dtype=bool)
+
+    def _save_meta(self):
+        self._matrix.flush()
+        meta = {
+            'ids': self._ids,
+            'dim': int(self._matrix.shape[1]),
+            'synced_until': self._synced_until,
+        }
+        tmp_path = self.meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+        self._meta_mtime = os.stat(self.meta_path).st_mtime_ns
+
+    def _allocate(self, capacity: int, dim: int, keep_rows: int = 0):
+        """Создает файл матрицы нужной емкости, сохраняя первые keep_rows строк"""
+        tmp_path = self.matrix_path + '.tmp.npy'
+        matrix = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(capacity, dim))
+        if keep_rows and self._matrix is not None:
+            matrix[:keep_rows] = self._matrix[:keep_rows]
+        matrix.flush()
+        del matrix
+        os.replace(tmp_path, self.matrix_path)
+        self._matrix = np.load(self.matrix_path, mmap_mode='r+')
+
+    # ✍️ Запись
+
+    @staticmethod
+    def club_text(club: Dict) -> str:
+        return f"{club['name']} {club['description']} {club.get('category__name') or ''}"
+
+    def _encode(self, clubs: List[Dict]) -> np.ndarray:
+        vectors = self.encoder.encode(
+            [self.club_text(c) for c in clubs], batch_size=64, normalize_embeddings=True
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+    def rebuild(self) -> int:
+        """Полная пересборка по всем активным клубам"""
+        from clubs.models import Club
+
+        started = time.perf_counter()
+        clubs = list(Club.objects.filter(is_active=True).order_by('id').values(*CLUB_FIELDS))
+
+        with self._write_lock():
+            dim = self.encoder.get_sentence_embedding_dimension()
+            self._matrix = None
+            self._allocate(max(self.MIN_CAPACITY, len(clubs)), dim)
+            for start in range(0, len(clubs), self.batch_size):
+                batch = clubs[start:start + self.batch_size]
+                self._matrix[start:start + len(batch)] = self._encode(batch)
+
+            self._set_ids([str(c['id']) for c in clubs])
+            self._synced_until = max((c['updated_at'] for c in clubs), default=None)
+            self._synced_until = self._synced_until.isoformat() if self._synced_until else None
+            self._save_meta()
+
+        logger.info(f"🧮 Матрица эмбеддингов клубов пересобрана: {len(clubs)} клубов "
+                    f"за {time.perf_counter() - started:.1f}с")
+        return len(clubs)
+
+    def sync(self, force: bool = False, build_missing: bool = False) -> int:
+        """
+        Перекодирует клубы, измененные после последней синхронизации, и убирает неактивные.
+
+        Без файлов индекса ничего не делает, если не передан build_missing (прогрев, команда):
+        полная пересборка на пути запроса закодировала бы весь каталог.
+        """
+        if not force and time.monotonic() - self._last_sync < self.sync_interval:
+            self._reload()
+            return 0
+        self._last_sync = time.monotonic()
+
+        if not self.exists():
+            return self.rebuild() if build_missing else 0
+
+        from clubs.models import Club
+
+        self._reload()
+        changed = Club.objects.order_by('updated_at')
+        if self._synced_until:
+            changed = changed.filter(updated_at__gt=self._synced_until)
+        changed = list(changed.values(*CLUB_FIELDS))
+        # Удаленные клубы не попадают в changed, поэтому сверяемся со списком активных
+        active_ids = {str(pk) for pk in Club.objects.filter(is_active=True).values_list('id', flat=True)}
+        if not changed and active_ids.issuperset(self._rows):
+            return 0
+
+        with self._write_lock():
+            # Сюда попадают и деактивированные клубы из changed
+            stale = [club_id for club_id in self._rows if club_id not in active_ids]
+            self.remove(stale, save=False)
+            self.upsert([c for c in changed if c['is_active']], save=False)
+            if changed:
+                self._synced_until = changed[-1]['updated_at'].isoformat()
+            self._save_meta()
+
+        affected = {str(c['id']) for c in changed}.union(stale)
+        logger.info(f"🧮 Матрица эмбеддингов клубов: обновлено {len(affected)} клубов, удалено {len(stale)}")
+        return len(affected)
+
+    def upsert(self, clubs: List[Dict], save: bool = True):
+        """Записывает строки клубов (новые занимают освободившиеся строки или конец матрицы)"""
+        if not clubs:
+            return
+        vectors = self._encode(clubs)
+        if self._matrix is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._allocate(self.MIN_CAPACITY, vectors.shape[1])
+
+        free_rows = [row for row, club_id in enumerate(self._ids) if club_id is None]
+        ids = list(self._ids)
+        rows = []
+        for club in clubs:
+            club_id = str(club['id'])
+            row = self._rows.get(club_id)
+            if row is None:
+                row = free_rows.pop(0) if free_rows else len(ids)
+                if row == len(ids):
+                    ids.append(None)
+                ids[row] = club_id
+                self._rows[club_id] = row
+            rows.append(row)
+
+        if len(ids) > self._matrix.shape[0]:
+            self._allocate(max(len(ids), self._matrix.shape[0] * 2), self._matrix.shape[1], keep_rows=len(self._ids))
+
+        self._matrix[rows] = vectors
+        self._set_ids(ids)
+        if save:
+            self._save_meta()
+
+    def remove(self, club_ids: Iterable, save: bool = True):
+        ids = list(self._ids)
+        for club_id in club_ids:
+            row = self._rows.get(str(club_id))
+            if row is not None:
+                self._matrix[row] = 0.0
+                ids[row] = None
+        self._set_ids(ids)
+        if save:
+            self._save_meta()
+
+    # 🔎 Поиск
+
+    def profile_vector(self, club_ids: Iterable) -> Optional[np.ndarray]:
+        """Нормированный средний вектор клубов пользователя"""
+        rows = [self._rows[str(club_id)] for club_id in club_ids if str(club_id) in self._rows]
+        if not rows:
+            return None
+        vector = np.asarray(self._matrix[rows], dtype=np.float32).mean(axis=0)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def most_similar(self, vector: np.ndarray, k: int = 10, exclude: Iterable = ()) -> List[Tuple[str, float]]:
+        """Top-k клубов по косинусной близости (строки нормированы, поэтому это скалярное произведение)"""
+        count = len(self._ids)
+        if not count:
+            return []
+
+        scores = self._matrix[:count] @ vector.astype(np.float32)
+        scores[~self._valid] = -np.inf
+        excluded_rows = [self._rows[str(club_id)] for club_id in exclude if str(club_id) in self._rows]
+        scores[excluded_rows] = -np.inf
+
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._ids[row], float(scores[row])) for row in top if np.isfinite(scores[row])]
+
+    def __len__(self) -> int:
+        return len(self._rows)
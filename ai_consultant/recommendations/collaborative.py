@@ -0,0 +1,214 @@
+"""
+👥 Item-item collaborative filtering, обучаемый офлайн
+
+Матрица пользователь×клуб (SciPy CSR) строится из членства, лайков и
+UserInteraction с club_id в metadata. По ней считаются косинусные
+похожести клубов, для каждого клуба сохраняется top-k соседей в .npz.
+
+Онлайн рекомендация — поиск строк клубов пользователя в загруженной модели
+и суммирование их соседей, без запросов по взаимодействиям других пользователей.
+Обучение: python manage.py build_cf_model
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from ai_consultant.utils.lazy_imports import lazy_import
+
+# SciPy нужен только при обучении и загрузке модели, не при импорте
+sparse = lazy_import('scipy.sparse')
+
+logger = logging.getLogger(__name__)
+
+# Вес сигнала в матрице; повторные просмотры сглаживаются через log1p
+SIGNAL_WEIGHTS = {
+    'member': 3.0,
+    'like': 2.0,
+    'recommendation_click': 1.0,
+    'club_view': 0.5,
+}
+
+
+def collect_signals() -> List[Tuple[str, str, float]]:
+    """Все пары (user_id, club_id, вес) из членства, лайков и взаимодействий"""
+    from clubs.models import Club, UserInteraction
+
+    signals = [
+        (str(user_id), str(club_id), SIGNAL_WEIGHTS['member'])
+        for user_id, club_id in Club.members.through.objects.values_list('user_id', 'club_id').iterator()
+    ]
+    signals.extend(
+        (str(user_id), str(club_id), SIGNAL_WEIGHTS['like'])
+        for user_id, club_id in Club.likes.through.objects.values_list('user_id', 'club_id').iterator()
+    )
+
+    interactions = UserInteraction.objects.filter(
+        interaction_type__in=[t for t in SIGNAL_WEIGHTS if t not in ('member', 'like')],
+        metadata__has_key='club_id',
+    ).values_list('user_id', 'metadata__club_id', 'interaction_type')
+    try:
+        with transaction.atomic():
+            signals.extend(
+                (str(user_id), str(club_id), SIGNAL_WEIGHTS[interaction_type])
+                for user_id, club_id, interaction_type in interactions.iterator()
+                if club_id
+            )
+    except DatabaseError as e:
+        logger.warning(f"⚠️ UserInteraction недоступны для CF модели: {e}")
+    return signals
+
+
+def build_interaction_matrix(signals: Iterable[Tuple[str, str, float]]) -> Tuple['sparse.csr_matrix', List[str], List[str]]:
+    """CSR матрица пользователь×клуб; повторяющиеся сигналы суммируются"""
+    user_index: Dict[str, int] = {}
+    club_index: Dict[str, int] = {}
+    rows, cols, data = [], [], []
+    for user_id, club_id, weight in signals:
+        rows.append(user_index.setdefault(user_id, len(user_index)))
+        cols.append(club_index.setdefault(club_id, len(club_index)))
+        data.append(weight)
+
+    matrix = sparse.coo_matrix(
+        (np.asarray(data, dtype=np.float32), (rows, cols)),
+        shape=(len(user_index), len(club_index)),
+    ).tocsr()
+    matrix.sum_duplicates()
+    matrix.data = np.log1p(matrix.data)
+    return matrix, list(user_index), list(club_index)
+
+
+def compute_item_neighbors(matrix: 'sparse.csr_matrix', top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Косинусные похожести клубов и top-k соседей для каждого.
+
+    Returns:
+        (neighbors, scores) формы (n_clubs, top_k); пустые позиции: -1 и 0.0
+    """
+    items = matrix.T.tocsr()
+    norms = np.sqrt(np.asarray(items.multiply(items).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    items = sparse.diags(1.0 / norms).dot(items).tocsr()
+
+    similarity = items.dot(items.T).tocsr()
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+
+    n_clubs = similarity.shape[0]
+    neighbors = np.full((n_clubs, top_k), -1, dtype=np.int32)
+    scores = np.zeros((n_clubs, top_k), dtype=np.float32)
+    for row in range(n_clubs):
+        start, end = similarity.indptr[row], similarity.indptr[row + 1]
+        if start == end:
+            continue
+        row_scores = similarity.data[start:end]
+        row_columns = similarity.indices[start:end]
+        k = min(top_k, len(row_scores))
+        top = np.argpartition(-row_scores, k - 1)[:k]
+        top = top[np.argsort(-row_scores[top])]
+        neighbors[row, :k] = row_columns[top]
+        scores[row, :k] = row_scores[top]
+    return neighbors, scores
+
+
+class ItemSimilarityModel:
+    """Загруженная модель соседей клубов; перечитывается при обновлении файла"""
+
+    def __init__(self, path: str = None):
+        self.path = path or getattr(
+            settings, 'AI_CF_MODEL_PATH', os.path.join(settings.BASE_DIR, 'data', 'recommendations', 'item_cf.npz')
+        )
+        self._lock = threading.Lock()
+        self._mtime = None
+        self.club_ids = np.array([], dtype=str)
+        self.neighbors = np.zeros((0, 0), dtype=np.int32)
+        self.scores = np.zeros((0, 0), dtype=np.float32)
+        self._rows: Dict[str, int] = {}
+
+    def train(self, top_k: int = None) -> Dict[str, int]:
+        """Строит модель по текущим данным и сохраняет ее"""
+        top_k = top_k or getattr(settings, 'AI_CF_TOP_K', 50)
+        started = time.perf_counter()
+
+        matrix, user_ids, club_ids = build_interaction_matrix(collect_signals())
+        neighbors, scores = compute_item_neighbors(matrix, top_k)
+        self.save(np.asarray(club_ids, dtype=str), neighbors, scores)
+
+        stats = {'users': len(user_ids), 'clubs': len(club_ids), 'nonzero': int(matrix.nnz)}
+        logger.info(f"👥 CF модель обучена за {time.perf_counter() - started:.1f}с: {stats}")
+        return stats
+
+    def save(self, club_ids: np.ndarray, neighbors: np.ndarray, scores: np.ndarray):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp.npz'
+        np.savez_compressed(tmp_path, club_ids=club_ids, neighbors=neighbors, scores=scores)
+        os.replace(tmp_path, self.path)
+        self._load()
+
+    def _load(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime:
+            return
+
+        with self._lock:
+            with np.load(self.path, allow_pickle=False) as data:
+                self.club_ids = data['club_ids']
+                self.neighbors = data['neighbors']
+                self.scores = data['scores']
+            self._rows = {club_id: row for row, club_id in enumerate(self.club_ids.tolist())}
+            self._mtime = mtime
+        logger.info(f"👥 CF модель загружена: {len(self.club_ids)} клубов")
+
+    def is_ready(self) -> bool:
+        self._load()
+        return bool(self._rows)
+
+    def recommend(self, club_ids: Iterable, k: int = 10,
+                  exclude: Optional[Iterable] = None) -> List[Tuple[str, float]]:
+        """
+        Суммирует похожести соседей клубов пользователя.
+
+        Returns:
+            [(club_id, score)] по убыванию score, score нормирован на число клубов пользователя
+        """
+        self._load()
+        club_ids = {str(club_id) for club_id in club_ids}
+        rows = [self._rows[club_id] for club_id in club_ids if club_id in self._rows]
+        if not rows:
+            return []
+
+        neighbors = self.neighbors[rows].ravel()
+        scores = self.scores[rows].ravel()
+        valid = neighbors >= 0
+        totals = np.bincount(neighbors[valid], weights=scores[valid], minlength=len(self.club_ids))
+
+        excluded = club_ids | {str(club_id) for club_id in (exclude or ())}
+        totals[[self._rows[club_id] for club_id in excluded if club_id in self._rows]] = 0.0
+
+        candidates = np.flatnonzero(totals)
+        if not len(candidates):
+            return []
+        k = min(k, len(candidates))
+        top = candidates[np.argpartition(-totals[candidates], k - 1)[:k]]
+        top = top[np.argsort(-totals[top])]
+        return [(self.club_ids[row].item(), float(totals[row] / len(rows))) for row in top]
+
+
+_cf_model = None
+
+
+def get_cf_model() -> ItemSimilarityModel:
+    """Получение глобальной CF модели"""
+    global _cf_model
+    if _cf_model is None:
+        _cf_model = ItemSimilarityModel()
+    return _cf_model
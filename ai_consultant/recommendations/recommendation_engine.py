@@ -5,30 +5,21 @@ Personalized recommendations using collaborative filtering, content-based filter
 
 import logging
 import numpy as np
-import pandas as pd
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import asyncio
-from collections import defaultdict, Counter
+from collections import Counter
 import json
 
-# Machine Learning
-from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.cluster import KMeans
-from sklearn.decomposition import NMF
-import networkx as nx
-
 # Django Integration
 from django.conf import settings
 from django.core.cache import cache
 from django.contrib.auth.models import User
 from django.utils import timezone
 
-# AI/ML Models
-import torch
-import torch.nn as nn
-from sentence_transformers import SentenceTransformer
+from ai_consultant.recommendations.club_embeddings import CLUB_FIELDS, ClubEmbeddingIndex
+from ai_consultant.recommendations.collaborative import get_cf_model
+from ai_consultant.utils.warmup import get_sentence_model
 
 logger = logging.getLogger(__name__)
 
@@ -46,8 +37,9 @@ class RecommendationEngine:
         self.similarity_matrices = {}
 
         # ML Models
-        self.content_vectorizer = TfidfVectorizer(max_features=1000, stop_words='russian')
-        self.sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.sentence_model = get_sentence_model('all-MiniLM-L6-v2')
+        self.club_index = ClubEmbeddingIndex(self.sentence_model)
+        self.cf_model = get_cf_model()
 
         # Recommendation weights
         self.weights = {
@@ -120,7 +112,7 @@ class RecommendationEngine:
                 {
                     'type': interaction.interaction_type,
                     'content': interaction.content,
-                    'club_id': getattr(interaction, 'club_id', None),
+                    'club_id': interaction.metadata.get('club_id'),
                     'timestamp': interaction.created_at.isoformat()
                 }
                 for interaction in interactions
@@ -195,8 +187,6 @@ class RecommendationEngine:
                                          context: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """Get content-based recommendations"""
         try:
-            from clubs.models import Club
-
             # Get user's liked content
             user_interactions = user_profile.get('interactions', [])
             liked_clubs = [inter['club_id'] for inter in user_interactions
@@ -205,128 +195,98 @@ class RecommendationEngine:
             if not liked_clubs:
                 return []
 
-            # Get club content
-            liked_clubs_data = Club.objects.filter(id__in=liked_clubs)
-            all_clubs = Club.objects.filter(is_active=True).exclude(id__in=liked_clubs)[:100]
+            if not self.club_index.exists():
+                # The matrix is built by warmup / build_club_embeddings, never on a request
+                return self._score_content_directly(liked_clubs)
 
-            if not all_clubs:
+            # Precomputed club embeddings: one mat-vec over the whole catalog
+            self.club_index.sync()
+            profile_vector = self.club_index.profile_vector(liked_clubs)
+            if profile_vector is None:
                 return []
 
-            # Create content vectors
-            liked_content = []
-            for club in liked_clubs_data:
-                content = f"{club.name} {club.description} {club.category.name if club.category else ''}"
-                liked_content.append(content)
-
-            all_content = []
-            all_club_ids = []
-            for club in all_clubs:
-                content = f"{club.name} {club.description} {club.category.name if club.category else ''}"
-                all_content.append(content)
-                all_club_ids.append(club.id)
-
-            # Calculate similarities
-            if liked_content and all_content:
-                liked_vector = self.sentence_model.encode(liked_content, convert_to_tensor=True)
-                all_vectors = self.sentence_model.encode(all_content, convert_to_tensor=True)
-
-                # Calculate cosine similarities
-                similarities = cosine_similarity(
-                    self.sentence_model.encode(liked_content).mean(axis=0).reshape(1, -1),
-                    self.sentence_model.encode(all_content)
-                )
-
-                # Get top recommendations
-                top_indices = similarities[0].argsort()[-10:][::-1]
-                recommendations = []
-
-                for idx in top_indices:
-                    if similarities[0][idx] > 0.3:  # Similarity threshold
-                        club = all_clubs[idx]
-                        recommendations.append({
-                            'club_id': club.id,
-                            'score': float(similarities[0][idx]),
-                            'reason': 'Similar content to your interests',
-                            'type': 'content'
-                        })
-
-                return recommendations
+            return [
+                {
+                    'club_id': club_id,
+                    'score': score,
+                    'reason': 'Similar content to your interests',
+                    'type': 'content'
+                }
+                for club_id, score in self.club_index.most_similar(profile_vector, k=10, exclude=liked_clubs)
+                if score > 0.3  # Similarity threshold
+            ]
 
         except Exception as e:
             logger.error(f"❌ Error in content recommendations: {e}")
 
         return []
 
+    def _score_content_directly(self, liked_clubs: List) -> List[Dict[str, Any]]:
+        """Content scoring without the matrix: encodes up to 100 active clubs per request"""
+        from clubs.models import Club
+
+        liked = list(Club.objects.filter(id__in=liked_clubs).values(*CLUB_FIELDS))
+        candidates = list(
+            Club.objects.filter(is_active=True).exclude(id__in=liked_clubs).values(*CLUB_FIELDS)[:100]
+        )
+        if not liked or not candidates:
+            return []
+
+        liked_vectors = self.sentence_model.encode(
+            [ClubEmbeddingIndex.club_text(c) for c in liked], normalize_embeddings=True
+        )
+        profile = np.asarray(liked_vectors, dtype=np.float32).mean(axis=0)
+        norm = np.linalg.norm(profile)
+        if not norm:
+            return []
+        candidate_vectors = np.asarray(self.sentence_model.encode(
+            [ClubEmbeddingIndex.club_text(c) for c in candidates], normalize_embeddings=True
+        ), dtype=np.float32)
+        scores = candidate_vectors @ (profile / norm)
+
+        return [
+            {
+                'club_id': str(candidates[row]['id']),
+                'score': float(scores[row]),
+                'reason': 'Similar content to your interests',
+                'type': 'content'
+            }
+            for row in np.argsort(-scores)[:10]
+            if scores[row] > 0.3  # Similarity threshold
+        ]
+
     async def _get_collaborative_recommendations(self, user_profile: Dict[str, Any],
                                                context: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """Get collaborative filtering recommendations"""
         try:
-            from clubs.models import Club, UserInteraction
+            from clubs.models import Club
 
             user_id = user_profile['user_id']
-            user_interactions = user_profile.get('interactions', [])
-
-            if not user_interactions:
+            if not self.cf_model.is_ready():
                 return []
 
-            # Find similar users
-            user_clubs = {inter['club_id'] for inter in user_interactions if inter.get('club_id')}
+            # Clubs the user already has a signal for (indexed M2M lookups)
+            user_clubs = {inter['club_id'] for inter in user_profile.get('interactions', []) if inter.get('club_id')}
+            user_clubs.update(Club.members.through.objects.filter(user_id=user_id).values_list('club_id', flat=True))
+            user_clubs.update(Club.likes.through.objects.filter(user_id=user_id).values_list('club_id', flat=True))
             if not user_clubs:
                 return []
 
-            # Get users who interacted with same clubs
-            similar_users_data = UserInteraction.objects.filter(
-                club_id__in=user_clubs
-            ).exclude(user_id=user_id).values('user_id', 'club_id')
+            # Offline item-item model: neighbour lookup + one bulk fetch
+            scored = self.cf_model.recommend(user_clubs, k=10)
+            clubs = Club.objects.filter(is_active=True).in_bulk([club_id for club_id, _ in scored])
+            clubs = {str(pk): club for pk, club in clubs.items()}
 
-            # Create user-club matrix
-            user_club_matrix = defaultdict(set)
-            for data in similar_users_data:
-                user_club_matrix[data['user_id']].add(data['club_id'])
-
-            if not user_club_matrix:
-                return []
-
-            # Find most similar users (Jaccard similarity)
-            user_similarities = []
-            for similar_user_id, clubs in user_club_matrix.items():
-                intersection = len(user_clubs & clubs)
-                union = len(user_clubs | clubs)
-                similarity = intersection / union if union > 0 else 0
-
-                if similarity > 0.1:  # Minimum similarity threshold
-                    user_similarities.append((similar_user_id, similarity))
-
-            # Get recommendations from similar users
-            user_similarities.sort(key=lambda x: x[1], reverse=True)
-            top_similar_users = [user_id for user_id, _ in user_similarities[:5]]
-
-            if not top_similar_users:
-                return []
-
-            # Get clubs that similar users liked but current user hasn't seen
-            recommended_clubs = UserInteraction.objects.filter(
-                user_id__in=top_similar_users
-            ).exclude(
-                club_id__in=user_clubs
-            ).values('club_id').annotate(
-                score=Count('id')
-            ).order_by('-score')[:10]
-
-            recommendations = []
-            for club_data in recommended_clubs:
-                try:
-                    club = Club.objects.get(id=club_data['club_id'])
-                    recommendations.append({
-                        'club_id': club.id,
-                        'score': float(club_data['score'] / len(top_similar_users)),
-                        'reason': 'Users with similar interests liked this',
-                        'type': 'collaborative'
-                    })
-                except Club.DoesNotExist:
-                    continue
-
-            return recommendations
+            return [
+                {
+                    'club_id': clubs[club_id].id,
+                    'score': score,
+                    'reason': 'Users with similar interests liked this',
+                    'type': 'collaborative'
+                }
+                for club_id, score in scored
+                if club_id in clubs
+            ]
 
         except Exception as e:
             logger.error(f"❌ Error in collaborative recommendations: {e}")
@@ -381,10 +341,23 @@ class RecommendationEngine:
 
         return []
 
+    @staticmethod
+    def _context_point(context: Dict[str, Any]):
+        """User coordinates from the context, or the coordinates of the context city by name"""
+        from clubs import geo
+
+        if context.get('latitude') is not None and context.get('longitude') is not None:
+            try:
+                return geo.parse_point(context['latitude'], context['longitude'])
+            except geo.GeoQueryError:
+                return None
+        return geo.city_point(context.get('city'))
+
     async def _get_contextual_recommendations(self, user_profile: Dict[str, Any],
                                             context: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """Get context-aware recommendations"""
         try:
+            from clubs import geo
             from clubs.models import Club
 
             recommendations = []
@@ -418,8 +391,18 @@ class RecommendationEngine:
 
             # Context-based filtering
             if context:
-                # Location-based
-                if context.get('city'):
+                # Location-based: nearest clubs by coordinates (clubs/geo.py), else same city
+                near = self._context_point(context)
+                if near is not None:
+                    nearest = geo.nearest(Club.objects.filter(is_active=True), near, 3)
+                    for club_id, distance in nearest:
+                        recommendations.append({
+                            'club_id': club_id,
+                            'score': 0.8,
+                            'reason': f'Near your location ({distance:.1f} km)',
+                            'type': 'contextual'
+                        })
+                elif context.get('city'):
                     location_clubs = Club.objects.filter(
                         is_active=True,
                         city=context['city']
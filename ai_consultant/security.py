@@ -9,6 +9,8 @@ from django.core.validators import validate_email, RegexValidator
 from django.conf import settings
 import logging
 
+from ai_consultant.utils.text_matcher import text_matcher
+
 logger = logging.getLogger(__name__)
 
 class SecurityValidator:
@@ -82,21 +84,21 @@ class SecurityValidator:
         if not text:
             return True, ""
 
-        # Проверка на запрещенные слова
-        text_lower = text.lower()
-        for word in cls.FORBIDDEN_WORDS:
-            if word in text_lower:
-                logger.warning(f"Forbidden word detected: {word}")
-                return False, "Текст содержит недопустимые слова"
+        # Запрещенные слова, спам-паттерны и ссылки — за один проход общего автомата
+        scan = text_matcher.scan(text.lower())
+
+        profanity = scan.group('security.profanity')
+        if profanity:
+            logger.warning(f"Forbidden word detected: {profanity[0].pattern}")
+            return False, "Текст содержит недопустимые слова"
 
-        # Проверка на спам-паттерны
-        for pattern in cls.SPAM_PATTERNS:
-            if re.search(pattern, text_lower):
-                logger.warning(f"Spam pattern detected: {pattern}")
-                return False, "Текст похож на спам"
+        spam = scan.group('security.spam')
+        if spam:
+            logger.warning(f"Spam pattern detected: {spam[0].pattern}")
+            return False, "Текст похож на спам"
 
         # Дополнительная проверка на чрезмерное количество ссылок
-        url_count = len(re.findall(r'http[s]?://', text_lower))
+        url_count = len(scan.group('security.url'))
         if url_count > 2:
             return False, "Слишком много ссылок в тексте"
 
@@ -238,6 +240,12 @@ class SecurityValidator:
 
         return True, ""
 
+
+text_matcher.register_phrases('security.profanity', {'profanity': SecurityValidator.FORBIDDEN_WORDS})
+text_matcher.register_regex('security.spam', {'spam': SecurityValidator.SPAM_PATTERNS})
+text_matcher.register_phrases('security.url', {'url': ['http://', 'https://']})
+
+
 def sanitize_user_input(data: str) -> str:
     """
     Удобная функция для очистки любого пользовательского ввода
@@ -314,4 +322,5 @@ SECURITY_CONFIG = {
     'LOG_SECURITY_EVENTS': getattr(settings, 'AI_LOG_SECURITY_EVENTS', True),
 }
 
-logger.info("AI Consultant Security module loaded successfully")
\ No newline at end of file
+logger.info("AI Consultant Security module loaded successfully")
+
@@ -15,6 +15,7 @@ from django.core.exceptions import ObjectDoesNotExist
 
 from .models import ConversationState, AISessionLog, ClubCreationRequest
 from .security import log_security_event
+from .utils.log_buffer import buffered_log
 
 logger = logging.getLogger(__name__)
 
@@ -238,7 +239,7 @@ class AISessionLoggingService:
                         ip_address: str = None,
                         user_agent: str = None):
         """Логировать ввод пользователя"""
-        AISessionLog.objects.create(
+        buffered_log(AISessionLog(
             session_id=session_id,
             log_type='user_input',
             message=message,
@@ -246,7 +247,7 @@ class AISessionLoggingService:
             stage=stage,
             ip_address=ip_address,
             user_agent=user_agent
-        )
+        ))
 
     def log_ai_response(self, session_id: str, response_data: Dict[str, Any],
                         processing_time: float = None,
@@ -254,7 +255,7 @@ class AISessionLoggingService:
                         stage: str = None,
                         ip_address: str = None):
         """Логировать ответ ИИ"""
-        AISessionLog.objects.create(
+        buffered_log(AISessionLog(
             session_id=session_id,
             log_type='ai_response',
             message=response_data.get('message', ''),
@@ -263,7 +264,7 @@ class AISessionLoggingService:
             tokens_used=tokens_used,
             stage=stage,
             ip_address=ip_address
-        )
+        ))
 
     def log_error(self, session_id: str, error_message: str,
                     processing_time: float = None,
@@ -271,7 +272,7 @@ class AISessionLoggingService:
                     ip_address: str = None,
                     response_data: Dict[str, Any] = None):
         """Логировать ошибку"""
-        AISessionLog.objects.create(
+        buffered_log(AISessionLog(
             session_id=session_id,
             log_type='error',
             message=error_message,
@@ -279,19 +280,19 @@ class AISessionLoggingService:
             processing_time=processing_time,
             stage=stage,
             ip_address=ip_address
-        )
+        ))
 
     def log_security_event(self, session_id: str, event_type: str,
                            details: Dict[str, Any],
                            processing_time: float = None):
         """Логировать событие безопасности"""
-        AISessionLog.objects.create(
+        buffered_log(AISessionLog(
             session_id=session_id,
             log_type='security',
             message=f"Security event: {event_type}",
             response_data=details,
             processing_time=processing_time
-        )
+        ))
 
     def get_session_logs(self, session_id: str, limit: int = 100, offset: int = 0) -> dict:
         """
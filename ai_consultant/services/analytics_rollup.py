@@ -0,0 +1,200 @@
+"""
+🗓️ Дневные rollup-агрегаты аналитики чата
+
+Все счетчики считаются агрегатными SQL запросами (Count/Sum, TruncHour),
+время ответа — оконной функцией LEAD по сообщениям сессии. Результат
+сохраняется в chat_analytics_daily, и дашборды читают десятки строк
+вместо миллионов сообщений.
+
+Обновление: python manage.py rollup_chat_analytics (по умолчанию вчера и сегодня)
+"""
+
+import logging
+import math
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Count, F, Q, Sum, Window
+from django.db.models.functions import Lead, Length, TruncHour
+from django.utils import timezone
+
+from ..models import ChatAnalyticsDaily, ChatMessage, ChatSession
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин гистограммы времени ответа, секунды
+LATENCY_BUCKETS = [0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300, 600]
+OVERFLOW_BUCKET = 'inf'
+
+# Ответ, пришедший позже, считается отдельным обращением, а не ответом на запрос
+MAX_REPLY_DELAY = timedelta(hours=1)
+
+TOP_KEYWORDS = 50
+
+
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """Границы дня в текущей таймзоне"""
+    start = datetime.combine(day, time.min)
+    if settings.USE_TZ:
+        start = timezone.make_aware(start)
+    return start, start + timedelta(days=1)
+
+
+def message_lengths(messages) -> Dict[str, int]:
+    """Распределение длин сообщений пользователей одним агрегатом"""
+    return messages.filter(role='user').annotate(length=Length('content')).aggregate(
+        short=Count('id', filter=Q(length__lt=50)),
+        medium=Count('id', filter=Q(length__gte=50, length__lt=200)),
+        long=Count('id', filter=Q(length__gte=200)),
+    )
+
+
+def reply_latencies(messages) -> Iterable[Tuple[datetime, float]]:
+    """
+    (время запроса, секунды до ответа) для пар «пользователь → ассистент».
+
+    LEAD по сообщениям сессии находит следующее сообщение одним проходом
+    вместо вложенного перебора сообщений в Python.
+    """
+    window = {'partition_by': [F('session_id')], 'order_by': F('created_at').asc()}
+    rows = messages.annotate(
+        next_role=Window(Lead('role'), **window),
+        next_at=Window(Lead('created_at'), **window),
+    ).filter(next_role='assistant').values_list('role', 'created_at', 'next_at')
+
+    # Фильтр по role нельзя передать в filter(): Django применит его до окна, и LEAD
+    # увидит только сообщения пользователя
+    for role, created_at, next_at in rows.iterator():
+        if role != 'user':
+            continue
+        delay = next_at - created_at
+        if delay <= MAX_REPLY_DELAY:
+            yield created_at, delay.total_seconds()
+
+
+def latency_histogram(latencies: Iterable[float]) -> Tuple[Dict[str, int], int, float]:
+    """(гистограмма, количество, сумма секунд)"""
+    histogram = Counter()
+    count, total = 0, 0.0
+    for seconds in latencies:
+        bucket = next((b for b in LATENCY_BUCKETS if seconds <= b), OVERFLOW_BUCKET)
+        histogram[str(bucket)] += 1
+        count += 1
+        total += seconds
+    return dict(histogram), count, total
+
+
+def merge_counts(dicts: Iterable[Dict[str, int]]) -> Counter:
+    merged = Counter()
+    for counts in dicts:
+        merged.update(counts or {})
+    return merged
+
+
+def histogram_percentile(histogram: Dict[str, int], q: float) -> float:
+    """Перцентиль по гистограмме — верхняя граница корзины"""
+    total = sum(histogram.values())
+    if not total:
+        return 0.0
+    rank = math.ceil(total * q)
+    seen = 0
+    for bucket in [str(b) for b in LATENCY_BUCKETS] + [OVERFLOW_BUCKET]:
+        seen += histogram.get(bucket, 0)
+        if seen >= rank:
+            return float(bucket) if bucket != OVERFLOW_BUCKET else float(LATENCY_BUCKETS[-1])
+    return float(LATENCY_BUCKETS[-1])
+
+
+def latency_summary(histogram: Dict[str, int], count: int, total_seconds: float) -> Dict[str, float]:
+    if not count:
+        return {}
+    return {
+        'average_seconds': round(total_seconds / count, 2),
+        'median_seconds': histogram_percentile(histogram, 0.5),
+        'p95_seconds': histogram_percentile(histogram, 0.95),
+        'p99_seconds': histogram_percentile(histogram, 0.99),
+    }
+
+
+def analyze_contents(contents: Iterable[str], context_analyzer) -> Tuple[Counter, Counter, Counter]:
+    """Интенты, тональность и ключевые слова сообщений"""
+    intents, sentiments, keywords = Counter(), Counter(), Counter()
+    for content in contents:
+        analysis = context_analyzer.analyze_message(content)
+        intents[analysis['intent'] or 'unknown'] += 1
+        sentiments[analysis['sentiment']] += 1
+        keywords.update(analysis['keywords'])
+    return intents, sentiments, keywords
+
+
+def rollup_day(day: date, context_analyzer=None) -> ChatAnalyticsDaily:
+    """Пересчитывает строку chat_analytics_daily за день"""
+    start, end = day_bounds(day)
+
+    sessions = ChatSession.objects.filter(created_at__gte=start, created_at__lt=end).aggregate(
+        sessions=Count('id'),
+        anonymous_sessions=Count('id', filter=Q(user__isnull=True)),
+    )
+
+    messages = ChatMessage.objects.filter(created_at__gte=start, created_at__lt=end)
+    counts = messages.aggregate(
+        total_messages=Count('id'),
+        user_messages=Count('id', filter=Q(role='user')),
+        assistant_messages=Count('id', filter=Q(role='assistant')),
+        tokens_used=Sum('tokens_used'),
+    )
+    counts['tokens_used'] = counts['tokens_used'] or 0
+
+    hourly = {
+        row['hour'].hour: row['count']
+        for row in messages.annotate(hour=TruncHour('created_at')).values('hour').annotate(count=Count('id'))
+    }
+
+    # Ответ на поздний вечерний запрос может прийти уже после полуночи
+    latencies = ChatMessage.objects.filter(created_at__gte=start, created_at__lt=end + MAX_REPLY_DELAY)
+    histogram, replies, reply_seconds = latency_histogram(
+        seconds for created_at, seconds in reply_latencies(latencies) if created_at < end
+    )
+
+    intents = sentiments = keywords = Counter()
+    if context_analyzer is not None:
+        intents, sentiments, keywords = analyze_contents(
+            messages.filter(role='user').values_list('content', flat=True).iterator(), context_analyzer
+        )
+
+    row, _ = ChatAnalyticsDaily.objects.update_or_create(
+        date=day,
+        defaults={
+            **sessions,
+            **counts,
+            'replies': replies,
+            'reply_seconds_total': reply_seconds,
+            'reply_latency_histogram': histogram,
+            'message_lengths': message_lengths(messages),
+            'hourly_messages': {str(hour): count for hour, count in sorted(hourly.items())},
+            'intents': dict(intents),
+            'sentiments': dict(sentiments),
+            'keywords': dict(keywords.most_common(TOP_KEYWORDS)),
+        },
+    )
+    return row
+
+
+def rollup_range(start: date, end: date, context_analyzer=None) -> List[ChatAnalyticsDaily]:
+    """Пересчитывает дни [start, end] включительно"""
+    rows = []
+    day = start
+    while day <= end:
+        rows.append(rollup_day(day, context_analyzer))
+        day += timedelta(days=1)
+    logger.info(f"🗓️ Rollup аналитики чата: {start} — {end} ({len(rows)} дней)")
+    return rows
+
+
+def get_daily_rollups(start: date, end: Optional[date] = None):
+    rows = ChatAnalyticsDaily.objects.filter(date__gte=start)
+    if end:
+        rows = rows.filter(date__lte=end)
+    return rows.order_by('date')
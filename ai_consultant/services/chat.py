@@ -5,11 +5,12 @@
 
 import logging
 import json
+import time
 from typing import Dict, Any, List, Optional
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
 from django.db import transaction, models
 from django.utils import timezone
-from django.core.cache import cache
 
 from ..models import ChatSession, ChatMessage, ConversationState
 from .base import BaseAIService
@@ -17,6 +18,8 @@ from .cache_manager import ResponseCacheManager
 from ..metrics.collector import MetricsCollector
 from .context_builder import ContextBuilder
 from .language import LanguageService
+from .context_packer import ContextPacker, HistorySummarizer, PackedContext, SUMMARY_KEY
+from .history_buffer import get_history_buffer
 from ..agents.tools import ToolExecutor
 
 # Agents
@@ -43,6 +46,8 @@ class ChatService(BaseAIService):
         self.metrics = MetricsCollector()
         self.context_builder = ContextBuilder()
         self.language_service = LanguageService()
+        self.context_packer = ContextPacker()
+        self.summarizer = HistorySummarizer(openai_service)
         
         # Initialize Router
         self.router = AgentRouter(openai_service)
@@ -83,7 +88,6 @@ class ChatService(BaseAIService):
         """
         Отправляет сообщение и получает ответ от ИИ
         """
-        import time
         start_time = time.time()
         
         try:
@@ -91,8 +95,9 @@ class ChatService(BaseAIService):
                 # 1. Сохраняем сообщение пользователя
                 user_message = self._save_message(session, message, is_from_user=True)
 
-                # 2. Определяем историю сообщений для роутинга
-                history = self.get_history(session, limit=5)
+                # 2. Последние сообщения из буфера: хвост — для роутинга, все — для контекста
+                recent = get_history_buffer().recent(session, self.max_history_length)
+                history = self._as_history(recent[-5:])
                 
                 # 3. Роутинг: выбираем агента (с сохранением контекста)
                 # Проверяем есть ли уже активный агент в сессии
@@ -107,7 +112,7 @@ class ChatService(BaseAIService):
                         logger.info(f"🔄 Сброс агента из-за смены темы")
                         agent_name = self.router.route(message, history)
                         session.current_agent = agent_name
-                        session.agent_context = {}
+                        self._reset_agent_context(session)
                         session.save(update_fields=['current_agent', 'agent_context'])
                         logger.info(f"🆕 Новый агент после сброса: {agent_name}")
                 else:
@@ -131,8 +136,11 @@ class ChatService(BaseAIService):
                 #         # intercepted is a ready response dict
                 #         return intercepted
                 
-                # 5. Строим контекст для OpenAI
-                messages_context = self._build_messages_context(session, message, agent, context_service)
+                # 5. Строим контекст для OpenAI; резюме выпавших реплик — после коммита хода
+                packed = self._build_messages_context(session, message, agent, context_service, recent)
+                messages_context = packed.messages
+                if packed.dropped:
+                    transaction.on_commit(lambda: self.summarizer.refresh(session, packed.dropped))
                 
                 # 6. Вызываем OpenAI с инструментами агента
                 tools = agent.get_tools() if agent else []
@@ -216,18 +224,8 @@ class ChatService(BaseAIService):
                         func_name = tool_call.get('function', {}).get('name')
                         func_args_str = tool_call.get('function', {}).get('arguments', '{}')
                         
-                        try:
-                            # Очистка строки от невалидных символов
-                            func_args_str = func_args_str.strip()
-                            if not func_args_str:
-                                func_args_str = '{}'
-                            func_args = json.loads(func_args_str)
-                        except json.JSONDecodeError as e:
-                            logger.error(f"❌ JSON parse error in tool arguments: {e}")
-                            logger.error(f"   Raw arguments: {repr(func_args_str)}")
-                            func_args = {}
-
-                            
+                        func_args = self._parse_tool_arguments(func_args_str)
+
                         # Execute tool
                         logger.info(f"🔧 Executing tool: {func_name} with args: {func_args}")
                         tool_result = self.tool_executor.execute(agent_name, func_name, func_args, session.user)
@@ -258,7 +256,7 @@ class ChatService(BaseAIService):
                 if self._is_process_completed(response_content, agent_name):
                     logger.info(f"✅ Процесс завершен, сбрасываем агента")
                     session.current_agent = None
-                    session.agent_context = {}
+                    self._reset_agent_context(session)
                     session.save(update_fields=['current_agent', 'agent_context'])
                 
                 # 8. Сохраняем ответ ИИ
@@ -282,36 +280,186 @@ class ChatService(BaseAIService):
             }
 
         except Exception as e:
+            # Транзакция хода откатилась, а буфер уже получил его сообщения
+            get_history_buffer().invalidate(session.id)
             self.metrics.record_error('chat_error')
             self.metrics.record_request(status='error')
             self.log_error(f"Ошибка отправки сообщения: {e}")
             raise
 
-    def get_history(self, session: ChatSession, limit: int = None) -> List[Dict[str, Any]]:
+    async def asend_message(self, session: ChatSession, message: str, context_service=None) -> Dict[str, Any]:
         """
-        Получает историю сообщений сессии
+        Асинхронная версия send_message для ASGI.
+
+        ORM-участки выполняются через sync_to_async короткими транзакциями,
+        а ожидание ответа OpenAI не занимает поток воркера.
         """
+        start_time = time.time()
+
         try:
-            limit = limit or self.max_history_length
-
-            messages = ChatMessage.objects.filter(
-                session=session
-            ).order_by('created_at')[:limit]
-
-            history = []
-            for message in messages:
-                history.append({
-                    'id': message.id,
-                    'content': message.content,
-                    'is_from_user': message.role == 'user',
-                    'created_at': message.created_at.isoformat(),
-                    'tokens_used': message.tokens_used or 0
+            # 1-2. Сохраняем сообщение пользователя и получаем историю
+            history, user, recent = await sync_to_async(self._begin_turn)(session, message)
+
+            # 3. Роутинг с сохранением активного агента
+            agent_name = session.current_agent
+            if agent_name:
+                logger.info(f"📌 Продолжаем с агентом: {agent_name}")
+                if self._should_reset_agent(message, history, session):
+                    logger.info(f"🔄 Сброс агента из-за смены темы")
+                    agent_name = await self.router.aroute(message, history)
+                    session.current_agent = agent_name
+                    self._reset_agent_context(session)
+                    await sync_to_async(session.save)(update_fields=['current_agent', 'agent_context'])
+            else:
+                agent_name = await self.router.aroute(message, history)
+                session.current_agent = agent_name
+                await sync_to_async(session.save)(update_fields=['current_agent'])
+                logger.info(f"🆕 Новый агент: {agent_name}")
+
+            agent_class = AgentRegistry.get_agent(agent_name)
+            if not agent_class:
+                raise ValueError(f"Agent {agent_name} not found in registry")
+
+            agent = agent_class(context_service)
+
+            # 5. Строим контекст для OpenAI
+            packed = await sync_to_async(self._build_messages_context)(
+                session, message, agent, context_service, recent
+            )
+            messages_context = packed.messages
+
+            # 6. Вызываем OpenAI с инструментами агента
+            tools = agent.get_tools() if agent else []
+            tool_choice = "auto" if tools else None
+
+            ai_response = await self.openai_service.achat_completion(
+                messages=messages_context,
+                tools=tools,
+                tool_choice=tool_choice
+            )
+
+            content = (ai_response.get('content') or '').strip()
+            tool_calls = ai_response.get('tool_calls')
+
+            if not ai_response.get('success') or (not content and not tool_calls):
+                logger.error(f"❌ OpenAI returned error: {ai_response.get('error')}")
+                fallback_response = self._get_fallback_response_for_agent(agent_name, message)
+                ai_message = await sync_to_async(self._save_message)(session, fallback_response, is_from_user=False)
+                return {
+                    'response': fallback_response,
+                    'session_id': session.id,
+                    'message_id': ai_message.id,
+                    'tokens_used': 0
+                }
+
+            if tool_calls:
+                messages_context.append({
+                    "role": "assistant",
+                    "content": ai_response.get('content') or "",
+                    "tool_calls": tool_calls
                 })
-            return history
+
+                for tool_call in tool_calls:
+                    func_name = tool_call.get('function', {}).get('name')
+                    func_args = self._parse_tool_arguments(tool_call.get('function', {}).get('arguments', '{}'))
+
+                    logger.info(f"🔧 Executing tool: {func_name} with args: {func_args}")
+                    tool_result = await sync_to_async(self.tool_executor.execute)(
+                        agent_name, func_name, func_args, user
+                    )
+
+                    messages_context.append({
+                        "role": "tool",
+                        "tool_call_id": tool_call.get('id'),
+                        "content": tool_result
+                    })
+
+                second_response = await self.openai_service.achat_completion(
+                    messages=messages_context,
+                    tools=tools if tools else None,
+                    tool_choice="auto" if tools else None
+                )
+                ai_response['tokens_used'] += second_response.get('tokens_used', 0)
+                ai_response['content'] = second_response.get('content', '')
+
+            response_content = ai_response.get('content', 'Извините, я не смог сформировать ответ.')
+
+            # 7.5-8. Завершение процесса и сохранение ответа ИИ
+            ai_message = await sync_to_async(self._finish_turn)(
+                session, agent_name, response_content, ai_response.get('tokens_used', 0)
+            )
+            if packed.dropped:
+                await self.summarizer.arefresh(session, packed.dropped)
+
+            duration = time.time() - start_time
+            self.metrics.record_response_time(duration)
+            self.metrics.record_tokens(ai_response.get('tokens_used', 0))
+
+            return {
+                'response': response_content,
+                'message_id': ai_message.id,
+                'tokens_used': ai_response.get('tokens_used', 0),
+                'session_id': session.id,
+                'agent': agent_name
+            }
+
+        except Exception as e:
+            self.metrics.record_error('chat_error')
+            self.metrics.record_request(status='error')
+            self.log_error(f"Ошибка асинхронной отправки сообщения: {e}")
+            raise
+
+    def _begin_turn(self, session: ChatSession, message: str):
+        """
+        Сохраняет сообщение пользователя и возвращает историю для роутинга,
+        пользователя сессии (чтобы не обращаться к FK из event loop) и последние
+        сообщения из буфера для контекста
+        """
+        self._save_message(session, message, is_from_user=True)
+        recent = get_history_buffer().recent(session, self.max_history_length)
+        return self._as_history(recent[-5:]), session.user, recent
+
+    def _finish_turn(self, session: ChatSession, agent_name: str, response_content: str, tokens_used: int) -> ChatMessage:
+        """
+        Сбрасывает агента по завершении процесса и сохраняет ответ ИИ
+        """
+        with transaction.atomic():
+            if self._is_process_completed(response_content, agent_name):
+                logger.info(f"✅ Процесс завершен, сбрасываем агента")
+                session.current_agent = None
+                self._reset_agent_context(session)
+                session.save(update_fields=['current_agent', 'agent_context'])
+
+            return self._save_message(
+                session,
+                response_content,
+                is_from_user=False,
+                tokens_used=tokens_used
+            )
+
+    def get_history(self, session: ChatSession, limit: int = None) -> List[Dict[str, Any]]:
+        """
+        Получает последние limit сообщений сессии (от старых к новым) из буфера истории
+        """
+        try:
+            return self._as_history(get_history_buffer().recent(session, limit or self.max_history_length))
         except Exception as e:
             self.log_error(f"Ошибка получения истории: {e}")
             return []
 
+    @staticmethod
+    def _as_history(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {
+                'id': row['id'],
+                'content': row['content'],
+                'is_from_user': row['role'] == 'user',
+                'created_at': row['created_at'],
+                'tokens_used': row['tokens_used']
+            }
+            for row in rows
+        ]
+
     def get_messages_count(self, session: ChatSession) -> int:
         """
         Получает общее количество сообщений в сессии
@@ -336,7 +484,7 @@ class ChatService(BaseAIService):
             with transaction.atomic():
                 session.messages.all().delete()
                 session.delete()
-                self._clear_history_cache(session.id)
+                get_history_buffer().invalidate(session.id)
                 return True
         except Exception as e:
             self.log_error(f"Ошибка удаления сессии: {e}")
@@ -388,35 +536,56 @@ class ChatService(BaseAIService):
             tokens_used=tokens_used
         )
 
-    def _build_messages_context(self, session: ChatSession, current_message: str, agent, context_service=None) -> List[Dict[str, str]]:
-        """
-        Строит контекст для OpenAI из истории сообщений
+    def _parse_tool_arguments(self, func_args_str: str) -> Dict[str, Any]:
+        try:
+            # Очистка строки от невалидных символов
+            func_args_str = (func_args_str or '').strip()
+            if not func_args_str:
+                func_args_str = '{}'
+            return json.loads(func_args_str)
+        except json.JSONDecodeError as e:
+            logger.error(f"❌ JSON parse error in tool arguments: {e}")
+            logger.error(f"   Raw arguments: {repr(func_args_str)}")
+            return {}
+
+    def _build_messages_context(self, session: ChatSession, current_message: str, agent, context_service=None,
+                                recent: List[Dict[str, Any]] = None) -> PackedContext:
         """
-        messages = []
+        Строит контекст для OpenAI: system prompt, резюме старой истории,
+        последние реплики в пределах бюджета токенов и текущее сообщение.
 
-        # 1. System Prompt from Agent
+        Без вызовов LLM: реплики вне окна (dropped) вызывающий сжимает
+        в резюме после коммита хода. recent — последние сообщения, уже
+        прочитанные из буфера в этом ходе.
+        """
         system_prompt = agent.get_system_prompt()
-        messages.append({"role": "system", "content": system_prompt})
+        tools = agent.get_tools() if agent else []
+        history = self._get_recent_history(session, current_message, recent)
+        summary = self.summarizer.get_summary(session).get('text', '')
 
-        # 2. History
-        history = self.get_history(session, limit=self.max_history_length - 2)
-        for msg in history:
-            role = "user" if msg['is_from_user'] else "assistant"
-            messages.append({
-                "role": role,
-                "content": msg['content']
-            })
+        packed = self.context_packer.pack(system_prompt, history, current_message, tools=tools, summary=summary)
 
-        # 3. Current Message
-        messages.append({"role": "user", "content": current_message})
+        logger.info(f"📦 Контекст: {len(packed.messages)} сообщений, ~{packed.prompt_tokens} токенов, "
+                    f"вне окна: {len(packed.dropped)}")
+        return packed
 
-        return self.openai_service.truncate_messages(messages)
+    def _get_recent_history(self, session: ChatSession, current_message: str,
+                            recent: List[Dict[str, Any]] = None) -> List[Dict[str, str]]:
+        """
+        Последние реплики сессии от старых к новым (без текущего сообщения пользователя)
+        """
+        if recent is None:
+            recent = get_history_buffer().recent(session, self.max_history_length)
+        rows = [row for row in recent if row['role'] in ('user', 'assistant')]
 
-    def _clear_history_cache(self, session_id: str):
-        try:
-            cache.delete_many([f"chat_history_{session_id}_*"])
-        except Exception as e:
-            self.log_error(f"Ошибка очистки кэша: {e}")
+        # Текущее сообщение уже сохранено в начале хода и добавляется в контекст отдельно
+        if rows and rows[-1]['role'] == 'user' and rows[-1]['content'] == current_message:
+            rows.pop()
+
+        return [
+            {'role': row['role'], 'content': row['content'], 'created_at': row['created_at']}
+            for row in rows
+        ]
     
     def _get_fallback_response_for_agent(self, agent_name: str, user_message: str) -> str:
         """
@@ -590,23 +759,19 @@ class ChatService(BaseAIService):
                     'city': data.get('city'),
                     'is_private': False
                 }
-                tool_output = None
                 try:
                     if self.tool_executor is None:
                         raise ValueError('Tool executor is not configured')
-                    tool_output = self.tool_executor.execute('club_specialist', 'create_club', tool_args, session.user)
+                    # Структурированный результат без кодирования в JSON и обратного разбора
+                    tool_output = self.tool_executor.run('club_specialist', 'create_club', tool_args, session.user)
                 except Exception as e:
                     logger.error(f"❌ Failed to execute create_club tool: {e}")
-                    tool_output = json.dumps({
+                    tool_output = {
                         'status': 'error',
                         'message': f'Не удалось создать клуб: {str(e)}'
-                    }, ensure_ascii=False)
+                    }
                 
-                # Parse tool result
-                try:
-                    tool_json = json.loads(tool_output) if isinstance(tool_output, str) else tool_output
-                except Exception:
-                    tool_json = {'status': 'error', 'message': str(tool_output)}
+                tool_json = tool_output if isinstance(tool_output, dict) else {'status': 'error', 'message': str(tool_output)}
                 
                 if tool_json.get('status') == 'success':
                     # Reset state and agent
@@ -614,7 +779,7 @@ class ChatService(BaseAIService):
                     state.update_progress()
                     state.save(update_fields=['stage', 'updated_at', 'progress'])
                     session.current_agent = None
-                    session.agent_context = {}
+                    self._reset_agent_context(session)
                     session.save(update_fields=['current_agent', 'agent_context'])
                     response = tool_json.get('message') or "Клуб успешно создан! 🎉"
                     ai_message = self._save_message(session, response, is_from_user=False)
@@ -716,6 +881,12 @@ class ChatService(BaseAIService):
 
         return None
     
+    @staticmethod
+    def _reset_agent_context(session: ChatSession):
+        """Сбрасывает состояние агента, сохраняя сводку истории (ее пересчет дорог)"""
+        context = session.agent_context or {}
+        session.agent_context = {SUMMARY_KEY: context[SUMMARY_KEY]} if SUMMARY_KEY in context else {}
+
     def _should_reset_agent(self, message: str, history: List[Dict], session) -> bool:
         """
         Определяет нужно ли сбросить текущего агента и выбрать нового
@@ -11,6 +11,7 @@ from django.db import transaction
 
 from ..models import AIContext
 from .base import BaseAIService
+from ..prompts.compiler import prompt_compiler
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -35,44 +36,39 @@ class ContextService(BaseAIService):
     def get_system_context(self) -> str:
         """
         Получает основной системный контекст
+        (компилируется один раз на версию базы знаний, см. prompts/compiler.py)
         """
         try:
-            cache_key = "system_context_primary"
-            cached_context = cache.get(cache_key)
-
-            if cached_context:
-                self.log_info("Системный контекст загружен из кэша")
-                return cached_context
-
-            # Получаем активные системные контексты
-            contexts = AIContext.objects.filter(
-                category='system',
-                is_active=True
-            ).order_by('created_at')
-
-            if contexts.exists():
-                context_text = "\n\n".join([
-                    f"📌 {ctx.key}:\n{ctx.content}"
-                    for ctx in contexts
-                ])
-            else:
-                # Используем контекст по умолчанию
-                context_text = self.default_contexts.get('system', '')
-
-            # Кэшируем результат
-            cache.set(cache_key, context_text, self.cache_timeout)
-
-            self.log_info(f"Системный контекст загружен", {
-                'contexts_count': contexts.count(),
-                'length': len(context_text)
-            })
-
-            return context_text
-
+            return prompt_compiler.text('system_context')
         except Exception as e:
             self.log_error(f"Ошибка получения системного контекста: {e}")
             return self.default_contexts.get('system', '')
 
+    def _build_system_context(self) -> str:
+        """
+        Собирает системный контекст из активных AIContext
+        """
+        contexts = list(AIContext.objects.filter(
+            category='system',
+            is_active=True
+        ).order_by('created_at'))
+
+        if contexts:
+            context_text = "\n\n".join([
+                f"📌 {ctx.key}:\n{ctx.content}"
+                for ctx in contexts
+            ])
+        else:
+            # Используем контекст по умолчанию
+            context_text = self.default_contexts.get('system', '')
+
+        self.log_info(f"Системный контекст загружен", {
+            'contexts_count': len(contexts),
+            'length': len(context_text)
+        })
+
+        return context_text
+
     def get_context_by_category(self, category: str) -> str:
         """
         Получает контекст по категории
@@ -406,4 +402,7 @@ class ContextService(BaseAIService):
             return True
         except Exception as e:
             self.log_error(f"Health check не пройден: {e}")
-            return False
\ No newline at end of file
+            return False
+
+
+prompt_compiler.register('system_context', lambda: ContextService()._build_system_context())
@@ -0,0 +1,208 @@
+"""
+📦 Упаковка контекста под бюджет токенов
+Точный подсчет токенов (tiktoken), резерв под tools и ответ,
+сжатие старых реплик в накопительное резюме сессии
+"""
+
+import json
+import logging
+import math
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Служебные токены chat-формата: на каждое сообщение и на затравку ответа
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+SUMMARY_KEY = 'history_summary'
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    """Кодировщик загружается один раз на модель"""
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding('o200k_base')
+    except Exception as e:
+        # Нет локального кэша BPE и нет сети — используем оценку
+        logger.warning(f"⚠️ tiktoken недоступен для {model}: {e}")
+        return None
+
+
+class TokenCounter:
+    """Подсчет токенов для модели с кэшем по тексту"""
+
+    def __init__(self, model: str = None):
+        self.model = model or getattr(settings, 'OPENAI_MODEL', 'gpt-4o-mini')
+        self.encoding = _get_encoding(self.model)
+        self.count = lru_cache(maxsize=4096)(self._count)
+
+    def _count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        # Оценка без токенизатора: кириллица занимает заметно больше токенов, чем латиница
+        ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+        return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 2)
+
+    def count_message(self, message: Dict[str, Any]) -> int:
+        return TOKENS_PER_MESSAGE + self.count(message.get('content') or '')
+
+    def count_messages(self, messages: List[Dict[str, Any]]) -> int:
+        return sum(self.count_message(m) for m in messages) + TOKENS_PER_REPLY
+
+    def count_tools(self, tools: Optional[List[Dict[str, Any]]]) -> int:
+        if not tools:
+            return 0
+        return self.count(json.dumps(tools, ensure_ascii=False, sort_keys=True))
+
+
+@dataclass
+class PackedContext:
+    messages: List[Dict[str, str]]
+    prompt_tokens: int
+    dropped: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class ContextPacker:
+    """
+    Собирает сообщения для Chat Completion в пределах бюджета.
+
+    Бюджет = AI_CONTEXT_TOKEN_BUDGET - резерв под ответ - tools - system - резюме - текущее сообщение.
+    История добавляется от новых реплик к старым за один проход; не поместившиеся
+    старые реплики возвращаются в dropped для сжатия в резюме.
+    """
+
+    def __init__(self, model: str = None, token_budget: int = None, completion_reserve: int = None):
+        self.counter = TokenCounter(model)
+        self.token_budget = token_budget or getattr(settings, 'AI_CONTEXT_TOKEN_BUDGET', 6000)
+        self.completion_reserve = completion_reserve or getattr(settings, 'OPENAI_MAX_TOKENS', 1000)
+
+    def pack(self, system_prompt: str, history: List[Dict[str, Any]], current_message: str,
+             tools: Optional[List[Dict[str, Any]]] = None, summary: str = '') -> PackedContext:
+        """
+        history — реплики от старых к новым: {'role', 'content'[, 'created_at']}
+        """
+        head = [{'role': 'system', 'content': system_prompt}]
+        if summary:
+            head.append({'role': 'system', 'content': f"Краткое содержание предыдущего диалога:\n{summary}"})
+        tail = {'role': 'user', 'content': current_message}
+
+        used = self.counter.count_messages(head + [tail]) + self.counter.count_tools(tools)
+        available = self.token_budget - self.completion_reserve - used
+
+        kept = 0
+        for msg in reversed(history):
+            cost = self.counter.count_message(msg)
+            if cost > available:
+                break
+            available -= cost
+            used += cost
+            kept += 1
+
+        cut = len(history) - kept
+        window = [{'role': m['role'], 'content': m['content']} for m in history[cut:]]
+        return PackedContext(messages=head + window + [tail], prompt_tokens=used, dropped=history[:cut])
+
+
+class HistorySummarizer:
+    """
+    Накопительное резюме старых реплик в ChatSession.agent_context.
+
+    Резюме обновляется инкрементально: в LLM отправляется прежнее резюме и только
+    реплики, выпавшие из окна после последнего обновления. Обновление выполняется
+    пачками, чтобы не тратить по вызову на каждую реплику.
+
+    Вызов LLM — после коммита хода, вне его транзакции: новое резюме попадает
+    в контекст со следующего хода (refresh для WSGI, arefresh для ASGI).
+    """
+
+    def __init__(self, openai_service, batch_size: int = None, max_tokens: int = None):
+        self.openai_service = openai_service
+        self.batch_size = batch_size or getattr(settings, 'AI_SUMMARY_BATCH_SIZE', 6)
+        self.max_tokens = max_tokens or getattr(settings, 'AI_SUMMARY_MAX_TOKENS', 300)
+
+    @staticmethod
+    def get_summary(session) -> Dict[str, Any]:
+        return (session.agent_context or {}).get(SUMMARY_KEY) or {}
+
+    def pending(self, session, dropped: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Реплики вне окна, еще не вошедшие в резюме; пусто, пока их меньше пачки"""
+        # id сообщений — UUID, поэтому граница резюме хранится как created_at (ISO)
+        summarized_until = self.get_summary(session).get('until') or ''
+        pending = [m for m in dropped if m.get('created_at', '') > summarized_until]
+        return pending if len(pending) >= self.batch_size else []
+
+    def refresh(self, session, dropped: List[Dict[str, Any]]) -> str:
+        """Возвращает актуальный текст резюме, при необходимости обновив его"""
+        state = self.get_summary(session)
+        pending = self.pending(session, dropped)
+        if not pending:
+            return state.get('text', '')
+
+        try:
+            result = self.openai_service.chat_completion(
+                messages=self._prompt(state, pending), max_tokens=self.max_tokens, temperature=0.2,
+            )
+        except Exception as e:
+            logger.error(f"❌ Ошибка обновления резюме истории: {e}")
+            return state.get('text', '')
+        return self._store(session, state, pending, result)
+
+    async def arefresh(self, session, dropped: List[Dict[str, Any]]) -> str:
+        """refresh для ASGI: ожидание LLM не занимает поток, в потоке только сохранение"""
+        state = self.get_summary(session)
+        pending = self.pending(session, dropped)
+        if not pending:
+            return state.get('text', '')
+
+        try:
+            result = await self.openai_service.achat_completion(
+                messages=self._prompt(state, pending), max_tokens=self.max_tokens, temperature=0.2,
+            )
+        except Exception as e:
+            logger.error(f"❌ Ошибка обновления резюме истории: {e}")
+            return state.get('text', '')
+        return await sync_to_async(self._store)(session, state, pending, result)
+
+    @staticmethod
+    def _prompt(state: Dict[str, Any], pending: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        transcript = "\n".join(
+            f"{'Пользователь' if m['role'] == 'user' else 'Ассистент'}: {m['content']}" for m in pending
+        )
+        return [
+            {'role': 'system', 'content': (
+                "Сожми диалог в краткое резюме на языке диалога: цели пользователя, "
+                "названные факты (город, интересы, клубы), принятые решения. Не более 8 пунктов."
+            )},
+            {'role': 'user', 'content': f"Текущее резюме:\n{state.get('text') or '—'}\n\nНовые реплики:\n{transcript}"},
+        ]
+
+    @staticmethod
+    def _store(session, state: Dict[str, Any], pending: List[Dict[str, Any]], result: Optional[Dict[str, Any]]) -> str:
+        text = (result or {}).get('content', '').strip()
+        if not result or not result.get('success') or not text:
+            return state.get('text', '')
+
+        context = dict(session.agent_context or {})
+        context[SUMMARY_KEY] = {'text': text, 'until': max(m['created_at'] for m in pending)}
+        session.agent_context = context
+        session.save(update_fields=['agent_context'])
+        logger.info(f"🧾 Резюме истории обновлено: +{len(pending)} реплик")
+        return text
@@ -0,0 +1,292 @@
+"""
+💬 Общее хранилище состояний диалогов
+
+Все сценарии создания клуба (SimplifiedInteractiveAIConsultant,
+LightweightClubCreationAgent, ClubCreationAgent) хранят состояние здесь, а не в
+словарях процесса или LocMem кэше, поэтому следующее сообщение пользователя
+может обработать любой воркер gunicorn.
+
+- Ключ — (flow, session_id); загрузка — одно обращение по ключу.
+- Формат компактный: JSON без пробелов, zlib при размере от COMPRESS_THRESHOLD.
+- Время жизни (TTL) продлевается при каждой записи, истекшие состояния не читаются.
+- Запись — compare-and-set по версии: update() перечитывает состояние и
+  повторяет изменение, если другой воркер успел записать раньше.
+
+Бэкенды: Redis (AI_CONVERSATION_REDIS_URL, CAS через Lua скрипт) и таблица
+ConversationState. При недоступности Redis хранилище переключается на базу.
+"""
+
+import json
+import logging
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..utils.lazy_imports import is_available, lazy_import
+
+logger = logging.getLogger(__name__)
+
+redis = lazy_import('redis')
+REDIS_AVAILABLE = is_available('redis')
+
+COMPRESS_THRESHOLD = 512
+RAW_MARKER = b'j'
+ZLIB_MARKER = b'z'
+
+
+class ConversationConflictError(Exception):
+    """Состояние изменил другой воркер между чтением и записью"""
+
+
+@dataclass
+class ConversationRecord:
+    flow: str
+    session_id: str
+    stage: str = ''
+    data: Dict[str, Any] = field(default_factory=dict)
+    version: int = 0  # 0 — состояния в хранилище нет
+
+    @property
+    def key(self) -> str:
+        return f'{self.flow}:{self.session_id}'
+
+    @property
+    def exists(self) -> bool:
+        return self.version > 0
+
+
+def encode_state(stage: str, data: Dict[str, Any]) -> bytes:
+    """Компактная сериализация: маркер формата + JSON (datetime, UUID, Decimal — строками)"""
+    payload = json.dumps(
+        {'s': stage, 'd': data}, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')
+    ).encode('utf-8')
+    if len(payload) >= COMPRESS_THRESHOLD:
+        return ZLIB_MARKER + zlib.compress(payload, 6)
+    return RAW_MARKER + payload
+
+
+def decode_state(blob: bytes) -> Tuple[str, Dict[str, Any]]:
+    marker, body = blob[:1], blob[1:]
+    if marker == ZLIB_MARKER:
+        body = zlib.decompress(body)
+    payload = json.loads(body)
+    return payload.get('s', ''), payload.get('d', {})
+
+
+class RedisConversationBackend:
+    """Хеш {v: версия, p: состояние} на ключ; TTL выставляет Redis"""
+
+    name = 'redis'
+
+    CAS_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], 'v')
+if (current or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'v', ARGV[2], 'p', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+    def __init__(self, url: str, prefix: str = 'conversation:'):
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self._cas = self.client.register_script(self.CAS_SCRIPT)
+
+    def ping(self):
+        self.client.ping()
+
+    def load(self, key: str) -> Optional[Tuple[str, Dict[str, Any], int]]:
+        version, payload = self.client.hmget(self.prefix + key, 'v', 'p')
+        if payload is None:
+            return None
+        stage, data = decode_state(payload)
+        return stage, data, int(version)
+
+    def compare_and_set(self, key: str, flow: str, blob: bytes, expected_version: int, ttl: int) -> bool:
+        return bool(self._cas(
+            keys=[self.prefix + key],
+            args=[str(expected_version), str(expected_version + 1), blob, int(ttl)],
+        ))
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+
+class DatabaseConversationBackend:
+    """Таблица ConversationState: уникальный session_id = '<flow>:<session_id>', условный UPDATE по version"""
+
+    name = 'db'
+
+    def __init__(self):
+        self.purge_interval = getattr(settings, 'AI_CONVERSATION_PURGE_INTERVAL', 300)
+        self._last_purge = 0.0
+
+    def load(self, key: str) -> Optional[Tuple[str, Dict[str, Any], int]]:
+        from ai_consultant.models import ConversationState
+
+        row = ConversationState.objects.filter(
+            session_id=key, expires_at__gt=timezone.now()
+        ).values_list('stage', 'data', 'version').first()
+        if row is None or not row[2]:
+            return None
+        return row
+
+    def compare_and_set(self, key: str, flow: str, blob: bytes, expected_version: int, ttl: int) -> bool:
+        from ai_consultant.models import ConversationState
+
+        # В JSONField попадает то же, что вернет Redis после decode
+        stage, data = decode_state(blob)
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=ttl)
+
+        if expected_version == 0:
+            self._maybe_purge()
+            # Истекшее состояние с тем же ключом освобождает уникальный session_id
+            ConversationState.objects.filter(session_id=key).filter(
+                Q(expires_at__lte=now) | Q(expires_at__isnull=True) | Q(version=0)
+            ).delete()
+            try:
+                with transaction.atomic():
+                    # bulk_create: без full_clean(), stage сценария не обязан входить в choices модели
+                    ConversationState.objects.bulk_create([ConversationState(
+                        session_id=key, flow=flow, stage=stage, data=data,
+                        version=1, expires_at=expires_at,
+                    )])
+                return True
+            except IntegrityError:
+                return False
+
+        updated = ConversationState.objects.filter(
+            session_id=key, version=expected_version, expires_at__gt=now
+        ).update(stage=stage, data=data, version=expected_version + 1, expires_at=expires_at, updated_at=now)
+        return updated == 1
+
+    def delete(self, key: str):
+        from ai_consultant.models import ConversationState
+        ConversationState.objects.filter(session_id=key).delete()
+
+    def purge_expired(self) -> int:
+        from ai_consultant.models import ConversationState
+        return ConversationState.objects.filter(version__gt=0, expires_at__lte=timezone.now()).delete()[0]
+
+    def _maybe_purge(self):
+        if time.monotonic() - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = time.monotonic()
+        deleted = self.purge_expired()
+        if deleted:
+            logger.info(f"🧹 Удалено истекших состояний диалогов: {deleted}")
+
+
+class ConversationStore:
+    """
+    Состояния диалогов всех сценариев.
+
+    primary — Redis или база; при ошибке Redis операции на fallback_seconds
+    уходят в базу (fallback), затем Redis пробуется снова.
+    """
+
+    def __init__(self, backend=None, fallback=None, ttl: int = None):
+        self.backend = backend or DatabaseConversationBackend()
+        self.fallback = fallback
+        self.ttl = ttl or getattr(settings, 'AI_CONVERSATION_TTL', 3600)
+        self.fallback_seconds = getattr(settings, 'AI_CONVERSATION_REDIS_RETRY', 30)
+        self.max_retries = getattr(settings, 'AI_CONVERSATION_CAS_RETRIES', 5)
+        self._fallback_until = 0.0
+
+    def _call(self, method: str, *args):
+        if self.fallback is None:
+            return getattr(self.backend, method)(*args)
+        if time.monotonic() >= self._fallback_until:
+            try:
+                return getattr(self.backend, method)(*args)
+            except Exception as e:
+                logger.error(f"❌ Хранилище диалогов {self.backend.name} недоступно, временно используется база: {e}")
+                self._fallback_until = time.monotonic() + self.fallback_seconds
+        return getattr(self.fallback, method)(*args)
+
+    @property
+    def backend_name(self) -> str:
+        if self.fallback is not None and time.monotonic() < self._fallback_until:
+            return self.fallback.name
+        return self.backend.name
+
+    def load(self, flow: str, session_id: str) -> ConversationRecord:
+        """Текущее состояние или пустая запись с version=0"""
+        record = ConversationRecord(flow, str(session_id))
+        loaded = self._call('load', record.key)
+        if loaded is not None:
+            record.stage, record.data, record.version = loaded
+        return record
+
+    def save(self, record: ConversationRecord, ttl: int = None) -> ConversationRecord:
+        """Compare-and-set по record.version; при конфликте ConversationConflictError"""
+        blob = encode_state(record.stage, record.data)
+        if not self._call('compare_and_set', record.key, record.flow, blob, record.version, ttl or self.ttl):
+            raise ConversationConflictError(f"Состояние {record.key} изменено другим запросом")
+        record.version += 1
+        return record
+
+    def update(self, flow: str, session_id: str, mutate: Callable[[ConversationRecord], Any],
+               ttl: int = None) -> Tuple[ConversationRecord, Any]:
+        """
+        load → mutate(record) → save с повтором при конфликте.
+
+        mutate изменяет record.data / record.stage на месте и может вернуть результат;
+        он должен быть идемпотентным, так как при конфликте вызывается повторно.
+        """
+        for attempt in range(self.max_retries):
+            record = self.load(flow, session_id)
+            result = mutate(record)
+            try:
+                return self.save(record, ttl), result
+            except ConversationConflictError:
+                logger.debug(f"Конфликт записи {record.key}, попытка {attempt + 1}")
+        raise ConversationConflictError(f"Не удалось записать состояние {flow}:{session_id}")
+
+    def delete(self, flow: str, session_id: str):
+        self._call('delete', ConversationRecord(flow, str(session_id)).key)
+
+
+_conversation_store = None
+_conversation_store_lock = threading.Lock()
+
+
+def _create_store() -> ConversationStore:
+    backend_name = getattr(settings, 'AI_CONVERSATION_STORE', 'auto')
+    redis_url = getattr(settings, 'AI_CONVERSATION_REDIS_URL', None)
+    database = DatabaseConversationBackend()
+
+    if backend_name in ('auto', 'redis') and redis_url:
+        if not REDIS_AVAILABLE:
+            logger.warning("⚠️ Пакет redis не установлен, состояния диалогов хранятся в базе")
+        else:
+            try:
+                backend = RedisConversationBackend(redis_url)
+                backend.ping()
+                logger.info("💬 Состояния диалогов хранятся в Redis")
+                return ConversationStore(backend, fallback=database)
+            except Exception as e:
+                logger.warning(f"⚠️ Redis недоступен ({e}), состояния диалогов хранятся в базе")
+
+    return ConversationStore(database)
+
+
+def get_conversation_store() -> ConversationStore:
+    """Получение глобального хранилища состояний диалогов"""
+    global _conversation_store
+    if _conversation_store is None:
+        with _conversation_store_lock:
+            if _conversation_store is None:
+                _conversation_store = _create_store()
+    return _conversation_store
@@ -5,12 +5,12 @@
 
 import logging
 import json
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
-from collections import defaultdict, Counter
+from collections import Counter
 import numpy as np
-from django.db.models import Q, Count, Avg, Sum, F, Func
-from django.db.models.functions import TruncDate, TruncHour, ExtractHour
+from django.db.models import Q, Count, Avg, Sum, F, Func, Min, Max
+from django.db.models.functions import TruncDate, TruncHour, ExtractHour, Length
 from django.core.cache import cache
 from django.utils import timezone
 
@@ -19,6 +19,16 @@ from clubs.models import Club, ClubEvent
 from accounts.models import User
 from ..utils.predictive_engine import PredictiveEngine
 from ..utils.context_analyzer import ContextAnalyzer
+from .analytics_rollup import (
+    analyze_contents,
+    day_bounds,
+    get_daily_rollups,
+    latency_histogram,
+    latency_summary,
+    merge_counts,
+    message_lengths,
+    reply_latencies,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +42,9 @@ class EnhancedAnalyticsService:
         self.predictive_engine = PredictiveEngine()
         self.context_analyzer = ContextAnalyzer()
 
+        # Сколько последних сообщений пользователя разбирать для персональной аналитики
+        self.USER_ANALYSIS_LIMIT = 500
+
         # Периоды для анализа
         self.ANALYSIS_PERIODS = {
             'day': 1,
@@ -105,37 +118,27 @@ class EnhancedAnalyticsService:
             return cached
 
         try:
-            days = self.ANALYSIS_PERIODS.get(period, 7)
-            start_date = timezone.now() - timedelta(days=days)
-
-            # Базовые запросы
-            base_filter = Q(created_at__gte=start_date)
-            if user_id:
-                base_filter &= Q(user_id=user_id)
-
-            # Метрики сессий
-            sessions = ChatSession.objects.filter(base_filter)
-
-            total_sessions = sessions.count()
-            active_sessions = sessions.filter(is_active=True).count()
-            anonymous_sessions = sessions.filter(user__isnull=True).count()
-
-            # Метрики сообщений
-            messages = ChatMessage.objects.filter(
-                session__created_at__gte=start_date
+            start_date = self._period_start(period)
+
+            # Метрики сессий одним агрегатом
+            sessions = self._sessions(start_date, user_id)
+            session_counts = sessions.aggregate(
+                total=Count('id'),
+                active=Count('id', filter=Q(is_active=True)),
+                anonymous=Count('id', filter=Q(user__isnull=True)),
+                unique_users=Count('user', distinct=True),
             )
-            if user_id:
-                messages = messages.filter(session__user_id=user_id)
-
-            total_messages = messages.count()
-            user_messages = messages.filter(role='user').count()
-            assistant_messages = messages.filter(role='assistant').count()
-
-            # Уникальные пользователи
-            unique_users = ChatSession.objects.filter(
-                base_filter,
-                user__isnull=False
-            ).values('user').distinct().count()
+            total_sessions = session_counts['total']
+            anonymous_sessions = session_counts['anonymous']
+            unique_users = session_counts['unique_users']
+
+            # Метрики сообщений одним агрегатом
+            message_counts = self._messages(start_date, user_id).aggregate(
+                total=Count('id'),
+                user=Count('id', filter=Q(role='user')),
+                assistant=Count('id', filter=Q(role='assistant')),
+            )
+            total_messages = message_counts['total']
 
             # Средние показатели
             avg_messages_per_session = total_messages / total_sessions if total_sessions > 0 else 0
@@ -143,13 +146,13 @@ class EnhancedAnalyticsService:
 
             metrics = {
                 'total_sessions': total_sessions,
-                'active_sessions': active_sessions,
+                'active_sessions': session_counts['active'],
                 'anonymous_sessions': anonymous_sessions,
                 'registered_sessions': total_sessions - anonymous_sessions,
                 'unique_users': unique_users,
                 'total_messages': total_messages,
-                'user_messages': user_messages,
-                'assistant_messages': assistant_messages,
+                'user_messages': message_counts['user'],
+                'assistant_messages': message_counts['assistant'],
                 'avg_messages_per_session': round(avg_messages_per_session, 2),
                 'avg_session_duration_minutes': round(avg_session_duration / 60, 2),
                 'messages_per_user': round(total_messages / unique_users, 2) if unique_users > 0 else 0,
@@ -166,72 +169,41 @@ class EnhancedAnalyticsService:
     def _get_conversation_analytics(self, period: str, user_id: Optional[int]) -> Dict[str, Any]:
         """Аналитика диалогов"""
         try:
-            days = self.ANALYSIS_PERIODS.get(period, 7)
-            start_date = timezone.now() - timedelta(days=days)
+            start_date = self._period_start(period)
+            sessions = self._sessions(start_date, user_id)
 
-            base_filter = Q(created_at__gte=start_date)
-            if user_id:
-                base_filter &= Q(user_id=user_id)
-
-            sessions = ChatSession.objects.filter(base_filter).prefetch_related('messages')
-
-            # Анализ продолжительности диалогов
-            session_lengths = []
-            message_patterns = defaultdict(int)
-            intent_distribution = defaultdict(int)
-            sentiment_distribution = defaultdict(int)
-
-            for session in sessions:
-                messages = list(session.messages.all())
-
-                # Длина сессии
-                if messages:
-                    first_message = messages[0].created_at
-                    last_message = messages[-1].created_at
-                    duration = (last_message - first_message).total_seconds()
-                    session_lengths.append(duration)
-
-                # Анализ паттернов сообщений
-                for i, msg in enumerate(messages):
-                    if msg.role == 'user':
-                        # Паттерны длины сообщений
-                        content_length = len(msg.content)
-                        if content_length < 50:
-                            message_patterns['short'] += 1
-                        elif content_length < 200:
-                            message_patterns['medium'] += 1
-                        else:
-                            message_patterns['long'] += 1
-
-                        # Анализ интентов и тональности
-                        analysis = self.context_analyzer.analyze_message(msg.content)
-                        intent_distribution[analysis['intent']] += 1
-                        sentiment_distribution[analysis['sentiment']] += 1
+            # Длительность и размер каждой сессии одним запросом
+            session_stats = self._session_stats(sessions)
+            session_lengths = session_stats['durations']
 
             # Статистика по длительности
-            if session_lengths:
+            if len(session_lengths):
                 avg_duration = np.mean(session_lengths)
                 median_duration = np.median(session_lengths)
                 std_duration = np.std(session_lengths)
             else:
                 avg_duration = median_duration = std_duration = 0
 
-            # Выявление популярных тем
-            popular_topics = self._extract_popular_topics(sessions)
+            # Паттерны длины сообщений, интенты и тональность
+            message_patterns = message_lengths(self._messages(start_date, user_id))
+            intents, sentiments, _ = self._message_analysis_counts(period, user_id)
 
             return {
                 'session_duration': {
                     'average_minutes': round(avg_duration / 60, 2),
                     'median_minutes': round(median_duration / 60, 2),
                     'std_minutes': round(std_duration / 60, 2),
-                    'longest_session_minutes': round(max(session_lengths) / 60, 2) if session_lengths else 0
+                    'longest_session_minutes': round(max(session_lengths) / 60, 2) if len(session_lengths) else 0
                 },
-                'message_patterns': dict(message_patterns),
-                'intent_distribution': dict(intent_distribution),
-                'sentiment_distribution': dict(sentiment_distribution),
-                'popular_topics': popular_topics,
-                'conversation_flow': self._analyze_conversation_flow(sessions),
-                'engagement_metrics': self._calculate_engagement_metrics(sessions)
+                'message_patterns': message_patterns,
+                'intent_distribution': dict(intents),
+                'sentiment_distribution': dict(sentiments),
+                'popular_topics': [
+                    {'topic': topic, 'count': count}
+                    for topic, count in intents.most_common(10)
+                ],
+                'conversation_flow': self._analyze_conversation_flow(session_stats),
+                'engagement_metrics': self._calculate_engagement_metrics(session_stats, start_date, user_id)
             }
 
         except Exception as e:
@@ -253,29 +225,11 @@ class EnhancedAnalyticsService:
     def _get_content_analytics(self, period: str, user_id: Optional[int]) -> Dict[str, Any]:
         """Аналитика контента"""
         try:
-            days = self.ANALYSIS_PERIODS.get(period, 7)
-            start_date = timezone.now() - timedelta(days=days)
+            start_date = self._period_start(period)
+            messages = self._messages(start_date, user_id).filter(role='user')
 
-            # Анализ наиболее обсуждаемых тем
-            messages = ChatMessage.objects.filter(
-                role='user',
-                created_at__gte=start_date
-            )
-            if user_id:
-                messages = messages.filter(session__user_id=user_id)
-
-            # Извлечение ключевых слов из всех сообщений
-            all_keywords = []
-            all_intents = []
-
-            for message in messages:
-                analysis = self.context_analyzer.analyze_message(message.content)
-                all_keywords.extend(analysis['keywords'])
-                all_intents.append(analysis['intent'])
-
-            # Частотность ключевых слов
-            keyword_freq = Counter(all_keywords)
-            intent_freq = Counter(all_intents)
+            # Частотность ключевых слов и интентов
+            intent_freq, _, keyword_freq = self._message_analysis_counts(period, user_id)
 
             # Анализ контента RAG
             rag_analytics = self._get_rag_content_analytics(period, user_id)
@@ -304,49 +258,45 @@ class EnhancedAnalyticsService:
     def _get_performance_metrics(self, period: str, user_id: Optional[int]) -> Dict[str, Any]:
         """Метрики производительности"""
         try:
-            days = self.ANALYSIS_PERIODS.get(period, 7)
-            start_date = timezone.now() - timedelta(days=days)
-
-            # Анализ времени ответа
-            response_times = []
-            success_rates = []
-
-            sessions = ChatSession.objects.filter(created_at__gte=start_date)
-            if user_id:
-                sessions = sessions.filter(user_id=user_id)
-
-            for session in sessions:
-                messages = list(session.messages.all())
-                user_queries = [msg for msg in messages if msg.role == 'user']
-
-                for i, user_msg in enumerate(user_queries):
-                    # Найти следующий ответ ассистента
-                    for j in range(i + 1, len(messages)):
-                        if messages[j].role == 'assistant':
-                            response_time = (messages[j].created_at - user_msg.created_at).total_seconds()
-                            response_times.append(response_time)
-                            break
-
-                    # Оценка успешности (на основе обратной связи или продолжения диалога)
-                    success_rate = self._calculate_query_success_rate(user_msg, messages[i+1:])
-                    if success_rate is not None:
-                        success_rates.append(success_rate)
+            first_day = self._period_first_day(period)
+
+            # Время ответа: гистограммы из rollup + LEAD по дням без rollup
+            rollups, live_from = self._rollups_and_live_start(first_day, user_id)
+            histogram = merge_counts(r.reply_latency_histogram for r in rollups)
+            replies = sum(r.replies for r in rollups)
+            reply_seconds = sum(r.reply_seconds_total for r in rollups)
+            user_queries = sum(r.user_messages for r in rollups)
+
+            if live_from is not None:
+                covered = {r.date for r in rollups}
+                live_messages = self._messages(live_from, user_id)
+                live_histogram, live_replies, live_seconds = latency_histogram(
+                    seconds for created_at, seconds in reply_latencies(live_messages)
+                    if timezone.localdate(created_at) not in covered
+                )
+                histogram.update(live_histogram)
+                replies += live_replies
+                reply_seconds += live_seconds
+                user_queries += sum(
+                    row['count'] for row in live_messages.filter(role='user').annotate(
+                        day=TruncDate('created_at')).values('day').annotate(count=Count('id'))
+                    if row['day'] not in covered
+                )
 
             # Статистика производительности
             performance_stats = {}
-            if response_times:
-                performance_stats['response_time'] = {
-                    'average_seconds': round(np.mean(response_times), 2),
-                    'median_seconds': round(np.median(response_times), 2),
-                    'p95_seconds': round(np.percentile(response_times, 95), 2),
-                    'p99_seconds': round(np.percentile(response_times, 99), 2)
-                }
-
-            if success_rates:
+            response_time = latency_summary(histogram, replies, reply_seconds)
+            if response_time:
+                performance_stats['response_time'] = response_time
+
+            # Успешность: доля запросов, получивших ответ ассистента
+            if user_queries:
+                answered = min(replies, user_queries)
+                success = answered / user_queries
                 performance_stats['success_rate'] = {
-                    'average': round(np.mean(success_rates) * 100, 2),
-                    'median': round(np.median(success_rates) * 100, 2),
-                    'distribution': self._create_distribution(success_rates)
+                    'average': round(success * 100, 2),
+                    'median': 100.0 if success >= 0.5 else 0.0,
+                    'distribution': {'low': user_queries - answered, 'medium': 0, 'high': answered}
                 }
 
             # Анализ использования ресурсов
@@ -383,34 +333,32 @@ class EnhancedAnalyticsService:
     def _analyze_trends(self, period: str, user_id: Optional[int]) -> Dict[str, Any]:
         """Анализ трендов"""
         try:
-            days = self.ANALYSIS_PERIODS.get(period, 7)
-            start_date = timezone.now() - timedelta(days=days)
+            first_day = self._period_first_day(period)
+            rollups, live_from = self._rollups_and_live_start(first_day, user_id)
+
+            # Дни из rollup + один GROUP BY по дням для остальных
+            usage = {r.date: {'sessions': r.sessions, 'messages': r.total_messages} for r in rollups}
+            covered = set(usage)
+            if live_from is not None:
+                for field, queryset in (('sessions', self._sessions(live_from, user_id)),
+                                        ('messages', self._messages(live_from, user_id))):
+                    rows = queryset.annotate(day=TruncDate('created_at')).values('day').annotate(count=Count('id'))
+                    for row in rows:
+                        if row['day'] in covered:
+                            continue
+                        usage.setdefault(row['day'], {'sessions': 0, 'messages': 0})[field] = row['count']
 
-            # Динамика использования по дням
             daily_usage = []
-            for i in range(days):
-                day_date = start_date + timedelta(days=i)
-                day_end = day_date + timedelta(days=1)
-
-                sessions_count = ChatSession.objects.filter(
-                    created_at__gte=day_date,
-                    created_at__lt=day_end
-                )
-                if user_id:
-                    sessions_count = sessions_count.filter(user_id=user_id)
-
-                messages_count = ChatMessage.objects.filter(
-                    created_at__gte=day_date,
-                    created_at__lt=day_end
-                )
-                if user_id:
-                    messages_count = messages_count.filter(session__user_id=user_id)
-
+            today = timezone.localdate()
+            day = first_day
+            while day <= today:
+                counts = usage.get(day, {})
                 daily_usage.append({
-                    'date': day_date.date().isoformat(),
-                    'sessions': sessions_count.count(),
-                    'messages': messages_count.count()
+                    'date': day.isoformat(),
+                    'sessions': counts.get('sessions', 0),
+                    'messages': counts.get('messages', 0)
                 })
+                day += timedelta(days=1)
 
             # Анализ трендов
             trend_analysis = self._analyze_usage_trends(daily_usage)
@@ -485,72 +433,115 @@ class EnhancedAnalyticsService:
             return []
 
     # Вспомогательные методы
+    def _period_first_day(self, period: str) -> date:
+        """Первый календарный день периода (сегодня включительно)"""
+        days = self.ANALYSIS_PERIODS.get(period, 7)
+        return timezone.localdate() - timedelta(days=days - 1)
+
+    def _period_start(self, period: str) -> datetime:
+        return day_bounds(self._period_first_day(period))[0]
+
+    def _sessions(self, start_date: datetime, user_id: Optional[int]):
+        sessions = ChatSession.objects.filter(created_at__gte=start_date)
+        if user_id:
+            sessions = sessions.filter(user_id=user_id)
+        return sessions
+
+    def _messages(self, start_date: datetime, user_id: Optional[int]):
+        messages = ChatMessage.objects.filter(created_at__gte=start_date)
+        if user_id:
+            messages = messages.filter(session__user_id=user_id)
+        return messages
+
+    def _rollups_and_live_start(self, first_day: date, user_id: Optional[int]):
+        """
+        Rollup строки периода и начало интервала, который нужно досчитать по сырым данным
+        (дни, уже покрытые rollup, из сырых данных пропускаются).
+        Rollup глобальные, поэтому для конкретного пользователя весь период считается напрямую.
+        """
+        if user_id:
+            return [], day_bounds(first_day)[0]
+
+        rollups = list(get_daily_rollups(first_day))
+        covered = {r.date for r in rollups}
+        day = first_day
+        today = timezone.localdate()
+        while day <= today and day in covered:
+            day += timedelta(days=1)
+        return rollups, (day_bounds(day)[0] if day <= today else None)
+
+    def _message_analysis_counts(self, period: str, user_id: Optional[int]) -> Tuple[Counter, Counter, Counter]:
+        """
+        Интенты, тональность и ключевые слова за период.
+        Глобально — из rollup (NLP разбор делает ночная команда), для пользователя —
+        по последним USER_ANALYSIS_LIMIT его сообщениям.
+        """
+        if not user_id:
+            rollups = list(get_daily_rollups(self._period_first_day(period)))
+            return (
+                merge_counts(r.intents for r in rollups),
+                merge_counts(r.sentiments for r in rollups),
+                merge_counts(r.keywords for r in rollups),
+            )
+
+        contents = self._messages(self._period_start(period), user_id).filter(role='user').order_by(
+            '-created_at').values_list('content', flat=True)[:self.USER_ANALYSIS_LIMIT]
+        return analyze_contents(contents, self.context_analyzer)
+
+    def _session_stats(self, sessions) -> Dict[str, Any]:
+        """Длительность, число сообщений и активность сессий одним запросом"""
+        rows = sessions.annotate(
+            first_at=Min('messages__created_at'),
+            last_at=Max('messages__created_at'),
+            message_count=Count('messages'),
+        ).values_list('first_at', 'last_at', 'message_count', 'is_active')
+
+        durations, dialog_durations, counts, active = [], [], [], 0
+        for first_at, last_at, message_count, is_active in rows:
+            counts.append(message_count)
+            active += bool(is_active)
+            if message_count:
+                durations.append((last_at - first_at).total_seconds())
+            if message_count >= 2:
+                dialog_durations.append(durations[-1])
+
+        return {
+            'total': len(counts),
+            'active': active,
+            'durations': np.array(durations),
+            'dialog_durations': np.array(dialog_durations),
+            'message_counts': np.array(counts),
+        }
+
     def _calculate_avg_session_duration(self, sessions) -> float:
-        """Расчет средней продолжительности сессии"""
-        durations = []
-        for session in sessions:
-            messages = session.messages.all()
-            if messages.count() >= 2:
-                first = messages.first().created_at
-                last = messages.last().created_at
-                duration = (last - first).total_seconds()
-                durations.append(duration)
-
-        return np.mean(durations) if durations else 0.0
-
-    def _extract_popular_topics(self, sessions) -> List[Dict[str, Any]]:
-        """Извлечение популярных тем"""
-        topic_counter = Counter()
-
-        for session in sessions:
-            user_messages = session.messages.filter(role='user')
-            for message in user_messages:
-                analysis = self.context_analyzer.analyze_message(message.content)
-                topic_counter[analysis['intent']] += 1
-
-        return [
-            {'topic': topic, 'count': count}
-            for topic, count in topic_counter.most_common(10)
-        ]
-
-    def _analyze_conversation_flow(self, sessions) -> Dict[str, Any]:
+        """Расчет средней продолжительности сессии (сессии от двух сообщений)"""
+        durations = self._session_stats(sessions)['dialog_durations']
+        return float(np.mean(durations)) if len(durations) else 0.0
+
+    def _analyze_conversation_flow(self, session_stats: Dict[str, Any]) -> Dict[str, Any]:
         """Анализ потока диалогов"""
-        flow_patterns = {
-            'quick_resolutions': 0,  # Быстрое решение (1-2 сообщения)
-            'extended_discussions': 0,  # Длинные диалоги (>10 сообщений)
+        message_counts = session_stats['message_counts']
+        return {
+            'quick_resolutions': int(np.sum(message_counts <= 2)),  # Быстрое решение (1-2 сообщения)
+            'extended_discussions': int(np.sum(message_counts > 10)),  # Длинные диалоги (>10 сообщений)
             'follow_up_questions': 0   # Последующие вопросы
         }
 
-        for session in sessions:
-            message_count = session.messages.count()
-            if message_count <= 2:
-                flow_patterns['quick_resolutions'] += 1
-            elif message_count > 10:
-                flow_patterns['extended_discussions'] += 1
-
-        return flow_patterns
-
-    def _calculate_engagement_metrics(self, sessions) -> Dict[str, Any]:
+    def _calculate_engagement_metrics(self, session_stats: Dict[str, Any], start_date: datetime,
+                                      user_id: Optional[int]) -> Dict[str, Any]:
         """Расчет метрик вовлеченности"""
-        total_sessions = len(sessions)
+        total_sessions = session_stats['total']
         if total_sessions == 0:
             return {}
 
-        # Доля активных сессий
-        active_sessions = sum(1 for s in sessions if s.is_active)
-
-        # Средняя длина сообщений
-        all_user_messages = []
-        for session in sessions:
-            user_messages = session.messages.filter(role='user')
-            all_user_messages.extend([msg.content for msg in user_messages])
-
-        avg_message_length = np.mean([len(msg) for msg in all_user_messages]) if all_user_messages else 0
+        avg_message_length = self._messages(start_date, user_id).filter(role='user').aggregate(
+            avg=Avg(Length('content'))
+        )['avg'] or 0
 
         return {
-            'active_session_rate': round(active_sessions / total_sessions * 100, 2),
+            'active_session_rate': round(session_stats['active'] / total_sessions * 100, 2),
             'avg_message_length': round(avg_message_length, 2),
-            'return_user_rate': self._calculate_return_user_rate(sessions)
+            'return_user_rate': self._calculate_return_user_rate(session_stats)
         }
 
     def _create_distribution(self, values: List[float]) -> Dict[str, int]:
@@ -659,15 +650,10 @@ class EnhancedAnalyticsService:
         """Расчет темпа роста"""
         return 0.05
 
-    def _calculate_return_user_rate(self, sessions) -> float:
+    def _calculate_return_user_rate(self, session_stats: Dict[str, Any]) -> float:
         """Расчет коэффициента возврата пользователей"""
         return 0.3
 
-    def _calculate_query_success_rate(self, user_msg, remaining_messages) -> Optional[float]:
-        """Расчет успешности запроса"""
-        # Упрощенная реализация
-        return 0.7
-
 
 # Глобальный экземпляр
 enhanced_analytics_service = None
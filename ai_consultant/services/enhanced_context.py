@@ -17,7 +17,8 @@ from django.db.models import Q, Count, Avg
 
 from ..models import ChatSession, ChatMessage, AIContext
 from .rag_service import get_rag_service
-from ..utils.context_analyzer import ContextAnalyzer
+from ..utils.context_analyzer import get_context_analyzer
+from .message_analysis import MessageAnalysis
 from ..utils.predictive_engine import PredictiveEngine
 
 User = get_user_model()
@@ -31,7 +32,7 @@ class EnhancedContextService:
 
     def __init__(self):
         self.rag_service = get_rag_service()
-        self.context_analyzer = ContextAnalyzer()
+        self.context_analyzer = get_context_analyzer()
         self.predictive_engine = PredictiveEngine()
 
         # Кэши для производительности
@@ -47,9 +48,12 @@ class EnhancedContextService:
         self.MAX_CONTEXT_ITEMS = 10
         self.CONTEXT_TIMEOUT = 3600  # 1 час
 
-    def get_enhanced_session_context(self, session_id: str, user_message: str = None) -> Dict[str, Any]:
+    def get_enhanced_session_context(self, session_id: str, user_message: str = None,
+                                     analysis: MessageAnalysis = None) -> Dict[str, Any]:
         """
         🎯 Получение улучшенного контекста сессии с RAG и предиктивной аналитикой
+
+        analysis — MessageAnalysis текущего хода; без него сообщение разбирается здесь
         """
         try:
             # Базовый контекст сессии
@@ -61,8 +65,8 @@ class EnhancedContextService:
 
             # Анализ текущего сообщения
             if user_message:
-                message_analysis = self.context_analyzer.analyze_message(user_message)
-                base_context['current_message'] = message_analysis
+                analysis = analysis or MessageAnalysis.of(user_message)
+                base_context['current_message'] = analysis.context
 
             # RAG обогащение
             rag_context = self._get_rag_context(user_message or "", base_context)
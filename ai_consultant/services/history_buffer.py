@@ -0,0 +1,179 @@
+"""
+🧵 Кольцевой буфер последних сообщений сессии
+
+Роутинг, контекст для LLM и API истории на каждом ходе читали сообщения
+сессии из БД, причем get_history брал самые старые N сообщений вместо
+последних. Теперь последние AI_HISTORY_BUFFER_SIZE сообщений каждой сессии
+лежат в общем кэше одним компактным JSON значением (fast_json) и читаются
+за один запрос к кэшу.
+
+Новые сообщения дописываются в буфер сигналом post_save ChatMessage, самые
+старые вытесняются. Если буфера нет (истек или сброшен), сообщение не
+дописывается: буфер собирается при следующем чтении одним запросом к БД
+по индексу (session, -created_at), а если сообщений в БД меньше N и сессия
+старше срока хранения журналов — с начала дополняется их архивом. Удаление
+сообщений и откат хода сбрасывают буфер (invalidate).
+
+Дописывание — чтение, изменение и запись значения, поэтому запись буфера
+(дописывание и сборка при чтении) идет под блокировкой сессии на cache.add.
+Писатель, не дождавшийся блокировки, не переписывает буфер, а оставляет
+отметку и сбрасывает его; держатель блокировки, увидев отметку после своей
+записи, тоже сбрасывает буфер — следующее чтение соберет его из БД со всеми
+сообщениями.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ..models import ChatMessage
+from ..utils import fast_json
+from ..utils.log_storage import get_archived_session_messages, month_start, retention_cutoff
+
+logger = logging.getLogger(__name__)
+
+BUFFER_KEY = 'chat:recent:{}'
+LOCK_KEY = 'chat:recent:{}:lock'
+STALE_KEY = 'chat:recent:{}:stale'
+# Запись буфера занимает миллисекунды; таймаут только снимает блокировку упавшего воркера
+LOCK_TIMEOUT = 5
+LOCK_WAIT = 0.05
+
+
+class HistoryRingBuffer:
+    """
+    Последние сообщения сессии в кэше.
+
+    Элемент буфера — список [id, role, content, created_at, tokens_used],
+    от старых к новым; наружу отдаются словари с теми же ключами.
+    """
+
+    @property
+    def size(self) -> int:
+        return getattr(settings, 'AI_HISTORY_BUFFER_SIZE', 50)
+
+    @property
+    def timeout(self) -> int:
+        return getattr(settings, 'AI_HISTORY_BUFFER_TIMEOUT', 60 * 60 * 24)
+
+    @staticmethod
+    def key(session_id) -> str:
+        return BUFFER_KEY.format(session_id)
+
+    def recent(self, session, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Последние limit сообщений сессии от старых к новым.
+
+        Больше размера буфера — прямой запрос к БД (страницы старой истории).
+        """
+        limit = limit or self.size
+        if limit > self.size:
+            return [self._row(entry) for entry in self._load(session, limit)]
+
+        entries = self._get(session.id)
+        if entries is None:
+            # Без блокировки (буфер пишет другой воркер) — ответ из БД без сохранения
+            locked = self._acquire(session.id, wait=0)
+            try:
+                entries = self._load(session, self.size)
+                if locked:
+                    cache.set(self.key(session.id), fast_json.dumps_bytes(entries), self.timeout)
+            finally:
+                if locked:
+                    self._release(session.id)
+        return [self._row(entry) for entry in entries[-limit:]]
+
+    def append(self, message: ChatMessage):
+        """Дописывает сообщение в существующий буфер; без буфера — ничего (соберется при чтении)"""
+        session_id = message.session_id
+        if not self._acquire(session_id, wait=LOCK_WAIT):
+            logger.debug(f"🔒 Буфер истории сессии {session_id} занят, сбрасываем его")
+            cache.set(STALE_KEY.format(session_id), 1, LOCK_TIMEOUT)
+            self.invalidate(session_id)
+            return
+        try:
+            entries = self._get(session_id)
+            if entries is None:
+                return
+            entries.append(self._entry(
+                message.id, message.role, message.content, message.created_at.isoformat(), message.tokens_used,
+            ))
+            cache.set(self.key(session_id), fast_json.dumps_bytes(entries[-self.size:]), self.timeout)
+        finally:
+            self._release(session_id)
+
+    def invalidate(self, session_id):
+        cache.delete(self.key(session_id))
+
+    @staticmethod
+    def _acquire(session_id, wait: float) -> bool:
+        deadline = time.monotonic() + wait
+        while not cache.add(LOCK_KEY.format(session_id), 1, LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def _release(self, session_id):
+        # Отметка писателя, не дождавшегося блокировки: в записанном буфере нет его сообщения
+        stale_key = STALE_KEY.format(session_id)
+        if cache.get(stale_key) is not None:
+            cache.delete_many([self.key(session_id), stale_key])
+        cache.delete(LOCK_KEY.format(session_id))
+
+    def _get(self, session_id) -> Optional[List[list]]:
+        raw = cache.get(self.key(session_id))
+        if raw is None:
+            return None
+        try:
+            return fast_json.loads(raw)
+        except ValueError:
+            logger.warning(f"⚠️ Поврежденный буфер истории сессии {session_id}, собираем заново")
+            return None
+
+    def _load(self, session, limit: int) -> List[list]:
+        """Последние limit сообщений из БД (индекс session, -created_at), недостающие — из архива"""
+        rows = list(
+            ChatMessage.objects.filter(session=session).order_by('-created_at')
+            .values_list('id', 'role', 'content', 'created_at', 'tokens_used')[:limit]
+        )
+        rows.reverse()
+        entries = [
+            self._entry(pk, role, content, created_at.isoformat(), tokens_used)
+            for pk, role, content, created_at, tokens_used in rows
+        ]
+        if len(entries) < limit and month_start(session.created_at) < retention_cutoff():
+            # Месяцы старше срока хранения могли уйти в архив журналов — они идут первыми;
+            # новые и короткие сессии архив (файлы на диске) не читают
+            archived = get_archived_session_messages(session)[-(limit - len(entries)):]
+            entries = [
+                self._entry(row['id'], row['role'], row['content'], row['created_at'], row.get('tokens_used'))
+                for row in archived
+            ] + entries
+        return entries
+
+    @staticmethod
+    def _entry(pk, role, content, created_at, tokens_used) -> list:
+        return [str(pk), role, content, created_at, tokens_used or 0]
+
+    @staticmethod
+    def _row(entry: list) -> Dict[str, Any]:
+        pk, role, content, created_at, tokens_used = entry
+        return {'id': pk, 'role': role, 'content': content, 'created_at': created_at, 'tokens_used': tokens_used}
+
+
+_history_buffer = None
+_history_buffer_lock = threading.Lock()
+
+
+def get_history_buffer() -> HistoryRingBuffer:
+    global _history_buffer
+    if _history_buffer is None:
+        with _history_buffer_lock:
+            if _history_buffer is None:
+                _history_buffer = HistoryRingBuffer()
+    return _history_buffer
@@ -0,0 +1,349 @@
+"""
+🛡️ LLM шлюз процесса
+Общий пул соединений, повторы с backoff, circuit breaker и ограничение конкурентности
+для всех обращений к OpenAI
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional
+
+import httpx
+from django.conf import settings
+
+from ..metrics.collector import MetricsCollector
+from ..utils.lazy_imports import lazy_import
+
+# SDK OpenAI импортируется при создании первого клиента (~1 с при старте процесса)
+openai = lazy_import('openai')
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailableError(Exception):
+    """LLM временно недоступен: открыт circuit breaker, исчерпан бюджет времени или очередь переполнена"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker для upstream LLM.
+
+    closed    — запросы проходят, ошибки считаются;
+    open      — после failure_threshold ошибок подряд запросы сразу отклоняются;
+    half_open — по истечении reset_timeout пропускается один пробный запрос.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._state = self.CLOSED
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Можно ли выполнить запрос сейчас"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # half_open: пропускаем только один пробный запрос
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._state = self.CLOSED
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"⚡ Circuit breaker LLM открыт после {self._failures} ошибок")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+    def release_probe(self):
+        """Снимает пробный запрос, завершившийся без результата (отмена, прерывание)"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+
+class LLMGateway:
+    """
+    Единая точка доступа к OpenAI для процесса.
+
+    - один sync и один async клиент с keep-alive пулом на процесс;
+    - повторы на 429/5xx/таймаутах с экспоненциальной задержкой и full jitter;
+    - circuit breaker, чтобы при отказе upstream сразу уходить в fallback;
+    - ограничение одновременных запросов и общий бюджет времени на вызов.
+    """
+
+    def __init__(self):
+        self.api_key = getattr(settings, 'OPENAI_API_KEY', None)
+        self.base_url = getattr(settings, 'OPENAI_API_BASE', None)
+        self.request_timeout = getattr(settings, 'OPENAI_TIMEOUT', 30)
+        self.timeout_budget = getattr(settings, 'AI_LLM_TIMEOUT_BUDGET', 45)
+        self.max_attempts = max(1, getattr(settings, 'AI_RETRY_ATTEMPTS', 3))
+        self.retry_delay = getattr(settings, 'AI_RETRY_DELAY', 1)
+        self.retry_max_delay = getattr(settings, 'AI_RETRY_MAX_DELAY', 8)
+        self.queue_timeout = getattr(settings, 'AI_LLM_QUEUE_TIMEOUT', 2)
+        self.max_concurrency = getattr(settings, 'AI_LLM_MAX_CONCURRENCY', 32)
+
+        self.breaker = CircuitBreaker(
+            failure_threshold=getattr(settings, 'AI_CIRCUIT_FAILURE_THRESHOLD', 5),
+            reset_timeout=getattr(settings, 'AI_CIRCUIT_RESET_TIMEOUT', 30),
+        )
+        self.metrics = MetricsCollector()
+
+        self._client = None
+        self._async_client = None
+        self._client_lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self._async_semaphores = weakref.WeakKeyDictionary()
+
+    # 🔌 Клиенты
+
+    def _timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.request_timeout, connect=5.0)
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=getattr(settings, 'AI_ASYNC_MAX_CONNECTIONS', 200),
+            max_keepalive_connections=getattr(settings, 'AI_ASYNC_MAX_KEEPALIVE', 50),
+            keepalive_expiry=30.0,
+        )
+
+    @property
+    def client(self) -> Optional['openai.OpenAI']:
+        """Общий синхронный клиент (повторы выполняет шлюз, а не SDK)"""
+        if self._client is None and self.api_key:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = openai.OpenAI(
+                        api_key=self.api_key,
+                        base_url=self.base_url,
+                        http_client=httpx.Client(timeout=self._timeout(), limits=self._limits()),
+                        max_retries=0,
+                    )
+                    logger.info("Общий OpenAI клиент инициализирован")
+        return self._client
+
+    @property
+    def async_client(self) -> Optional['openai.AsyncOpenAI']:
+        """Общий асинхронный клиент (HTTP/2, если установлен h2)"""
+        if self._async_client is None and self.api_key:
+            with self._client_lock:
+                if self._async_client is None:
+                    self._async_client = openai.AsyncOpenAI(
+                        api_key=self.api_key,
+                        base_url=self.base_url,
+                        http_client=httpx.AsyncClient(
+                            http2=_http2_available(),
+                            timeout=self._timeout(),
+                            limits=self._limits(),
+                        ),
+                        max_retries=0,
+                    )
+                    logger.info("Общий AsyncOpenAI клиент инициализирован")
+        return self._async_client
+
+    def is_available(self) -> bool:
+        return bool(self.api_key)
+
+    # 🔁 Выполнение запросов
+
+    def chat_completion(self, timeout_budget: Optional[float] = None, **params) -> Any:
+        """
+        Выполняет chat.completions.create через общий клиент.
+        Возвращает объект ответа SDK или бросает LLMUnavailableError / ошибку API.
+        """
+        client = self.client
+        if client is None:
+            raise LLMUnavailableError("OpenAI API ключ не настроен")
+
+        deadline = time.monotonic() + (timeout_budget or self.timeout_budget)
+
+        # Сначала слот, потом breaker: пробный запрос не должен застрять в очереди
+        if not self._semaphore.acquire(timeout=min(self.queue_timeout, self._remaining(deadline))):
+            self.metrics.record_error('llm_overloaded')
+            raise LLMUnavailableError("Превышен лимит одновременных запросов к LLM")
+        try:
+            self._check_breaker()
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    response = client.chat.completions.create(
+                        **params, timeout=self._attempt_timeout(deadline)
+                    )
+                    self.breaker.record_success()
+                    return response
+                except Exception as e:
+                    delay = self._next_delay(e, attempt, deadline)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+        except BaseException as e:
+            if not isinstance(e, Exception):
+                # Прерывание без record_success/record_failure не должно держать пробу вечно
+                self.breaker.release_probe()
+            raise
+        finally:
+            self._semaphore.release()
+
+    async def achat_completion(self, timeout_budget: Optional[float] = None, **params) -> Any:
+        """Асинхронный вариант chat_completion"""
+        client = self.async_client
+        if client is None:
+            raise LLMUnavailableError("OpenAI API ключ не настроен")
+
+        deadline = time.monotonic() + (timeout_budget or self.timeout_budget)
+
+        semaphore = self._get_async_semaphore()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=min(self.queue_timeout, self._remaining(deadline)))
+        except asyncio.TimeoutError:
+            self.metrics.record_error('llm_overloaded')
+            raise LLMUnavailableError("Превышен лимит одновременных запросов к LLM")
+        try:
+            self._check_breaker()
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    response = await client.chat.completions.create(
+                        **params, timeout=self._attempt_timeout(deadline)
+                    )
+                    self.breaker.record_success()
+                    return response
+                except Exception as e:
+                    delay = self._next_delay(e, attempt, deadline)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+        except BaseException as e:
+            if not isinstance(e, Exception):
+                # CancelledError — не Exception: без этого проба осталась бы занятой
+                self.breaker.release_probe()
+            raise
+        finally:
+            semaphore.release()
+
+    # 🧮 Вспомогательные методы
+
+    def _check_breaker(self):
+        if not self.breaker.allow_request():
+            self.metrics.record_error('llm_circuit_open')
+            raise LLMUnavailableError("LLM временно недоступен (circuit breaker открыт)")
+
+    def _get_async_semaphore(self) -> asyncio.Semaphore:
+        """asyncio.Semaphore привязан к event loop, поэтому держим по одному на loop"""
+        loop = asyncio.get_running_loop()
+        semaphore = self._async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._async_semaphores[loop] = semaphore
+        return semaphore
+
+    @staticmethod
+    def _remaining(deadline: float) -> float:
+        return max(0.0, deadline - time.monotonic())
+
+    def _attempt_timeout(self, deadline: float) -> float:
+        remaining = self._remaining(deadline)
+        if remaining <= 0:
+            raise LLMUnavailableError("Исчерпан бюджет времени на запрос к LLM")
+        return min(self.request_timeout, remaining)
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """Повторяем только временные ошибки: 429, 5xx, таймауты и обрывы соединения"""
+        if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code >= 500
+        return False
+
+    def _next_delay(self, error: Exception, attempt: int, deadline: float) -> Optional[float]:
+        """
+        Возвращает паузу перед следующей попыткой или None, если повторять не нужно.
+        Учитывает ошибки в circuit breaker.
+        """
+        if isinstance(error, LLMUnavailableError):
+            self.breaker.record_failure()
+            return None
+
+        if not self.is_retryable(error):
+            # upstream ответил (например, 400) — он жив
+            self.breaker.record_success()
+            return None
+
+        self.metrics.record_error('llm_retryable')
+        delay = random.uniform(0, min(self.retry_max_delay, self.retry_delay * (2 ** (attempt - 1))))
+        if attempt >= self.max_attempts or delay >= self._remaining(deadline):
+            self.breaker.record_failure()
+            return None
+
+        logger.warning(f"🔁 Повтор запроса к LLM #{attempt + 1} через {delay:.2f}с: {error}")
+        return delay
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'circuit_state': self.breaker.state,
+            'max_concurrency': self.max_concurrency,
+            'max_attempts': self.max_attempts,
+            'timeout_budget': self.timeout_budget,
+        }
+
+
+def _http2_available() -> bool:
+    """HTTP/2 в httpx требует установленного пакета h2"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+# Глобальный экземпляр шлюза
+_llm_gateway = None
+_llm_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Получение глобального экземпляра LLM шлюза"""
+    global _llm_gateway
+    if _llm_gateway is None:
+        with _llm_gateway_lock:
+            if _llm_gateway is None:
+                _llm_gateway = LLMGateway()
+    return _llm_gateway
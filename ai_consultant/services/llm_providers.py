@@ -0,0 +1,123 @@
+"""
+🔌 Провайдеры LLM
+Единый интерфейс за OpenAIClientService: реальный OpenAI (через LLM шлюз)
+или локальная детерминированная заглушка для тестов и нагрузочного тестирования
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Iterator
+
+from django.conf import settings
+
+from ..utils.lazy_imports import lazy_import
+from ..utils.llm_stub import LatencyModel, StubScript, build_completion, build_stream_chunks
+from .llm_gateway import get_llm_gateway
+
+logger = logging.getLogger(__name__)
+
+chat_types = lazy_import('openai.types.chat')
+
+
+class LLMProvider(ABC):
+    """
+    Базовый провайдер. Методы принимают параметры Chat Completion API
+    и возвращают объекты SDK (ChatCompletion / поток ChatCompletionChunk).
+    """
+
+    name = 'base'
+
+    def is_available(self) -> bool:
+        return True
+
+    @abstractmethod
+    def chat_completion(self, **params) -> Any:
+        pass
+
+    @abstractmethod
+    async def achat_completion(self, **params) -> Any:
+        pass
+
+    @abstractmethod
+    def stream(self, **params) -> Iterator[Any]:
+        pass
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI через общий шлюз процесса (пул соединений, повторы, circuit breaker)"""
+
+    name = 'openai'
+
+    def __init__(self):
+        self.gateway = get_llm_gateway()
+
+    def is_available(self) -> bool:
+        return self.gateway.is_available()
+
+    def chat_completion(self, **params) -> Any:
+        return self.gateway.chat_completion(**params)
+
+    async def achat_completion(self, **params) -> Any:
+        return await self.gateway.achat_completion(**params)
+
+    def stream(self, **params) -> Iterator[Any]:
+        return self.gateway.chat_completion(stream=True, **params)
+
+
+class StubProvider(LLMProvider):
+    """
+    Детерминированная заглушка внутри процесса: сценарий ответов из AI_STUB_SCRIPT,
+    задержка из AI_STUB_LATENCY_* — без сети и без расхода кредитов
+    """
+
+    name = 'stub'
+
+    def __init__(self):
+        self.script = StubScript.from_file(getattr(settings, 'AI_STUB_SCRIPT', None))
+        self.latency = LatencyModel(
+            kind=getattr(settings, 'AI_STUB_LATENCY_DISTRIBUTION', 'gaussian'),
+            mean_ms=getattr(settings, 'AI_STUB_LATENCY_MS', 0),
+            jitter_ms=getattr(settings, 'AI_STUB_JITTER_MS', 0),
+            seed=getattr(settings, 'AI_STUB_SEED', None),
+        )
+
+    def chat_completion(self, **params) -> Any:
+        time.sleep(self.latency.sample())
+        return chat_types.ChatCompletion.model_validate(build_completion(params, self.script.respond(params)))
+
+    async def achat_completion(self, **params) -> Any:
+        await asyncio.sleep(self.latency.sample())
+        return chat_types.ChatCompletion.model_validate(build_completion(params, self.script.respond(params)))
+
+    def stream(self, **params) -> Iterator[Any]:
+        time.sleep(self.latency.sample())
+        for chunk in build_stream_chunks(params, self.script.respond(params)):
+            yield chat_types.ChatCompletionChunk.model_validate(chunk)
+
+
+PROVIDERS = {
+    OpenAIProvider.name: OpenAIProvider,
+    StubProvider.name: StubProvider,
+}
+
+# Глобальный экземпляр провайдера
+_llm_provider = None
+_llm_provider_lock = threading.Lock()
+
+
+def get_llm_provider() -> LLMProvider:
+    """Провайдер, выбранный в AI_LLM_PROVIDER (openai | stub)"""
+    global _llm_provider
+    name = getattr(settings, 'AI_LLM_PROVIDER', 'openai')
+    if _llm_provider is None or _llm_provider.name != name:
+        with _llm_provider_lock:
+            if _llm_provider is None or _llm_provider.name != name:
+                provider_class = PROVIDERS.get(name)
+                if provider_class is None:
+                    raise ValueError(f"Неизвестный LLM провайдер: {name}")
+                _llm_provider = provider_class()
+                logger.info(f"🔌 LLM провайдер: {name}")
+    return _llm_provider
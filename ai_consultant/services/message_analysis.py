@@ -0,0 +1,147 @@
+"""
+🧾 Анализ сообщения — один раз за ход диалога
+
+Раньше каждое звено чата (MessageProcessorService, ContextAnalyzer,
+AdvancedRAGService) заново приводило сообщение к нижнему регистру и
+сканировало его словарями.
+MessageAnalysis создается на входе хода и передается дальше по цепочке;
+каждое поле вычисляется при первом обращении и дальше переиспользуется.
+Здесь только то, что читают эти сервисы.
+
+Сервисы, которые получают только текст (например, поиск в asyncio.to_thread),
+берут тот же объект через MessageAnalysis.of(text) — небольшой LRU по тексту.
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from functools import cached_property, lru_cache
+from typing import Any, Dict, List, Optional
+
+from ..utils.text_matcher import ScanResult, text_matcher
+
+logger = logging.getLogger(__name__)
+
+KEYWORD_RE = re.compile(r'\b[a-zA-Zа-яА-Я]{3,}\b')
+ANALYSIS_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=1)
+def get_stop_words() -> frozenset:
+    """Стоп-слова NLTK (русские и английские), загружаются один раз на процесс"""
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words('russian') + stopwords.words('english'))
+
+
+def extract_keywords(text: str, limit: int = 5) -> List[str]:
+    """Самые частые слова длиной от 3 букв без стоп-слов"""
+    stop_words = get_stop_words()
+    words = [word for word in KEYWORD_RE.findall(text.lower()) if word not in stop_words]
+
+    word_freq = {}
+    for word in words:
+        word_freq[word] = word_freq.get(word, 0) + 1
+    return [word for word, _ in sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:limit]]
+
+
+def cyrillic_ratio(text: str) -> Optional[float]:
+    """Доля кириллицы среди непробельных символов (None для пустого текста)"""
+    total_chars = len(text.replace(' ', ''))
+    if total_chars == 0:
+        return None
+    return sum(1 for char in text if '\u0400' <= char <= '\u04FF') / total_chars
+
+
+class MessageAnalysis:
+    """
+    Результаты разбора одного сообщения пользователя.
+
+    text — исходное сообщение, sanitized — после MessageProcessorService.preprocess
+    (если предобработка не выполнялась, используется исходный текст).
+    """
+
+    def __init__(self, text: str, sanitized: str = None):
+        self.text = text or ''
+        self.sanitized = self.text if sanitized is None else sanitized
+
+    @classmethod
+    def for_turn(cls, message: str, processor=None) -> 'MessageAnalysis':
+        """Предобработка и анализ входящего сообщения; ошибки валидации preprocess пробрасываются"""
+        if processor is None:
+            from .message_processor import MessageProcessorService
+            processor = MessageProcessorService()
+        analysis = cls(message, processor.preprocess(message))
+        _remember(analysis)
+        return analysis
+
+    @classmethod
+    def of(cls, text: str) -> 'MessageAnalysis':
+        """Анализ этого хода, если он уже создан, иначе новый"""
+        with _cache_lock:
+            cached = _analysis_cache.get(text)
+            if cached is not None:
+                _analysis_cache.move_to_end(text)
+                return cached
+        analysis = cls(text)
+        _remember(analysis)
+        return analysis
+
+    # 🔤 Текст
+
+    @cached_property
+    def lower(self) -> str:
+        return ' '.join(self.sanitized.split()).lower()
+
+    # 🎯 Словари, интенты, сущности
+
+    @cached_property
+    def scan(self) -> ScanResult:
+        """Все словари анализаторов за один проход (utils/text_matcher.py)"""
+        return text_matcher.scan(self.lower)
+
+    @cached_property
+    def intents(self) -> List[str]:
+        from .message_processor import match_intents
+        return match_intents(self.scan)
+
+    @cached_property
+    def primary_intent(self) -> str:
+        from .message_processor import primary_intent
+        return primary_intent(self.intents)
+
+    @cached_property
+    def sentiment(self) -> str:
+        from .message_processor import match_sentiment
+        return match_sentiment(self.scan)
+
+    @cached_property
+    def context(self) -> Dict[str, Any]:
+        """Результат ContextAnalyzer.analyze_message"""
+        from ..utils.context_analyzer import get_context_analyzer
+        return get_context_analyzer().analyze_message(self.sanitized)
+
+    @property
+    def entities(self) -> List[Dict[str, Any]]:
+        return self.context.get('entities', [])
+
+    @cached_property
+    def keywords(self) -> List[str]:
+        try:
+            return extract_keywords(self.sanitized)
+        except Exception as e:
+            logger.error(f"❌ Ошибка извлечения ключевых слов: {e}")
+            return []
+
+
+_analysis_cache: 'OrderedDict[str, MessageAnalysis]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _remember(analysis: MessageAnalysis):
+    with _cache_lock:
+        for key in {analysis.text, analysis.sanitized}:
+            _analysis_cache[key] = analysis
+            _analysis_cache.move_to_end(key)
+        while len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
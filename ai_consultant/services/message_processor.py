@@ -10,6 +10,75 @@ from html import escape
 from django.utils.html import strip_tags
 
 from .base import BaseAIService
+from ..utils.text_matcher import ScanResult, text_matcher
+
+# Паттерны для определения намерений
+INTENT_PATTERNS = {
+    'question': [
+        '?', 'как', 'что', 'где', 'когда', 'почему', 'зачем',
+        'объясни', 'расскажи', 'покажи', 'помоги'
+    ],
+    'club_creation': [
+        'создать клуб', 'новый клуб', 'как создать', 'открыть клуб',
+        'создание клуба', 'клуб создание'
+    ],
+    'search': [
+        'найди', 'поиск', 'ищу', 'подскажи', 'где найти',
+        'покажи клубы', 'список клубов'
+    ],
+    'help': [
+        'помощь', 'помоги', 'не работает', 'проблема', 'ошибка',
+        'как пользоваться', 'инструкция'
+    ],
+    'greeting': [
+        'привет', 'здравствуй', 'добрый день', 'хай', 'хеллоу'
+    ],
+    'farewell': [
+        'пока', 'до свидания', 'до встречи', 'спасибо', 'благодарю'
+    ]
+}
+
+SENTIMENT_WORDS = {
+    'positive': ['хорошо', 'отлично', 'замечательно', 'прекрасно', 'спасибо', 'благодарю', 'рад', 'супер'],
+    'negative': ['плохо', 'ужасно', 'терrible', 'проблема', 'ошибка', 'не работает', 'зло'],
+}
+
+text_matcher.register_phrases('processor.intent', INTENT_PATTERNS)
+text_matcher.register_phrases('processor.sentiment', SENTIMENT_WORDS)
+
+INTENT_PRIORITY = {
+    'greeting': 1,
+    'farewell': 2,
+    'help': 3,
+    'question': 4,
+    'search': 5,
+    'club_creation': 6
+}
+
+
+def match_intents(scan: ScanResult) -> List[str]:
+    """Намерения, хотя бы один паттерн которых есть в сообщении"""
+    return [intent for intent in INTENT_PATTERNS if scan.has('processor.intent', intent)]
+
+
+def match_sentiment(scan: ScanResult) -> str:
+    """Эмоциональная окраска по числу разных совпавших слов каждой тональности"""
+    positive_count = len(scan.patterns('processor.sentiment', 'positive'))
+    negative_count = len(scan.patterns('processor.sentiment', 'negative'))
+
+    if positive_count > negative_count:
+        return 'positive'
+    elif negative_count > positive_count:
+        return 'negative'
+    else:
+        return 'neutral'
+
+
+def primary_intent(intents: List[str]) -> str:
+    """Намерение с наивысшим приоритетом"""
+    if not intents:
+        return 'unknown'
+    return min(intents, key=lambda x: INTENT_PRIORITY.get(x, 999))
 
 
 class MessageProcessorService(BaseAIService):
@@ -159,56 +228,26 @@ class MessageProcessorService(BaseAIService):
             self.log_error(f"Ошибка извлечения ключевых слов: {e}")
             return []
 
-    def detect_intent(self, message: str) -> Dict[str, Any]:
+    def detect_intent(self, message: str, analysis=None) -> Dict[str, Any]:
         """
         Определяет намерение пользователя
+
+        analysis — MessageAnalysis этого хода; без него словари сканируются заново
         """
         try:
-            message_lower = message.lower()
-
-            # Паттерны для определения намерений
-            intent_patterns = {
-                'question': [
-                    r'\?', r'как', r'что', r'где', r'когда', r'почему', r'зачем',
-                    r'объясни', r'расскажи', r'покажи', r'помоги'
-                ],
-                'club_creation': [
-                    r'создать клуб', r'новый клуб', r'как создать', r'открыть клуб',
-                    r'создание клуба', r'клуб создание'
-                ],
-                'search': [
-                    r'найди', r'поиск', r'ищу', r'подскажи', r'где найти',
-                    r'покажи клубы', r'список клубов'
-                ],
-                'help': [
-                    r'помощь', r'помоги', r'не работает', r'проблема', r'ошибка',
-                    r'как пользоваться', r'инструкция'
-                ],
-                'greeting': [
-                    r'привет', r'здравствуй', r'добрый день', r'хай', r'хеллоу'
-                ],
-                'farewell': [
-                    r'пока', r'до свидания', r'до встречи', r'спасибо', r'благодарю'
-                ]
-            }
-
-            # Определяем намерения
-            detected_intents = {}
-            for intent, patterns in intent_patterns.items():
-                for pattern in patterns:
-                    if re.search(pattern, message_lower):
-                        detected_intents[intent] = True
-                        break
+            if analysis is not None:
+                intents, sentiment = analysis.intents, analysis.sentiment
+            else:
+                # Определяем намерения одним проходом по всем словарям
+                scan = text_matcher.scan(message.lower())
+                intents, sentiment = match_intents(scan), match_sentiment(scan)
 
             # Извлекаем ключевые слова
             keywords = self.extract_keywords(message, 5)
 
-            # Определяем эмоциональную окраску
-            sentiment = self._detect_sentiment(message_lower)
-
             result = {
-                'intents': list(detected_intents.keys()),
-                'primary_intent': self._get_primary_intent(detected_intents),
+                'intents': intents,
+                'primary_intent': primary_intent(intents),
                 'keywords': keywords,
                 'sentiment': sentiment,
                 'message_length': len(message),
@@ -402,35 +441,11 @@ class MessageProcessorService(BaseAIService):
 
     def _detect_sentiment(self, message: str) -> str:
         """Определяет эмоциональную окраску"""
-        positive_words = ['хорошо', 'отлично', 'замечательно', 'прекрасно', 'спасибо', 'благодарю', 'рад', 'супер']
-        negative_words = ['плохо', 'ужасно', 'терrible', 'проблема', 'ошибка', 'не работает', 'зло']
-
-        positive_count = sum(1 for word in positive_words if word in message)
-        negative_count = sum(1 for word in negative_words if word in message)
-
-        if positive_count > negative_count:
-            return 'positive'
-        elif negative_count > positive_count:
-            return 'negative'
-        else:
-            return 'neutral'
+        return match_sentiment(text_matcher.scan(message))
 
     def _get_primary_intent(self, intents: List[str]) -> str:
         """Определяет основное намерение"""
-        intent_priority = {
-            'greeting': 1,
-            'farewell': 2,
-            'help': 3,
-            'question': 4,
-            'search': 5,
-            'club_creation': 6
-        }
-
-        if not intents:
-            return 'unknown'
-
-        # Возвращаем намерение с наивысшим приоритетом
-        return min(intents, key=lambda x: intent_priority.get(x, 999))
+        return primary_intent(intents)
 
     def health_check(self) -> bool:
         """Проверка работоспособности сервиса"""
@@ -1,16 +1,22 @@
 """
 🤖 OpenAI клиент сервис v2.0
 Оптимизированная работа с OpenAI API
+Запросы выполняет провайдер из AI_LLM_PROVIDER (openai или stub)
 """
 
 import logging
 from typing import Dict, Any, Optional, List
 from django.conf import settings
-from openai import OpenAI
 from django.core.cache import cache
-import json
 
 from .base import BaseAIService
+from .llm_gateway import get_llm_gateway, LLMUnavailableError
+from .llm_providers import get_llm_provider
+from .context_packer import TokenCounter
+from ..metrics.collector import MetricsCollector
+from ..utils import fast_json
+
+logger = logging.getLogger(__name__)
 
 
 class OpenAIClientService(BaseAIService):
@@ -25,18 +31,18 @@ class OpenAIClientService(BaseAIService):
         self.max_tokens = getattr(settings, 'OPENAI_MAX_TOKENS', 1000)
         self.temperature = getattr(settings, 'OPENAI_TEMPERATURE', 0.7)
         self.timeout = getattr(settings, 'OPENAI_TIMEOUT', 30)
+        self.gateway = get_llm_gateway()
+        self.provider = get_llm_provider()
+        self.token_counter = TokenCounter(self.model)
+        self.metrics = MetricsCollector()
         self._initialize_client()
 
     def _initialize_client(self):
-        """Инициализация OpenAI клиента"""
+        """Инициализация OpenAI клиента (общий пул соединений процесса)"""
         try:
-            api_key = getattr(settings, 'OPENAI_API_KEY', None)
-            if not api_key:
+            self.client = self.gateway.client
+            if not self.provider.is_available():
                 self.log_error("OpenAI API ключ не настроен")
-                return
-
-            self.client = OpenAI(api_key=api_key)
-            self.log_info("OpenAI клиент инициализирован")
 
         except Exception as e:
             self.log_error(f"Ошибка инициализации OpenAI клиента: {e}")
@@ -64,45 +70,16 @@ class OpenAIClientService(BaseAIService):
                 return cached_response
 
             # Подготовка параметров запроса
-            params = {
-                'model': kwargs.get('model', self.model),
-                'messages': messages,
-                'max_tokens': kwargs.get('max_tokens', self.max_tokens),
-                'temperature': kwargs.get('temperature', self.temperature),
-            }
-            
-            # Add tools if provided
-            if 'tools' in kwargs and kwargs['tools']:
-                params['tools'] = kwargs['tools']
-                if 'tool_choice' in kwargs and kwargs['tool_choice']:
-                    params['tool_choice'] = kwargs['tool_choice']
-            
-            # Add response_format if provided
-            if 'response_format' in kwargs:
-                params['response_format'] = kwargs['response_format']
+            params = self._build_params(messages, **kwargs)
 
             # Выполнение запроса
             try:
-                response = self.client.chat.completions.create(**params)
+                response = self.provider.chat_completion(**params)
+            except LLMUnavailableError as unavailable:
+                self.log_error(f"LLM недоступен: {unavailable}", exc_info=False)
+                return self._get_error_response(str(unavailable))
             except Exception as api_error:
-                error_msg = str(api_error)
-                self.log_error(f"OpenAI API error: {error_msg}")
-                
-                # Check if it's the empty response error
-                if "empty" in error_msg.lower() or "must contain either" in error_msg.lower():
-                    # Return a simple text response as fallback
-                    return {
-                        'content': "Привет! Чем могу помочь? 🌟",
-                        'role': 'assistant',
-                        'finish_reason': 'fallback',
-                        'tokens_used': 0,
-                        'model': params['model'],
-                        'success': True,
-                        'fallback': True
-                    }
-                
-                # For other errors, return error response
-                return self._get_error_response(f"API Error: {error_msg}")
+                return self._handle_api_error(api_error, params)
 
             # Обработка ответа
             result = self._process_response(response)
@@ -115,6 +92,7 @@ class OpenAIClientService(BaseAIService):
             self.log_info("Chat completion выполнен успешно", {
                 'model': params['model'],
                 'tokens_used': result.get('tokens_used', 0),
+                'cached_tokens': result.get('cached_tokens', 0),
                 'has_tool_calls': bool(result.get('tool_calls'))
             })
 
@@ -124,6 +102,101 @@ class OpenAIClientService(BaseAIService):
             self.log_error(f"Ошибка chat completion: {e}")
             return self._get_error_response(f"Ошибка API: {str(e)}")
 
+    async def achat_completion(self, messages: List[Dict[str, str]], **kwargs) -> Dict[str, Any]:
+        """
+        Асинхронный вариант chat_completion для ASGI.
+        Не блокирует поток на время ожидания ответа LLM.
+        """
+        if not self.provider.is_available():
+            return self._get_error_response("OpenAI сервис недоступен")
+
+        try:
+            cache_key = self._get_cache_key_for_messages(messages)
+            cached_response = await cache.aget(cache_key)
+            if cached_response:
+                self.log_info("Ответ загружен из кэша")
+                return cached_response
+
+            params = self._build_params(messages, **kwargs)
+
+            try:
+                response = await self.provider.achat_completion(**params)
+            except LLMUnavailableError as unavailable:
+                self.log_error(f"LLM недоступен: {unavailable}", exc_info=False)
+                return self._get_error_response(str(unavailable))
+            except Exception as api_error:
+                return self._handle_api_error(api_error, params)
+
+            result = self._process_response(response)
+
+            if not result.get('tool_calls') and result.get('success'):
+                cache_timeout = getattr(settings, 'AI_RESPONSE_CACHE_TIMEOUT', 300)
+                await cache.aset(cache_key, result, cache_timeout)
+
+            self.log_info("Async chat completion выполнен успешно", {
+                'model': params['model'],
+                'tokens_used': result.get('tokens_used', 0),
+                'cached_tokens': result.get('cached_tokens', 0),
+                'has_tool_calls': bool(result.get('tool_calls'))
+            })
+
+            return result
+
+        except Exception as e:
+            self.log_error(f"Ошибка async chat completion: {e}")
+            return self._get_error_response(f"Ошибка API: {str(e)}")
+
+    def _build_params(self, messages: List[Dict[str, str]], **kwargs) -> Dict[str, Any]:
+        """
+        Формирует параметры запроса к Chat Completion API
+        """
+        params = {
+            'model': kwargs.get('model', self.model),
+            'messages': messages,
+            'max_tokens': kwargs.get('max_tokens', self.max_tokens),
+            'temperature': kwargs.get('temperature', self.temperature),
+        }
+
+        # Add tools if provided
+        if 'tools' in kwargs and kwargs['tools']:
+            params['tools'] = kwargs['tools']
+            if 'tool_choice' in kwargs and kwargs['tool_choice']:
+                params['tool_choice'] = kwargs['tool_choice']
+
+        # Add response_format if provided
+        if 'response_format' in kwargs:
+            params['response_format'] = kwargs['response_format']
+
+        # Запросы с одинаковым статическим префиксом (system prompt) направляются
+        # в один и тот же prompt cache провайдера
+        if self.provider.name == 'openai' and messages and messages[0].get('role') == 'system':
+            params['prompt_cache_key'] = kwargs.get('prompt_cache_key') or self._get_prefix_cache_key(messages[0])
+
+        return params
+
+    def _handle_api_error(self, api_error: Exception, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Преобразует ошибку API в ответ сервиса
+        """
+        error_msg = str(api_error)
+        self.log_error(f"OpenAI API error: {error_msg}")
+
+        # Check if it's the empty response error
+        if "empty" in error_msg.lower() or "must contain either" in error_msg.lower():
+            # Return a simple text response as fallback
+            return {
+                'content': "Привет! Чем могу помочь? 🌟",
+                'role': 'assistant',
+                'finish_reason': 'fallback',
+                'tokens_used': 0,
+                'model': params['model'],
+                'success': True,
+                'fallback': True
+            }
+
+        # For other errors, return error response
+        return self._get_error_response(f"API Error: {error_msg}")
+
     def chat_completion_stream(self, messages: List[Dict[str, str]], **kwargs):
         """
         Выполняет streaming запрос к OpenAI Chat Completion
@@ -138,10 +211,9 @@ class OpenAIClientService(BaseAIService):
                 'messages': messages,
                 'max_tokens': kwargs.get('max_tokens', self.max_tokens),
                 'temperature': kwargs.get('temperature', self.temperature),
-                'stream': True
             }
 
-            response = self.client.chat.completions.create(**params)
+            response = self.provider.stream(**params)
 
             for chunk in response:
                 if chunk.choices[0].delta.content:
@@ -163,13 +235,13 @@ class OpenAIClientService(BaseAIService):
         """
         Проверяет доступность OpenAI сервиса
         """
-        return self.client is not None
+        return self.provider.is_available()
 
     def get_models(self) -> List[str]:
         """
         Получает список доступных моделей
         """
-        if not self.is_available():
+        if self.client is None:
             return []
 
         try:
@@ -181,46 +253,40 @@ class OpenAIClientService(BaseAIService):
 
     def estimate_tokens(self, text: str) -> int:
         """
-        Оценивает количество токенов в тексте
+        Считает количество токенов в тексте токенизатором модели
         """
-        # Простая оценка: ~4 символа = 1 токен
-        return max(1, len(text) // 4)
+        return self.token_counter.count(text or '')
 
     def truncate_messages(self, messages: List[Dict[str, str]], max_tokens: int = None) -> List[Dict[str, str]]:
         """
-        Обрезает сообщения чтобы уложиться в лимит токенов
+        Обрезает сообщения чтобы уложиться в лимит токенов.
+        Системные сообщения сохраняются, история набирается от новых к старым за один проход.
         """
         if max_tokens is None:
             max_tokens = self.max_tokens * 2  # Примерная оценка
 
-        total_tokens = sum(self.estimate_tokens(msg.get('content', '')) for msg in messages)
-
-        if total_tokens <= max_tokens:
-            return messages
-
-        # Оставляем системное сообщение и обрезаем историю
         system_messages = [msg for msg in messages if msg.get('role') == 'system']
         other_messages = [msg for msg in messages if msg.get('role') != 'system']
 
-        # Обрезаем с конца (самые старые сообщения)
-        tokens_used = sum(self.estimate_tokens(msg.get('content', '')) for msg in system_messages)
-
-        truncated_messages = system_messages.copy()
+        available = max_tokens - sum(self.token_counter.count_message(msg) for msg in system_messages)
+        kept = []
         for msg in reversed(other_messages):
-            msg_tokens = self.estimate_tokens(msg.get('content', ''))
-            if tokens_used + msg_tokens <= max_tokens:
-                truncated_messages.insert(len(system_messages), msg)
-                tokens_used += msg_tokens
-            else:
+            msg_tokens = self.token_counter.count_message(msg)
+            if msg_tokens > available:
                 break
+            available -= msg_tokens
+            kept.append(msg)
 
+        if len(kept) == len(other_messages):
+            return messages
+
+        kept.reverse()
         self.log_info(f"Сообщения обрезаны", {
             'original_count': len(messages),
-            'truncated_count': len(truncated_messages),
-            'tokens_saved': total_tokens - tokens_used
+            'truncated_count': len(system_messages) + len(kept)
         })
 
-        return truncated_messages
+        return system_messages + kept
 
     def _process_response(self, response) -> Dict[str, Any]:
         """
@@ -234,12 +300,18 @@ class OpenAIClientService(BaseAIService):
             # Получаем информацию об использовании токенов
             usage = getattr(response, 'usage', None)
             tokens_used = usage.total_tokens if usage else 0
+            prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+            details = getattr(usage, 'prompt_tokens_details', None)
+            cached_tokens = getattr(details, 'cached_tokens', 0) or 0
+            self.metrics.record_prompt_tokens(prompt_tokens, cached_tokens, model=response.model)
             
             result = {
                 'content': content.strip() if content else "",
                 'role': message.role,
                 'finish_reason': choice.finish_reason,
                 'tokens_used': tokens_used,
+                'prompt_tokens': prompt_tokens,
+                'cached_tokens': cached_tokens,
                 'model': response.model,
                 'created': response.created,
                 'success': True
@@ -279,13 +351,19 @@ class OpenAIClientService(BaseAIService):
             'success': False
         }
 
+    def _get_prefix_cache_key(self, system_message: Dict[str, str]) -> str:
+        """
+        Ключ prompt cache по содержимому статического system prompt
+        """
+        import hashlib
+        return 'prefix-' + hashlib.sha1((system_message.get('content') or '').encode()).hexdigest()[:16]
+
     def _get_cache_key_for_messages(self, messages: List[Dict[str, str]]) -> str:
         """
         Генерирует ключ кэша для сообщений
         """
         import hashlib
-        messages_str = json.dumps(messages, sort_keys=True)
-        hash_obj = hashlib.md5(messages_str.encode())
+        hash_obj = hashlib.md5(fast_json.dumps_bytes(messages, sort_keys=True))
         return f"openai_response_{hash_obj.hexdigest()}"
 
     def health_check(self) -> bool:
@@ -312,14 +390,15 @@ class OpenAIClientService(BaseAIService):
             'model': self.model,
             'max_tokens': self.max_tokens,
             'temperature': self.temperature,
-            'available': self.is_available()
+            'available': self.is_available(),
+            'provider': self.provider.name,
+            'gateway': self.gateway.get_stats()
         }
 
     def cleanup(self):
         """
         Очистка ресурсов
+        Общий клиент шлюза не закрывается: им пользуются другие сервисы процесса.
         """
-        if self.client:
-            self.client.close()
-            self.client = None
+        self.client = None
         self.log_info("OpenAI клиент очищен")
\ No newline at end of file
@@ -7,25 +7,16 @@ import os
 import json
 import logging
 import uuid
+from contextlib import ExitStack, contextmanager
 from typing import List, Dict, Optional, Any, Tuple
 from datetime import datetime, timedelta
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-import nltk
-from nltk.tokenize import sent_tokenize
-
-# Загрузка необходимых NLTK данных
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
 
 from django.conf import settings
 from django.core.cache import cache
-from openai import OpenAI
+from .llm_gateway import get_llm_gateway
+from ai_consultant.utils.warmup import ensure_nltk_data, get_sentence_model
+from ai_consultant.rag.vector_index import get_vector_client
 
 logger = logging.getLogger(__name__)
 
@@ -37,12 +28,14 @@ class RAGService:
 
     def __init__(self):
         self.model_name = getattr(settings, 'RAG_EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
-        self.embedding_model = SentenceTransformer(self.model_name)
-        self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
-        # Инициализация ChromaDB
-        self.chroma_client = chromadb.PersistentClient(
-            path=getattr(settings, 'CHROMA_DB_PATH', './chroma_db')
+        # Общая модель процесса, прогревается в мастере gunicorn (utils/warmup.py)
+        ensure_nltk_data()
+        self.embedding_model = get_sentence_model(self.model_name)
+        self.openai_client = get_llm_gateway().client
+
+        # Векторное хранилище: ChromaDB или индекс в процессе (RAG_VECTOR_BACKEND)
+        self.chroma_client = get_vector_client(
+            getattr(settings, 'CHROMA_DB_PATH', './chroma_db'), store='rag'
         )
 
         # Коллекции для разных типов знаний
@@ -120,6 +113,19 @@ class RAGService:
             logger.error(f"❌ Ошибка добавления документа: {e}")
             return False
 
+    @contextmanager
+    def deferred_writes(self, *collection_names: str):
+        """
+        Пакетная запись: локальный векторный индекс публикует одно поколение на пакет,
+        а не по поколению (все векторы + ANN) на каждый документ
+        """
+        with ExitStack() as stack:
+            for collection_name in collection_names or tuple(self.collections):
+                collection = self.collections.get(collection_name)
+                if hasattr(collection, 'deferred_write'):
+                    stack.enter_context(collection.deferred_write())
+            yield
+
     def search_similar(self, collection_name: str, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
         """Поиск похожих документов в коллекции"""
         if collection_name not in self.collections or not self.collections[collection_name]:
@@ -302,24 +308,25 @@ class RAGService:
 
             clubs = Club.objects.filter(is_active=True)[:100]  # Ограничение для начала
 
-            for club in clubs:
-                # Создание текстового представления клуба
-                club_text = f"""
-                Клуб: {club.name}
-                Описание: {club.description or 'Нет описания'}
-                Категория: {club.category.name if club.category else 'Не указана'}
-                Телефон: {club.phone or 'Не указан'}
-                Email: {club.email or 'Не указан'}
-                """
-
-                metadata = {
-                    'club_id': club.id,
-                    'club_name': club.name,
-                    'category': club.category.name if club.category else None,
-                    'is_active': club.is_active
-                }
-
-                self.add_document('clubs', club_text.strip(), metadata)
+            with self.deferred_writes('clubs'):
+                for club in clubs:
+                    # Создание текстового представления клуба
+                    club_text = f"""
+                    Клуб: {club.name}
+                    Описание: {club.description or 'Нет описания'}
+                    Категория: {club.category.name if club.category else 'Не указана'}
+                    Телефон: {club.phone or 'Не указан'}
+                    Email: {club.email or 'Не указан'}
+                    """
+
+                    metadata = {
+                        'club_id': club.id,
+                        'club_name': club.name,
+                        'category': club.category.name if club.category else None,
+                        'is_active': club.is_active
+                    }
+
+                    self.add_document('clubs', club_text.strip(), metadata)
 
             logger.info(f"✅ Проиндексировано клубов: {len(clubs)}")
 
@@ -362,9 +369,10 @@ class RAGService:
             }
         ]
 
-        for doc in docs_to_add:
-            self.add_document('documentation', doc['text'], doc['metadata'])
-            self.add_document('faq', doc['text'], doc['metadata'])
+        with self.deferred_writes('documentation', 'faq'):
+            for doc in docs_to_add:
+                self.add_document('documentation', doc['text'], doc['metadata'])
+                self.add_document('faq', doc['text'], doc['metadata'])
 
         logger.info(f"✅ Добавлено документов: {len(docs_to_add)}")
 
@@ -384,9 +392,10 @@ class RAGService:
         # Переинициализация
         self._init_collections()
 
-        # Индексация данных
-        self.index_documentation()
-        self.index_club_data()
+        # Индексация данных: одно поколение на коллекцию
+        with self.deferred_writes():
+            self.index_documentation()
+            self.index_club_data()
 
         logger.info("✅ Перестроение индекса завершено")
 
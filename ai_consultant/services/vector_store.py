@@ -1,10 +1,12 @@
 import os
 import logging
-import chromadb
-from chromadb.config import Settings
-from chromadb.utils import embedding_functions
 from django.conf import settings
 
+from ai_consultant.rag.vector_index import get_vector_client
+from ai_consultant.utils.lazy_imports import lazy_import
+
+embedding_functions = lazy_import('chromadb.utils.embedding_functions')
+
 logger = logging.getLogger(__name__)
 
 class VectorStoreService:
@@ -34,7 +36,8 @@ class VectorStoreService:
             # Persist data in a 'chroma_db' directory within the project
             persist_directory = os.path.join(settings.BASE_DIR, 'chroma_db')
             
-            self._client = chromadb.PersistentClient(path=persist_directory)
+            # Chroma or the in-process index, depending on RAG_VECTOR_BACKEND
+            self._client = get_vector_client(persist_directory, store='knowledge')
             
             # Use a lightweight, high-performance model
             self._embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
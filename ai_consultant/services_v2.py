@@ -6,13 +6,14 @@
 import os
 import json
 import logging
+import threading
 from typing import List, Dict, Optional, Any
 from abc import ABC, abstractmethod
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.utils import timezone
-from openai import OpenAI
 
 from .models import ChatSession, ChatMessage, AIContext
 from .services.base import BaseAIService
@@ -21,6 +22,7 @@ from .services.context import ContextService
 from .services.openai_client import OpenAIClientService
 from .utils.logging import AIConsultantLogger
 from .services.message_processor import MessageProcessorService
+from .services.message_analysis import MessageAnalysis
 from .services.club_creation import ClubCreationService
 from .services.club_management import ClubManagementService
 from .services.feedback import FeedbackService
@@ -105,20 +107,22 @@ class AIConsultantServiceV2:
         🚀 Основной метод отправки сообщения с RAG и улучшенным контекстом
         """
         try:
-            # 🔍 Предварительная обработка сообщения
-            processed_message = self.message_processor.preprocess(message)
+            # 🔍 Предварительная обработка и разбор сообщения — один раз за ход
+            analysis = MessageAnalysis.for_turn(message, self.message_processor)
+            processed_message = analysis.sanitized
             self.log_info(f"Обработка сообщения", {'session_id': session.id, 'length': len(processed_message)})
 
             # 🧠 Получение улучшенного контекста с RAG
             enhanced_context = self.enhanced_context_service.get_enhanced_session_context(
                 session_id=str(session.id),
-                user_message=processed_message
+                user_message=processed_message,
+                analysis=analysis
             )
 
             if enhanced_context.get('error'):
                 self.log_warning(f"Проблемы с RAG контекстом", {'error': enhanced_context['error']})
                 # Используем стандартный контекст как запасной вариант
-                enhanced_context = self._get_fallback_enhanced_context(session, processed_message)
+                enhanced_context = self._get_fallback_enhanced_context(session, analysis)
 
             # 💬 Отправка в чат сервис с улучшенным контекстом
             response_data = self.chat_service.send_message(
@@ -164,6 +168,56 @@ class AIConsultantServiceV2:
             self.log_error(f"Ошибка обработки сообщения с RAG: {e}")
             return self._get_fallback_response()
 
+    async def asend_message(self, session: ChatSession, message: str) -> Dict[str, Any]:
+        """
+        🚀 Асинхронная отправка сообщения для ASGI чата.
+        Синхронные участки (RAG контекст, ORM) выполняются через sync_to_async.
+        """
+        try:
+            analysis = MessageAnalysis.for_turn(message, self.message_processor)
+            processed_message = analysis.sanitized
+
+            enhanced_context = await sync_to_async(self.enhanced_context_service.get_enhanced_session_context)(
+                session_id=str(session.id),
+                user_message=processed_message,
+                analysis=analysis
+            )
+            if enhanced_context.get('error'):
+                self.log_warning(f"Проблемы с RAG контекстом", {'error': enhanced_context['error']})
+                enhanced_context = await sync_to_async(self._get_fallback_enhanced_context)(session, analysis)
+
+            response_data = await self.chat_service.asend_message(
+                session=session,
+                message=processed_message,
+                context_service=self.context_service
+            )
+
+            processed_response = self.message_processor.postprocess(response_data['response'])
+
+            await sync_to_async(self._after_turn)(session, processed_message, processed_response, enhanced_context)
+
+            return {
+                'response': processed_response,
+                'session_id': session.id,
+                'message_id': response_data.get('message_id'),
+                'tokens_used': response_data.get('tokens_used', 0),
+                'enhanced_context': {
+                    'rag_confidence': enhanced_context.get('rag_context', {}).get('overall_confidence', 0),
+                    'predictions': enhanced_context.get('predictions', {}),
+                    'personalization': enhanced_context.get('personalization', {})
+                }
+            }
+
+        except Exception as e:
+            self.log_error(f"Ошибка асинхронной обработки сообщения: {e}")
+            return self._get_fallback_response()
+
+    def _after_turn(self, session: ChatSession, user_message: str, ai_response: str, enhanced_context: Dict[str, Any]):
+        """Аналитика, очистка и обновление RAG индекса после ответа"""
+        self._record_interaction_analytics(session, user_message, ai_response, enhanced_context)
+        self._cleanup_old_messages(session)
+        self._update_rag_index_if_needed(session, user_message, ai_response)
+
     def get_user_sessions(self, user: User) -> List[Dict]:
         """
         Получает список сессий пользователя
@@ -177,43 +231,22 @@ class AIConsultantServiceV2:
         Args:
             session: Сессия чата
             limit: Лимит сообщений (по умолчанию 50)
-            offset: Смещение для пагинации (по умолчанию 0)
+            offset: Сколько последних сообщений пропустить (по умолчанию 0)
 
         Returns:
             List[Dict]: Список сообщений чата
         """
         try:
-            # Для пагинации не используем кэш, т.к. offset часто меняется
-            # В будущем можно реализовать более умное кэширование
-            if offset == 0:  # Только для первой страницы используем кэш
-                cache_key = f"chat_history_{session.id}_{limit}"
-                cached_history = cache.get(cache_key)
-
-                if cached_history:
-                    self.log_info(f"История чата загружена из кэша", {'session_id': session.id})
-                    return cached_history
-
-            # Получаем историю с учетом offset
+            # Последние limit + offset сообщений: первая страница целиком из буфера истории,
+            # offset отсчитывается от самого нового сообщения (подгрузка более старых)
             history = self.chat_service.get_history(session, limit + offset)
-
-            # Применяем offset
-            if offset > 0:
-                history = history[offset:]
-
-            # Ограничиваем количество сообщений
-            history = history[:limit]
-
-            # Кэшируем только первую страницу
-            if offset == 0:
-                cache_key = f"chat_history_{session.id}_{limit}"
-                cache.set(cache_key, history, self.cache_timeout)
+            history = history[:max(len(history) - offset, 0)][-limit:]
 
             self.log_info(f"Загружена история чата", {
                 'session_id': session.id,
                 'messages_count': len(history),
                 'limit': limit,
-                'offset': offset,
-                'cached': offset == 0
+                'offset': offset
             })
 
             return history
@@ -264,8 +297,6 @@ class AIConsultantServiceV2:
         try:
             success = self.chat_service.delete_session(session)
             if success:
-                # Очистка кэша
-                cache.delete_many([f"chat_history_{session.id}_*"])
                 self.log_info(f"Сессия чата удалена", {'session_id': session.id})
             return success
         except Exception as e:
@@ -398,10 +429,14 @@ class AIConsultantServiceV2:
                 'error': 'Не удалось получить рекомендации клубов'
             }
 
-    def get_clubs_by_interest_keywords(self, message: str, limit: int = 5) -> Dict:
+    def get_clubs_by_interest_keywords(self, message: str, limit: int = 5, near=None) -> Dict:
         """
-        Находит клубы по ключевым словам в сообщении пользователя
+        Находит клубы по ключевым словам в сообщении пользователя.
+
+        near — точка (clubs.geo.Point) пользователя или его города: тогда из
+        подходящих клубов выбираются ближайшие, а расстояние попадает в причины.
         """
+        candidates = limit * 3 if near is not None else limit
         try:
             # Анализируем сообщение на предмет интересов
             # Создаем временный объект пользователя с интересами из сообщения
@@ -425,45 +460,45 @@ class AIConsultantServiceV2:
                     Q(name__icontains=message) |
                     Q(description__icontains=message) |
                     Q(tags__icontains=message)
-                ).order_by('-members_count')[:limit]
+                ).order_by('-members_count')[:candidates]
 
                 return {
                     'success': True,
                     'type': 'keyword_search',
                     'message': f'Нашел клубы по запросу "{message}":',
-                    'clubs': [
-                        {
+                    'clubs': self._rank_by_distance([
+                        (club, {
                             'id': str(club.id),
                             'name': club.name,
                             'description': club.description[:200] + '...' if len(club.description) > 200 else club.description,
                             'category': club.category.name if club.category else 'Без категории',
                             'members_count': club.members_count,
                             'reasons': ['Найдено по ключевым словам']
-                        }
+                        })
                         for club in clubs
-                    ]
+                    ], near, limit)
                 }
 
             # Используем рекомендации по интересам
-            scored_clubs = self.recommendation_service.find_clubs_by_interests(interests, limit * 2)
+            scored_clubs = self.recommendation_service.find_clubs_by_interests(interests, max(limit * 2, candidates))
 
             club_list = []
-            for rec in scored_clubs[:limit]:
+            for rec in scored_clubs[:candidates]:
                 club = rec['club']
-                club_list.append({
+                club_list.append((club, {
                     'id': str(club.id),
                     'name': club.name,
                     'description': club.description[:200] + '...' if len(club.description) > 200 else club.description,
                     'category': club.category.name if club.category else 'Без категории',
                     'members_count': club.members_count,
                     'reasons': rec['match_reasons']
-                })
+                }))
 
             return {
                 'success': True,
                 'type': 'interest_based',
                 'message': f'По вашим интересам я нашел следующие клубы:',
-                'clubs': club_list
+                'clubs': self._rank_by_distance(club_list, near, limit)
             }
 
         except Exception as e:
@@ -473,6 +508,27 @@ class AIConsultantServiceV2:
                 'error': 'Не удалось найти клубы по запросу'
             }
 
+    @staticmethod
+    def _rank_by_distance(clubs: List, near, limit: int) -> List[Dict]:
+        """
+        Описания клубов [(club, dict)]: без near — в исходном порядке, с near — по
+        расстоянию (clubs/geo.py), клубы без координат в конце по релевантности
+        """
+        if near is None:
+            return [item for _, item in clubs[:limit]]
+
+        from clubs import geo
+
+        ranked = []
+        for position, (club, item) in enumerate(clubs):
+            distance = geo.distance_to(near, club.latitude, club.longitude)
+            if distance is not None:
+                item = {**item, 'distance_km': round(distance, 1),
+                        'reasons': [*item['reasons'], f'📍 {distance:.1f} км от вас']}
+            ranked.append((distance is None, distance or 0, position, item))
+        ranked.sort(key=lambda entry: entry[:3])
+        return [item for *_, item in ranked[:limit]]
+
     def format_club_recommendations(self, recommendations_data: Dict) -> str:
         """
         Форматирует рекомендации клубов для ответа ИИ
@@ -555,17 +611,22 @@ class AIConsultantServiceV2:
         else:
             logger.warning(message)
 
-    def _get_fallback_enhanced_context(self, session: ChatSession, message: str) -> Dict[str, Any]:
-        """Запасной контекст при ошибках RAG"""
+    def _get_fallback_enhanced_context(self, session: ChatSession, analysis: MessageAnalysis) -> Dict[str, Any]:
+        """Запасной контекст при ошибках RAG (анализ сообщения уже выполнен в этом ходе)"""
+        current_message = analysis.context
         return {
             'session_id': str(session.id),
             'user': self._get_basic_user_context(session.user),
             'message_count': session.messages.count(),
             'recent_messages': [],
+            'current_message': current_message,
             'rag_context': {'retrieved_info': {}, 'overall_confidence': 0.0},
             'predictions': {},
             'personalization': {},
-            'intent_analysis': {'primary_intent': 'general', 'confidence': 0.5}
+            'intent_analysis': {
+                'primary_intent': current_message.get('intent') or 'general',
+                'confidence': current_message.get('confidence', 0.5)
+            }
         }
 
     def _get_basic_user_context(self, user: User) -> Optional[Dict[str, Any]]:
@@ -723,11 +784,26 @@ class AIServiceFactory:
     Фабрика для создания AI сервисов
     """
 
+    _shared_service = None
+    _shared_lock = threading.Lock()
+
     @staticmethod
     def create_chat_service(user: User = None) -> AIConsultantServiceV2:
         """Создает основной сервис чата"""
         return AIConsultantServiceV2()
 
+    @classmethod
+    def get_shared_chat_service(cls) -> AIConsultantServiceV2:
+        """
+        Возвращает общий для процесса сервис чата.
+        Сервис не хранит состояние запроса, поэтому его можно переиспользовать.
+        """
+        if cls._shared_service is None:
+            with cls._shared_lock:
+                if cls._shared_service is None:
+                    cls._shared_service = AIConsultantServiceV2()
+        return cls._shared_service
+
     @staticmethod
     def create_chat_service_only() -> ChatService:
         """Создает только чат сервис"""
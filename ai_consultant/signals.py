@@ -1,7 +1,9 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import ChatSession, ChatMessage
+from clubs.models import City, Club, ClubCategory
+from .models import ChatSession, ChatMessage, AIContext
+from .prompts.compiler import prompt_compiler
 import logging
 
 User = get_user_model()
@@ -24,12 +26,36 @@ def chat_message_created_handler(sender, instance, created, **kwargs):
     Обработчик создания нового сообщения в чате
     """
     if created:
-        user_identifier = instance.session.user.phone if instance.session.user else "Анонимный пользователь"
-        logger.info(
-            f"Новое сообщение в чате: {user_identifier} -> {instance.role}"
-        )
+        # session_id вместо instance.session.user: без лишних SELECT на каждое сообщение
+        logger.debug("Новое сообщение в чате: %s -> %s", instance.session_id, instance.role)
+
+        # Сразу, а не после коммита: ход читает историю в той же транзакции
+        from .services.history_buffer import get_history_buffer
+        get_history_buffer().append(instance)
 
         # Здесь можно добавить аналитику или триггеры
         if instance.role == 'user':
             # Счетчик сообщений пользователя
-            pass
\ No newline at end of file
+            pass
+
+
+@receiver([post_save, post_delete], sender=AIContext)
+@receiver([post_save, post_delete], sender=ClubCategory)
+def prompt_sources_changed_handler(sender, instance, **kwargs):
+    """
+    Данные статических промптов изменились — перекомпилировать их при следующем запросе
+    """
+    prompt_compiler.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Club)
+@receiver([post_save, post_delete], sender=City)
+@receiver([post_save, post_delete], sender=ClubCategory)
+def club_catalog_changed_handler(sender, instance, update_fields=None, **kwargs):
+    """
+    Клубы, города или категории изменились — новая версия снимка каталога клубов
+    """
+    from .recommendations.club_catalog import SNAPSHOT_FIELDS, get_club_catalog_store
+    if sender is Club and update_fields and SNAPSHOT_FIELDS.isdisjoint(update_fields):
+        return  # только счетчики: снимок обновится по AI_CLUB_CATALOG_MAX_AGE
+    get_club_catalog_store().invalidate()
@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from ai_consultant.models import ChatAnalyticsDaily, ChatMessage, ChatSession
+from ai_consultant.services.analytics_rollup import day_bounds, histogram_percentile, rollup_day
+from ai_consultant.services.enhanced_analytics import EnhancedAnalyticsService
+
+User = get_user_model()
+
+
+class FakeAnalyzer:
+    def analyze_message(self, content):
+        return {'intent': 'search' if 'клуб' in content else None, 'sentiment': 'neutral', 'keywords': content.split()}
+
+
+class ChatDataMixin:
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.yesterday = self.today - timedelta(days=1)
+        self.user = User.objects.create_user(phone='+77015550000', password='password', email='rollup@example.com')
+
+    def make_session(self, day, replies, user=None):
+        """Сессия с парами вопрос/ответ; replies — задержки ответа в секундах"""
+        session = ChatSession.objects.create(user=user)
+        at = day_bounds(day)[0] + timedelta(hours=10)
+        ChatSession.objects.filter(pk=session.pk).update(created_at=at)
+        for delay in replies:
+            for role, moment in (('user', at), ('assistant', at + timedelta(seconds=delay))):
+                message = ChatMessage.objects.create(session=session, role=role, content='найди клуб', tokens_used=10)
+                ChatMessage.objects.filter(pk=message.pk).update(created_at=moment)
+            at += timedelta(minutes=5)
+        return session
+
+
+class AnalyticsRollupTestCase(ChatDataMixin, TestCase):
+    def test_rollup_day(self):
+        self.make_session(self.yesterday, [2, 4], user=self.user)
+        self.make_session(self.yesterday, [40])
+        self.make_session(self.today, [1])
+
+        row = rollup_day(self.yesterday, FakeAnalyzer())
+
+        self.assertEqual((row.sessions, row.anonymous_sessions), (2, 1))
+        self.assertEqual((row.total_messages, row.user_messages, row.replies), (6, 3, 3))
+        self.assertEqual(row.tokens_used, 60)
+        self.assertAlmostEqual(row.reply_seconds_total, 46.0)
+        self.assertEqual(row.reply_latency_histogram, {'2': 1, '5': 1, '45': 1})
+        self.assertEqual(row.intents, {'search': 3})
+        self.assertEqual(row.message_lengths['short'], 3)
+        self.assertEqual(sum(row.hourly_messages.values()), 6)
+
+    def test_histogram_percentile(self):
+        histogram = {'1': 90, '10': 9, '600': 1}
+        self.assertEqual(histogram_percentile(histogram, 0.5), 1.0)
+        self.assertEqual(histogram_percentile(histogram, 0.95), 10.0)
+        self.assertEqual(histogram_percentile({}, 0.5), 0.0)
+
+
+class EnhancedAnalyticsSQLTestCase(ChatDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.service = EnhancedAnalyticsService()
+
+    def test_trends_combine_rollups_and_live_days(self):
+        self.make_session(self.yesterday, [2, 4])
+        rollup_day(self.yesterday)
+        # После rollup сырые данные вчерашнего дня больше не читаются
+        ChatMessage.objects.all().delete()
+        self.make_session(self.today, [1])
+
+        daily = {d['date']: d for d in self.service._analyze_trends('week', None)['daily_usage']}
+
+        self.assertEqual(len(daily), 7)
+        self.assertEqual(daily[self.yesterday.isoformat()]['messages'], 4)
+        self.assertEqual(daily[self.today.isoformat()], {'date': self.today.isoformat(), 'sessions': 1, 'messages': 2})
+
+    def test_performance_metrics_per_user_use_window_query(self):
+        self.make_session(self.today, [3, 3, 8], user=self.user)
+        self.make_session(self.today, [100])
+
+        stats = self.service._get_performance_metrics('day', self.user.id)['performance_stats']
+
+        self.assertAlmostEqual(stats['response_time']['average_seconds'], 4.67)
+        self.assertEqual(stats['response_time']['p95_seconds'], 10.0)
+        self.assertEqual(stats['success_rate']['average'], 100.0)
+        self.assertFalse(ChatAnalyticsDaily.objects.exists())
+
+    def test_overall_metrics(self):
+        self.make_session(self.today, [3, 3], user=self.user)
+        self.make_session(self.today, [5])
+
+        metrics = self.service._get_overall_metrics('day', None)
+
+        self.assertEqual(metrics['total_sessions'], 2)
+        self.assertEqual(metrics['unique_users'], 1)
+        self.assertEqual(metrics['total_messages'], 6)
+        self.assertEqual(metrics['avg_session_duration_minutes'], round((300 + 3 + 5) / 2 / 60, 2))
+
+    def test_comprehensive_analytics(self):
+        self.make_session(self.today, [3, 3], user=self.user)
+
+        for user_id in (None, self.user.id):
+            analytics = self.service.get_comprehensive_analytics('week', user_id)
+            self.assertNotIn('error', analytics)
+            self.assertEqual(analytics['conversation_analytics']['conversation_flow']['quick_resolutions'], 0)
+            self.assertEqual(analytics['conversation_analytics']['message_patterns']['short'], 2)
@@ -0,0 +1,81 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+
+from asgiref.sync import sync_to_async
+
+from ai_consultant.agents.router import AgentRouter
+from ai_consultant.models import ChatMessage
+from ai_consultant.services.chat import ChatService
+from ai_consultant.services.context_packer import ContextPacker, HistorySummarizer, SUMMARY_KEY
+
+User = get_user_model()
+
+
+class FakeAsyncOpenAI:
+    def __init__(self, router_content='{"agent": "orchestrator", "reason": "greeting"}'):
+        self.router_content = router_content
+        self.calls = 0
+
+    async def achat_completion(self, messages, tools=None, tool_choice=None, response_format=None, **kwargs):
+        self.calls += 1
+        if response_format:
+            return {'success': True, 'content': self.router_content, 'tokens_used': 1}
+        if messages[-1]['content'].startswith('Текущее резюме'):
+            return {'success': True, 'content': '- Ищет клуб', 'tokens_used': 3}
+        return {'success': True, 'content': 'Привет! Чем могу помочь?', 'tokens_used': 7}
+
+    def chat_completion(self, messages, **kwargs):
+        raise AssertionError('sync LLM call on the async path')
+
+    def truncate_messages(self, messages):
+        return messages
+
+
+class TestAsyncRouter(TestCase):
+    async def test_aroute_returns_registered_agent(self):
+        router = AgentRouter(FakeAsyncOpenAI('{"agent": "club_specialist", "reason": "search"}'))
+        self.assertEqual(await router.aroute("Найди клуб по шахматам", []), "club_specialist")
+
+    async def test_aroute_falls_back_on_invalid_json(self):
+        router = AgentRouter(FakeAsyncOpenAI('not json'))
+        self.assertEqual(await router.aroute("???", []), "orchestrator")
+
+
+class TestAsyncChatService(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(phone='+77010000026', password='pass', email='async@example.com')
+        self.openai = FakeAsyncOpenAI()
+        self.chat = ChatService(openai_service=self.openai)
+        self.session = self.chat.create_session(self.user)
+
+    async def test_asend_message_routes_and_saves_both_messages(self):
+        result = await self.chat.asend_message(self.session, "Привет")
+
+        self.assertEqual(result['response'], 'Привет! Чем могу помочь?')
+        self.assertEqual(result['agent'], 'orchestrator')
+        self.assertEqual(result['tokens_used'], 7)
+        self.assertEqual(self.openai.calls, 2)  # routing + answer
+        self.assertEqual(await ChatMessage.objects.filter(session=self.session).acount(), 2)
+
+    async def test_asend_message_keeps_current_agent(self):
+        self.session.current_agent = 'orchestrator'
+        await self.session.asave(update_fields=['current_agent'])
+
+        await self.chat.asend_message(self.session, "Расскажи о платформе")
+
+        self.assertEqual(self.openai.calls, 1)  # no routing call
+
+    async def test_summary_is_refreshed_after_the_turn_without_blocking_calls(self):
+        self.session.current_agent = 'orchestrator'
+        await self.session.asave(update_fields=['current_agent'])
+        for index in range(6):
+            await sync_to_async(self.chat._save_message)(self.session, f'Реплика {index}', is_from_user=index % 2 == 0)
+        self.chat.context_packer = ContextPacker(token_budget=50, completion_reserve=10)
+        self.chat.summarizer = HistorySummarizer(self.openai, batch_size=4)
+
+        result = await self.chat.asend_message(self.session, "Что дальше?")
+
+        self.assertEqual(result['response'], 'Привет! Чем могу помочь?')
+        self.assertEqual(self.openai.calls, 2)  # answer + summary
+        await self.session.arefresh_from_db()
+        self.assertEqual(self.session.agent_context[SUMMARY_KEY]['text'], '- Ищет клуб')
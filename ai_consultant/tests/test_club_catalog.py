@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from ai_consultant.recommendations.club_catalog import ClubCatalogStore, TextColumn
+from clubs.models import City, Club, ClubCategory
+from core.api_ai_consultant import _club_relevance_scores, _generate_match_reasons, _match_interests
+from core.api_clubs_views import find_relevant_clubs
+
+User = get_user_model()
+
+
+class TestTextColumn(SimpleTestCase):
+    def test_contains_matches_substrings_within_one_field(self):
+        column = TextColumn(['Шахматы и Го', None, 'футбол', 'го'])
+
+        self.assertEqual(column.contains('ГО').tolist(), [True, False, False, True])
+        self.assertEqual(column.contains('го\x00фут').tolist(), [False] * 4)
+        self.assertEqual(column.contains('').tolist(), [True] * 4)
+        self.assertEqual(column.contains_any(['фут', 'шах']).tolist(), [True, False, True, False])
+
+
+class TestClubCatalog(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(phone='+77012345670', password='password', email='catalog@example.com')
+        sport = ClubCategory.objects.create(name='Спорт', is_active=True)
+        music = ClubCategory.objects.create(name='Музыка', is_active=True)
+        almaty = City.objects.create(name='Алматы', iata_code='ALA')
+        self.chess = Club.objects.create(
+            name='Шахматы', description='Турниры по шахматам', activities='Блиц', category=sport,
+            city=almaty, creater=user, members_count=60,
+        )
+        self.choir = Club.objects.create(
+            name='Музыка и хор', description='Пение и музыка', category=music, creater=user, members_count=8,
+        )
+        Club.objects.create(name='Закрытый', description='шахматы', category=sport, creater=user, is_active=False)
+        self.store = ClubCatalogStore()
+
+    def test_snapshot_columns(self):
+        catalog = self.store.get()
+        chess, choir = catalog.row(self.chess.pk), catalog.row(self.choir.pk)
+
+        self.assertEqual(len(catalog), 2)
+        self.assertEqual((chess, choir), (0, 1))
+        self.assertEqual(catalog.city_name(chess), 'Алматы')
+        self.assertIsNone(catalog.city_name(choir))
+        self.assertEqual(catalog.category_name(choir), 'Музыка')
+        self.assertEqual(catalog.city_matches('алма').tolist(), [True, False])
+        self.assertEqual(catalog.text_contains(('name', 'activities'), 'блиц').tolist(), [True, False])
+
+    def test_rebuilds_after_change_signal(self):
+        catalog = self.store.get()
+        self.assertIs(self.store.get(), catalog)
+
+        self.choir.is_active = False
+        self.choir.save()
+
+        rebuilt = self.store.get()
+        self.assertIsNot(rebuilt, catalog)
+        self.assertNotEqual(rebuilt.version, catalog.version)
+        self.assertEqual(len(rebuilt), 1)
+
+    def test_counter_saves_keep_snapshot_version(self):
+        from clubs.services import ClubServices
+
+        version = self.store.get().version
+        fan = User.objects.create_user(phone='+77012345671', email='fan@example.com')
+        ClubServices.like(self.chess, fan)
+        ClubServices.join(self.chess, fan)
+
+        self.assertEqual(self.store.version(), version)
+        self.chess.refresh_from_db()
+        self.assertEqual((self.chess.likes_count, self.chess.members_count), (1, 61))
+
+    def test_relevance_scores_and_reasons(self):
+        catalog = self.store.get()
+        location_mask = catalog.city_matches('Алматы')
+        matches = _match_interests(catalog, ['шахмат', 'пение'])
+
+        scores = _club_relevance_scores(catalog, matches, location_mask)
+
+        # 1 (активен) + 2 (город) + 1.5 (интерес) + 2 (> 50 участников) + 0.8 (полнота профиля)
+        self.assertEqual(scores.tolist(), [7.3, 3.1])
+        self.assertEqual(_generate_match_reasons(catalog, 0, matches, location_mask), [
+            '📍 В вашем городе (Алматы)', '🎯 По интересам: шахмат', '👥 Популярный клуб (60 участников)',
+        ])
+
+    def test_find_relevant_clubs(self):
+        # Как и раньше, слова сообщения ищутся подстрокой: «и» есть в описании и деятельности шахмат
+        clubs = find_relevant_clubs('Люблю музыка и турниры')
+
+        self.assertEqual([(c['name'], c['score'], c['city']) for c in clubs], [
+            ('Музыка и хор', 8, 'Не указан'), ('Шахматы', 5, 'Алматы'),
+        ])
+
+    def test_search_endpoint(self):
+        response = self.client.get('/api/ai/clubs/search/', {'q': 'шахмат'}, secure=True)
+        data = response.json()['data']
+
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(data['clubs'][0]['name'], 'Шахматы')
+        self.assertEqual(data['clubs'][0]['category']['name'], 'Спорт')
@@ -0,0 +1,119 @@
+import tempfile
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from ai_consultant.prompts.compiler import PromptCompiler
+from ai_consultant.recommendations.club_embeddings import ClubEmbeddingIndex
+from clubs.models import Club, ClubCategory
+
+User = get_user_model()
+
+TOPICS = ['шахматы', 'футбол', 'python']
+
+
+class FakeEncoder:
+    """Вектор по ключевым словам: одна ось на тему"""
+
+    def get_sentence_embedding_dimension(self):
+        return len(TOPICS)
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=False):
+        vectors = np.array([[text.lower().count(t) + 0.01 for t in TOPICS] for text in texts], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def club(club_id, name):
+    return {'id': club_id, 'name': name, 'description': '', 'category__name': ''}
+
+
+class TestClubEmbeddingIndex(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.index = ClubEmbeddingIndex(FakeEncoder(), directory=self.directory)
+        self.index.upsert([club(1, 'Шахматы'), club(2, 'Шахматы и python'), club(3, 'Футбол')])
+
+    def test_most_similar_ranks_and_excludes(self):
+        vector = self.index.profile_vector([1])
+        result = self.index.most_similar(vector, k=5, exclude=[1])
+
+        self.assertEqual([club_id for club_id, _ in result], ['2', '3'])
+        self.assertGreater(result[0][1], result[1][1])
+
+    def test_remove_frees_row_for_reuse(self):
+        self.index.remove([2])
+        self.index.upsert([club(4, 'Python')])
+
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index._ids, ['1', '4', '3'])
+        result = self.index.most_similar(self.index.profile_vector([4]), k=1)
+        self.assertEqual(result[0][0], '4')
+
+    def test_other_process_sees_saved_matrix(self):
+        reader = ClubEmbeddingIndex(FakeEncoder(), directory=self.directory)
+        reader._reload()
+
+        self.assertEqual(len(reader), 3)
+        self.assertEqual(reader.most_similar(reader.profile_vector([3]), k=1)[0][0], '3')
+
+    def test_matrix_grows_past_capacity(self):
+        self.index.upsert([club(i, 'Футбол') for i in range(10, 10 + ClubEmbeddingIndex.MIN_CAPACITY)])
+
+        self.assertEqual(len(self.index), 3 + ClubEmbeddingIndex.MIN_CAPACITY)
+        self.assertEqual(self.index.most_similar(self.index.profile_vector([1]), k=1)[0][0], '1')
+
+
+class TestClubEmbeddingSync(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(phone='+77012345679', password='password', email='emb@example.com')
+        category = ClubCategory.objects.create(name='Спорт', is_active=True)
+        self.chess = Club.objects.create(name='Шахматы', description='', category=category, creater=user)
+        self.football = Club.objects.create(name='Футбол', description='', category=category, creater=user)
+        self.index = ClubEmbeddingIndex(FakeEncoder(), directory=tempfile.mkdtemp())
+
+    def test_request_sync_does_not_build_missing_index(self):
+        self.assertEqual(self.index.sync(force=True), 0)
+        self.assertFalse(self.index.exists())
+
+    def test_sync_builds_then_applies_changes(self):
+        self.assertEqual(self.index.sync(force=True, build_missing=True), 2)
+
+        self.football.is_active = False
+        self.football.save()
+        self.chess.name = 'Шахматы и python'
+        self.chess.save()
+
+        self.assertEqual(self.index.sync(force=True), 2)
+        self.assertEqual(len(self.index), 1)
+        self.assertIsNone(self.index.profile_vector([self.football.id]))
+
+    def test_sync_drops_deleted_clubs(self):
+        self.index.sync(force=True, build_missing=True)
+
+        Club.objects.filter(pk=self.football.pk).delete()
+
+        self.assertEqual(self.index.sync(force=True), 1)
+        self.assertIsNone(self.index.profile_vector([self.football.id]))
+        self.assertEqual(len(self.index), 1)
+
+
+class TestPromptCompiler(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        self.compiler = PromptCompiler()
+        self.compiler.register('test', self._build)
+
+    def _build(self):
+        self.calls += 1
+        return f'prompt {self.calls}'
+
+    def test_compiled_once_until_invalidated(self):
+        first = self.compiler.get('test')
+        self.assertIs(self.compiler.get('test'), first)
+        self.assertEqual(self.calls, 1)
+
+        ClubCategory.objects.create(name='Новая категория', is_active=True)  # сигнал инвалидирует версию
+        self.assertEqual(self.compiler.text('test'), 'prompt 2')
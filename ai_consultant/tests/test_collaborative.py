@@ -0,0 +1,72 @@
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from ai_consultant.recommendations.collaborative import (
+    ItemSimilarityModel,
+    build_interaction_matrix,
+    compute_item_neighbors,
+)
+from clubs.models import Club, ClubCategory
+
+User = get_user_model()
+
+
+class TestItemNeighbors(TestCase):
+    def test_matrix_sums_duplicate_signals(self):
+        matrix, users, clubs = build_interaction_matrix([('u1', 'a', 1.0), ('u1', 'a', 2.0), ('u2', 'b', 1.0)])
+
+        self.assertEqual((users, clubs), (['u1', 'u2'], ['a', 'b']))
+        self.assertEqual(matrix.nnz, 2)
+
+    def test_co_occurring_clubs_are_neighbors(self):
+        matrix, _, clubs = build_interaction_matrix([
+            ('u1', 'chess', 1.0), ('u1', 'go', 1.0),
+            ('u2', 'chess', 1.0), ('u2', 'go', 1.0), ('u2', 'football', 1.0),
+            ('u3', 'football', 1.0), ('u3', 'tennis', 1.0),
+        ])
+        neighbors, scores = compute_item_neighbors(matrix, top_k=2)
+
+        chess = clubs.index('chess')
+        self.assertEqual(clubs[neighbors[chess, 0]], 'go')
+        self.assertGreater(scores[chess, 0], scores[chess, 1])
+        self.assertNotIn(chess, neighbors[chess])
+
+
+class TestItemSimilarityModel(TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'item_cf.npz')
+        category = ClubCategory.objects.create(name='Игры', is_active=True)
+        creator = User.objects.create_user(phone='+77010000000', password='password', email='cf0@example.com')
+        self.chess, self.go, self.football = (
+            Club.objects.create(name=name, description='', category=category, creater=creator)
+            for name in ('Шахматы', 'Го', 'Футбол')
+        )
+        self.users = [
+            User.objects.create_user(phone=f'+7701000000{i}', password='password', email=f'cf{i}@example.com')
+            for i in range(1, 4)
+        ]
+
+    def test_train_and_recommend(self):
+        self.chess.members.add(self.users[0], self.users[1])
+        self.go.likes.add(self.users[0], self.users[1])
+        self.football.members.add(self.users[2])
+        self.chess.likes.add(self.users[2])
+
+        model = ItemSimilarityModel(path=self.path)
+        stats = model.train(top_k=5)
+        self.assertEqual(stats['clubs'], 3)
+
+        recommended = model.recommend([self.chess.id], k=5)
+        self.assertEqual(recommended[0][0], str(self.go.id))
+        self.assertNotIn(str(self.chess.id), [club_id for club_id, _ in recommended])
+
+        # Другой процесс читает сохраненный файл
+        self.assertTrue(ItemSimilarityModel(path=self.path).is_ready())
+
+    def test_unknown_clubs_give_no_recommendations(self):
+        model = ItemSimilarityModel(path=self.path)
+        self.assertFalse(model.is_ready())
+        self.assertEqual(model.recommend(['missing']), [])
@@ -0,0 +1,108 @@
+from unittest.mock import AsyncMock, Mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from ai_consultant.services.chat import ChatService
+from ai_consultant.services.context_packer import ContextPacker, HistorySummarizer, SUMMARY_KEY
+
+
+def make_history(count):
+    return [
+        {
+            'role': 'user' if i % 2 == 0 else 'assistant',
+            'content': f'Реплика номер {i}: расскажи подробнее про клубы и мероприятия',
+            'created_at': f'2025-01-01T00:00:{i:02d}+00:00',
+        }
+        for i in range(count)
+    ]
+
+
+class TestContextPacker(TestCase):
+    def setUp(self):
+        self.packer = ContextPacker(model='gpt-4o-mini', token_budget=400, completion_reserve=100)
+
+    def test_keeps_newest_turns_within_budget(self):
+        history = make_history(30)
+        packed = self.packer.pack('Ты консультант', history, 'Привет')
+
+        self.assertLessEqual(packed.prompt_tokens, 300)
+        self.assertEqual(packed.messages[0]['role'], 'system')
+        self.assertEqual(packed.messages[-1], {'role': 'user', 'content': 'Привет'})
+        self.assertEqual(packed.messages[-2]['content'], history[-1]['content'])
+        self.assertEqual(packed.dropped, history[:len(packed.dropped)])
+        self.assertTrue(packed.dropped)
+
+    def test_tools_reserve_budget(self):
+        history = make_history(30)
+        tools = [{'type': 'function', 'function': {'name': 'search_clubs', 'description': 'Поиск клубов ' * 20}}]
+
+        without_tools = self.packer.pack('Ты консультант', history, 'Привет')
+        with_tools = self.packer.pack('Ты консультант', history, 'Привет', tools=tools)
+
+        self.assertGreater(len(with_tools.dropped), len(without_tools.dropped))
+
+
+class TestHistorySummarizer(TestCase):
+    def setUp(self):
+        self.openai = Mock()
+        self.openai.chat_completion.return_value = {'success': True, 'content': '- Ищет шахматный клуб'}
+        self.session = Mock(agent_context={})
+        self.summarizer = HistorySummarizer(self.openai, batch_size=4)
+
+    def test_waits_for_full_batch(self):
+        self.assertEqual(self.summarizer.refresh(self.session, make_history(3)), '')
+        self.openai.chat_completion.assert_not_called()
+
+    def test_refreshes_incrementally(self):
+        history = make_history(6)
+        self.assertEqual(self.summarizer.refresh(self.session, history[:4]), '- Ищет шахматный клуб')
+        self.assertEqual(self.session.agent_context[SUMMARY_KEY]['until'], history[3]['created_at'])
+        self.session.save.assert_called_once_with(update_fields=['agent_context'])
+
+        # Уже учтенные реплики повторно не отправляются
+        self.summarizer.refresh(self.session, history)
+        self.assertEqual(self.openai.chat_completion.call_count, 1)
+
+    async def test_async_refresh_awaits_gateway(self):
+        self.openai.achat_completion = AsyncMock(return_value={'success': True, 'content': '- Ищет хор'})
+
+        self.assertEqual(await self.summarizer.arefresh(self.session, make_history(4)), '- Ищет хор')
+        self.openai.chat_completion.assert_not_called()
+        self.session.save.assert_called_once_with(update_fields=['agent_context'])
+
+    def test_summary_survives_agent_reset(self):
+        self.summarizer.refresh(self.session, make_history(4))
+        self.session.agent_context['club_draft'] = {'name': 'Шахматы'}
+
+        ChatService._reset_agent_context(self.session)
+
+        self.assertEqual(list(self.session.agent_context), [SUMMARY_KEY])
+        self.assertEqual(self.session.agent_context[SUMMARY_KEY]['text'], '- Ищет шахматный клуб')
+
+
+class TestSummaryAfterCommit(TestCase):
+    def setUp(self):
+        self.openai = Mock()
+        self.openai.chat_completion.return_value = {'success': True, 'content': 'Ответ', 'tokens_used': 5}
+        self.chat = ChatService(openai_service=self.openai)
+        self.chat.context_packer = ContextPacker(token_budget=50, completion_reserve=10)
+        self.chat.summarizer = Mock()
+        user = get_user_model().objects.create(phone='+77010000028', email='summary@example.com')
+        self.session = self.chat.create_session(user)
+        self.session.current_agent = 'orchestrator'
+        self.session.save(update_fields=['current_agent'])
+
+    def test_llm_summary_runs_after_the_turn_commits(self):
+        for index in range(6):
+            self.chat._save_message(self.session, f'Реплика {index}', is_from_user=index % 2 == 0)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.chat.send_message(self.session, 'Что дальше?')
+            self.chat.summarizer.refresh.assert_not_called()
+
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        session, dropped = self.chat.summarizer.refresh.call_args.args
+        self.assertIs(session, self.session)
+        self.assertTrue(dropped)
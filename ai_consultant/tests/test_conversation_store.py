@@ -0,0 +1,93 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils import timezone
+
+from ai_consultant.agents.lightweight_agent import LightweightClubCreationAgent
+from ai_consultant.models import ConversationState
+from ai_consultant.services.conversation_store import (
+    COMPRESS_THRESHOLD, ZLIB_MARKER, ConversationConflictError, ConversationStore,
+    DatabaseConversationBackend, decode_state, encode_state,
+)
+
+
+class TestStateCodec(TestCase):
+    def test_round_trip_small_and_compressed(self):
+        small = encode_state('name', {'name': 'Клуб шахмат'})
+        self.assertEqual(decode_state(small), ('name', {'name': 'Клуб шахмат'}))
+
+        history = {'history': ['сообщение пользователя'] * COMPRESS_THRESHOLD}
+        large = encode_state('review', history)
+        self.assertTrue(large.startswith(ZLIB_MARKER))
+        self.assertEqual(decode_state(large), ('review', history))
+
+
+class TestConversationStore(TestCase):
+    def setUp(self):
+        self.store = ConversationStore(DatabaseConversationBackend(), ttl=60)
+
+    def test_missing_state_has_version_zero(self):
+        record = self.store.load('flow', 'session')
+        self.assertFalse(record.exists)
+        self.assertEqual(record.data, {})
+
+    def test_compare_and_set_rejects_stale_version(self):
+        first = self.store.load('flow', 'session')
+        second = self.store.load('flow', 'session')
+
+        first.data = {'step': 1}
+        self.store.save(first)
+        second.data = {'step': 2}
+        with self.assertRaises(ConversationConflictError):
+            self.store.save(second)
+
+        record = self.store.load('flow', 'session')
+        self.assertEqual((record.data, record.version), ({'step': 1}, 1))
+
+    def test_update_retries_on_concurrent_write(self):
+        self.store.update('flow', 'session', lambda r: r.data.update(count=1))
+        calls = []
+
+        def increment(record):
+            calls.append(record.version)
+            if len(calls) == 1:
+                # Другой воркер успевает записать между чтением и записью
+                self.store.update('flow', 'session', lambda r: r.data.update(count=r.data['count'] + 10))
+            record.data['count'] += 1
+
+        record, _ = self.store.update('flow', 'session', increment)
+
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(record.data['count'], 12)
+
+    def test_expired_state_is_not_loaded_and_can_be_recreated(self):
+        self.store.update('flow', 'session', lambda r: r.data.update(step='name'))
+        ConversationState.objects.filter(session_id='flow:session').update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.assertFalse(self.store.load('flow', 'session').exists)
+        record, _ = self.store.update('flow', 'session', lambda r: r.data.update(step='welcome'))
+        self.assertEqual((record.data, record.version), ({'step': 'welcome'}, 1))
+
+    def test_flows_are_isolated_and_delete(self):
+        self.store.update('a', 'session', lambda r: r.data.update(x=1))
+        self.store.update('b', 'session', lambda r: r.data.update(x=2))
+        self.store.delete('a', 'session')
+
+        self.assertFalse(self.store.load('a', 'session').exists)
+        self.assertEqual(self.store.load('b', 'session').data, {'x': 2})
+
+
+class TestLightweightAgentState(TestCase):
+    def test_session_survives_new_agent_instance(self):
+        store = ConversationStore(DatabaseConversationBackend())
+        with patch('ai_consultant.agents.lightweight_agent.get_conversation_store', return_value=store):
+            first = LightweightClubCreationAgent().process_message('Хочу создать клуб шахмат', 'abc')
+            # Следующее сообщение обрабатывает другой экземпляр (другой воркер)
+            second = LightweightClubCreationAgent().process_message('Клуб для любителей шахмат в Алматы', 'abc')
+
+        self.assertEqual(first['progress']['current_stage'], 'idea_discovery')
+        self.assertEqual(second['progress']['current_stage'], 'category_selection')
+        self.assertEqual(store.load(LightweightClubCreationAgent.FLOW, 'abc').stage, 'category_selection')
@@ -0,0 +1,110 @@
+import io
+import json
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+import numpy as np
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from ai_consultant.agents.tools import ToolExecutor
+from ai_consultant.utils import fast_json
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+
+class TestFastJson(SimpleTestCase):
+    PAYLOAD = {
+        'name': 'Шахматы',
+        'id': uuid.UUID(int=1),
+        'price': Decimal('1.50'),
+        'created_at': datetime(2026, 1, 1, 10, 0, 0, 123456, tzinfo=timezone.utc),
+        'scores': np.array([0.5, 1.0], dtype=np.float32),
+        'rank': np.int64(3),
+        1: 'int key',
+    }
+    EXPECTED = {
+        'name': 'Шахматы', 'id': '00000000-0000-0000-0000-000000000001', 'price': '1.50',
+        'created_at': '2026-01-01T10:00:00.123Z', 'scores': [0.5, 1.0], 'rank': 3, '1': 'int key',
+    }
+
+    def test_compact_utf8_with_django_types(self):
+        encoded = fast_json.dumps_bytes(self.PAYLOAD)
+
+        self.assertIn('"name":"Шахматы"'.encode(), encoded)
+        self.assertEqual(json.loads(encoded), self.EXPECTED)
+        self.assertEqual(fast_json.loads(fast_json.dumps(self.PAYLOAD)), self.EXPECTED)
+
+    def test_stdlib_fallback_gives_same_data(self):
+        with patch.object(fast_json, 'ORJSON_AVAILABLE', False):
+            self.assertEqual(json.loads(fast_json.dumps_bytes(self.PAYLOAD)), self.EXPECTED)
+        # Целые больше 64 бит orjson не кодирует — срабатывает стандартный json
+        self.assertEqual(fast_json.dumps({'big': 2 ** 70}), '{"big":%d}' % 2 ** 70)
+
+    def test_sort_keys_and_errors(self):
+        self.assertEqual(fast_json.dumps({'b': 1, 'a': 2}, sort_keys=True), '{"a":2,"b":1}')
+        with self.assertRaises(ValueError):
+            fast_json.loads(b'{"broken"')
+        with self.assertRaises(TypeError):
+            fast_json.dumps({'object': object()})
+
+    def test_fast_json_response(self):
+        response = fast_json.FastJsonResponse({'message': 'Привет'}, status=201)
+
+        self.assertEqual((response.status_code, response['Content-Type']), (201, 'application/json'))
+        self.assertEqual(response.content, '{"message":"Привет"}'.encode())
+        with self.assertRaises(TypeError):
+            fast_json.FastJsonResponse(['list'])
+
+
+class TestDRFRendererAndParser(SimpleTestCase):
+    def test_renderer_matches_json_renderer(self):
+        data = {'results': [{'name': 'Клуб\u2028', 'id': uuid.UUID(int=5), 'count': 3, 'price': Decimal('2.5')}]}
+
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+        self.assertIn(b'\n    ', ORJSONRenderer().render(data, 'application/json; indent=4'))
+
+    def test_parser(self):
+        parser = ORJSONParser()
+
+        self.assertEqual(parser.parse(io.BytesIO('{"q": "шахматы"}'.encode())), {'q': 'шахматы'})
+        self.assertEqual(
+            parser.parse(io.BytesIO('{"q": "шахматы"}'.encode('cp1251')), parser_context={'encoding': 'cp1251'}),
+            {'q': 'шахматы'},
+        )
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'{"q":'))
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'{}'), parser_context={'encoding': 'bz2_codec'})
+
+
+class TestToolExecutorFastPath(SimpleTestCase):
+    def setUp(self):
+        self.service_provider = Mock()
+        self.service_provider.club_management_service.create_post.return_value = {
+            'success': True, 'post_id': uuid.UUID(int=7), 'title': 'Итоги турнира',
+        }
+        self.executor = ToolExecutor(self.service_provider)
+
+    def test_run_returns_structured_result(self):
+        result = self.executor.run('club_specialist', 'create_post', {'club_id': 1, 'title': 'Итоги турнира'}, None)
+
+        self.assertEqual(result['post_id'], uuid.UUID(int=7))
+
+    def test_execute_encodes_compact_json(self):
+        result = self.executor.execute('club_specialist', 'create_post', {}, None)
+
+        self.assertEqual(
+            result, '{"success":true,"post_id":"00000000-0000-0000-0000-000000000007","title":"Итоги турнира"}'
+        )
+
+    def test_unencodable_result_becomes_error_text(self):
+        self.service_provider.club_management_service.create_post.return_value = {'post': object()}
+
+        result = self.executor.execute('club_specialist', 'create_post', {}, None)
+
+        self.assertTrue(result.startswith('Error executing tool create_post'))
@@ -0,0 +1,101 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ai_consultant.models import ChatMessage, ChatSession
+from ai_consultant.services.chat import ChatService
+from ai_consultant.services.history_buffer import HistoryRingBuffer, get_history_buffer
+
+
+@override_settings(AI_HISTORY_BUFFER_SIZE=5)
+class TestHistoryRingBuffer(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.buffer = get_history_buffer()
+        self.session = ChatSession.objects.create()
+        start = timezone.now() - timedelta(hours=1)
+        for index in range(8):
+            message = ChatMessage.objects.create(
+                session=self.session, role='user' if index % 2 == 0 else 'assistant', content=f'msg {index}',
+            )
+            ChatMessage.objects.filter(pk=message.pk).update(created_at=start + timedelta(minutes=index))
+
+    def contents(self, rows):
+        return [row['content'] for row in rows]
+
+    def test_get_history_returns_latest_messages(self):
+        with patch('ai_consultant.services.chat.ChatService.__init__', return_value=None):
+            service = ChatService()
+        service.max_history_length = 50
+
+        history = service.get_history(self.session, limit=3)
+
+        self.assertEqual([row['content'] for row in history], ['msg 5', 'msg 6', 'msg 7'])
+        self.assertEqual([row['is_from_user'] for row in history], [False, True, False])
+
+    def test_append_keeps_cached_buffer_in_sync(self):
+        self.assertEqual(self.contents(self.buffer.recent(self.session)), [f'msg {i}' for i in range(3, 8)])
+
+        ChatMessage.objects.create(session=self.session, role='user', content='msg 8')
+
+        with self.assertNumQueries(0):
+            rows = self.buffer.recent(self.session)
+        self.assertEqual(self.contents(rows), [f'msg {i}' for i in range(4, 9)])
+
+    def test_miss_rebuilds_from_database(self):
+        # Без буфера сообщение не дописывается, а собирается при чтении
+        ChatMessage.objects.create(session=self.session, role='user', content='msg 8')
+        self.assertIsNone(cache.get(self.buffer.key(self.session.id)))
+
+        with self.assertNumQueries(1):
+            rows = self.buffer.recent(self.session, limit=2)
+        self.assertEqual(self.contents(rows), ['msg 7', 'msg 8'])
+
+    def test_invalidate_and_limit_above_buffer(self):
+        self.buffer.recent(self.session)
+        ChatMessage.objects.filter(content='msg 7').delete()
+        self.buffer.invalidate(self.session.id)
+
+        self.assertEqual(self.contents(self.buffer.recent(self.session, limit=2)), ['msg 5', 'msg 6'])
+        self.assertEqual(len(self.buffer.recent(self.session, limit=20)), 7)
+
+    def test_concurrent_append_does_not_lose_messages(self):
+        self.buffer.recent(self.session)
+        read = HistoryRingBuffer._get
+
+        def racing_get(buffer, session_id):
+            entries = read(buffer, session_id)
+            # Другой воркер сохраняет ответ, пока этот дописывает сообщение пользователя
+            if not ChatMessage.objects.filter(content='msg 9').exists():
+                ChatMessage.objects.create(session=self.session, role='assistant', content='msg 9')
+            return entries
+
+        with patch.object(HistoryRingBuffer, '_get', autospec=True, side_effect=racing_get):
+            ChatMessage.objects.create(session=self.session, role='user', content='msg 8')
+
+        self.assertEqual(self.contents(self.buffer.recent(self.session)), [f'msg {i}' for i in range(5, 10)])
+
+    def test_append_during_rebuild_is_not_lost(self):
+        load = HistoryRingBuffer._load
+
+        def racing_load(buffer, session, limit):
+            entries = load(buffer, session, limit)
+            ChatMessage.objects.create(session=self.session, role='user', content='msg 8')
+            return entries
+
+        with patch.object(HistoryRingBuffer, '_load', autospec=True, side_effect=racing_load):
+            self.buffer.recent(self.session)
+
+        self.assertEqual(self.contents(self.buffer.recent(self.session, limit=2)), ['msg 7', 'msg 8'])
+
+    def test_recent_session_does_not_read_archive(self):
+        ChatMessage.objects.filter(content__in=['msg 0', 'msg 1', 'msg 2', 'msg 3']).delete()
+
+        with patch('ai_consultant.services.history_buffer.get_archived_session_messages') as archived:
+            rows = self.buffer.recent(self.session)
+
+        archived.assert_not_called()
+        self.assertEqual(self.contents(rows), [f'msg {i}' for i in range(4, 8)])
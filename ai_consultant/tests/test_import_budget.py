@@ -0,0 +1,59 @@
+import sys
+
+from django.test import SimpleTestCase
+
+from ai_consultant.utils.import_budget import (
+    StartupProfile, check_budget, forbidden_imports, measure_startup, parse_importtime,
+)
+from ai_consultant.utils.lazy_imports import is_available, lazy_import
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      2000 |       2500 | site
+import time:       400 |        400 |     torch._C
+import time:      1000 |       1400 |   torch
+import time:       600 |       2000 | ai_consultant.recommendations
+"""
+
+
+class TestImportTimeParsing(SimpleTestCase):
+    def test_parses_depth_and_top_level_total(self):
+        profile = StartupProfile(parse_importtime(IMPORTTIME_OUTPUT), wall_seconds=0.1)
+
+        depths = {r.module: r.depth for r in profile.records}
+        self.assertEqual(depths, {'_io': 1, 'site': 0, 'torch._C': 2, 'torch': 1, 'ai_consultant.recommendations': 0})
+        self.assertEqual(profile.total_ms, 4.5)
+        self.assertEqual([r.module for r in profile.slowest(1)], ['site'])
+
+    def test_budget_violations(self):
+        profile = StartupProfile(parse_importtime(IMPORTTIME_OUTPUT), wall_seconds=0.1)
+
+        self.assertEqual(forbidden_imports(profile, ['torch', 'sklearn']), ['torch'])
+        self.assertEqual(check_budget(profile, budget_ms=10, forbidden=['sklearn']), [])
+        violations = check_budget(profile, budget_ms=1, forbidden=['torch'])
+        self.assertEqual(len(violations), 2)
+
+
+class TestLazyImport(SimpleTestCase):
+    def test_module_loads_on_first_attribute(self):
+        name = 'xml.dom.minidom'
+        sys.modules.pop(name, None)
+        module = lazy_import(name)
+
+        self.assertFalse(module.is_loaded)
+        self.assertNotIn(name, sys.modules)
+        self.assertTrue(callable(module.parseString))
+        self.assertTrue(module.is_loaded)
+
+    def test_is_available_does_not_import(self):
+        self.assertTrue(is_available('json'))
+        self.assertFalse(is_available('package_that_does_not_exist'))
+
+
+class TestStartupBudget(SimpleTestCase):
+    def test_django_startup_does_not_import_heavy_packages(self):
+        profile = measure_startup()
+
+        self.assertEqual(profile.returncode, 0, profile.stderr_tail)
+        self.assertEqual(forbidden_imports(profile), [])
+        self.assertEqual(check_budget(profile), [])
@@ -0,0 +1,67 @@
+import tempfile
+
+from django.test import TestCase
+
+from ai_consultant.rag.lexical_index import BM25Index, get_lemmatizer, reciprocal_rank_fusion
+
+
+class TestBM25Index(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.index = BM25Index('clubs', directory=self.directory)
+        self.index.add('chess', 'Шахматный клуб «Белая ладья» в Алматы')
+        self.index.add('football', 'Футбольный клуб для детей в Астане')
+        self.index.add('dombra', 'Домбыра үйірмесі Алматыда')
+
+    def test_exact_names_and_inflected_cities_are_found(self):
+        self.assertEqual(self.index.search('ладья')[0][0], 'chess')
+        self.assertEqual(self.index.search('клубы в Астане')[0][0], 'football')
+        hits = [doc_id for doc_id, _ in self.index.search('Алматы')]
+        self.assertEqual(set(hits), {'chess', 'dombra'})
+
+    def test_incremental_updates_are_persisted(self):
+        self.index.remove('chess')
+        self.index.add('football', 'Футбольная секция в Караганде')
+
+        reloaded = BM25Index('clubs', directory=self.directory)
+        self.assertEqual(len(reloaded), 2)
+        self.assertEqual(reloaded.search('ладья'), [])
+        self.assertEqual(reloaded.search('Караганда')[0][0], 'football')
+        self.assertEqual(reloaded.search('Астана'), [])
+
+    def test_deferred_save_writes_once(self):
+        other = BM25Index('faq', directory=self.directory)
+        with other.deferred_save():
+            other.add('q1', 'Как вступить в клуб')
+            self.assertEqual(len(BM25Index('faq', directory=self.directory)), 0)
+        self.assertEqual(len(BM25Index('faq', directory=self.directory)), 1)
+
+    def test_concurrent_writers_merge_instead_of_overwriting(self):
+        # Два воркера с копиями одного файла
+        other = BM25Index('clubs', directory=self.directory)
+        self.index.add('chess_kids', 'Детские шахматы в Караганде')
+        other.add('swimming', 'Плавание в Астане')
+        other.remove('football')
+
+        reloaded = BM25Index('clubs', directory=self.directory)
+        self.assertEqual(set(reloaded.doc_lengths), {'chess', 'dombra', 'chess_kids', 'swimming'})
+
+    def test_deferred_batch_keeps_unsaved_additions(self):
+        other = BM25Index('clubs', directory=self.directory)
+        with self.index.deferred_save():
+            self.index.add('chess_kids', 'Детские шахматы в Караганде')
+            other.add('swimming', 'Плавание в Астане')
+            self.index.add('tennis', 'Теннис в Алматы')
+            self.assertEqual(self.index.search('Караганда')[0][0], 'chess_kids')
+
+        self.assertEqual(len(BM25Index('clubs', directory=self.directory)), 6)
+
+
+class TestFusion(TestCase):
+    def test_rrf_rewards_documents_in_both_rankings(self):
+        fused = reciprocal_rank_fusion([['a', 'b', 'c'], ['c', 'd']], k=60)
+        self.assertEqual(fused[0][0], 'c')
+        self.assertEqual({doc_id for doc_id, _ in fused}, {'a', 'b', 'c', 'd'})
+
+    def test_lemmatizer_drops_stop_words(self):
+        self.assertNotIn('в', get_lemmatizer().tokens('клуб в городе'))
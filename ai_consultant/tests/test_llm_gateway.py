@@ -0,0 +1,132 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import httpx
+import openai
+from django.test import TestCase, override_settings
+
+from ai_consultant.services.llm_gateway import CircuitBreaker, LLMGateway, LLMUnavailableError
+
+REQUEST = httpx.Request('POST', 'http://llm.test/v1/chat/completions')
+
+
+def connection_error():
+    return openai.APIConnectionError(request=REQUEST)
+
+
+def bad_request():
+    return openai.BadRequestError('bad', response=httpx.Response(400, request=REQUEST), body=None)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=self.clock)
+
+    def test_opens_after_threshold_and_probes_after_reset(self):
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow_request())
+
+        self.clock.now = 11
+        self.assertTrue(self.breaker.allow_request())   # пробный запрос
+        self.assertFalse(self.breaker.allow_request())  # остальные ждут результата пробы
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_probe_reopens(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 11
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_released_probe_allows_next_probe(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 11
+        self.assertTrue(self.breaker.allow_request())
+
+        self.breaker.release_probe()
+
+        self.assertTrue(self.breaker.allow_request())
+
+
+@override_settings(
+    OPENAI_API_KEY='sk-test', AI_RETRY_ATTEMPTS=3, AI_RETRY_DELAY=0,
+    AI_CIRCUIT_FAILURE_THRESHOLD=2, AI_LLM_TIMEOUT_BUDGET=5,
+)
+class TestLLMGateway(TestCase):
+    def setUp(self):
+        self.gateway = LLMGateway()
+        self.create = Mock()
+        self.gateway._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=self.create)))
+
+    def test_retries_transient_errors(self):
+        self.create.side_effect = [connection_error(), connection_error(), 'ok']
+
+        self.assertEqual(self.gateway.chat_completion(model='m', messages=[]), 'ok')
+        self.assertEqual(self.create.call_count, 3)
+        self.assertLessEqual(self.create.call_args.kwargs['timeout'], 5)
+
+    def test_does_not_retry_client_errors(self):
+        self.create.side_effect = bad_request()
+
+        with self.assertRaises(openai.BadRequestError):
+            self.gateway.chat_completion(model='m', messages=[])
+        self.assertEqual(self.create.call_count, 1)
+        self.assertEqual(self.gateway.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_open_circuit_fails_fast(self):
+        self.create.side_effect = connection_error()
+        for _ in range(2):
+            with self.assertRaises(openai.APIConnectionError):
+                self.gateway.chat_completion(model='m', messages=[])
+        calls = self.create.call_count
+
+        with self.assertRaises(LLMUnavailableError):
+            self.gateway.chat_completion(model='m', messages=[])
+        self.assertEqual(self.create.call_count, calls)
+
+    def open_breaker(self):
+        clock = FakeClock()
+        self.gateway.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        self.gateway.breaker.record_failure()
+        clock.now = 11  # half_open: следующий запрос — проба
+
+    def test_half_open_probe_timing_out_in_queue_does_not_wedge_breaker(self):
+        self.open_breaker()
+        self.gateway.queue_timeout = 0.01
+        self.gateway._semaphore = threading.BoundedSemaphore(1)
+        self.gateway._semaphore.acquire()
+
+        with self.assertRaises(LLMUnavailableError):
+            self.gateway.chat_completion(model='m', messages=[])
+
+        self.gateway._semaphore.release()
+        self.create.return_value = 'ok'
+        self.assertEqual(self.gateway.chat_completion(model='m', messages=[]), 'ok')
+        self.assertEqual(self.gateway.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_cancelled_async_probe_is_released(self):
+        self.open_breaker()
+        create = AsyncMock(side_effect=asyncio.CancelledError)
+        self.gateway._async_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(self.gateway.achat_completion(model='m', messages=[]))
+
+        self.assertTrue(self.gateway.breaker.allow_request())
@@ -0,0 +1,66 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from ai_consultant.services.llm_providers import StubProvider, get_llm_provider
+from ai_consultant.services.openai_client import OpenAIClientService
+from ai_consultant.utils.llm_stub import LatencyModel, StubScript
+
+SEARCH_TOOL = {
+    'type': 'function',
+    'function': {'name': 'search_clubs', 'parameters': {'type': 'object', 'properties': {}}},
+}
+
+
+class TestStubScript(TestCase):
+    def test_tool_call_only_until_tool_result(self):
+        script = StubScript()
+        params = {'messages': [{'role': 'user', 'content': 'Найди клуб шахмат'}], 'tools': [SEARCH_TOOL]}
+
+        reply = script.respond(params)
+        self.assertEqual(reply['tool_calls'][0]['function']['name'], 'search_clubs')
+        self.assertEqual(reply, script.respond(params))  # детерминированно
+
+        params['messages'].append({'role': 'tool', 'tool_call_id': 'x', 'content': '[]'})
+        self.assertFalse(script.respond(params)['tool_calls'])
+
+    def test_router_requests_get_json(self):
+        reply = StubScript().respond({'messages': [], 'response_format': {'type': 'json_object'}})
+        self.assertIn('"agent"', reply['content'])
+
+    def test_latency_is_reproducible(self):
+        first = LatencyModel('lognormal', 100, 50, seed=1)
+        second = LatencyModel('lognormal', 100, 50, seed=1)
+        self.assertEqual([first.sample() for _ in range(5)], [second.sample() for _ in range(5)])
+
+
+@override_settings(AI_LLM_PROVIDER='stub', AI_STUB_LATENCY_MS=0)
+class TestOpenAIClientServiceWithStub(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.service = OpenAIClientService()
+
+    def test_provider_selected_from_settings(self):
+        self.assertIsInstance(get_llm_provider(), StubProvider)
+        self.assertEqual(self.service.get_usage_stats()['provider'], 'stub')
+
+    def test_text_completion(self):
+        result = self.service.chat_completion([{'role': 'user', 'content': 'Привет'}])
+
+        self.assertTrue(result['success'])
+        self.assertIn('Привет', result['content'])
+        self.assertGreater(result['tokens_used'], 0)
+
+    def test_tool_call_completion(self):
+        result = self.service.chat_completion(
+            [{'role': 'user', 'content': 'Подбери клуб по шахматам'}], tools=[SEARCH_TOOL], tool_choice='auto'
+        )
+        self.assertEqual(result['tool_calls'][0]['function']['name'], 'search_clubs')
+
+    def test_stream(self):
+        chunks = list(self.service.chat_completion_stream([{'role': 'user', 'content': 'Привет'}]))
+        self.assertGreater(len(chunks), 1)
+        self.assertIn('Привет', ''.join(chunks))
+
+    async def test_async_completion(self):
+        result = await self.service.achat_completion([{'role': 'user', 'content': 'Как дела?'}])
+        self.assertTrue(result['success'])
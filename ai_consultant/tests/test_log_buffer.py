@@ -0,0 +1,54 @@
+import queue
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from agents.models import AgentLog
+from ai_consultant.models import AISessionLog
+from ai_consultant.utils.log_buffer import BufferedLogWriter
+
+
+class TestBufferedLogWriter(TestCase):
+    """Запись проверяется без фонового потока: очередь и пачки разбираются напрямую"""
+
+    def make_writer(self, max_size=10):
+        writer = BufferedLogWriter(max_size=max_size, batch_size=100, flush_interval_ms=10)
+
+        def start_without_thread():
+            if writer._queue is None:
+                writer._queue = queue.Queue(maxsize=writer.max_size)
+        patcher = patch.object(writer, '_ensure_started', side_effect=start_without_thread)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return writer
+
+    @override_settings(AI_LOG_BUFFER_ENABLED=False)
+    def test_disabled_buffer_writes_synchronously(self):
+        BufferedLogWriter().add(AgentLog(agent_name='router', action='route'))
+        self.assertEqual(AgentLog.objects.count(), 1)
+
+    def test_batch_is_bulk_inserted_per_model(self):
+        writer = self.make_writer()
+        for i in range(3):
+            writer.add(AgentLog(agent_name='router', action=f'route-{i}'))
+        writer.add(AISessionLog(session_id='s1', log_type='user_input', message='Привет'))
+        self.assertFalse(AgentLog.objects.exists())
+
+        batch = writer._collect()
+        self.assertEqual(len(batch), 4)
+        with self.assertNumQueries(2):
+            writer._write(batch)
+
+        self.assertEqual(AgentLog.objects.count(), 3)
+        self.assertEqual(AISessionLog.objects.get().message, 'Привет')
+        self.assertEqual(writer.stats['written'], 4)
+        self.assertEqual(writer._pending, 0)
+
+    def test_full_queue_falls_back_to_sync_write(self):
+        writer = self.make_writer(max_size=1)
+        writer.add(AgentLog(agent_name='router', action='queued'))
+        writer.add(AgentLog(agent_name='router', action='overflow'))
+
+        self.assertEqual(list(AgentLog.objects.values_list('action', flat=True)), ['overflow'])
+        self.assertEqual(writer.stats['sync_fallback'], 1)
+        self.assertEqual(writer._pending, 1)
@@ -0,0 +1,73 @@
+import tempfile
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ai_consultant.models import AISessionLog, ChatMessage, ChatSession
+from ai_consultant.services.chat import ChatService
+from ai_consultant.utils.log_storage import (
+    LogArchive,
+    add_months,
+    archive_old_logs,
+    get_archived_session_messages,
+    month_bounds,
+    month_start,
+)
+
+
+class TestMonths(TestCase):
+    def test_add_months_crosses_year(self):
+        self.assertEqual(add_months(date(2025, 11, 1), 3), date(2026, 2, 1))
+        self.assertEqual(add_months(date(2025, 1, 1), -1), date(2024, 12, 1))
+
+
+class TestLogArchive(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings_override = override_settings(AI_LOG_ARCHIVE_DIR=self.directory)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.old_month = add_months(month_start(timezone.now()), -8)
+        old_at = month_bounds(self.old_month)[0] + timedelta(days=3)
+
+        self.session = ChatSession.objects.create()
+        ChatSession.objects.filter(pk=self.session.pk).update(created_at=old_at)
+        self.session.refresh_from_db()
+        for offset, (role, content) in enumerate([('user', 'Привет'), ('assistant', 'Здравствуйте!')]):
+            message = ChatMessage.objects.create(session=self.session, role=role, content=content)
+            ChatMessage.objects.filter(pk=message.pk).update(created_at=old_at + timedelta(seconds=offset))
+        ChatMessage.objects.create(session=self.session, role='user', content='Я вернулся')
+
+        log = AISessionLog.objects.create(session_id=str(self.session.id), log_type='user_input', message='Привет')
+        AISessionLog.objects.filter(pk=log.pk).update(created_at=old_at)
+
+    def test_old_months_move_to_archive(self):
+        results = archive_old_logs(add_months(month_start(timezone.now()), -6))
+
+        archived = {(r['table'], r['month']): r['rows'] for r in results}
+        self.assertEqual(archived[('chat_messages', self.old_month.isoformat())], 2)
+        self.assertEqual(archived[('ai_session_logs', self.old_month.isoformat())], 1)
+        self.assertEqual(ChatMessage.objects.count(), 1)
+        self.assertFalse(AISessionLog.objects.exists())
+        self.assertEqual(LogArchive().archived_months('chat_messages'), [self.old_month])
+
+    def test_dry_run_keeps_rows(self):
+        archive_old_logs(add_months(month_start(timezone.now()), -6), dry_run=True)
+        self.assertEqual(ChatMessage.objects.count(), 3)
+
+    def test_cold_read_session_history(self):
+        archive_old_logs(add_months(month_start(timezone.now()), -6))
+        self.session.refresh_from_db()
+
+        archived = get_archived_session_messages(self.session)
+        self.assertEqual([row['content'] for row in archived], ['Привет', 'Здравствуйте!'])
+
+        with patch('ai_consultant.services.chat.ChatService.__init__', return_value=None):
+            service = ChatService()
+        service.max_history_length = 50
+        history = service.get_history(self.session)
+        self.assertEqual([m['content'] for m in history], ['Привет', 'Здравствуйте!', 'Я вернулся'])
+        self.assertTrue(history[0]['is_from_user'])
@@ -0,0 +1,56 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from ai_consultant.services.message_analysis import MessageAnalysis, cyrillic_ratio
+from ai_consultant.services.message_processor import MessageProcessorService
+from ai_consultant.utils.context_analyzer import ContextAnalyzer
+
+
+class TestMessageAnalysis(SimpleTestCase):
+    MESSAGE = 'Привет!  Хочу создать клуб шахмат, как это сделать?'
+
+    def test_fields_are_computed_from_the_sanitized_text(self):
+        analysis = MessageAnalysis.for_turn(self.MESSAGE, MessageProcessorService())
+
+        self.assertEqual(analysis.sanitized, 'Привет! Хочу создать клуб шахмат, как это сделать?')
+        self.assertEqual(analysis.lower, 'привет! хочу создать клуб шахмат, как это сделать?')
+        self.assertEqual(analysis.intents, ['question', 'club_creation', 'greeting'])
+        self.assertEqual(analysis.primary_intent, 'greeting')
+        self.assertEqual(analysis.context['intent'], 'club_creation')
+
+    def test_turn_analysis_is_shared_by_text(self):
+        analysis = MessageAnalysis.for_turn(self.MESSAGE, MessageProcessorService())
+
+        self.assertIs(MessageAnalysis.of(self.MESSAGE), analysis)
+        self.assertIs(MessageAnalysis.of(analysis.sanitized), analysis)
+
+    def test_context_analysis_runs_once_per_turn(self):
+        analysis = MessageAnalysis('Где найти книжный клуб?')
+        with patch.object(ContextAnalyzer, 'analyze_message', return_value={'entities': []}) as analyze:
+            analysis.context
+            analysis.entities
+            analysis.context
+
+        analyze.assert_called_once()
+
+    def test_keywords_skip_stop_words(self):
+        with patch('ai_consultant.services.message_analysis.get_stop_words', return_value=frozenset({'как', 'это'})):
+            keywords = MessageAnalysis('клуб клуб шахмат как это').keywords
+
+        self.assertEqual(keywords, ['клуб', 'шахмат'])
+
+    def test_detect_intent_reuses_analysis(self):
+        analysis = MessageAnalysis('Спасибо, до свидания')
+        analysis.intents
+
+        with patch('ai_consultant.services.message_processor.text_matcher') as matcher:
+            result = MessageProcessorService().detect_intent(analysis.text, analysis)
+
+        matcher.scan.assert_not_called()
+        self.assertEqual(result['primary_intent'], 'farewell')
+        self.assertEqual(result['sentiment'], 'positive')
+
+    def test_cyrillic_ratio(self):
+        self.assertIsNone(cyrillic_ratio('  '))
+        self.assertEqual(cyrillic_ratio('ab вг'), 0.5)
@@ -0,0 +1,54 @@
+import time
+
+import numpy as np
+from django.test import TestCase
+
+from ai_consultant.rag.ranking import (
+    document_features,
+    merge_candidates,
+    mmr_select,
+    score_candidates,
+)
+
+
+def candidate(doc_id, text, distance=0.5, **metadata):
+    return {'id': doc_id, 'text': text, 'distance': distance, 'metadata': metadata}
+
+
+class TestScoreCandidates(TestCase):
+    def test_features_precomputed_at_index_time(self):
+        features = document_features('Шахматный клуб в Алматы ' * 10, {'city': 'Алматы', 'category': 'Спорт'})
+
+        self.assertEqual(features['rank_length_bucket'], 1)
+        self.assertEqual(features['rank_tokens'], 'алматы спорт')
+        self.assertEqual(features['rank_terms'].split()[:2], ['шахматный', 'клуб'])
+
+    def test_scores_match_former_weights(self):
+        now = time.time()
+        text = 'Шахматный клуб для начинающих, занятия по выходным в центре города'
+        fresh = candidate('a', text, 0.2, **document_features(text, {'city': 'Алматы'}))
+        old = candidate('b', text, 0.2, created_at='2000-01-01T00:00:00')
+
+        scores = score_candidates([fresh, old], 'шахматный клуб', {'city': 'Алматы', 'interests': ['шахматы']}, now=now)
+
+        # сходство 0.32 + свежесть 0.2 + совпадение запроса 0.15; город только у первого
+        self.assertAlmostEqual(scores[0], 0.32 + 0.2 + 0.15 + 0.15, places=3)
+        self.assertAlmostEqual(scores[1], 0.32 + 0.15, places=3)
+
+    def test_merge_keeps_closest_hit_per_document(self):
+        text = 'Клуб любителей настольных игр'
+        merged = merge_candidates([candidate('a', text, 0.6), candidate('a', text, 0.3), candidate('b', 'коротко')])
+
+        self.assertEqual([(c['id'], c['distance']) for c in merged], [('a', 0.3)])
+
+
+class TestMMR(TestCase):
+    def test_near_duplicates_are_dropped_and_diversity_preferred(self):
+        embeddings = np.array([[1.0, 0.0, 0.0], [0.999, 0.01, 0.0], [0.9, 0.43, 0.0], [0.0, 0.0, 1.0]])
+        relevance = np.array([1.0, 0.99, 0.9, 0.6])
+
+        order = mmr_select(embeddings, relevance, k=4, lambda_=0.5, duplicate_threshold=0.95)
+
+        self.assertEqual(order[0], 0)
+        self.assertNotIn(1, order)
+        self.assertEqual(order[1], 3)
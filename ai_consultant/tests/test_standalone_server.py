@@ -0,0 +1,107 @@
+import asyncio
+import http.client
+import json
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from ai_consultant.agents.lightweight_production_agent import get_ai_response
+from standalone_ai_server import AIServer
+
+
+class ServerThread:
+    """AIServer в собственном event loop фонового потока"""
+
+    def __init__(self, **options):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.server = self.call(AIServer('127.0.0.1', 0, access_log=False, **options).start())
+
+    def call(self, coroutine, timeout=10):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def connection(self):
+        return http.client.HTTPConnection('127.0.0.1', self.server.port, timeout=10)
+
+    def stop(self):
+        if not self.server.draining:
+            self.call(self.server.shutdown())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+
+
+def post(connection, payload, path='/api/v1/ai/production/agent/'):
+    connection.request('POST', path, body=json.dumps(payload), headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    return response, json.loads(response.read())
+
+
+def slow_agent(delay):
+    def agent(message, session_id):
+        time.sleep(delay)
+        return {'response': message, 'state': 'done'}
+    return agent
+
+
+class TestStandaloneServer(SimpleTestCase):
+    def test_keep_alive_and_health(self):
+        server = ServerThread(agent=get_ai_response)
+        self.addCleanup(server.stop)
+        connection = server.connection()
+
+        for _ in range(3):
+            response, data = post(connection, {'message': 'Привет', 'session_id': 'keep-alive'}, path='/api/agent')
+            self.assertEqual(response.status, 200)
+            self.assertEqual(response.getheader('Connection'), 'keep-alive')
+        connection.request('GET', '/health/')
+        health = json.loads(connection.getresponse().read())
+
+        self.assertEqual(health['connections'], 1)
+        self.assertEqual((health['served'], health['queue_depth']), (3, 0))
+
+    def test_request_limits(self):
+        server = ServerThread(agent=slow_agent(0), max_body_bytes=100)
+        self.addCleanup(server.stop)
+
+        response, data = post(server.connection(), {'message': 'x' * 200})
+        self.assertEqual(response.status, 413)
+        response, data = post(server.connection(), {'message': ' '})
+        self.assertEqual((response.status, data['error']), (400, 'Message is required'))
+
+    def test_rejects_when_queue_is_full(self):
+        server = ServerThread(agent=slow_agent(0.5), workers=1, max_queue=0)
+        self.addCleanup(server.stop)
+        first = threading.Thread(target=post, args=(server.connection(), {'message': 'первый'}))
+        first.start()
+        time.sleep(0.2)
+
+        response, data = post(server.connection(), {'message': 'второй'})
+        first.join()
+
+        self.assertEqual(response.status, 503)
+        self.assertEqual(response.getheader('Retry-After'), '1')
+
+    def test_shutdown_drains_in_flight_requests(self):
+        server = ServerThread(agent=slow_agent(0.5))
+        results = []
+        worker = threading.Thread(target=lambda: results.append(post(server.connection(), {'message': 'долгий'})))
+        worker.start()
+        time.sleep(0.2)
+
+        server.call(server.server.shutdown())
+        worker.join()
+        server.stop()
+
+        response, data = results[0]
+        self.assertEqual((response.status, data['response']), (200, 'долгий'))
+        self.assertEqual(response.getheader('Connection'), 'close')
+        with self.assertRaises(ConnectionError):
+            server.connection().request('GET', '/health/')
+
+
+class TestProductionAgentSessions(SimpleTestCase):
+    def test_sessions_do_not_share_dialog_state(self):
+        self.assertEqual(get_ai_response('Привет', 'session-a')['state'], 'club_type')
+        self.assertEqual(get_ai_response('Привет', 'session-b')['state'], 'club_type')
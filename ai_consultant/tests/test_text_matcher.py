@@ -0,0 +1,75 @@
+from django.test import SimpleTestCase
+
+from ai_consultant.management.commands.benchmark_text_matcher import legacy_scan, matcher_scan
+from ai_consultant.security import SecurityValidator
+from ai_consultant.utils.context_analyzer import ContextAnalyzer
+from ai_consultant.utils.text_matcher import TextMatcher
+
+
+class TestTextMatcher(SimpleTestCase):
+    def setUp(self):
+        self.matcher = TextMatcher()
+        self.matcher.register_phrases('intent', {
+            'create': ['создать', 'создать клуб', 'клуб'],
+            'help': ['помощь'],
+        })
+        self.matcher.register_phrases('sentiment', {'positive': ['класс']}, whole_word=True)
+        self.matcher.register_regex('spam', {'link': [r'(?i)free\s+money']})
+
+    def test_overlapping_matches_with_offsets(self):
+        scan = self.matcher.scan('Хочу СОЗДАТЬ КЛУБ и помощь')
+
+        spans = [(m.pattern, m.start, m.end, m.text) for m in scan.group('intent')]
+        self.assertEqual(spans, [
+            ('создать клуб', 5, 17, 'СОЗДАТЬ КЛУБ'),
+            ('создать', 5, 12, 'СОЗДАТЬ'),
+            ('клуб', 13, 17, 'КЛУБ'),
+            ('помощь', 20, 26, 'помощь'),
+        ])
+        self.assertEqual(scan.counts('intent'), {'create': 3, 'help': 1})
+
+    def test_whole_word_and_regex_groups(self):
+        self.assertTrue(self.matcher.scan('это класс').has('sentiment', 'positive'))
+        self.assertFalse(self.matcher.scan('классный клуб').has('sentiment'))
+
+        scan = self.matcher.scan('get FREE  money now')
+        self.assertEqual([(m.label, m.text) for m in scan.group('spam')], [('link', 'FREE  money')])
+
+    def test_scan_survives_registration_between_compile_and_scan(self):
+        scan = self.matcher.compile()[4]
+        self.matcher.register_phrases('event', {'festival': ['фестиваль']})  # сбрасывает автомат
+
+        self.assertTrue(scan('создать клуб').has('intent', 'create'))
+        self.assertTrue(self.matcher.scan('фестиваль', use_cache=False).has('event'))
+
+    def test_registration_after_compile_recompiles(self):
+        self.matcher.scan('клуб')
+        self.matcher.register_phrases('event', {'festival': ['фестиваль']})
+
+        self.assertTrue(self.matcher.scan('фестиваль клуба').has('event', 'festival'))
+
+
+class TestMatcherConsumers(SimpleTestCase):
+    MESSAGES = [
+        'Хочу создать клуб, как создать спортивный клуб завтра? Срочно, не работает!',
+        'Спасибо, отлично! Посоветуй интересные мероприятия в нашем городе',
+        'Где найти книжный клуб? Расскажи, что такое фестиваль',
+        'click здесь: http://spam.example https://a.b http://c.d',
+        'классный клуб, хорошо',
+    ]
+
+    def test_same_results_as_per_pattern_loops(self):
+        for message in self.MESSAGES:
+            with self.subTest(message=message):
+                self.assertEqual(matcher_scan(message), legacy_scan(message))
+
+    def test_context_analyzer(self):
+        analysis = ContextAnalyzer().analyze_message(self.MESSAGES[0])
+
+        self.assertEqual(analysis['intent'], 'club_creation')
+        self.assertEqual(analysis['urgency'], 'high')
+        self.assertEqual([e['value'] for e in analysis['entities']], ['спортивный клуб', 'завтра'])
+
+    def test_security_validator(self):
+        self.assertEqual(SecurityValidator.validate_content('Клуб шахмат'), (True, ''))
+        self.assertFalse(SecurityValidator.validate_content('click здесь')[0])
@@ -28,6 +28,20 @@ class TestToolExecutor(TestCase):
         self.service_provider.get_clubs_by_interest_keywords.assert_called_with('chess', 5)
         self.assertEqual(result, "Formatted Club List")
 
+    def test_club_search_ranks_by_city_distance(self):
+        from clubs.geo import Point
+        from clubs.models import City
+
+        City.objects.create(name='Алматы', iata_code='ALA', latitude=43.238, longitude=76.945)
+        self.service_provider.get_clubs_by_interest_keywords.return_value = {'success': True, 'message': '', 'clubs': []}
+        self.service_provider.format_club_recommendations.return_value = "Formatted Club List"
+
+        self.executor.execute('club_specialist', 'search_clubs', {'query': 'chess', 'city': 'алматы'}, self.user)
+
+        self.service_provider.get_clubs_by_interest_keywords.assert_called_with(
+            'chess', 5, near=Point(43.238, 76.945)
+        )
+
     def test_execute_support_status(self):
         # Mock platform service
         self.service_provider.platform_service_manager.get_status.return_value = {'status': 'ok'}
@@ -39,7 +53,7 @@ class TestToolExecutor(TestCase):
             self.user
         )
         
-        self.assertEqual(result, '{"status": "ok"}')
+        self.assertEqual(result, '{"status":"ok"}')
 
     def test_execute_mentor_recommendations(self):
         # Mock development service
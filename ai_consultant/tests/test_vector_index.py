@@ -0,0 +1,83 @@
+import os
+import tempfile
+import threading
+
+import numpy as np
+from django.test import TestCase
+
+from ai_consultant.rag.vector_index import LocalVectorClient, benchmark_ann
+
+
+class TestLocalVectorCollection(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.collection = LocalVectorClient(self.path, ann_method='exact').get_or_create_collection('clubs')
+        self.collection.add(
+            ids=['chess', 'go', 'football'],
+            embeddings=[[1.0, 0.0, 0.0], [0.9, 0.1, 0.0], [0.0, 0.0, 1.0]],
+            documents=['Шахматы', 'Го', 'Футбол'],
+            metadatas=[{'city': 'Алматы'}, {'city': 'Астана'}, {'city': 'Алматы'}],
+        )
+
+    def test_query_returns_chroma_shaped_results(self):
+        result = self.collection.query(query_embeddings=[[1.0, 0.05, 0.0]], n_results=2)
+
+        self.assertEqual(result['ids'], [['chess', 'go']])
+        self.assertEqual(result['documents'][0][0], 'Шахматы')
+        self.assertLess(result['distances'][0][0], result['distances'][0][1])
+        self.assertIsNone(result['embeddings'])
+
+        filtered = self.collection.query(query_embeddings=[[1.0, 0.0, 0.0]], n_results=5, where={'city': 'Алматы'})
+        self.assertEqual(filtered['ids'], [['chess', 'football']])
+
+    def test_other_workers_see_swapped_generation(self):
+        reader = LocalVectorClient(self.path, ann_method='exact').get_or_create_collection('clubs')
+        self.assertEqual(reader.count(), 3)
+
+        self.collection.delete(ids=['go'])
+        self.collection.upsert(ids=['chess'], embeddings=[[0.0, 1.0, 0.0]], documents=['Шахматы 2'])
+
+        self.assertEqual(reader.count(), 2)
+        self.assertEqual(reader.get(ids=['chess'])['documents'], ['Шахматы 2'])
+        generations = [d for d in os.listdir(os.path.join(self.path, 'clubs')) if d.startswith('gen-')]
+        self.assertEqual(len(generations), 2)
+
+    def test_deferred_write_publishes_one_generation(self):
+        with self.collection.deferred_write():
+            self.collection.delete()
+            for i in range(5):
+                self.collection.add(ids=[f'c{i}'], embeddings=[[1.0, i, 0.0]])
+            self.assertEqual(self.collection.count(), 3)
+        self.assertEqual(self.collection.count(), 5)
+
+    def test_readers_do_not_wait_for_a_deferred_write(self):
+        batch_open, finish_batch = threading.Event(), threading.Event()
+
+        def writer():
+            with self.collection.deferred_write():
+                self.collection.add(ids=['tennis'], embeddings=[[0.0, 1.0, 0.0]])
+                batch_open.set()
+                finish_batch.wait(5)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            self.assertTrue(batch_open.wait(5))
+            # Тот же процесс, пока писатель держит блокировку: читается текущее поколение
+            result = self.collection.query(query_embeddings=[[1.0, 0.0, 0.0]], n_results=1)
+            self.assertEqual(result['ids'], [['chess']])
+            self.assertEqual(self.collection.count(), 3)
+        finally:
+            finish_batch.set()
+            thread.join()
+        self.assertEqual(self.collection.count(), 4)
+
+
+class TestBenchmark(TestCase):
+    def test_exact_search_has_full_recall(self):
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(200, 16))
+        report = benchmark_ann(vectors, vectors[:20], k=5, methods=['exact'])
+
+        self.assertEqual(report[0]['recall_at_k'], 1.0)
+        self.assertGreaterEqual(report[0]['p99_ms'], report[0]['p50_ms'])
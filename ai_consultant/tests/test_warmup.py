@@ -0,0 +1,60 @@
+from unittest.mock import patch
+
+from django.test import RequestFactory, TestCase, override_settings
+
+from ai_consultant.utils.warmup import STATE_COLD, WarmupRegistry, warmup_registry
+from core.urls_health import readiness_check
+
+
+class TestWarmupRegistry(TestCase):
+    def setUp(self):
+        self.registry = WarmupRegistry()
+        self.loaded = []
+
+        @self.registry.register('model')
+        def load_model():
+            self.loaded.append('model')
+
+        @self.registry.register('sentiment', critical=False)
+        def load_sentiment():
+            raise ImportError('transformers is not installed')
+
+    def test_warm_up_reports_each_resource_once(self):
+        report = self.registry.warm_up()
+        self.registry.warm_up()
+
+        self.assertEqual(self.loaded, ['model'])
+        self.assertEqual(report['state'], 'ready')
+        statuses = {r['name']: r['status'] for r in report['resources']}
+        self.assertEqual(statuses, {'model': 'loaded', 'sentiment': 'failed'})
+        self.assertIn('transformers', report['resources'][1]['error'])
+
+    def test_critical_failure_degrades(self):
+        @self.registry.register('index')
+        def load_index():
+            raise RuntimeError('no index')
+
+        self.assertEqual(self.registry.warm_up()['state'], 'degraded')
+        self.assertTrue(self.registry.is_ready())
+
+    @override_settings(AI_WARMUP_RESOURCES=['model'])
+    def test_resources_can_be_selected(self):
+        report = self.registry.warm_up()
+        self.assertEqual([r['name'] for r in report['resources']], ['model'])
+
+
+class TestReadinessEndpoint(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/health/ready/')
+
+    @override_settings(AI_WARMUP_ENABLED=True)
+    def test_cold_worker_is_not_ready(self):
+        with patch.object(warmup_registry, 'state', STATE_COLD):
+            response = readiness_check(self.request)
+        self.assertEqual(response.status_code, 503)
+        self.assertIn(b'"state": "cold"', response.content)
+
+    @override_settings(AI_WARMUP_ENABLED=False)
+    def test_ready_without_warmup(self):
+        with patch.object(warmup_registry, 'state', STATE_COLD):
+            self.assertEqual(readiness_check(self.request).status_code, 200)
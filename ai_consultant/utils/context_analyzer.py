@@ -5,29 +5,122 @@
 
 import re
 import logging
+import threading
 from typing import Dict, List, Any, Tuple
 from collections import Counter
+
+from .lazy_imports import is_available
+from .text_matcher import text_matcher
+
 logger = logging.getLogger(__name__)
 
-try:
-    import spacy
-    SPACY_AVAILABLE = True
+SPACY_AVAILABLE = is_available('spacy')
+_nlp = None
+_nlp_loaded = False
+
+
+def get_nlp():
+    """Модель spaCy загружается при первом анализе, а не при импорте модуля"""
+    global _nlp, _nlp_loaded, SPACY_AVAILABLE
+    if _nlp_loaded:
+        return _nlp
+    _nlp_loaded = True
+    if not SPACY_AVAILABLE:
+        logger.warning("⚠️ spaCy недоступен, используется базовый анализ")
+        return None
     try:
-        nlp = spacy.load("ru_core_news_sm")
+        import spacy
+    except (ImportError, OSError):
+        SPACY_AVAILABLE = False
+        logger.warning("⚠️ spaCy недоступен, используется базовый анализ")
+        return None
+    try:
+        _nlp = spacy.load("ru_core_news_sm")
     except OSError:
         # Если русская модель не найдена, попробуем английскую
         try:
-            nlp = spacy.load("en_core_web_sm")
+            _nlp = spacy.load("en_core_web_sm")
         except OSError:
             # Если и английская не найдена, отключим spacy
-            nlp = None
             SPACY_AVAILABLE = False
             logger.warning("⚠️ spaCy модели не найдены, используется базовый анализ")
-except (ImportError, OSError):
-    spacy = None
-    nlp = None
-    SPACY_AVAILABLE = False
-    logger.warning("⚠️ spaCy недоступен, используется базовый анализ")
+    return _nlp
+
+
+# Паттерны для интентов
+INTENT_PATTERNS = {
+    'club_creation': [
+        r'создать клуб', r'как создать', r'зарегистрировать клуб',
+        r'основать клуб', r'открыть клуб', r'новый клуб'
+    ],
+    'club_joining': [
+        r'вступить в клуб', r'присоединиться', r'как вступить',
+        r'участие в клубе', r'стать участником'
+    ],
+    'event_creation': [
+        r'создать мероприятие', r'организовать событие',
+        r'провести фестиваль', r'новое мероприятие'
+    ],
+    'technical_help': [
+        r'не работает', r'ошибка', r'проблема', r'баг',
+        r'помощь', r'поддержка', r'технический вопрос'
+    ],
+    'information_request': [
+        r'что такое', r'расскажи о', r'информация о',
+        r'как работает', r'для чего нужен'
+    ],
+    'recommendation': [
+        r'посоветуй', r'рекомендуй', r'какой выбрать',
+        r'лучший клуб', r'интересные мероприятия'
+    ]
+}
+
+# Сущности и ключевые слова
+ENTITY_PATTERNS = {
+    'club_type': [
+        r'спортивный клуб', r'музыкальный клуб', r'книжный клуб',
+        r'ит клуб', r'танцевальный клуб', r'художественный клуб'
+    ],
+    'event_type': [
+        r'фестиваль', r'конференция', r'семинар', r'воркшоп',
+        r'соревнование', r'концерт', r'выставка'
+    ],
+    'time_period': [
+        r'завтра', r'сегодня', r'на следующей неделе', r'в этом месяце',
+        r'скоро', r'близко'
+    ],
+    'location': [
+        r'в нашем городе', r'онлайн', r'офлайн', r'в центре',
+        r'в университете'
+    ]
+}
+
+# Sentiment словарь (упрощенный)
+POSITIVE_WORDS = [
+    'отлично', 'хорошо', 'здорово', 'супер', 'класс', 'замечательно',
+    'спасибо', 'благодарю', 'удобно', 'понравилось'
+]
+
+NEGATIVE_WORDS = [
+    'плохо', 'ужасно', 'отвратительно', 'проблема', 'ошибка',
+    'неудобно', 'сложно', 'непонятно', 'не работает', 'бесполезно'
+]
+
+URGENCY_PATTERNS = {
+    'urgent': [
+        r'срочно', r'немедленно', r'пожалуйста помогите', r'проблема',
+        r'не работает', r'ошибка', r'urgent', r'asap', r'immediately'
+    ]
+}
+
+# Все словари анализатора проверяются одним проходом общего автомата
+text_matcher.register_phrases('context.intent', INTENT_PATTERNS)
+text_matcher.register_phrases('context.entity', ENTITY_PATTERNS)
+text_matcher.register_phrases('context.sentiment', {
+    'positive': POSITIVE_WORDS,
+    'negative': NEGATIVE_WORDS,
+}, whole_word=True)
+text_matcher.register_phrases('context.urgency', URGENCY_PATTERNS)
 
 
 class ContextAnalyzer:
@@ -36,64 +129,11 @@ class ContextAnalyzer:
     """
 
     def __init__(self):
-        # Паттерны для интентов
-        self.intent_patterns = {
-            'club_creation': [
-                r'создать клуб', r'как создать', r'зарегистрировать клуб',
-                r'основать клуб', r'открыть клуб', r'новый клуб'
-            ],
-            'club_joining': [
-                r'вступить в клуб', r'присоединиться', r'как вступить',
-                r'участие в клубе', r'стать участником'
-            ],
-            'event_creation': [
-                r'создать мероприятие', r'организовать событие',
-                r'провести фестиваль', r'новое мероприятие'
-            ],
-            'technical_help': [
-                r'не работает', r'ошибка', r'проблема', r'баг',
-                r'помощь', r'поддержка', r'технический вопрос'
-            ],
-            'information_request': [
-                r'что такое', r'расскажи о', r'информация о',
-                r'как работает', r'для чего нужен'
-            ],
-            'recommendation': [
-                r'посоветуй', r'рекомендуй', r'какой выбрать',
-                r'лучший клуб', r'интересные мероприятия'
-            ]
-        }
-
-        # Сущности и ключевые слова
-        self.entity_patterns = {
-            'club_type': [
-                r'спортивный клуб', r'музыкальный клуб', r'книжный клуб',
-                r'ит клуб', r'танцевальный клуб', r'художественный клуб'
-            ],
-            'event_type': [
-                r'фестиваль', r'конференция', r'семинар', r'воркшоп',
-                r'соревнование', r'концерт', r'выставка'
-            ],
-            'time_period': [
-                r'завтра', r'сегодня', r'на следующей неделе', r'в этом месяце',
-                r'скоро', r'близко'
-            ],
-            'location': [
-                r'в нашем городе', r'онлайн', r'офлайн', r'в центре',
-                r'в университете'
-            ]
-        }
-
-        # Sentiment словарь (упрощенный)
-        self.positive_words = [
-            'отлично', 'хорошо', 'здорово', 'супер', 'класс', 'замечательно',
-            'спасибо', 'благодарю', 'удобно', 'понравилось'
-        ]
-
-        self.negative_words = [
-            'плохо', 'ужасно', 'отвратительно', 'проблема', 'ошибка',
-            'неудобно', 'сложно', 'непонятно', 'не работает', 'бесполезно'
-        ]
+        self.intent_patterns = INTENT_PATTERNS
+        self.entity_patterns = ENTITY_PATTERNS
+        self.positive_words = POSITIVE_WORDS
+        self.negative_words = NEGATIVE_WORDS
+        self.matcher = text_matcher
 
     def analyze_message(self, text: str) -> Dict[str, Any]:
         """
@@ -160,21 +200,15 @@ class ContextAnalyzer:
         """Определение основного интента сообщения"""
         intent_scores = {}
 
-        # Проверка каждого паттерна интента
-        for intent, patterns in self.intent_patterns.items():
-            score = 0
-            matched_patterns = []
-
-            for pattern in patterns:
-                matches = len(re.findall(pattern, text, re.IGNORECASE))
-                if matches > 0:
-                    score += matches
-                    matched_patterns.append(pattern)
-
+        # Все паттерны интентов — из одного прохода автомата
+        scan = self.matcher.scan(text)
+        counts = scan.counts('context.intent')
+        for intent in self.intent_patterns:
+            score = counts[intent]
             if score > 0:
                 intent_scores[intent] = {
                     'score': score,
-                    'patterns': matched_patterns
+                    'patterns': scan.patterns('context.intent', intent)
                 }
 
         # Выбор лучшего интента
@@ -198,20 +232,18 @@ class ContextAnalyzer:
         entities = []
 
         # Поиск по паттернам
-        for entity_type, patterns in self.entity_patterns.items():
-            for pattern in patterns:
-                matches = re.finditer(pattern, text, re.IGNORECASE)
-                for match in matches:
-                    entities.append({
-                        'type': entity_type,
-                        'value': match.group(),
-                        'start': match.start(),
-                        'end': match.end(),
-                        'confidence': 0.8
-                    })
+        for match in self.matcher.scan(text).group('context.entity'):
+            entities.append({
+                'type': match.label,
+                'value': match.text,
+                'start': match.start,
+                'end': match.end,
+                'confidence': 0.8
+            })
 
         # Если доступен spaCy, используем его для NER
-        if SPACY_AVAILABLE and nlp:
+        nlp = get_nlp()
+        if nlp:
             try:
                 doc = nlp(text)
                 for ent in doc.ents:
@@ -257,8 +289,9 @@ class ContextAnalyzer:
         """Анализ тональности текста"""
         words = text.split()
 
-        positive_count = sum(1 for word in words if word in self.positive_words)
-        negative_count = sum(1 for word in words if word in self.negative_words)
+        sentiment_counts = self.matcher.scan(text).counts('context.sentiment')
+        positive_count = sentiment_counts['positive']
+        negative_count = sentiment_counts['negative']
 
         total_words = len(words)
         if total_words == 0:
@@ -284,13 +317,8 @@ class ContextAnalyzer:
 
     def _assess_urgency(self, text: str) -> str:
         """Оценка срочности сообщения"""
-        urgency_patterns = [
-            r'срочно', r'немедленно', r'пожалуйста помогите', r'проблема',
-            r'не работает', r'ошибка', r'urgent', r'asap', r'immediately'
-        ]
-
-        urgency_score = sum(1 for pattern in urgency_patterns
-                           if re.search(pattern, text, re.IGNORECASE))
+        # Число разных совпавших паттернов срочности
+        urgency_score = len(self.matcher.scan(text).patterns('context.urgency'))
 
         if urgency_score >= 2:
             return 'high'
@@ -417,4 +445,17 @@ class ContextAnalyzer:
 
         except Exception as e:
             logger.error(f"❌ Error analyzing conversation context: {e}")
-            return {'error': str(e)}
\ No newline at end of file
+            return {'error': str(e)}
+
+_context_analyzer = None
+_context_analyzer_lock = threading.Lock()
+
+
+def get_context_analyzer() -> ContextAnalyzer:
+    """Получение глобального анализатора контекста"""
+    global _context_analyzer
+    if _context_analyzer is None:
+        with _context_analyzer_lock:
+            if _context_analyzer is None:
+                _context_analyzer = ContextAnalyzer()
+    return _context_analyzer
@@ -0,0 +1,97 @@
+"""
+⚡ Быстрая компактная сериализация JSON для горячих ответов
+
+Ответы чата, списки клубов, результаты поиска и инструментов агентов
+кодируются в JSON на каждом запросе. orjson (если установлен) делает это
+в несколько раз быстрее стандартного json и сразу отдает UTF-8 байты без
+\\uXXXX экранирования кириллицы и без пробелов-разделителей.
+
+Без orjson используется стандартный json с теми же параметрами
+(ensure_ascii=False, компактные разделители), поэтому вывод одинаковый
+с точностью до форматирования чисел с плавающей точкой. Типы, которых
+нет в JSON (Decimal, ленивые строки, timedelta, QuerySet...), переводит
+DjangoJSONEncoder, как в JsonResponse; numpy массивы и скаляры
+(баллы рекомендаций, RAG) сериализуются напрямую.
+
+Используется в DRF рендерере/парсере (core/renderers.py, core/parsers.py),
+FastJsonResponse и ToolExecutor.
+"""
+
+import json
+from typing import Any, Callable, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+from .lazy_imports import is_available, lazy_import
+
+ORJSON_AVAILABLE = is_available('orjson')
+orjson = lazy_import('orjson')
+
+
+def make_default(encoder: json.JSONEncoder) -> Callable[[Any], Any]:
+    """Обработчик типов вне JSON: numpy через tolist(), остальное — encoder.default"""
+    def default(obj: Any) -> Any:
+        if hasattr(obj, 'tolist') and type(obj).__module__ == 'numpy':
+            return obj.tolist()
+        return encoder.default(obj)
+    return default
+
+
+_default = make_default(DjangoJSONEncoder())
+
+
+def _options(sort_keys: bool) -> int:
+    # Даты — через encoder (миллисекунды и «Z», как в JsonResponse и DRF), а не родным форматом orjson
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+    if sort_keys:
+        options |= orjson.OPT_SORT_KEYS
+    return options
+
+
+def _stdlib_dumps(obj: Any, default: Callable, sort_keys: bool) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=default, sort_keys=sort_keys)
+
+
+def dumps_bytes(obj: Any, *, sort_keys: bool = False, default: Optional[Callable] = None) -> bytes:
+    """JSON в UTF-8 байтах — для тела HTTP ответа"""
+    default = default or _default
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(obj, default=default, option=_options(sort_keys))
+        except orjson.JSONEncodeError:
+            # Целые больше 64 бит, суррогаты в строках, глубокая вложенность — умеет только json
+            pass
+    return _stdlib_dumps(obj, default, sort_keys).encode('utf-8')
+
+
+def dumps(obj: Any, *, sort_keys: bool = False, default: Optional[Callable] = None) -> str:
+    """JSON строкой — для сообщений LLM, ключей кэша и логов"""
+    default = default or _default
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(obj, default=default, option=_options(sort_keys)).decode('utf-8')
+        except orjson.JSONEncodeError:
+            pass
+    return _stdlib_dumps(obj, default, sort_keys)
+
+
+def loads(data: Any) -> Any:
+    """Разбор JSON из str/bytes; ошибки — json.JSONDecodeError (ValueError) в обоих вариантах"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJsonResponse(HttpResponse):
+    """
+    JsonResponse на fast_json: компактный UTF-8 вместо \\uXXXX.
+
+    Как и JsonResponse, по умолчанию принимает только dict (safe=True).
+    """
+
+    def __init__(self, data: Any, safe: bool = True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError('In order to allow non-dict objects to be serialized set the safe parameter to False.')
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps_bytes(data), **kwargs)
@@ -0,0 +1,123 @@
+"""
+⏱️ Бюджет времени старта Django процесса
+
+Запускает в отдельном интерпретаторе python -X importtime, выполняет
+django.setup() и импорт ROOT_URLCONF (то же, что делают migrate, проверки
+системы и воркер при первом запросе) и разбирает отчет об импортах.
+
+Проверка не проходит, если:
+- суммарное время импортов превышает AI_IMPORT_BUDGET_MS;
+- при старте загружен пакет из AI_IMPORT_FORBIDDEN_MODULES (torch, sklearn,
+  chromadb и т.д. должны подключаться через utils/lazy_imports.py).
+
+Запуск: python manage.py import_budget
+"""
+
+import os
+import re
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+DEFAULT_FORBIDDEN_MODULES = (
+    'torch', 'transformers', 'sentence_transformers', 'sklearn', 'scipy', 'pandas',
+    'networkx', 'nltk', 'chromadb', 'openai', 'faiss', 'hnswlib', 'spacy',
+)
+
+STARTUP_SCRIPT = (
+    "import importlib, django; django.setup(); "
+    "from django.conf import settings; importlib.import_module(settings.ROOT_URLCONF)"
+)
+
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$')
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class StartupProfile:
+    records: List[ImportRecord]
+    wall_seconds: float
+    returncode: int = 0
+    stderr_tail: str = ''
+    top_level: List[ImportRecord] = field(init=False)
+
+    def __post_init__(self):
+        self.top_level = [r for r in self.records if r.depth == 0]
+
+    @property
+    def total_ms(self) -> float:
+        """Суммарное время импортов верхнего уровня (вложенные входят в cumulative)"""
+        return sum(r.cumulative_us for r in self.top_level) / 1000
+
+    def imported(self) -> Dict[str, ImportRecord]:
+        return {r.module: r for r in self.records}
+
+    def slowest(self, limit: int = 15) -> List[ImportRecord]:
+        return sorted(self.top_level, key=lambda r: r.cumulative_us, reverse=True)[:limit]
+
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """Строки 'import time: self | cumulative | имя' → записи (отступ имени — глубина вложенности)"""
+    records = []
+    for line in output.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append(ImportRecord(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return records
+
+
+def measure_startup(settings_module: Optional[str] = None, timeout: float = 120) -> StartupProfile:
+    """Старт Django в чистом интерпретаторе под python -X importtime"""
+    env = dict(os.environ)
+    env['DJANGO_SETTINGS_MODULE'] = settings_module or os.environ.get('DJANGO_SETTINGS_MODULE', 'core.settings')
+    # Регрессия не должна превращаться в скачивание моделей с HuggingFace
+    env.setdefault('HF_HUB_OFFLINE', '1')
+    env.setdefault('TRANSFORMERS_OFFLINE', '1')
+
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+        cwd=str(settings.BASE_DIR), env=env, capture_output=True, text=True, timeout=timeout,
+    )
+    wall_seconds = time.perf_counter() - started
+
+    other_lines = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+    return StartupProfile(
+        records=parse_importtime(result.stderr),
+        wall_seconds=wall_seconds,
+        returncode=result.returncode,
+        stderr_tail='\n'.join(other_lines[-20:]),
+    )
+
+
+def forbidden_imports(profile: StartupProfile, forbidden=None) -> List[str]:
+    forbidden = forbidden if forbidden is not None else getattr(
+        settings, 'AI_IMPORT_FORBIDDEN_MODULES', DEFAULT_FORBIDDEN_MODULES
+    )
+    imported = profile.imported()
+    return [name for name in forbidden if name in imported]
+
+
+def check_budget(profile: StartupProfile, budget_ms: Optional[float] = None, forbidden=None) -> List[str]:
+    """Список нарушений бюджета (пустой — старт в норме)"""
+    budget_ms = budget_ms if budget_ms is not None else getattr(settings, 'AI_IMPORT_BUDGET_MS', 3000)
+    violations = []
+    if profile.returncode != 0:
+        violations.append(f"Старт завершился с кодом {profile.returncode}:\n{profile.stderr_tail}")
+    if profile.total_ms > budget_ms:
+        violations.append(f"Импорты при старте заняли {profile.total_ms:.0f} мс при бюджете {budget_ms:.0f} мс")
+    for name in forbidden_imports(profile, forbidden):
+        violations.append(f"При старте импортирован тяжелый пакет '{name}' — подключите его через lazy_import()")
+    return violations
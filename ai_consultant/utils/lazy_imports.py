@@ -0,0 +1,69 @@
+"""
+💤 Ленивая загрузка тяжелых зависимостей
+
+torch, transformers, sentence_transformers, sklearn, scipy, nltk, chromadb и
+openai стоят секунды и сотни МБ при импорте. Модули ai_consultant подключают
+их через lazy_import(): объект-заместитель импортирует пакет при первом
+обращении к атрибуту, поэтому migrate, management команды, тесты и
+процессы админки не платят за модели, которыми не пользуются.
+
+Флаги *_AVAILABLE считаются через is_available() — importlib.util.find_spec
+находит пакет без его выполнения.
+
+Бюджет времени старта проверяет python manage.py import_budget
+(python -X importtime в отдельном процессе).
+"""
+
+import importlib
+import importlib.util
+import threading
+import types
+from functools import lru_cache
+
+_import_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def is_available(name: str) -> bool:
+    """Установлен ли пакет (без импорта; для вложенного модуля импортируется только родитель)"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyModule(types.ModuleType):
+    """Заместитель модуля: настоящий импорт при первом обращении к атрибуту"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__['_module']
+        if module is None:
+            with _import_lock:
+                module = self.__dict__['_module']
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__['_module'] = module
+        return module
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.__dict__['_module'] is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.is_loaded else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """chromadb = lazy_import('chromadb'); chromadb.PersistentClient(...) импортирует пакет здесь"""
+    return LazyModule(name)
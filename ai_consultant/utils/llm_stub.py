@@ -0,0 +1,180 @@
+"""
+🧪 Детерминированная заглушка LLM
+Сценарии ответов (включая tool calls), модели задержек и формат Chat Completion API.
+
+Модуль не зависит от Django: им пользуются и StubProvider внутри процесса,
+и scripts/fake_openai_server.py.
+
+Файл сценария (JSON):
+    {
+      "rules": [
+        {"match": "шахмат", "tool": "search_clubs", "arguments": {"query": "{last_user}"}},
+        {"match": "привет", "content": "Привет! Чем помочь?"}
+      ],
+      "default": "Ответ заглушки на: {last_user}"
+    }
+
+Правило срабатывает, если регулярное выражение match найдено в последнем сообщении
+пользователя. Правило с tool срабатывает, только если такой инструмент передан в
+запросе и в диалоге еще нет результата инструмента — иначе модель отвечает текстом.
+"""
+
+import hashlib
+import json
+import random
+import re
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+DEFAULT_RULES = [
+    {'match': r'клуб|club|кружок|секци', 'tool': 'search_clubs', 'arguments': {'query': '{last_user}'}},
+]
+DEFAULT_CONTENT = 'Это ответ тестовой заглушки LLM на сообщение: «{last_user}»'
+ROUTER_CONTENT = {'agent': 'orchestrator', 'reason': 'stub'}
+
+
+class LatencyModel:
+    """
+    Распределение задержки ответа.
+    kind: fixed | uniform | gaussian | lognormal (mean_ms — медиана, jitter_ms — разброс)
+    """
+
+    KINDS = ('fixed', 'uniform', 'gaussian', 'lognormal')
+
+    def __init__(self, kind: str = 'gaussian', mean_ms: float = 0, jitter_ms: float = 0, seed: Optional[int] = None):
+        if kind not in self.KINDS:
+            raise ValueError(f"Неизвестное распределение задержки: {kind}")
+        self.kind = kind
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+
+    def sample(self) -> float:
+        """Задержка в секундах"""
+        if self.mean_ms <= 0:
+            return 0.0
+        if self.kind == 'fixed' or self.jitter_ms <= 0:
+            value = self.mean_ms
+        elif self.kind == 'uniform':
+            value = self._random.uniform(self.mean_ms - self.jitter_ms, self.mean_ms + self.jitter_ms)
+        elif self.kind == 'gaussian':
+            value = self._random.gauss(self.mean_ms, self.jitter_ms)
+        else:
+            sigma = self.jitter_ms / self.mean_ms
+            value = self.mean_ms * self._random.lognormvariate(0, sigma)
+        return max(0.0, value) / 1000.0
+
+
+class StubScript:
+    """Выбирает ответ заглушки по сценарию; один и тот же запрос дает один и тот же ответ"""
+
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None, default: str = DEFAULT_CONTENT):
+        self.rules = [dict(rule, pattern=re.compile(rule['match'], re.IGNORECASE)) for rule in (rules or DEFAULT_RULES)]
+        self.default = default
+
+    @classmethod
+    def from_file(cls, path: Optional[str]) -> 'StubScript':
+        if not path:
+            return cls()
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(rules=data.get('rules'), default=data.get('default', DEFAULT_CONTENT))
+
+    def respond(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Возвращает {'content': str | None, 'tool_calls': [...]}"""
+        messages = params.get('messages') or []
+        last_user = next((m.get('content') or '' for m in reversed(messages) if m.get('role') == 'user'), '')
+        variables = {'last_user': last_user[:200], 'model': params.get('model', '')}
+
+        if (params.get('response_format') or {}).get('type') == 'json_object':
+            return {'content': json.dumps(ROUTER_CONTENT, ensure_ascii=False), 'tool_calls': []}
+
+        tool_names = {t.get('function', {}).get('name') for t in params.get('tools') or []}
+        has_tool_result = any(m.get('role') == 'tool' for m in messages)
+
+        for rule in self.rules:
+            if not rule['pattern'].search(last_user):
+                continue
+            if rule.get('tool'):
+                if rule['tool'] not in tool_names or has_tool_result:
+                    continue
+                arguments = {k: _render(v, variables) for k, v in (rule.get('arguments') or {}).items()}
+                call_id = 'call_' + hashlib.md5(f"{rule['tool']}:{last_user}".encode()).hexdigest()[:16]
+                return {
+                    'content': None,
+                    'tool_calls': [{
+                        'id': call_id,
+                        'type': 'function',
+                        'function': {'name': rule['tool'], 'arguments': json.dumps(arguments, ensure_ascii=False)},
+                    }],
+                }
+            if rule.get('content'):
+                return {'content': _render(rule['content'], variables), 'tool_calls': []}
+
+        return {'content': _render(self.default, variables), 'tool_calls': []}
+
+
+def _render(template: Any, variables: Dict[str, str]) -> Any:
+    if not isinstance(template, str):
+        return template
+    for key, value in variables.items():
+        template = template.replace('{' + key + '}', value)
+    return template
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text or '') // 3)
+
+
+def _completion_id(params: Dict[str, Any]) -> str:
+    digest = hashlib.md5(json.dumps(params.get('messages') or [], sort_keys=True, ensure_ascii=False).encode())
+    return f'chatcmpl-stub{digest.hexdigest()[:20]}'
+
+
+def build_completion(params: Dict[str, Any], reply: Dict[str, Any]) -> Dict[str, Any]:
+    """Ответ в формате Chat Completion API"""
+    prompt_tokens = sum(_estimate_tokens(str(m.get('content') or '')) for m in params.get('messages') or [])
+    completion_tokens = _estimate_tokens(reply.get('content') or json.dumps(reply.get('tool_calls')))
+    message = {'role': 'assistant', 'content': reply.get('content')}
+    if reply.get('tool_calls'):
+        message['tool_calls'] = reply['tool_calls']
+    return {
+        'id': _completion_id(params),
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': params.get('model', 'stub'),
+        'choices': [{
+            'index': 0,
+            'message': message,
+            'finish_reason': 'tool_calls' if reply.get('tool_calls') else 'stop',
+        }],
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def build_stream_chunks(params: Dict[str, Any], reply: Dict[str, Any], chunk_chars: int = 16) -> Iterator[Dict[str, Any]]:
+    """Тот же ответ в виде chat.completion.chunk для stream=True"""
+    base = {
+        'id': _completion_id(params),
+        'object': 'chat.completion.chunk',
+        'created': int(time.time()),
+        'model': params.get('model', 'stub'),
+    }
+
+    def chunk(delta, finish_reason=None):
+        return dict(base, choices=[{'index': 0, 'delta': delta, 'finish_reason': finish_reason}])
+
+    yield chunk({'role': 'assistant', 'content': ''})
+    if reply.get('tool_calls'):
+        yield chunk({'tool_calls': [dict(call, index=i) for i, call in enumerate(reply['tool_calls'])]})
+        yield chunk({}, 'tool_calls')
+        return
+
+    content = reply.get('content') or ''
+    for start in range(0, len(content), chunk_chars):
+        yield chunk({'content': content[start:start + chunk_chars]})
+    yield chunk({}, 'stop')
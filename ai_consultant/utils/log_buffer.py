@@ -0,0 +1,172 @@
+"""
+📝 Буферизованная запись журналов (AgentLog, AISessionLog)
+
+Вместо INSERT на каждое событие в потоке запроса строки складываются
+в ограниченную очередь процесса. Фоновый поток пишет их через bulk_create
+пачками по AI_LOG_BUFFER_BATCH_SIZE строк или раз в AI_LOG_BUFFER_FLUSH_MS.
+Если очередь заполнена, строка пишется синхронно, так что события не теряются.
+Остаток сбрасывается при завершении воркера (atexit и хук gunicorn worker_exit).
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedLogWriter:
+    """Очередь несохраненных экземпляров моделей с фоновой пакетной записью"""
+
+    def __init__(self, max_size: int = None, batch_size: int = None, flush_interval_ms: int = None):
+        self.max_size = max_size or getattr(settings, 'AI_LOG_BUFFER_SIZE', 10000)
+        self.batch_size = batch_size or getattr(settings, 'AI_LOG_BUFFER_BATCH_SIZE', 500)
+        self.flush_interval = (flush_interval_ms or getattr(settings, 'AI_LOG_BUFFER_FLUSH_MS', 500)) / 1000
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._idle = threading.Condition()
+        self._pending = 0
+
+        self.stats = {'buffered': 0, 'written': 0, 'sync_fallback': 0, 'failed': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'AI_LOG_BUFFER_ENABLED', True)
+
+    def add(self, instance):
+        """Ставит несохраненный экземпляр модели в очередь записи"""
+        if not self.enabled:
+            instance.save()
+            return
+
+        self._ensure_started()
+        try:
+            with self._idle:
+                self._queue.put_nowait(instance)
+                self._pending += 1
+            self.stats['buffered'] += 1
+        except queue.Full:
+            self.stats['sync_fallback'] += 1
+            instance.save()
+
+    def _ensure_started(self):
+        # После fork (gunicorn preload_app) поток родителя в воркере не существует
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.max_size)
+            self._pending = 0
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='log-buffer-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+        close_old_connections()
+
+    def _collect(self) -> List:
+        """Ждет первую строку, затем добирает пачку до batch_size или flush_interval"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List):
+        by_model: Dict[type, List] = defaultdict(list)
+        for instance in batch:
+            by_model[type(instance)].append(instance)
+
+        close_old_connections()
+        try:
+            for model, instances in by_model.items():
+                try:
+                    model.objects.bulk_create(instances, batch_size=self.batch_size)
+                    self.stats['written'] += len(instances)
+                except Exception as e:
+                    self.stats['failed'] += len(instances)
+                    logger.error(f"❌ Не удалось записать {len(instances)} строк {model.__name__}: {e}")
+        finally:
+            with self._idle:
+                self._pending -= len(batch)
+                self._idle.notify_all()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Ждет, пока все поставленные в очередь строки будут записаны"""
+        if self._thread is None or self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while self._pending > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: float = 5.0):
+        """Останавливает поток и синхронно дописывает остаток очереди"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+
+        remaining = []
+        while True:
+            try:
+                remaining.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if remaining:
+            self._write(remaining)
+        self._thread = None
+        logger.info(f"📝 Буфер журналов остановлен: {self.stats}")
+
+
+# Глобальный буфер процесса
+_log_buffer = None
+_log_buffer_lock = threading.Lock()
+
+
+def get_log_buffer() -> BufferedLogWriter:
+    """Получение буфера журналов процесса"""
+    global _log_buffer
+    if _log_buffer is None:
+        with _log_buffer_lock:
+            if _log_buffer is None:
+                _log_buffer = BufferedLogWriter()
+                atexit.register(_log_buffer.shutdown)
+    return _log_buffer
+
+
+def buffered_log(instance):
+    """Записать строку журнала через буфер процесса"""
+    get_log_buffer().add(instance)
@@ -0,0 +1,402 @@
+"""
+🗄️ Хранение журналов: помесячные партиции и архив
+
+Таблицы с одной строкой на сообщение / событие / вызов LLM (ChatMessage,
+AISessionLog, AgentLog) в PostgreSQL переводятся на декларативное
+партиционирование RANGE (created_at) по месяцам. Месяцы старше срока хранения
+выгружаются в сжатые файлы (JSONL.gz или Parquet), после чего партиция
+отсоединяется и удаляется — без DELETE по миллионам строк и без VACUUM.
+
+На других СУБД (SQLite для разработки) партиций нет: месяц выгружается
+так же, а строки удаляются обычным запросом.
+
+Архив читается обратно (cold read) для истории сессий в админке и API.
+Обслуживание: python manage.py archive_logs (ежемесячно, cron)
+"""
+
+import gzip
+import itertools
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+@dataclass(frozen=True)
+class LogTable:
+    name: str
+    model: str
+    date_field: str = 'created_at'
+
+    def get_model(self):
+        return apps.get_model(self.model)
+
+    @property
+    def db_table(self) -> str:
+        return self.get_model()._meta.db_table
+
+
+LOG_TABLES = {
+    'chat_messages': LogTable('chat_messages', 'ai_consultant.ChatMessage'),
+    'ai_session_logs': LogTable('ai_session_logs', 'ai_consultant.AISessionLog'),
+    'agent_logs': LogTable('agent_logs', 'agents.AgentLog'),
+}
+
+ARCHIVE_BATCH_SIZE = 5000
+
+
+# 📅 Месяцы
+
+def month_start(value) -> date:
+    if isinstance(value, datetime):
+        value = timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value.replace(day=1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bounds(month: date) -> Tuple[datetime, datetime]:
+    start, end = datetime.combine(month, time.min), datetime.combine(add_months(month, 1), time.min)
+    if settings.USE_TZ:
+        start, end = timezone.make_aware(start), timezone.make_aware(end)
+    return start, end
+
+
+def retention_cutoff(months: Optional[int] = None) -> date:
+    """Первый месяц, который остается в базе"""
+    months = months if months is not None else getattr(settings, 'AI_LOG_RETENTION_MONTHS', 6)
+    return add_months(month_start(timezone.now()), -months)
+
+
+# 🧩 Партиции PostgreSQL
+
+def is_postgresql() -> bool:
+    return connection.vendor == 'postgresql'
+
+
+def partition_name(table: str, month: date) -> str:
+    return f'{table}_p{month.year:04d}_{month.month:02d}'
+
+
+def is_partitioned(table: str, cursor) -> bool:
+    cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [table])
+    return cursor.fetchone() is not None
+
+
+def list_partitions(table: str, cursor) -> List[Tuple[str, date]]:
+    """Помесячные партиции таблицы (DEFAULT не входит)"""
+    cursor.execute(
+        'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+        'WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname',
+        [table],
+    )
+    pattern = re.compile(rf'^{re.escape(table)}_p(\d{{4}})_(\d{{2}})$')
+    partitions = []
+    for (name,) in cursor.fetchall():
+        match = pattern.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return partitions
+
+
+def ensure_partitions(log_table: LogTable, cursor, first_month: date = None, months_ahead: int = None):
+    """Создает месячные партиции от first_month до текущего месяца + months_ahead и DEFAULT"""
+    table = log_table.db_table
+    months_ahead = months_ahead if months_ahead is not None else getattr(settings, 'AI_LOG_PARTITION_MONTHS_AHEAD', 2)
+    month = first_month or month_start(timezone.now())
+    last = add_months(month_start(timezone.now()), months_ahead)
+
+    while month <= last:
+        start, end = month_bounds(month)
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {connection.ops.quote_name(partition_name(table, month))} '
+            f'PARTITION OF {connection.ops.quote_name(table)} FOR VALUES FROM (%s) TO (%s)',
+            [start, end],
+        )
+        month = add_months(month, 1)
+
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {connection.ops.quote_name(table + "_default")} '
+        f'PARTITION OF {connection.ops.quote_name(table)} DEFAULT'
+    )
+
+
+def convert_to_partitioned(log_table: LogTable, cursor):
+    """
+    Переводит обычную таблицу на RANGE партиционирование по месяцам.
+
+    Первичный ключ партиционированной таблицы обязан включать ключ партиции,
+    поэтому он становится (id, created_at); Django по-прежнему ищет строки по id.
+    Индексы и внешние ключи пересоздаются с прежними именами.
+    """
+    table = log_table.db_table
+    if is_partitioned(table, cursor):
+        return False
+
+    quoted, legacy = connection.ops.quote_name(table), connection.ops.quote_name(table + '_legacy')
+    date_field = connection.ops.quote_name(log_table.date_field)
+
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s", [table, f'{table}_pkey']
+    )
+    index_defs = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+        [table],
+    )
+    foreign_keys = cursor.fetchall()
+    cursor.execute(f'SELECT min({date_field}) FROM {quoted}')
+    oldest = cursor.fetchone()[0]
+
+    cursor.execute(f'ALTER TABLE {quoted} RENAME TO {legacy}')
+    cursor.execute(f'CREATE TABLE {quoted} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE ({date_field})')
+    ensure_partitions(log_table, cursor, first_month=month_start(oldest) if oldest else None)
+    cursor.execute(f'INSERT INTO {quoted} SELECT * FROM {legacy}')
+    cursor.execute(f'DROP TABLE {legacy}')
+
+    cursor.execute(
+        f'ALTER TABLE {quoted} ADD CONSTRAINT {connection.ops.quote_name(table + "_pkey")} '
+        f'PRIMARY KEY (id, {date_field})'
+    )
+    for index_def in index_defs:
+        cursor.execute(index_def)
+    for name, definition in foreign_keys:
+        cursor.execute(f'ALTER TABLE {quoted} ADD CONSTRAINT {connection.ops.quote_name(name)} {definition}')
+
+    logger.info(f"🗄️ Таблица {table} переведена на помесячные партиции")
+    return True
+
+
+def drop_partition(table: str, partition: str, cursor):
+    cursor.execute(
+        f'ALTER TABLE {connection.ops.quote_name(table)} DETACH PARTITION {connection.ops.quote_name(partition)}'
+    )
+    cursor.execute(f'DROP TABLE {connection.ops.quote_name(partition)}')
+
+
+# 📦 Архив
+
+class LogArchive:
+    """Файловый архив журналов: {dir}/{таблица}/{YYYY-MM}.jsonl.gz|.parquet"""
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or getattr(
+            settings, 'AI_LOG_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'data', 'log_archive')
+        )
+
+    def path(self, name: str, month: date, fmt: str) -> str:
+        extension = 'parquet' if fmt == 'parquet' else 'jsonl.gz'
+        return os.path.join(self.directory, name, f'{month:%Y-%m}.{extension}')
+
+    def find(self, name: str, month: date) -> Optional[str]:
+        for fmt in ('jsonl', 'parquet'):
+            path = self.path(name, month, fmt)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def archived_months(self, name: str) -> List[date]:
+        folder = os.path.join(self.directory, name)
+        if not os.path.isdir(folder):
+            return []
+        months = set()
+        for filename in os.listdir(folder):
+            match = re.match(r'^(\d{4})-(\d{2})\.(jsonl\.gz|parquet)$', filename)
+            if match:
+                months.add(date(int(match.group(1)), int(match.group(2)), 1))
+        return sorted(months)
+
+    # ✍️ Выгрузка
+
+    def export_month(self, log_table: LogTable, month: date, fmt: str = 'jsonl') -> int:
+        """Выгружает строки месяца в файл архива; возвращает число строк"""
+        if fmt == 'parquet' and not PARQUET_AVAILABLE:
+            raise RuntimeError('pyarrow не установлен, используйте формат jsonl')
+
+        start, end = month_bounds(month)
+        rows = log_table.get_model().objects.filter(**{
+            f'{log_table.date_field}__gte': start,
+            f'{log_table.date_field}__lt': end,
+        }).order_by(log_table.date_field).values().iterator(chunk_size=ARCHIVE_BATCH_SIZE)
+
+        first = next(rows, None)
+        if first is None:
+            return 0
+
+        path = self.path(log_table.name, month, fmt)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        writer = self._write_parquet if fmt == 'parquet' else self._write_jsonl
+        count = writer(tmp_path, itertools.chain([first], rows))
+        os.replace(tmp_path, path)
+        return count
+
+    @staticmethod
+    def _serialize(row: Dict[str, Any]) -> Dict[str, Any]:
+        serialized = {}
+        for key, value in row.items():
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            elif not isinstance(value, (str, int, float, bool, dict, list, type(None))):
+                value = str(value)  # UUID, Decimal
+            serialized[key] = value
+        return serialized
+
+    def _write_jsonl(self, path: str, rows) -> int:
+        count = 0
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(self._serialize(row), ensure_ascii=False, default=str) + '\n')
+                count += 1
+        return count
+
+    def _write_parquet(self, path: str, rows) -> int:
+        count, writer, batch = 0, None, []
+
+        def flush():
+            nonlocal writer
+            # JSON поля храним строкой, чтобы схема не зависела от содержимого
+            table = pa.Table.from_pylist([
+                {k: json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list)) else v for k, v in row.items()}
+                for row in batch
+            ])
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression='zstd')
+            writer.write_table(table.cast(writer.schema))
+
+        for row in rows:
+            batch.append(self._serialize(row))
+            count += 1
+            if len(batch) >= ARCHIVE_BATCH_SIZE:
+                flush()
+                batch = []
+        if batch:
+            flush()
+        writer.close()
+        return count
+
+    # 📖 Cold read
+
+    def read_month(self, name: str, month: date) -> Iterator[Dict[str, Any]]:
+        path = self.find(name, month)
+        if path is None:
+            return
+        if path.endswith('.parquet'):
+            if not PARQUET_AVAILABLE:
+                logger.warning(f"⚠️ Архив {path} в Parquet, но pyarrow не установлен")
+                return
+            for batch in pq.ParquetFile(path).iter_batches():
+                yield from batch.to_pylist()
+        else:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    yield json.loads(line)
+
+    def read(self, name: str, start: datetime, end: datetime, **filters) -> List[Dict[str, Any]]:
+        """Строки архива за [start, end] с фильтром по равенству полей"""
+        expected = {key: str(value) for key, value in filters.items()}
+        date_field = LOG_TABLES[name].date_field if name in LOG_TABLES else 'created_at'
+        rows = []
+        month, last = month_start(start), month_start(end)
+        while month <= last:
+            for row in self.read_month(name, month):
+                if all(str(row.get(key)) == value for key, value in expected.items()):
+                    rows.append(row)
+            month = add_months(month, 1)
+        rows.sort(key=lambda row: row.get(date_field) or '')
+        return rows
+
+
+def archive_old_logs(cutoff: date, fmt: str = 'jsonl', dry_run: bool = False,
+                     archive: LogArchive = None) -> List[Dict[str, Any]]:
+    """
+    Выгружает и удаляет все месяцы журналов раньше cutoff.
+
+    Returns:
+        [{'table', 'month', 'rows', 'path'}] по обработанным месяцам
+    """
+    archive = archive or LogArchive()
+    results = []
+
+    for log_table in LOG_TABLES.values():
+        model = log_table.get_model()
+        months = _months_before(log_table, cutoff)
+        for month, partition in months:
+            result = {'table': log_table.name, 'month': month.isoformat(),
+                      'path': archive.path(log_table.name, month, fmt), 'rows': None}
+            if not dry_run:
+                result['rows'] = archive.export_month(log_table, month, fmt)
+                if partition:
+                    with connection.cursor() as cursor:
+                        drop_partition(log_table.db_table, partition, cursor)
+                else:
+                    start, end = month_bounds(month)
+                    model.objects.filter(**{
+                        f'{log_table.date_field}__gte': start,
+                        f'{log_table.date_field}__lt': end,
+                    }).delete()
+                if result['rows']:
+                    logger.info(f"🗄️ {log_table.name} {month:%Y-%m}: {result['rows']} строк в архиве {result['path']}")
+            results.append(result)
+
+    return results
+
+
+def _months_before(log_table: LogTable, cutoff: date) -> List[Tuple[date, Optional[str]]]:
+    """Месяцы до cutoff: (месяц, имя партиции или None)"""
+    if is_postgresql():
+        with connection.cursor() as cursor:
+            if is_partitioned(log_table.db_table, cursor):
+                return [(month, name) for name, month in list_partitions(log_table.db_table, cursor) if month < cutoff]
+
+    from django.db.models import Min
+    oldest = log_table.get_model().objects.aggregate(oldest=Min(log_table.date_field))['oldest']
+    if oldest is None:
+        return []
+    months, month = [], month_start(oldest)
+    while month < cutoff:
+        months.append((month, None))
+        month = add_months(month, 1)
+    return months
+
+
+def maintain_partitions() -> List[str]:
+    """Создает партиции на ближайшие месяцы; возвращает партиционированные таблицы"""
+    if not is_postgresql():
+        return []
+    tables = []
+    with connection.cursor() as cursor:
+        for log_table in LOG_TABLES.values():
+            if is_partitioned(log_table.db_table, cursor):
+                ensure_partitions(log_table, cursor)
+                tables.append(log_table.db_table)
+    return tables
+
+
+def get_archived_session_messages(session) -> List[Dict[str, Any]]:
+    """Сообщения сессии из архива (пусто, если месяцы сессии не архивировались)"""
+    archive = LogArchive()
+    archived = set(archive.archived_months('chat_messages'))
+    if not archived or month_start(session.created_at) > max(archived):
+        return []
+    return archive.read('chat_messages', session.created_at, session.updated_at, session_id=session.id)
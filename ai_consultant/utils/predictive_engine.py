@@ -10,9 +10,6 @@ from datetime import datetime, timedelta
 from collections import defaultdict, deque
 import json
 from django.core.cache import cache
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.cluster import KMeans
 
 logger = logging.getLogger(__name__)
 
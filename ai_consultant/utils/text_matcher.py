@@ -0,0 +1,215 @@
+"""
+🔎 Общий движок сопоставления словарей с сообщением
+
+Словари интентов, сущностей, тональности, срочности, спама и нецензурной
+лексики всех анализаторов (ContextAnalyzer, MessageProcessorService,
+AdvancedRAGService, SecurityValidator) регистрируются здесь и компилируются в
+одно регулярное выражение-префиксное дерево (trie). Один проход finditer с
+lookahead находит в каждой позиции самую длинную фразу словаря; более
+короткие фразы, совпавшие в той же позиции, — ее префиксы и берутся из
+заранее посчитанной таблицы. Так за один проход по сообщению получаются все
+совпадения, включая перекрывающиеся, со смещениями.
+
+Настоящие регулярные выражения (спам-паттерны) собираются в одну
+альтернативу с именованными группами и проверяются вторым проходом.
+
+Результат scan() кэшируется по тексту: валидатор, процессор сообщений и
+анализатор контекста, получив одно и то же сообщение, сканируют его один раз.
+"""
+
+import logging
+import re
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import lru_cache, partial
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCAN_CACHE_SIZE = 1024
+
+
+@dataclass(frozen=True)
+class PatternEntry:
+    group: str
+    label: str
+    pattern: str
+    whole_word: bool = False
+
+
+@dataclass(frozen=True)
+class TextMatch:
+    group: str
+    label: str
+    pattern: str
+    start: int
+    end: int
+    text: str
+
+
+class ScanResult:
+    """Все совпадения сообщения, упорядоченные по позиции"""
+
+    __slots__ = ('matches', '_by_group')
+
+    def __init__(self, matches: List[TextMatch]):
+        self.matches = tuple(matches)
+        by_group = defaultdict(list)
+        for match in self.matches:
+            by_group[match.group].append(match)
+        self._by_group = dict(by_group)
+
+    def group(self, group: str) -> List[TextMatch]:
+        return self._by_group.get(group, [])
+
+    def counts(self, group: str) -> Counter:
+        """label → число вхождений"""
+        return Counter(match.label for match in self.group(group))
+
+    def patterns(self, group: str, label: Optional[str] = None) -> List[str]:
+        """Уникальные совпавшие фразы (в порядке первого вхождения)"""
+        matches = self.group(group)
+        return list(dict.fromkeys(m.pattern for m in matches if label is None or m.label == label))
+
+    def labels(self, group: str) -> List[str]:
+        return list(dict.fromkeys(match.label for match in self.group(group)))
+
+    def has(self, group: str, label: Optional[str] = None) -> bool:
+        return any(label is None or match.label == label for match in self.group(group))
+
+
+def _trie_pattern(node: Dict[str, dict]) -> str:
+    """Регулярное выражение по префиксному дереву; '' — конец фразы"""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        # Жадный «?» — сначала пробуется продолжение, поэтому находится самая длинная фраза
+        return (body if len(branches) > 1 else '(?:' + body + ')') + '?'
+    return body
+
+
+class TextMatcher:
+    """
+    Реестр словарей и скомпилированный автомат.
+
+    register_phrases() / register_regex() можно вызывать при импорте модулей;
+    компиляция выполняется при первом scan() после изменений.
+    """
+
+    def __init__(self, cache_size: int = SCAN_CACHE_SIZE):
+        self._phrases: Dict[str, List[PatternEntry]] = defaultdict(list)
+        self._regexes: List[PatternEntry] = []
+        self._registered = set()
+        self._lock = threading.Lock()
+        self._compiled = None
+        self._cache_size = cache_size
+
+    # 📋 Регистрация
+
+    def register_phrases(self, group: str, dictionary: Dict[str, Iterable[str]], whole_word: bool = False):
+        """{label: [фразы]} — поиск подстроки без учета регистра (whole_word: фраза ограничена пробелами)"""
+        with self._lock:
+            for label, phrases in dictionary.items():
+                for phrase in phrases:
+                    entry = PatternEntry(group, label, phrase, whole_word)
+                    if entry in self._registered:
+                        continue
+                    self._registered.add(entry)
+                    self._phrases[phrase.lower()].append(entry)
+            self._compiled = None
+
+    def register_regex(self, group: str, dictionary: Dict[str, Iterable[str]]):
+        """{label: [регулярные выражения]} для паттернов, которые нельзя выразить фразой"""
+        with self._lock:
+            for label, patterns in dictionary.items():
+                for pattern in patterns:
+                    entry = PatternEntry(group, label, pattern)
+                    if entry in self._registered:
+                        continue
+                    self._registered.add(entry)
+                    self._regexes.append(entry)
+            self._compiled = None
+
+    # ⚙️ Компиляция
+
+    def compile(self):
+        with self._lock:
+            if self._compiled is None:
+                self._compiled = self._build()
+        return self._compiled
+
+    def _build(self):
+        trie: Dict[str, dict] = {}
+        for phrase in self._phrases:
+            node = trie
+            for char in phrase:
+                node = node.setdefault(char, {})
+            node[''] = {}
+
+        # Для каждой фразы — все фразы словаря, являющиеся ее префиксами (включая ее саму)
+        prefixes = {
+            phrase: [(other, self._phrases[other]) for other in self._phrases if phrase.startswith(other)]
+            for phrase in self._phrases
+        }
+        phrase_re = re.compile('(?=(' + _trie_pattern(trie) + '))', re.IGNORECASE) if trie else None
+
+        regex_re = None
+        if self._regexes:
+            # Флаг (?i) в начале паттерна допустим только глобально — весь автомат без учета регистра
+            alternatives = [
+                f'(?P<r{i}>{re.sub(r"^[(][?]i[)]", "", entry.pattern)})' for i, entry in enumerate(self._regexes)
+            ]
+            regex_re = re.compile('|'.join(alternatives), re.IGNORECASE)
+
+        automaton = (phrase_re, prefixes, regex_re, list(self._regexes))
+        # Кэш привязан к своему автомату: register_* сбрасывает self._compiled во время чужих сканов
+        scan = lru_cache(maxsize=self._cache_size)(partial(self._scan_uncached, automaton=automaton))
+        logger.debug(f"🔎 Словари скомпилированы: {len(self._phrases)} фраз, {len(self._regexes)} выражений")
+        return automaton + (scan,)
+
+    # 🔍 Поиск
+
+    def scan(self, text: str, use_cache: bool = True) -> ScanResult:
+        """Все совпадения всех словарей за один проход"""
+        compiled = self.compile()
+        return compiled[4](text or '') if use_cache else self._scan_uncached(text or '', compiled[:4])
+
+    def __len__(self) -> int:
+        return len(self._registered)
+
+    def _scan_uncached(self, text: str, automaton: tuple) -> ScanResult:
+        phrase_re, prefixes, regex_re, regexes = automaton
+        matches: List[TextMatch] = []
+        length = len(text)
+
+        if phrase_re is not None:
+            for found in phrase_re.finditer(text):
+                start = found.start()
+                longest = found.group(1).lower()
+                for phrase, entries in prefixes.get(longest, ()):
+                    end = start + len(phrase)
+                    bounded = (start == 0 or text[start - 1].isspace()) and (end == length or text[end].isspace())
+                    for entry in entries:
+                        if entry.whole_word and not bounded:
+                            continue
+                        matches.append(TextMatch(entry.group, entry.label, entry.pattern, start, end, text[start:end]))
+
+        if regex_re is not None:
+            for found in regex_re.finditer(text):
+                entry = regexes[int(found.lastgroup[1:])]
+                matches.append(TextMatch(entry.group, entry.label, entry.pattern,
+                                         found.start(), found.end(), found.group()))
+
+        matches.sort(key=lambda m: (m.start, -m.end))
+        return ScanResult(matches)
+
+
+text_matcher = TextMatcher()
+
+
+def get_text_matcher() -> TextMatcher:
+    """Общий автомат процесса"""
+    return text_matcher
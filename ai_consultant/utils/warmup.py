@@ -0,0 +1,276 @@
+"""
+🔥 Прогрев тяжелых ресурсов до fork воркеров gunicorn
+
+Модели SentenceTransformer, пайплайн тональности, данные NLTK, RAG сервисы
+с векторными клиентами и рекомендательные индексы загружаются один раз в
+мастер-процессе (preload_app = True, хук when_ready). Воркеры получают их
+через fork, и веса разделяются copy-on-write: модели переводятся в режим
+инференса (eval, requires_grad=False), а gc.freeze() не дает сборщику мусора
+трогать страницы с загруженными объектами.
+
+Без preload (ASGI конфиг) прогрев выполняется в воркере в post_worker_init,
+до того как воркер начнет принимать запросы. Эндпоинт /health/ready/ отдает 503,
+пока прогрев не завершен, и отчет о времени загрузки каждого ресурса.
+"""
+
+import gc
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+STATE_COLD = 'cold'
+STATE_WARMING = 'warming'
+STATE_READY = 'ready'
+STATE_DEGRADED = 'degraded'
+
+
+@dataclass
+class WarmupResource:
+    name: str
+    loader: Callable[[], object]
+    critical: bool = True
+    status: str = 'pending'
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class WarmupRegistry:
+    """Реестр тяжелых ресурсов и состояние готовности процесса"""
+
+    resources: Dict[str, WarmupResource] = field(default_factory=dict)
+    state: str = STATE_COLD
+    started_at: Optional[float] = None
+    total_seconds: float = 0.0
+    warmed_in_pid: Optional[int] = None
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def register(self, name: str, critical: bool = True):
+        """Декоратор: @warmup_registry.register('sentence_model')"""
+        def decorator(loader):
+            self.resources[name] = WarmupResource(name, loader, critical)
+            return loader
+        return decorator
+
+    def selected(self) -> List[WarmupResource]:
+        names = getattr(settings, 'AI_WARMUP_RESOURCES', None)
+        if names is None:
+            return list(self.resources.values())
+        return [self.resources[name] for name in names if name in self.resources]
+
+    def warm_up(self) -> Dict:
+        """Загружает все ресурсы по порядку; повторный вызов ничего не делает"""
+        with self._lock:
+            if self.state in (STATE_READY, STATE_DEGRADED):
+                return self.report()
+            self.state = STATE_WARMING
+            self.started_at = time.time()
+            started = time.perf_counter()
+
+            for resource in self.selected():
+                resource_started = time.perf_counter()
+                try:
+                    resource.loader()
+                    resource.status = 'loaded'
+                except Exception as e:
+                    resource.status = 'failed'
+                    resource.error = str(e)
+                    logger.error(f"❌ Прогрев '{resource.name}' не удался: {e}")
+                resource.seconds = time.perf_counter() - resource_started
+
+            self.total_seconds = time.perf_counter() - started
+            failed = [r for r in self.selected() if r.status == 'failed' and r.critical]
+            self.state = STATE_DEGRADED if failed else STATE_READY
+            self.warmed_in_pid = os.getpid()
+
+        self._log_report()
+        return self.report()
+
+    def warm_up_before_fork(self) -> Dict:
+        """Хук мастера gunicorn: прогрев, закрытие соединений БД, заморозка объектов для copy-on-write"""
+        report = self.warm_up()
+        from django.db import connections
+        connections.close_all()
+        gc.collect()
+        gc.freeze()
+        return report
+
+    def after_fork(self):
+        """Хук post_fork: состояние унаследовано от мастера, настраиваются потоки torch воркера"""
+        threads = getattr(settings, 'AI_WARMUP_TORCH_THREADS', None)
+        if threads:
+            try:
+                import torch
+                torch.set_num_threads(threads)
+            except ImportError:
+                pass
+
+    def is_ready(self) -> bool:
+        if self.state in (STATE_READY, STATE_DEGRADED):
+            return True
+        # Без прогрева (runserver, тесты) процесс считается готовым
+        return self.state == STATE_COLD and not getattr(settings, 'AI_WARMUP_ENABLED', False)
+
+    def report(self) -> Dict:
+        return {
+            'state': self.state,
+            'pid': os.getpid(),
+            'warmed_in_pid': self.warmed_in_pid,
+            'total_seconds': round(self.total_seconds, 3),
+            'resources': [
+                {
+                    'name': r.name,
+                    'status': r.status,
+                    'seconds': round(r.seconds, 3),
+                    'critical': r.critical,
+                    **({'error': r.error} if r.error else {}),
+                }
+                for r in self.selected()
+            ],
+        }
+
+    def _log_report(self):
+        lines = [f"🔥 Прогрев завершен за {self.total_seconds:.2f} с ({self.state}, pid {self.warmed_in_pid}):"]
+        for r in sorted(self.selected(), key=lambda r: r.seconds, reverse=True):
+            lines.append(f"   {r.name:<28} {r.seconds:>7.2f} с  {r.status}")
+        logger.info('\n'.join(lines))
+
+
+warmup_registry = WarmupRegistry()
+
+
+# 🧠 Общие экземпляры моделей: один на процесс вместо отдельного в каждом сервисе
+
+_models: Dict[str, object] = {}
+_models_lock = threading.Lock()
+
+
+def _inference_mode(model):
+    """eval() и без градиентов: веса только читаются и остаются общими после fork"""
+    model.eval()
+    for parameter in model.parameters():
+        parameter.requires_grad_(False)
+    return model
+
+
+def get_sentence_model(name: str = 'all-MiniLM-L6-v2'):
+    """Общий SentenceTransformer процесса"""
+    key = f'sentence:{name}'
+    if key not in _models:
+        with _models_lock:
+            if key not in _models:
+                from sentence_transformers import SentenceTransformer
+                _models[key] = _inference_mode(SentenceTransformer(name))
+    return _models[key]
+
+
+def get_sentiment_pipeline(model: str = 'cardiffnlp/twitter-roberta-base-sentiment'):
+    """Общий пайплайн тональности transformers"""
+    key = f'sentiment:{model}'
+    if key not in _models:
+        with _models_lock:
+            if key not in _models:
+                from transformers import pipeline
+                sentiment = pipeline('sentiment-analysis', model=model)
+                _inference_mode(sentiment.model)
+                _models[key] = sentiment
+    return _models[key]
+
+
+NLTK_RESOURCES = {'tokenizers/punkt': 'punkt', 'corpora/stopwords': 'stopwords'}
+
+
+def ensure_nltk_data():
+    """Данные NLTK: проверка при прогреве вместо nltk.download при импорте модуля"""
+    import nltk
+    for path, package in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            nltk.download(package, quiet=True)
+
+
+# 📋 Ресурсы в порядке загрузки
+
+@warmup_registry.register('nltk_data', critical=False)
+def _warm_nltk():
+    ensure_nltk_data()
+
+
+@warmup_registry.register('sentence_models')
+def _warm_sentence_models():
+    names = {
+        'all-MiniLM-L6-v2',
+        getattr(settings, 'RAG_EMBEDDING_MODEL', 'all-MiniLM-L6-v2'),
+        getattr(settings, 'RECOMMENDATION_MODEL', 'sentence-transformers/all-MiniLM-L6-v2'),
+    }
+    for name in sorted(names):
+        # Первый encode инициализирует токенайзер и буферы до fork
+        get_sentence_model(name).encode(['прогрев'])
+
+
+@warmup_registry.register('sentiment_pipeline', critical=False)
+def _warm_sentiment():
+    get_sentiment_pipeline()
+
+
+@warmup_registry.register('llm_sdk', critical=False)
+def _warm_llm_sdk():
+    # SDK OpenAI подключается лениво (utils/lazy_imports.py); воркеры получают его уже загруженным
+    import openai  # noqa: F401
+    from ai_consultant.services.llm_gateway import get_llm_gateway
+    get_llm_gateway().client
+
+
+@warmup_registry.register('enhanced_rag_service')
+def _warm_enhanced_rag():
+    from ai_consultant.rag.enhanced_rag_service import get_enhanced_rag_service
+    get_enhanced_rag_service()
+
+
+@warmup_registry.register('rag_service')
+def _warm_rag():
+    from ai_consultant.services.rag_service import get_rag_service
+    get_rag_service()
+
+
+@warmup_registry.register('recommendation_engine', critical=False)
+def _warm_recommendations():
+    from ai_consultant.recommendations.collaborative import get_cf_model
+    from ai_consultant.recommendations.recommendation_engine import get_recommendation_engine
+    engine = get_recommendation_engine()
+    # Единственное место, кроме build_club_embeddings, где индекс собирается с нуля
+    engine.club_index.sync(force=True, build_missing=True)
+    get_cf_model().is_ready()
+
+
+@warmup_registry.register('static_prompts', critical=False)
+def _warm_prompts():
+    import ai_consultant.prompts.enhanced_agent_prompts  # noqa: F401 — регистрирует промпты агентов
+    import ai_consultant.services.context  # noqa: F401 — регистрирует system_context
+    from ai_consultant.prompts.compiler import prompt_compiler
+    prompt_compiler.compile_all()
+
+
+@warmup_registry.register('text_matcher', critical=False)
+def _warm_text_matcher():
+    import ai_consultant.security  # noqa: F401 — регистрируют свои словари в общем автомате
+    import ai_consultant.services.message_processor  # noqa: F401
+    import ai_consultant.utils.context_analyzer  # noqa: F401
+    from ai_consultant.utils.text_matcher import text_matcher
+    text_matcher.compile()
+
+
+@warmup_registry.register('club_catalog', critical=False)
+def _warm_club_catalog():
+    from ai_consultant.recommendations.club_catalog import get_club_catalog
+    get_club_catalog()
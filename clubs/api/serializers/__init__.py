@@ -6,3 +6,5 @@ from .club_services import *
 from .club_gallery_photo import *
 from .festival_requests import *
 from .festival import *
+from .club_bulk import *
+from .values import *
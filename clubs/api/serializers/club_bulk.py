@@ -0,0 +1,37 @@
+from django.conf import settings
+from rest_framework import serializers
+
+from clubs.api.serializers.club_events import ClubEventSerializer
+from clubs.static import MemberActionEnum, RecurrenceEnum, RequestActionEnum
+
+BULK_MAX_ITEMS = getattr(settings, 'CLUBS_BULK_MAX_ITEMS', 500)
+
+
+class ClubJoinRequestBulkActionSerializer(serializers.Serializer):
+    action = serializers.ChoiceField(choices=RequestActionEnum)
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=BULK_MAX_ITEMS)
+
+
+class ClubMembersBulkActionSerializer(serializers.Serializer):
+    action = serializers.ChoiceField(choices=MemberActionEnum)
+    user_ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=BULK_MAX_ITEMS)
+
+
+class ClubRecurringEventSerializer(ClubEventSerializer):
+    """
+    Серия событий: первое событие и правило повторения (repeat, count).
+    Клуб берется из URL.
+    """
+    repeat = serializers.ChoiceField(choices=RecurrenceEnum, write_only=True)
+    count = serializers.IntegerField(
+        min_value=1, max_value=getattr(settings, 'CLUBS_BULK_MAX_EVENTS', 52), write_only=True,
+    )
+
+    class Meta(ClubEventSerializer.Meta):
+        read_only_fields = ('club',)
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if attrs['end_datetime'] < attrs['start_datetime']:
+            raise serializers.ValidationError({'end_datetime': 'Событие не может закончиться раньше начала'})
+        return attrs
@@ -7,4 +7,4 @@ class ClubEventSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = models.ClubEvent
-        exclude = ('old_datetime', )
+        exclude = ('old_datetime', 'geohash')
@@ -0,0 +1,129 @@
+from django.urls import reverse
+from rest_framework import serializers
+
+from clubs import models
+
+
+class ValuesSerializer:
+    """
+    Легкий сериализатор списка для read-only эндпоинтов.
+
+    Работает со строками QuerySet.values(): запрашиваются только нужные столбцы,
+    модели не создаются, а каждая строка превращается в ответ одной функцией.
+    Формат ответа совпадает с соответствующим ModelSerializer.
+
+    Атрибуты:
+        values_fields (tuple): Поля для QuerySet.values(), включая поля связанных моделей.
+    """
+
+    values_fields = ()
+    datetime_field = serializers.DateTimeField()
+
+    def __init__(self, rows, many=True, context=None):
+        self.rows = rows
+        self.context = context or {}
+
+    @classmethod
+    def get_values(cls, queryset):
+        return queryset.values(*cls.values_fields)
+
+    @property
+    def data(self):
+        return [self.to_representation(row) for row in self.rows]
+
+    def to_representation(self, row):
+        raise NotImplementedError
+
+    def datetime(self, value):
+        return self.datetime_field.to_representation(value)
+
+    def file_url(self, model, field_name, name):
+        """URL файла по имени из values(), как у ImageField/FileField DRF"""
+        if not name:
+            return None
+        url = model._meta.get_field(field_name).storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+class ClubListValuesSerializer(ValuesSerializer):
+    """Список клубов в формате ClubListSerializer"""
+
+    values_fields = (
+        'id', 'name', 'category_id', 'category__name', 'logo', 'description',
+        'members_count', 'likes_count', 'is_private', 'created_at',
+    )
+
+    def to_representation(self, row):
+        return {
+            'id': str(row['id']),
+            'name': row['name'],
+            'category': {'id': str(row['category_id']), 'name': row['category__name']},
+            'logo': self.file_url(models.Club, 'logo', row['logo']),
+            'description': row['description'],
+            'members_count': row['members_count'],
+            'likes_count': row['likes_count'],
+            'is_private': row['is_private'],
+            'created_at': self.datetime(row['created_at']),
+        }
+
+
+class ClubCategoryValuesSerializer(ValuesSerializer):
+    """Категории в формате ClubCategorySerializer"""
+
+    values_fields = ('id', 'name')
+
+    def to_representation(self, row):
+        return {'id': str(row['id']), 'name': row['name']}
+
+
+class ClubCityValuesSerializer(ClubCategoryValuesSerializer):
+    """Города в формате ClubCitySerializer"""
+
+
+class ClubEventValuesSerializer(ValuesSerializer):
+    """События в формате ClubEventSerializer"""
+
+    values_fields = (
+        'id', 'title', 'description', 'banner', 'location', 'latitude', 'longitude', 'start_datetime',
+        'end_datetime', 'min_age', 'max_age', 'entry_requirements', 'created_at', 'updated_at', 'club',
+    )
+
+    def to_representation(self, row):
+        return {
+            'id': str(row['id']),
+            'title': row['title'],
+            'description': row['description'],
+            'banner': self.file_url(models.ClubEvent, 'banner', row['banner']),
+            'location': row['location'],
+            'latitude': row['latitude'],
+            'longitude': row['longitude'],
+            'start_datetime': self.datetime(row['start_datetime']),
+            'end_datetime': self.datetime(row['end_datetime']),
+            'min_age': row['min_age'],
+            'max_age': row['max_age'],
+            'entry_requirements': row['entry_requirements'],
+            'created_at': self.datetime(row['created_at']),
+            'updated_at': self.datetime(row['updated_at']),
+            'club': row['club'],
+        }
+
+
+class ClubEventCalendarValuesSerializer(ValuesSerializer):
+    """События для календаря (clubs/event_calendar.py): только то, что показывает ячейка дня"""
+
+    values_fields = ('id', 'title', 'location', 'start_datetime', 'end_datetime', 'banner', 'club_id', 'club__name')
+
+    def to_representation(self, row):
+        return {
+            'id': str(row['id']),
+            'title': row['title'],
+            'start': self.datetime(row['start_datetime']),
+            'end': self.datetime(row['end_datetime']),
+            'location': row['location'],
+            'url': reverse('event_detail', kwargs={'pk': row['id']}),
+            'banner': self.file_url(models.ClubEvent, 'banner', row['banner']),
+            'club': {'id': str(row['club_id']), 'name': row['club__name']},
+        }
@@ -1,9 +1,10 @@
-from datetime import datetime
-
+from django.conf import settings
 from django.db.models import Q
+from django.utils import timezone
 from rest_framework.filters import OrderingFilter
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework import mixins as drf_mixins
 from rest_framework import permissions as drf_permissions
 from rest_framework.permissions import IsAuthenticated
@@ -17,21 +18,27 @@ from clubs import models
 from clubs import permissions
 from clubs import services
 from clubs import mixins
+from clubs import http_cache
+from clubs import event_calendar
 from clubs.models import ClubJoinRequest
 
 
-class ClubViewSet(mixins.ClubActionSerializerMixin, viewsets.ModelViewSet):
+class ClubViewSet(mixins.ConditionalGetMixin, mixins.ValuesListMixin, mixins.NearbyMixin,
+                  mixins.ClubActionSerializerMixin, viewsets.ModelViewSet):
     """
     ViewSet для управления клубами.
 
     Данный ViewSet предоставляет стандартные действия CRUD для модели Club,
-    а также пользовательское действие `club_action`.
+    а также пользовательское действие `club_action`, поиск рядом `nearby` (clubs/geo.py)
+    и массовые действия управляющих: заявки, участники и серии событий (ClubBulkServices).
 
     Атрибуты:
         queryset (QuerySet): Базовый набор данных для этого ViewSet-а, включающий только активные клубы.
         permission_classes (tuple): Классы разрешений, применяемые к этому ViewSet-у.
         ACTION_SERIALIZERS (dict): Словарь, который сопоставляет действия с соответствующими сериализаторами.
         serializer_class (Serializer): Сериализатор, используемый по умолчанию для действий, не указанных в ACTION_SERIALIZERS.
+        CACHE_RESOURCES (tuple): Версии ресурсов для ETag списка клубов (детальная карточка зависит от пользователя).
+        VALUES_SERIALIZER (ValuesSerializer): Сериализатор списка по values() без создания моделей.
     """
     queryset = models.Club.objects.filter(is_active=True)
     permission_classes = (permissions.ClubPermission,)
@@ -41,11 +48,18 @@ class ClubViewSet(mixins.ClubActionSerializerMixin, viewsets.ModelViewSet):
         'update': serializers.ClubUpdateSerializer,
         'retrieve': serializers.ClubDetailSerializer,
         'join_requests': serializers.ClubJoinRequestSerializer,
+        'join_requests_bulk': serializers.ClubJoinRequestBulkActionSerializer,
+        'members_bulk': serializers.ClubMembersBulkActionSerializer,
+        'recurring_events': serializers.ClubRecurringEventSerializer,
     }
     serializer_class = serializers.ClubListSerializer
+    VALUES_SERIALIZER = serializers.ClubListValuesSerializer
     filterset_class = filtersets.ClubFilter
+    bulk_services = services.ClubBulkServices
     services = services.ClubServices
     filter_backends = [OrderingFilter,]
+    CACHE_RESOURCES = (http_cache.CLUB, http_cache.CATEGORY)
+    CONDITIONAL_ACTIONS = ('list',)
 
     @action(detail=True, methods=['post'], permission_classes=(IsAuthenticated,))
     def club_action(self, request, **kwargs):
@@ -72,6 +86,53 @@ class ClubViewSet(mixins.ClubActionSerializerMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(detail=True, methods=['post'], url_path='join_requests/bulk',
+            permission_classes=(permissions.IsClubManager,))
+    def join_requests_bulk(self, request, **kwargs):
+        """
+        Одобряет или отклоняет до CLUBS_BULK_MAX_ITEMS заявок на вступление одним запросом.
+
+        Тело: {"action": "approve" | "reject", "ids": [...]}.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        club = self.get_object()
+        result = self.bulk_services.process_join_requests(
+            club, serializer.validated_data['ids'], serializer.validated_data['action'],
+        )
+        return Response({**result, 'members_count': club.members_count}, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], url_path='members/bulk', permission_classes=(permissions.IsClubManager,))
+    def members_bulk(self, request, **kwargs):
+        """
+        Добавляет или удаляет участников клуба одним запросом.
+
+        Тело: {"action": "add" | "remove", "user_ids": [...]}.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        club = self.get_object()
+        result = self.bulk_services.update_members(
+            club, serializer.validated_data['user_ids'], serializer.validated_data['action'],
+        )
+        return Response({**result, 'members_count': club.members_count}, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], url_path='events/recurring', permission_classes=(permissions.IsClubManager,))
+    def recurring_events(self, request, **kwargs):
+        """
+        Создает серию событий клуба: поля события и правило повторения repeat (daily/weekly/monthly) и count.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        club = self.get_object()
+        data = dict(serializer.validated_data)
+        repeat, count = data.pop('repeat'), data.pop('count')
+        events = self.bulk_services.create_recurring_events(club, data, repeat, count)
+        return Response(
+            serializers.ClubEventSerializer(events, many=True, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED,
+        )
+
     def get_queryset(self):
         """
         Возвращает набор данных для данного ViewSet-а.
@@ -137,20 +198,114 @@ class ClubServiceImageViewSet(viewsets.ModelViewSet):
         return qs
 
 
-class ClubEventViewSet(viewsets.ModelViewSet):
+class ClubEventViewSet(mixins.ConditionalGetMixin, mixins.ValuesListMixin, mixins.NearbyMixin,
+                       viewsets.ModelViewSet):
     """
     ViewSet для управления событиями клубов.
 
     Этот ViewSet предоставляет возможность управлять событиями клубов, включая создание, чтение, обновление и удаление.
+    Действия календаря (clubs/event_calendar.py) отдают события видимого окна и счетчики для тепловой карты,
+    действие nearby — будущие события рядом с точкой (clubs/geo.py).
 
     Атрибуты:
         queryset (QuerySet): Базовый набор данных для этого ViewSet-а, включающий все будущие события клубов.
         permission_classes (tuple): Классы разрешений, применяемые для проверки прав доступа к операциям с событиями клубов.
         serializer_class (Serializer): Сериализатор для преобразования данных модели ClubEvent в JSON.
+        CACHE_RESOURCES (tuple): Версии ресурсов для ETag ответов (clubs/http_cache.py).
+        VALUES_SERIALIZER (ValuesSerializer): Сериализатор списка по values() без создания моделей.
+        CALENDAR_RESOURCES (tuple): Версии ресурсов для ETag ответов календаря (фильтры city/category зависят от клубов).
     """
-    queryset = models.ClubEvent.objects.filter(start_datetime__gte=datetime.now())
+    queryset = models.ClubEvent.objects.all()
     permission_classes = (permissions.ClubObjectsPermission, )
     serializer_class = serializers.ClubEventSerializer
+    VALUES_SERIALIZER = serializers.ClubEventValuesSerializer
+    CACHE_RESOURCES = (http_cache.EVENT,)
+    CALENDAR_RESOURCES = (http_cache.EVENT, http_cache.CLUB)
+
+    def get_queryset(self):
+        """
+        Возвращает будущие события.
+
+        Граница вычисляется на каждый запрос: queryset уровня класса считал бы datetime.now()
+        один раз при импорте, и «будущие» события устаревали бы на все время жизни воркера.
+        """
+        return super().get_queryset().filter(start_datetime__gte=timezone.now())
+
+    def get_changed_at(self) -> float:
+        """
+        Список будущих событий меняется и без записи в БД — когда ближайшее событие начинается.
+        """
+        def next_start():
+            start = (
+                models.ClubEvent.objects.filter(start_datetime__gte=timezone.now())
+                .order_by('start_datetime').values_list('start_datetime', flat=True).first()
+            )
+            return start.timestamp() if start else None
+        return http_cache.time_boundary(http_cache.EVENT, next_start)
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request, **kwargs):
+        """
+        События, пересекающие окно ?from=&to= (ISO дата или дата-время), и их число по дням.
+
+        Необязательные фильтры: city и category (UUID). По умолчанию — текущий месяц.
+        """
+        def view():
+            start, end = event_calendar.parse_range(
+                request.query_params, getattr(settings, 'CLUBS_CALENDAR_MAX_RANGE_DAYS', 92)
+            )
+            city, category = event_calendar.parse_filters(request.query_params)
+            return Response(event_calendar.window_view(
+                start, end, serializers.ClubEventCalendarValuesSerializer, city, category,
+                context=self.get_serializer_context(),
+            ))
+        now = timezone.localtime()
+        return self._calendar_response(request, view, event_calendar.month_start(now.year, now.month))
+
+    @action(detail=False, methods=['get'], url_path='calendar/months')
+    def calendar_months(self, request, **kwargs):
+        """
+        Число событий по месяцам окна ?from=&to= для тепловой карты (по умолчанию — текущий год).
+        """
+        def view():
+            params = request.query_params.copy()
+            if not params.get('from'):
+                params['from'] = f'{timezone.localtime().year}-01-01'
+            if not params.get('to'):
+                params['to'] = f'{event_calendar.parse_bound(params["from"]).year + 1}-01-01'
+            start, end = event_calendar.parse_range(
+                params, getattr(settings, 'CLUBS_CALENDAR_MAX_MONTHS_RANGE_DAYS', 731)
+            )
+            city, category = event_calendar.parse_filters(request.query_params)
+            return Response({'months': event_calendar.month_counts(start, end, city, category)})
+        return self._calendar_response(request, view, event_calendar.month_start(timezone.localtime().year, 1))
+
+    @action(detail=False, methods=['get'], url_path=r'calendar/(?P<year>\d{4})/(?P<month>\d{1,2})')
+    def calendar_month(self, request, year=None, month=None, **kwargs):
+        """
+        Месячный вид: события месяца и их число по дням, из кэша до изменения событий месяца.
+        """
+        def view():
+            city, category = event_calendar.parse_filters(request.query_params)
+            return Response(event_calendar.month_view(
+                int(year), int(month), serializers.ClubEventCalendarValuesSerializer, city, category,
+            ))
+        return self._calendar_response(request, view)
+
+    def _calendar_response(self, request, view, default_start=None):
+        """
+        Условный ответ календаря. Окно по умолчанию (без ?from=) сдвигается с началом
+        месяца или года — default_start входит в ETag и Last-Modified.
+        """
+        def checked_view():
+            try:
+                return view()
+            except event_calendar.CalendarQueryError as e:
+                raise ValidationError({'detail': str(e)})
+        changed_at = None
+        if default_start and not request.query_params.get('from'):
+            changed_at = default_start.timestamp
+        return http_cache.conditional_response(request, self.CALENDAR_RESOURCES, checked_view, changed_at)
 
 
 class ClubAdsViewSet(viewsets.ModelViewSet):
@@ -170,7 +325,7 @@ class ClubAdsViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.ClubAdsSerializer
 
 
-class ClubCategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class ClubCategoryViewSet(mixins.ConditionalGetMixin, mixins.ValuesListMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet для просмотра категорий клубов.
 
@@ -179,12 +334,16 @@ class ClubCategoryViewSet(viewsets.ReadOnlyModelViewSet):
     Атрибуты:
         queryset (QuerySet): Базовый набор данных для этого ViewSet-а, включающий только активные категории клубов.
         serializer_class (Serializer): Сериализатор для преобразования данных модели ClubCategory в JSON.
+        CACHE_RESOURCES (tuple): Версии ресурсов для ETag ответов (clubs/http_cache.py).
+        VALUES_SERIALIZER (ValuesSerializer): Сериализатор списка по values() без создания моделей.
     """
     queryset = models.ClubCategory.objects.filter(is_active=True)
     serializer_class = serializers.ClubCategorySerializer
+    VALUES_SERIALIZER = serializers.ClubCategoryValuesSerializer
+    CACHE_RESOURCES = (http_cache.CATEGORY,)
 
 
-class ClubCityViewSet(viewsets.ReadOnlyModelViewSet):
+class ClubCityViewSet(mixins.ConditionalGetMixin, mixins.ValuesListMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet для просмотра городов.
 
@@ -193,9 +352,13 @@ class ClubCityViewSet(viewsets.ReadOnlyModelViewSet):
     Атрибуты:
         queryset (QuerySet): Базовый набор данных для этого ViewSet-а, включающий все города.
         serializer_class (Serializer): Сериализатор для преобразования данных модели City в JSON.
+        CACHE_RESOURCES (tuple): Версии ресурсов для ETag ответов (clubs/http_cache.py).
+        VALUES_SERIALIZER (ValuesSerializer): Сериализатор списка по values() без создания моделей.
     """
     queryset = models.City.objects.all()
     serializer_class = serializers.ClubCitySerializer
+    VALUES_SERIALIZER = serializers.ClubCityValuesSerializer
+    CACHE_RESOURCES = (http_cache.CITY,)
 
 
 class ClubGalleryPhotoViewSet(viewsets.ModelViewSet):
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ClubsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'clubs'
+
+    def ready(self):
+        import clubs.signals  # noqa: F401
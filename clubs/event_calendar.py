@@ -0,0 +1,229 @@
+"""
+📅 Календарь событий клубов: выборка по окну дат и счетчики для тепловой карты
+
+Страница календаря раньше получала все события разом. Теперь она запрашивает
+только видимое окно (?from=&to=, плюс city и category). Выборка идет по
+индексу (start_datetime, club): событие попадает в окно, если началось не
+раньше чем за CLUBS_CALENDAR_MAX_EVENT_DAYS до него и закончилось после его
+начала, поэтому многодневные события видны и в соседних месяцах.
+
+Счетчики событий по месяцам и дням считает БД (TruncMonth/TruncDate + Count)
+в текущем часовом поясе. Месячный вид (события и счетчики по дням) кэшируется;
+у каждого месяца своя версия в кэше, и сигналы ClubEvent (clubs/signals.py)
+после коммита меняют версии месяцев, которые событие занимало до и после
+изменения. Для видов с фильтром по городу или категории в ключ входит версия
+клубов (clubs/http_cache.py): клуб мог сменить город.
+"""
+
+import calendar
+import uuid
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, QuerySet
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from clubs import http_cache
+from clubs.models import ClubEvent
+
+MONTH_VERSION_KEY = 'event_calendar:month:{}'
+MONTH_VIEW_KEY = 'event_calendar:view:{}:{}:{}:{}:{}'
+# Защита от перебора месяцев при испорченных датах события
+MAX_INVALIDATED_MONTHS = 24
+
+
+class CalendarQueryError(ValueError):
+    """Неверные параметры запроса календаря"""
+
+
+def parse_bound(value: str) -> datetime:
+    """Граница окна: ISO дата или дата-время; без часового пояса — в текущем поясе"""
+    value = value.strip()
+    try:
+        # «+» смещения в query string без кодирования превращается в пробел
+        parsed = parse_datetime(value.replace(' ', '+')) if 'T' in value else None
+        day = parse_date(value) if parsed is None else None
+    except ValueError:
+        parsed = day = None
+    if parsed is None:
+        if day is None:
+            raise CalendarQueryError(f'Неверная дата: {value}')
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def month_start(year: int, month: int) -> datetime:
+    return timezone.make_aware(datetime(year, month, 1))
+
+
+def next_month(moment: datetime) -> datetime:
+    year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+    return month_start(year, month)
+
+
+def parse_range(params, max_days: int) -> Tuple[datetime, datetime]:
+    """Окно [from, to); по умолчанию — текущий месяц"""
+    now = timezone.localtime()
+    start = parse_bound(params['from']) if params.get('from') else month_start(now.year, now.month)
+    end = parse_bound(params['to']) if params.get('to') else next_month(timezone.localtime(start))
+    if end <= start:
+        raise CalendarQueryError('Параметр to должен быть позже from')
+    if end - start > timedelta(days=max_days):
+        raise CalendarQueryError(f'Окно календаря не больше {max_days} дней')
+    return start, end
+
+
+def parse_filters(params) -> Tuple[Optional[str], Optional[str]]:
+    """Идентификаторы города и категории клуба (UUID) или None"""
+    filters = []
+    for name in ('city', 'category'):
+        value = params.get(name) or None
+        if value is not None:
+            try:
+                value = str(uuid.UUID(value))
+            except ValueError:
+                raise CalendarQueryError(f'Неверный идентификатор {name}: {value}')
+        filters.append(value)
+    return filters[0], filters[1]
+
+
+def _filter_clubs(queryset: QuerySet, city: Optional[str], category: Optional[str]) -> QuerySet:
+    if city:
+        queryset = queryset.filter(club__city_id=city)
+    if category:
+        queryset = queryset.filter(club__category_id=category)
+    return queryset
+
+
+def events_in_range(start: datetime, end: datetime, city: Optional[str] = None,
+                    category: Optional[str] = None) -> QuerySet:
+    """События, пересекающие окно [start, end), по возрастанию начала"""
+    lookback = timedelta(days=getattr(settings, 'CLUBS_CALENDAR_MAX_EVENT_DAYS', 31))
+    queryset = ClubEvent.objects.filter(
+        start_datetime__gte=start - lookback, start_datetime__lt=end, end_datetime__gt=start,
+    )
+    return _filter_clubs(queryset, city, category).order_by('start_datetime')
+
+
+def events_starting_in(start: datetime, end: datetime, city: Optional[str] = None,
+                       category: Optional[str] = None) -> QuerySet:
+    """События, начинающиеся в окне [start, end) — для счетчиков"""
+    queryset = ClubEvent.objects.filter(start_datetime__gte=start, start_datetime__lt=end)
+    return _filter_clubs(queryset, city, category)
+
+
+def bucket_counts(queryset: QuerySet, unit: str) -> Dict[str, int]:
+    """Число событий по месяцам ('2026-10') или дням ('2026-10-19'), посчитанное в SQL"""
+    if unit == 'month':
+        bucket, label = TruncMonth('start_datetime'), lambda value: value.strftime('%Y-%m')
+    else:
+        bucket, label = TruncDate('start_datetime'), lambda value: value.isoformat()
+    rows = (
+        queryset.order_by().annotate(bucket=bucket).values('bucket')
+        .annotate(count=Count('id')).order_by('bucket')
+    )
+    return {label(row['bucket']): row['count'] for row in rows}
+
+
+def month_key(moment: datetime) -> str:
+    return timezone.localtime(moment).strftime('%Y-%m')
+
+
+def month_version(key: str) -> str:
+    cache_key = MONTH_VERSION_KEY.format(key)
+    version = cache.get(cache_key)
+    if version is None:
+        cache.add(cache_key, uuid.uuid4().hex, None)
+        version = cache.get(cache_key)
+    return version
+
+
+def months_between(start: datetime, end: datetime) -> Iterator[str]:
+    """Месяцы ('2026-10'), которые занимает событие с start по end включительно"""
+    moment = month_start(*map(int, month_key(start).split('-')))
+    last = month_key(max(start, end))
+    for _ in range(MAX_INVALIDATED_MONTHS):
+        key = month_key(moment)
+        yield key
+        if key >= last:
+            break
+        moment = next_month(moment)
+
+
+def _as_datetime(value) -> Optional[datetime]:
+    """Дата события как datetime: атрибут модели до перечитывания может остаться строкой"""
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if isinstance(value, datetime) and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value if isinstance(value, datetime) else None
+
+
+def invalidate_months(spans: Iterable[Tuple[object, object]]):
+    """Новые версии месяцев, затронутых событиями с датами (start, end)"""
+    keys = set()
+    for start, end in spans:
+        start, end = _as_datetime(start), _as_datetime(end)
+        if start is not None:
+            keys.update(months_between(start, end or start))
+    for key in keys:
+        cache.set(MONTH_VERSION_KEY.format(key), uuid.uuid4().hex, None)
+
+
+def month_view(year: int, month: int, serializer, city: Optional[str] = None,
+               category: Optional[str] = None) -> dict:
+    """
+    События месяца и их число по дням; кэшируется до изменения событий этого месяца.
+
+    serializer — ValuesSerializer строк событий (clubs/api/serializers/values.py).
+    """
+    if not 1 <= month <= 12 or not 1 <= year < date.max.year:
+        raise CalendarQueryError(f'Неверный месяц: {year}-{month}')
+    start = month_start(year, month)
+    key = f'{year:04d}-{month:02d}'
+    clubs_version = http_cache.get_version(http_cache.CLUB) if city or category else ''
+    cache_key = MONTH_VIEW_KEY.format(key, month_version(key), city or '', category or '', clubs_version)
+
+    view = cache.get(cache_key)
+    if view is None:
+        end = next_month(start)
+        events = events_in_range(start, end, city, category)
+        view = {
+            'month': key,
+            'days_in_month': calendar.monthrange(year, month)[1],
+            'days': bucket_counts(events_starting_in(start, end, city, category), 'day'),
+            'events': serializer(serializer.get_values(events)).data,
+        }
+        cache.set(cache_key, view, getattr(settings, 'CLUBS_CALENDAR_CACHE_TIMEOUT', 60 * 60))
+    return view
+
+
+def window_view(start: datetime, end: datetime, serializer, city: Optional[str] = None,
+                category: Optional[str] = None, context=None) -> dict:
+    """События окна и их число по дням — для видимой области календаря"""
+    events = events_in_range(start, end, city, category)
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'days': bucket_counts(events_starting_in(start, end, city, category), 'day'),
+        'events': serializer(serializer.get_values(events), context=context).data,
+    }
+
+
+def month_counts(start: datetime, end: datetime, city: Optional[str] = None,
+                 category: Optional[str] = None) -> List[dict]:
+    """Число событий по месяцам окна, включая пустые месяцы"""
+    counts = bucket_counts(events_starting_in(start, end, city, category), 'month')
+    months = []
+    moment = month_start(*map(int, month_key(start).split('-')))
+    while moment < end:
+        key = month_key(moment)
+        months.append({'month': key, 'count': counts.get(key, 0)})
+        moment = next_month(moment)
+    return months
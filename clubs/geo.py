@@ -0,0 +1,277 @@
+"""
+📍 Координаты клубов и событий: geohash индекс, поиск в радиусе и k ближайших
+
+Город клуба и адрес — свободный текст, поэтому «клубы рядом» раньше сводились
+к совпадению подстроки. Теперь у городов, клубов и событий есть широта и
+долгота; их заполняет команда geocode_clubs по файлу-справочнику адресов и
+городов (Gazetteer), без обращений к внешним сервисам.
+
+Пространственный индекс — geohash точки (GEOHASH_PRECISION символов) в
+обычном B-tree индексе. Точки одной ячейки geohash имеют общий префикс, а
+префикс — это диапазон строк [prefix, следующий префикс), поэтому поиск
+в радиусе — несколько диапазонных запросов по индексу (ячейка с центром
+и ее соседи) и точная проверка расстояния по формуле гаверсинусов только
+для найденных кандидатов. Диапазон, а не LIKE, использует индекс и в
+SQLite, и в PostgreSQL без varchar_pattern_ops.
+
+k ближайших ищутся расширением радиуса, пока в круге не окажется k точек.
+"""
+
+import csv
+import json
+import math
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+# ~5 м: точнее справочник все равно не бывает
+GEOHASH_PRECISION = 9
+
+
+class GeoQueryError(ValueError):
+    """Неверные координаты или параметры гео-запроса"""
+
+
+@dataclass(frozen=True)
+class Point:
+    latitude: float
+    longitude: float
+
+
+def parse_point(latitude, longitude) -> Point:
+    """Точка из параметров запроса; ошибки — GeoQueryError"""
+    try:
+        point = Point(float(latitude), float(longitude))
+    except (TypeError, ValueError):
+        raise GeoQueryError('Параметры lat и lon должны быть числами')
+    if not (-90 <= point.latitude <= 90 and -180 <= point.longitude <= 180):
+        raise GeoQueryError('Координаты вне диапазона: lat [-90, 90], lon [-180, 180]')
+    return point
+
+
+def haversine_km(a: Point, b: Point) -> float:
+    lat1, lat2 = math.radians(a.latitude), math.radians(b.latitude)
+    dlat = lat2 - lat1
+    dlon = math.radians(b.longitude - a.longitude)
+    h = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+def _wrap_longitude(longitude: float) -> float:
+    return (longitude + 180) % 360 - 180
+
+
+def encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Geohash точки длиной precision"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    latitude = min(90.0, max(-90.0, latitude))
+    longitude = _wrap_longitude(longitude)
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def point_geohash(latitude: Optional[float], longitude: Optional[float]) -> str:
+    """Значение колонки geohash: пустая строка, если координат нет"""
+    if latitude is None or longitude is None:
+        return ''
+    return encode(latitude, longitude)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Размер ячейки geohash в градусах: (широта, долгота)"""
+    bits = 5 * precision
+    return 180 / 2 ** (bits // 2), 360 / 2 ** ((bits + 1) // 2)
+
+
+def covering_cells(center: Point, radius_km: float) -> Optional[List[str]]:
+    """
+    Ячейки geohash, покрывающие круг: самые мелкие ячейки не меньше круга, центральная и соседи.
+
+    None — круг задевает полюс или почти всю долготу, и по индексу его не сузить.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    farthest_latitude = abs(center.latitude) + dlat
+    if farthest_latitude >= 90:
+        return None
+    dlon = dlat / math.cos(math.radians(farthest_latitude))
+    if dlon >= 180:
+        return None
+
+    precision = 0
+    for candidate in range(1, GEOHASH_PRECISION + 1):
+        cell_lat, cell_lon = cell_size(candidate)
+        if cell_lat < dlat or cell_lon < dlon:
+            break
+        precision = candidate
+    if precision == 0:
+        return None
+
+    cell_lat, cell_lon = cell_size(precision)
+    cells = {
+        encode(center.latitude + i * cell_lat, center.longitude + j * cell_lon, precision)
+        for i in (-1, 0, 1) for j in (-1, 0, 1)
+    }
+    return sorted(cells)
+
+
+def _next_prefix(prefix: str) -> Optional[str]:
+    """Наименьшая строка больше всех строк с этим префиксом (алфавит geohash упорядочен как ASCII)"""
+    while prefix:
+        index = GEOHASH_ALPHABET.index(prefix[-1])
+        if index + 1 < len(GEOHASH_ALPHABET):
+            return prefix[:-1] + GEOHASH_ALPHABET[index + 1]
+        prefix = prefix[:-1]
+    return None
+
+
+def prefix_filter(cells: Iterable[str], field: str = 'geohash') -> Q:
+    """Условие «geohash начинается с одной из ячеек» как диапазоны по B-tree индексу"""
+    condition = Q()
+    for cell in cells:
+        upper = _next_prefix(cell)
+        cell_range = Q(**{f'{field}__gte': cell})
+        if upper is not None:
+            cell_range &= Q(**{f'{field}__lt': upper})
+        condition |= cell_range
+    return condition
+
+
+def within_radius(queryset: QuerySet, center: Point, radius_km: float) -> List[Tuple[object, float]]:
+    """
+    (pk, расстояние в км) объектов queryset в круге, по возрастанию расстояния.
+
+    Модель должна иметь поля latitude, longitude и geohash.
+    """
+    cells = covering_cells(center, radius_km)
+    if cells is None:
+        candidates = queryset.exclude(geohash='')
+    else:
+        candidates = queryset.filter(prefix_filter(cells))
+    found = []
+    for pk, latitude, longitude in candidates.order_by().values_list('pk', 'latitude', 'longitude'):
+        distance = haversine_km(center, Point(latitude, longitude))
+        if distance <= radius_km:
+            found.append((pk, distance))
+    found.sort(key=lambda item: item[1])
+    return found
+
+
+def nearest(queryset: QuerySet, center: Point, k: int,
+            max_radius_km: Optional[float] = None) -> List[Tuple[object, float]]:
+    """k ближайших объектов не дальше max_radius_km: радиус растет, пока в круге не окажется k точек"""
+    if max_radius_km is None:
+        max_radius_km = getattr(settings, 'CLUBS_GEO_MAX_RADIUS_KM', 300)
+    radius = min(getattr(settings, 'CLUBS_GEO_KNN_START_KM', 2), max_radius_km)
+    while True:
+        found = within_radius(queryset, center, radius)
+        if len(found) >= k or radius >= max_radius_km:
+            return found[:k]
+        radius = min(radius * 4, max_radius_km)
+
+
+def distance_to(center: Point, latitude: Optional[float], longitude: Optional[float]) -> Optional[float]:
+    """Расстояние до объекта в км или None, если он не геокодирован"""
+    if latitude is None or longitude is None:
+        return None
+    return haversine_km(center, Point(latitude, longitude))
+
+
+def city_point(name: Optional[str]) -> Optional[Point]:
+    """Координаты города по названию или коду ИАТА, если город геокодирован"""
+    from clubs.models import City
+
+    key = normalize_place(name) if isinstance(name, str) else ''
+    if not key:
+        return None
+    # Сравнение в Python: iexact в SQLite не различает регистр только у латиницы, а городов немного
+    rows = City.objects.filter(latitude__isnull=False).values_list('name', 'iata_code', 'latitude', 'longitude')
+    for city_name, iata_code, latitude, longitude in rows:
+        if key in (normalize_place(city_name), normalize_place(iata_code)):
+            return Point(latitude, longitude)
+    return None
+
+
+def normalize_place(text: Optional[str]) -> str:
+    """Ключ справочника: нижний регистр, ё -> е, без пунктуации и лишних пробелов"""
+    if not text:
+        return ''
+    text = text.lower().replace('ё', 'е')
+    return ' '.join(re.sub(r'[^\w]+', ' ', text).split())
+
+
+class Gazetteer:
+    """
+    Справочник «место -> координаты» для офлайн-геокодирования.
+
+    Файл CSV (колонки name, lat, lon и необязательная city) или JSON: список
+    объектов с теми же ключами либо словарь {name: [lat, lon]}. Записи с city
+    находятся только для этого города, поэтому одинаковые улицы разных городов
+    не путаются.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, Optional[str], float, float]] = ()):
+        self.places: Dict[Tuple[str, str], Point] = {}
+        for name, city, latitude, longitude in entries:
+            self.add(name, city, latitude, longitude)
+
+    def __len__(self):
+        return len(self.places)
+
+    def add(self, name: str, city: Optional[str], latitude, longitude):
+        point = parse_point(latitude, longitude)
+        key = normalize_place(name)
+        if key:
+            self.places[(normalize_place(city), key)] = point
+
+    @classmethod
+    def load(cls, path) -> 'Gazetteer':
+        path = Path(path)
+        with path.open(encoding='utf-8-sig', newline='') as file:
+            if path.suffix.lower() == '.json':
+                data = json.load(file)
+                if isinstance(data, dict):
+                    rows = [{'name': name, 'lat': value[0], 'lon': value[1]} for name, value in data.items()]
+                else:
+                    rows = data
+            else:
+                rows = list(csv.DictReader(file))
+        return cls((row['name'], row.get('city'), row['lat'], row['lon']) for row in rows)
+
+    def lookup(self, place: Optional[str], city: Optional[str] = None) -> Optional[Point]:
+        """
+        Координаты места: полная строка, затем она же без первых частей через запятую
+        («г. Алматы, ул. Абая 1» -> «ул. Абая 1»); сначала в городе city, потом без города.
+        """
+        if not place:
+            return None
+        parts = [part for part in place.split(',') if part.strip()]
+        candidates = [normalize_place(','.join(parts[i:])) for i in range(len(parts))]
+        city_key = normalize_place(city)
+        scopes = (city_key, '') if city_key else ('',)
+        for scope in scopes:
+            for candidate in candidates:
+                point = self.places.get((scope, candidate))
+                if point is not None:
+                    return point
+        return None
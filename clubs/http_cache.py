@@ -0,0 +1,143 @@
+"""
+🏷️ Условные GET запросы для редко меняющихся API клубов
+
+Категории, города, список клубов и события меняются редко, а виджет
+запрашивает их при каждой загрузке. Для каждого типа ресурса в общем кэше
+хранится отметка версии (время последнего изменения), ее обновляют сигналы
+моделей (clubs/signals.py) после коммита транзакции.
+
+Из отметок ресурсов, от которых зависит ответ, строятся слабый ETag и
+Last-Modified. Если клиент или nginx (proxy_cache_revalidate) присылает
+совпадающий If-None-Match / If-Modified-Since, представление не вызывается:
+нет ни запросов к БД, ни сериализации, сразу отдается 304.
+Cache-Control: public, max-age=CLUBS_API_CACHE_MAX_AGE позволяет nginx
+кэшировать ответ (nginx_production_optimal.conf, зона club_api).
+
+Если ответ меняется и со временем (будущие события перестают быть будущими
+в момент начала), к версиям добавляется момент последнего такого изменения —
+time_boundary(): ближайшая граница хранится в кэше и пересчитывается одним
+запросом, только когда она наступила или версия ресурса сменилась.
+
+Отметки должны быть общими для всех воркеров (Redis в settings_production).
+С LocMemCache воркер, не видевший изменения, ответил бы 304 на устаревшие
+данные, поэтому по умолчанию для локальных кэшей механизм выключен
+(CLUBS_API_CONDITIONAL_GET включает его явно).
+"""
+
+import hashlib
+import math
+import time
+from functools import wraps
+from typing import Callable, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+VERSION_CACHE_KEY = 'http_cache:version:{}'
+BOUNDARY_CACHE_KEY = 'http_cache:boundary:{}:{}'
+BOUNDARY_TIMEOUT = 24 * 60 * 60
+LOCAL_CACHE_BACKENDS = ('LocMemCache', 'DummyCache')
+
+# Типы ресурсов, для которых ведутся отметки версий
+CLUB = 'club'
+CATEGORY = 'category'
+CITY = 'city'
+EVENT = 'event'
+
+
+def is_enabled() -> bool:
+    enabled = getattr(settings, 'CLUBS_API_CONDITIONAL_GET', None)
+    if enabled is None:
+        backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+        enabled = not backend.endswith(LOCAL_CACHE_BACKENDS)
+    return enabled
+
+
+def get_version(resource: str) -> float:
+    """Отметка версии ресурса; если ее нет в кэше — создается текущим временем"""
+    key = VERSION_CACHE_KEY.format(resource)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(*resources: str):
+    """
+    Новая отметка версии ресурсов.
+    Отметка растет минимум на секунду, чтобы Last-Modified (с точностью до секунды) тоже менялся.
+    """
+    for resource in resources:
+        key = VERSION_CACHE_KEY.format(resource)
+        previous = cache.get(key) or 0
+        cache.set(key, max(time.time(), math.floor(previous) + 1), None)
+
+
+def time_boundary(resource: str, next_change: Callable[[], Optional[float]]) -> float:
+    """
+    Момент последнего изменения ответа со временем, при неизменной версии resource.
+
+    next_change() — ближайший будущий момент, когда ответ изменится сам (unix time или None);
+    вызывается, только когда сохраненная граница наступила или версия ресурса сменилась.
+    """
+    key = BOUNDARY_CACHE_KEY.format(resource, get_version(resource))
+    now = time.time()
+    state = cache.get(key)
+    if state is None or (state[1] is not None and now >= state[1]):
+        # Точный момент прошлой границы неизвестен; «сейчас» (с округлением вверх до секунды
+        # Last-Modified) не раньше его, поэтому ответ до границы не получит 304
+        state = (math.ceil(now), next_change())
+        cache.set(key, state, BOUNDARY_TIMEOUT)
+    return state[0]
+
+
+def get_validators(resources: Iterable[str], variant: str = '', changed_at: float = 0) -> Tuple[str, int]:
+    """
+    Слабый ETag и Last-Modified (unix time) для ответа, зависящего от resources.
+
+    changed_at — момент последнего изменения ответа со временем (time_boundary), 0 если не зависит.
+    """
+    versions = [(resource, get_version(resource)) for resource in resources]
+    payload = repr((getattr(settings, 'CLUBS_API_CACHE_VERSION', '1'), variant, versions, changed_at))
+    etag = 'W/"%s"' % hashlib.sha1(payload.encode()).hexdigest()[:20]
+    return etag, int(max(changed_at, *(version for _, version in versions)))
+
+
+def conditional_response(request, resources: Iterable[str], view: Callable[[], object],
+                         changed_at: Callable[[], float] = None):
+    """
+    Ответ view() с ETag/Last-Modified/Cache-Control или 304 без вызова view.
+
+    Для DRF запросов в ETag учитывается согласованный тип ответа (JSON или browsable API).
+    changed_at — для ответов, меняющихся со временем (см. time_boundary).
+    """
+    if request.method not in ('GET', 'HEAD') or not is_enabled():
+        return view()
+
+    variant = getattr(request, 'accepted_media_type', '')
+    etag, last_modified = get_validators(resources, variant, changed_at() if changed_at else 0)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = view()
+    if response.status_code not in (200, 304):
+        return response
+
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'CLUBS_API_CACHE_MAX_AGE', 60))
+    if variant:
+        patch_vary_headers(response, ('Accept',))
+    return response
+
+
+def conditional_get(*resources: str):
+    """Декоратор функционального представления: @conditional_get(CATEGORY, CLUB)"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            return conditional_response(request, resources, lambda: view_func(request, *args, **kwargs))
+        return wrapper
+    return decorator
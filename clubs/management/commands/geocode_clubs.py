@@ -0,0 +1,109 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from clubs import geo, http_cache
+from clubs.models import City, Club, ClubEvent
+
+
+class Command(BaseCommand):
+    help = ('Geocode cities, clubs and events offline from a gazetteer file '
+            '(CSV or JSON with name, lat, lon and an optional city)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('gazetteer', help='Path to the gazetteer .csv or .json file')
+        parser.add_argument('--overwrite', action='store_true', help='Re-geocode objects that already have coordinates')
+        parser.add_argument('--dry-run', action='store_true', help='Report matches without saving them')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk UPDATE')
+
+    def handle(self, *args, **options):
+        try:
+            gazetteer = geo.Gazetteer.load(options['gazetteer'])
+        except (OSError, KeyError, IndexError, TypeError, ValueError) as e:
+            raise CommandError(f'Cannot read gazetteer {options["gazetteer"]}: {e}')
+        self.overwrite = options['overwrite']
+        self.stats = Counter()
+        self.stdout.write(f'📖 Gazetteer: {len(gazetteer)} places')
+
+        with transaction.atomic():
+            cities = self._geocode(
+                City.objects.all(), 'city',
+                lambda city: (gazetteer.lookup(city.name) or gazetteer.lookup(city.iata_code), 'name'),
+            )
+            city_points = self._points(City.objects.all(), cities)
+
+            clubs = self._geocode(
+                Club.objects.select_related('city'), 'club',
+                lambda club: self._match(
+                    gazetteer.lookup(club.address, club.city.name if club.city else None),
+                    city_points.get(club.city_id), 'city',
+                ),
+            )
+            club_points = self._points(Club.objects.all(), clubs)
+
+            events = self._geocode(
+                ClubEvent.objects.select_related('club__city'), 'event',
+                lambda event: self._match(
+                    gazetteer.lookup(event.location, event.club.city.name if event.club.city else None),
+                    club_points.get(event.club_id), 'club',
+                ),
+            )
+
+            if options['dry_run']:
+                transaction.set_rollback(True)
+            else:
+                batch_size = options['batch_size']
+                City.objects.bulk_update(cities, ['latitude', 'longitude'], batch_size=batch_size)
+                Club.objects.bulk_update(clubs, ['latitude', 'longitude', 'geohash'], batch_size=batch_size)
+                ClubEvent.objects.bulk_update(events, ['latitude', 'longitude', 'geohash'], batch_size=batch_size)
+
+        for kind in ('city', 'club', 'event'):
+            matched = {source: count for (k, source), count in self.stats.items() if k == kind and source}
+            self.stdout.write(
+                f"  {kind:<6} matched: {sum(matched.values())} "
+                f"({', '.join(f'{source} {count}' for source, count in sorted(matched.items())) or '-'}), "
+                f"unresolved: {self.stats[(kind, None)]}"
+            )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('⚠️ Dry run, nothing saved'))
+            return
+        if cities or clubs or events:
+            # bulk_update sends no signals
+            http_cache.bump_version(http_cache.CITY, http_cache.CLUB, http_cache.EVENT)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Geocoded {len(cities)} cities, {len(clubs)} clubs, {len(events)} events'
+        ))
+
+    @staticmethod
+    def _match(point, fallback, fallback_source):
+        if point is not None:
+            return point, 'address'
+        return fallback, fallback_source
+
+    def _geocode(self, queryset, kind, resolve):
+        """Objects that got new coordinates; resolve(obj) -> (Point or None, source)"""
+        changed = []
+        for obj in queryset.iterator(chunk_size=2000):
+            if obj.latitude is not None and not self.overwrite:
+                continue
+            point, source = resolve(obj)
+            self.stats[(kind, source if point is not None else None)] += 1
+            if point is None:
+                continue
+            obj.latitude, obj.longitude = point.latitude, point.longitude
+            if hasattr(obj, 'geohash'):
+                obj.geohash = geo.point_geohash(obj.latitude, obj.longitude)
+            changed.append(obj)
+        return changed
+
+    @staticmethod
+    def _points(queryset, changed):
+        """Coordinates by pk: already stored ones plus the new, not yet saved ones"""
+        points = {
+            pk: geo.Point(latitude, longitude)
+            for pk, latitude, longitude in queryset.filter(latitude__isnull=False)
+            .values_list('pk', 'latitude', 'longitude')
+        }
+        points.update({obj.pk: geo.Point(obj.latitude, obj.longitude) for obj in changed})
+        return points
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0012_clubpost'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clubevent',
+            index=models.Index(fields=['start_datetime', 'club'], name='clubevent_start_club_idx'),
+        ),
+    ]
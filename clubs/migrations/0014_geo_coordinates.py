@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0013_clubevent_start_club_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='city',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Широта'),
+        ),
+        migrations.AddField(
+            model_name='city',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Долгота'),
+        ),
+        migrations.AddField(
+            model_name='club',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Широта'),
+        ),
+        migrations.AddField(
+            model_name='club',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Долгота'),
+        ),
+        migrations.AddField(
+            model_name='club',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='clubevent',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Широта'),
+        ),
+        migrations.AddField(
+            model_name='clubevent',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Долгота'),
+        ),
+        migrations.AddField(
+            model_name='clubevent',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=12),
+        ),
+    ]
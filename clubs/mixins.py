@@ -1,3 +1,10 @@
+from django.conf import settings
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from . import geo
+from .http_cache import conditional_response
 from .models import ClubCategory, Club
 
 
@@ -38,6 +45,116 @@ class ClubActionSerializerMixin:
         return super().get_serializer_class()
 
 
+class ConditionalGetMixin:
+    """
+    Миксин условных GET запросов для ViewSet-ов (clubs/http_cache.py).
+
+    Ответы действий из CONDITIONAL_ACTIONS получают ETag/Last-Modified по версиям
+    CACHE_RESOURCES; при совпадении If-None-Match действие не выполняется и
+    возвращается 304. Проверка прав выполняется до этого, в initial().
+
+    Если ответ зависит от текущего времени, get_changed_at() возвращает момент его
+    последнего изменения (http_cache.time_boundary), и он входит в ETag и Last-Modified.
+
+    Атрибуты:
+        CACHE_RESOURCES (tuple): Типы ресурсов, от которых зависит ответ.
+        CONDITIONAL_ACTIONS (tuple): Действия, одинаковые для всех пользователей.
+    """
+
+    CACHE_RESOURCES = ()
+    CONDITIONAL_ACTIONS = ('list', 'retrieve')
+
+    def get_changed_at(self) -> float:
+        return 0
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional('list', request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional('retrieve', request, *args, **kwargs)
+
+    def _conditional(self, action, request, *args, **kwargs):
+        handler = getattr(super(), action)
+        if action not in self.CONDITIONAL_ACTIONS:
+            return handler(request, *args, **kwargs)
+        return conditional_response(
+            request, self.CACHE_RESOURCES, lambda: handler(request, *args, **kwargs), self.get_changed_at,
+        )
+
+
+class ValuesListMixin:
+    """
+    Миксин списка на values()-сериализаторе (clubs/api/serializers/values.py).
+
+    Действие list отдает тот же JSON, что и serializer_class, но без создания
+    моделей: фильтры и пагинация применяются к QuerySet.values().
+    Ставится после ConditionalGetMixin, чтобы 304 по-прежнему не доходил до БД.
+
+    Атрибуты:
+        VALUES_SERIALIZER (ValuesSerializer): Сериализатор строк values() для списка.
+    """
+
+    VALUES_SERIALIZER = None
+
+    def list(self, request, *args, **kwargs):
+        if self.VALUES_SERIALIZER is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = self.VALUES_SERIALIZER.get_values(self.filter_queryset(self.get_queryset()))
+        context = self.get_serializer_context()
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.VALUES_SERIALIZER(page, context=context).data)
+        return Response(self.VALUES_SERIALIZER(rows, context=context).data)
+
+
+class NearbyMixin:
+    """
+    Миксин действия nearby: объекты рядом с точкой (clubs/geo.py).
+
+    GET ?lat=&lon=&radius_km= отдает объекты в круге по возрастанию расстояния,
+    с &k= — не больше k ближайших (по умолчанию в радиусе CLUBS_GEO_MAX_RADIUS_KM).
+    Строки сериализует VALUES_SERIALIZER, к каждой добавляется distance_km.
+    """
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request, **kwargs):
+        def view():
+            try:
+                return Response(self.get_nearby(request.query_params))
+            except geo.GeoQueryError as e:
+                raise ValidationError({'detail': str(e)})
+        return conditional_response(request, self.CACHE_RESOURCES, view, getattr(self, 'get_changed_at', None))
+
+    def get_nearby(self, params):
+        center = geo.parse_point(params.get('lat'), params.get('lon'))
+        max_radius = getattr(settings, 'CLUBS_GEO_MAX_RADIUS_KM', 300)
+        max_results = getattr(settings, 'CLUBS_GEO_MAX_RESULTS', 100)
+        default_radius = max_radius if params.get('k') else getattr(settings, 'CLUBS_GEO_DEFAULT_RADIUS_KM', 10)
+        try:
+            radius = float(params.get('radius_km') or default_radius)
+            k = int(params['k']) if params.get('k') else None
+        except ValueError:
+            raise geo.GeoQueryError('Параметр radius_km должен быть числом, k — целым')
+        if not 0 < radius <= max_radius:
+            raise geo.GeoQueryError(f'radius_km должен быть от 0 до {max_radius}')
+        if k is not None and not 0 < k <= max_results:
+            raise geo.GeoQueryError(f'k должен быть от 1 до {max_results}')
+
+        queryset = self.get_queryset()
+        if k is None:
+            found = geo.within_radius(queryset, center, radius)[:max_results]
+        else:
+            found = geo.nearest(queryset, center, k, radius)
+        distances = {str(pk): distance for pk, distance in found}
+        rows = self.VALUES_SERIALIZER.get_values(queryset.filter(pk__in=list(distances)))
+        results = self.VALUES_SERIALIZER(rows, context=self.get_serializer_context()).data
+        for row in results:
+            row['distance_km'] = round(distances[row['id']], 3)
+        results.sort(key=lambda row: row['distance_km'])
+        return {'lat': center.latitude, 'lon': center.longitude, 'radius_km': radius, 'results': results}
+
+
 class CategoryListMixin:
 
     def get_categories(self):
@@ -58,6 +58,8 @@ class City(models.Model):
         id (UUIDField): Уникальный идентификатор города (автоматически генерируется).
         iata_code (CharField): Код города (ИАТА).
         name (CharField): Название города.
+        latitude (FloatField): Широта центра города (команда geocode_clubs).
+        longitude (FloatField): Долгота центра города.
         created_at (DateTimeField): Дата и время создания записи о городе (автоматически устанавливается).
         updated_at (DateTimeField): Дата и время последнего обновления записи о городе (автоматически устанавливается).
     """
@@ -65,6 +67,8 @@ class City(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     iata_code = models.CharField(max_length=20, db_index=True, verbose_name='Код города')
     name = models.CharField(max_length=50, verbose_name='Название города')
+    latitude = models.FloatField(null=True, blank=True, verbose_name='Широта')
+    longitude = models.FloatField(null=True, blank=True, verbose_name='Долгота')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создан')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлен')
 
@@ -95,6 +99,9 @@ class Club(models.Model):
         phone (CharField): Контактный телефон клуба.
         city (ForeignKey): Город, к которому относится клуб.
         address (CharField): Локация клуба.
+        latitude (FloatField): Широта клуба (команда geocode_clubs).
+        longitude (FloatField): Долгота клуба.
+        geohash (CharField): Geohash координат для поиска рядом (clubs/geo.py).
         members (ManyToManyField): Члены клуба.
         members_count (PositiveIntegerField): Количество участников клуба.
         likes_count (PositiveIntegerField): Количество лайков клуба.
@@ -146,6 +153,9 @@ class Club(models.Model):
         verbose_name='Город'
     )
     address = models.CharField(default='No location', verbose_name='Локация клуба', max_length=150, blank=True)
+    latitude = models.FloatField(null=True, blank=True, verbose_name='Широта')
+    longitude = models.FloatField(null=True, blank=True, verbose_name='Долгота')
+    geohash = models.CharField(max_length=12, blank=True, default='', db_index=True, editable=False)
     members = models.ManyToManyField(
         'accounts.User',
         verbose_name='Члены клуба',
@@ -495,6 +505,9 @@ class ClubEvent(models.Model):
         description (TextField): Описание события.
         banner (ImageField): Баннер события.
         location (CharField): Место проведения события.
+        latitude (FloatField): Широта места проведения (команда geocode_clubs).
+        longitude (FloatField): Долгота места проведения.
+        geohash (CharField): Geohash координат для поиска рядом (clubs/geo.py).
         start_datetime (DateTimeField): Дата и время начала события.
         old_datetime (DateTimeField): Дата и время старта, если событие является переносом.
         end_datetime (DateTimeField): Дата и время завершения события.
@@ -516,6 +529,9 @@ class ClubEvent(models.Model):
     description = models.TextField(verbose_name='Описание')
     banner = models.ImageField(upload_to='clubs/event_banners', verbose_name='Баннер события')
     location = models.CharField(max_length=150, verbose_name='Место проведения')
+    latitude = models.FloatField(null=True, blank=True, verbose_name='Широта')
+    longitude = models.FloatField(null=True, blank=True, verbose_name='Долгота')
+    geohash = models.CharField(max_length=12, blank=True, default='', db_index=True, editable=False)
     start_datetime = models.DateTimeField(verbose_name='Дата и время начала')
     old_datetime = models.DateTimeField(blank=True, null=True)
     end_datetime = models.DateTimeField(verbose_name='Дата и время завершения')
@@ -538,6 +554,10 @@ class ClubEvent(models.Model):
     class Meta:
         verbose_name = "Событие"
         verbose_name_plural = "События"
+        indexes = [
+            # Диапазонные запросы календаря (clubs/event_calendar.py)
+            models.Index(fields=['start_datetime', 'club'], name='clubevent_start_club_idx'),
+        ]
 
     def get_age_restriction_str(self):
         if self.min_age is None and self.max_age is None:
@@ -1,4 +1,13 @@
-from . import models
+import calendar
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import event_calendar, http_cache, models
+from .static import MemberActionEnum, RecurrenceEnum, RequestActionEnum
 
 
 
@@ -28,7 +37,7 @@ class ClubServices:
         else:
             club.members.add(user)
             club.members_count += 1
-            club.save()
+            club.save(update_fields=['members_count'])
 
     @staticmethod
     def leave(club, user):
@@ -47,7 +56,7 @@ class ClubServices:
             raise clubs_exceptions.UserNotInClubException
         club.members.remove(user)
         club.members_count -= 1
-        club.save()
+        club.save(update_fields=['members_count'])
 
     @staticmethod
     def like(club, user):
@@ -66,7 +75,7 @@ class ClubServices:
             raise clubs_exceptions.UserLikeAlreadyExistsException
         club.likes.add(user)
         club.likes_count += 1
-        club.save()
+        club.save(update_fields=['likes_count'])
 
     @staticmethod
     def unlike(club, user):
@@ -85,15 +94,14 @@ class ClubServices:
             raise clubs_exceptions.UserLikeDoesNotExistException
         club.likes.remove(user)
         club.likes_count -= 1
-        club.save()
+        club.save(update_fields=['likes_count'])
 
 
 class ClubJoinRequestServices:
     @staticmethod
     def approve(request: models.ClubJoinRequest):
+        ClubBulkServices.process_join_requests(request.club, [request.pk], RequestActionEnum.APPROVE)
         request.approved = True
-        request.save()
-        request.club.members.add(request.user)
 
     @staticmethod
     def reject(request: models.ClubJoinRequest):
@@ -101,6 +109,133 @@ class ClubJoinRequestServices:
         request.save()
 
 
+class ClubBulkServices:
+    """
+    Массовые операции управляющих клубом.
+
+    Каждая операция — одна транзакция: заявки обновляются одним UPDATE,
+    участники добавляются одним INSERT, события создаются bulk_create, а
+    счетчик участников пересчитывается одним UPDATE с подзапросом (заодно
+    исправляется расхождение, накопленное одиночными операциями).
+    """
+
+    @staticmethod
+    def process_join_requests(club: models.Club, request_ids, action: RequestActionEnum) -> dict:
+        """
+        Одобряет или отклоняет заявки на вступление в клуб; одобренные пользователи становятся участниками.
+
+        Returns:
+            dict: processed — число обработанных заявок, members_added — новых участников,
+                not_found — идентификаторы заявок, которых нет у этого клуба.
+        """
+        approve = action == RequestActionEnum.APPROVE
+        with transaction.atomic():
+            found = dict(
+                models.ClubJoinRequest.objects.select_for_update()
+                .filter(club=club, id__in=request_ids).values_list('id', 'user_id')
+            )
+            models.ClubJoinRequest.objects.filter(id__in=found).update(approved=approve, updated_at=timezone.now())
+            added = ClubBulkServices._add_members(club, found.values()) if approve else 0
+        return {
+            'processed': len(found),
+            'members_added': added,
+            'not_found': [str(pk) for pk in dict.fromkeys(request_ids) if pk not in found],
+        }
+
+    @staticmethod
+    def update_members(club: models.Club, user_ids, action: MemberActionEnum) -> dict:
+        """
+        Добавляет или удаляет участников клуба.
+
+        Returns:
+            dict: changed — число добавленных или удаленных участников,
+                not_found — идентификаторы несуществующих пользователей.
+        """
+        from accounts.models import User
+
+        with transaction.atomic():
+            existing = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+            if action == MemberActionEnum.ADD:
+                changed = ClubBulkServices._add_members(club, existing)
+            else:
+                members = list(club.members.filter(id__in=existing).values_list('id', flat=True))
+                if members:
+                    club.members.remove(*members)
+                    ClubBulkServices._recount_members(club)
+                changed = len(members)
+        return {
+            'changed': changed,
+            'not_found': [str(pk) for pk in dict.fromkeys(user_ids) if pk not in existing],
+        }
+
+    @staticmethod
+    def create_recurring_events(club: models.Club, data: dict, repeat: RecurrenceEnum, count: int):
+        """
+        Создает серию из count событий с шагом repeat, начиная с data['start_datetime'].
+
+        Первое событие сохраняется обычным save() (сохраняется баннер, срабатывают сигналы),
+        остальные — одним bulk_create с тем же баннером; версии месяцев календаря и
+        событий меняются после коммита, как в сигналах.
+        """
+        duration = data['end_datetime'] - data['start_datetime']
+        starts = ClubBulkServices.recurring_starts(data['start_datetime'], repeat, count)
+        with transaction.atomic():
+            first = models.ClubEvent.objects.create(**{**data, 'club': club})
+            series = [
+                models.ClubEvent(**{
+                    **data, 'club': club, 'banner': first.banner.name, 'geohash': first.geohash,
+                    'start_datetime': start, 'end_datetime': start + duration,
+                })
+                for start in starts[1:]
+            ]
+            models.ClubEvent.objects.bulk_create(series, batch_size=500)
+            spans = [(event.start_datetime, event.end_datetime) for event in series]
+
+            def changed():
+                event_calendar.invalidate_months(spans)
+                http_cache.bump_version(http_cache.EVENT)
+            transaction.on_commit(changed)
+        return [first, *series]
+
+    @staticmethod
+    def recurring_starts(start, repeat: RecurrenceEnum, count: int) -> list:
+        """Начала событий серии по местному времени: ежемесячные — в тот же день или последний день месяца"""
+        local = timezone.localtime(start).replace(tzinfo=None)
+        starts = []
+        for i in range(count):
+            if repeat == RecurrenceEnum.DAILY:
+                moment = local + timedelta(days=i)
+            elif repeat == RecurrenceEnum.WEEKLY:
+                moment = local + timedelta(weeks=i)
+            else:
+                year, month = divmod(local.month - 1 + i, 12)
+                year += local.year
+                day = min(local.day, calendar.monthrange(year, month + 1)[1])
+                moment = local.replace(year=year, month=month + 1, day=day)
+            starts.append(timezone.make_aware(moment))
+        return starts
+
+    @staticmethod
+    def _add_members(club: models.Club, user_ids) -> int:
+        user_ids = set(user_ids)
+        current = set(club.members.filter(id__in=user_ids).values_list('id', flat=True))
+        new = user_ids - current
+        if new:
+            club.members.add(*new)
+            ClubBulkServices._recount_members(club)
+        return len(new)
+
+    @staticmethod
+    def _recount_members(club: models.Club):
+        """Счетчик участников по таблице связей — один UPDATE"""
+        memberships = (
+            models.Club.members.through.objects.filter(club_id=OuterRef('pk'))
+            .order_by().values('club_id').annotate(total=Count('*')).values('total')
+        )
+        models.Club.objects.filter(pk=club.pk).update(members_count=Coalesce(Subquery(memberships), 0))
+        club.refresh_from_db(fields=['members_count'])
+
+
 class ClubPartnershipRequestServices:
 
     @staticmethod
@@ -188,7 +323,6 @@ class FestivalRequestServices:
 
 import re
 from typing import List, Dict, Optional
-from django.db.models import Q, Count
 from django.contrib.auth import get_user_model
 from .models import Club, ClubCategory
 
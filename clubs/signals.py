@@ -0,0 +1,72 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from clubs import event_calendar, geo, http_cache
+from clubs.models import City, Club, ClubCategory, ClubEvent
+
+# Модель -> типы ресурсов, чьи версии меняются вместе с ней
+RESOURCE_MODELS = {
+    Club: (http_cache.CLUB,),
+    ClubCategory: (http_cache.CATEGORY,),
+    City: (http_cache.CITY,),
+    ClubEvent: (http_cache.EVENT,),
+}
+
+
+def bump_on_commit(*resources):
+    """Новая версия после коммита, чтобы по ней нельзя было прочитать еще не записанные данные"""
+    transaction.on_commit(lambda: http_cache.bump_version(*resources))
+
+
+@receiver([post_save, post_delete], sender=Club)
+@receiver([post_save, post_delete], sender=ClubCategory)
+@receiver([post_save, post_delete], sender=City)
+@receiver([post_save, post_delete], sender=ClubEvent)
+def http_cache_model_changed_handler(sender, **kwargs):
+    """
+    Обработчик изменения клубов, категорий, городов и событий
+    """
+    bump_on_commit(*RESOURCE_MODELS[sender])
+
+
+@receiver(m2m_changed, sender=Club.members.through)
+@receiver(m2m_changed, sender=Club.managers.through)
+def http_cache_club_relations_changed_handler(sender, action, **kwargs):
+    """
+    Список клубов фильтруется по участникам и управляющим
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_on_commit(http_cache.CLUB)
+
+
+@receiver(pre_save, sender=ClubEvent)
+def event_calendar_previous_dates_handler(sender, instance, **kwargs):
+    """
+    Прежние даты события: при переносе сбрасывается и месяц, из которого его перенесли
+    """
+    if not instance._state.adding:
+        instance._calendar_previous_dates = (
+            ClubEvent.objects.filter(pk=instance.pk).values_list('start_datetime', 'end_datetime').first()
+        )
+
+
+@receiver([post_save, post_delete], sender=ClubEvent)
+def event_calendar_changed_handler(sender, instance, **kwargs):
+    """
+    Месячные виды календаря, в которые попадает событие
+    """
+    spans = [(instance.start_datetime, instance.end_datetime)]
+    previous = getattr(instance, '_calendar_previous_dates', None)
+    if previous:
+        spans.append(previous)
+    transaction.on_commit(lambda: event_calendar.invalidate_months(spans))
+
+
+@receiver(pre_save, sender=Club)
+@receiver(pre_save, sender=ClubEvent)
+def geohash_handler(sender, instance, **kwargs):
+    """
+    Geohash для поиска рядом (clubs/geo.py) всегда соответствует координатам
+    """
+    instance.geohash = geo.point_geohash(instance.latitude, instance.longitude)
@@ -4,3 +4,14 @@ from enum import Enum
 class RequestActionEnum(Enum):
     APPROVE = 'approve'
     REJECT = 'reject'
+
+
+class MemberActionEnum(Enum):
+    ADD = 'add'
+    REMOVE = 'remove'
+
+
+class RecurrenceEnum(Enum):
+    DAILY = 'daily'
+    WEEKLY = 'weekly'
+    MONTHLY = 'monthly'
@@ -1,3 +1,424 @@
-from django.test import TestCase
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.client import MULTIPART_CONTENT
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import parse_http_date
+
+from clubs.api.serializers import (
+    ClubCategorySerializer, ClubCategoryValuesSerializer, ClubEventSerializer, ClubEventValuesSerializer,
+    ClubListSerializer, ClubListValuesSerializer,
+)
+from clubs import geo
+from clubs.models import City, Club, ClubCategory, ClubEvent, ClubJoinRequest
+
+
+@override_settings(CLUBS_API_CONDITIONAL_GET=True)
+class ConditionalGetTest(TestCase):
+    CATEGORIES_URL = '/api/v1/clubs/category/'
+
+    def setUp(self):
+        cache.clear()
+        ClubCategory.objects.create(name='Спорт', is_active=True)
+
+    def get(self, url, **headers):
+        return self.client.get(url, secure=True, HTTP_ACCEPT='application/json', **headers)
+
+    def test_validators_and_cache_control(self):
+        response = self.get(self.CATEGORIES_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(set(response['Cache-Control'].split(', ')), {'public', 'max-age=60'})
+
+    def test_not_modified_skips_queries_and_serialization(self):
+        etag = self.get(self.CATEGORIES_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.get(self.CATEGORIES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_change_signal_bumps_version(self):
+        first = self.get(self.CATEGORIES_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ClubCategory.objects.create(name='Музыка', is_active=True)
+
+        response = self.get(self.CATEGORIES_URL, HTTP_IF_NONE_MATCH=first['ETag'],
+                            HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertNotEqual(response['Last-Modified'], first['Last-Modified'])
+
+        response = self.get(self.CATEGORIES_URL, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_function_view_depends_on_clubs_and_cities(self):
+        url = '/api/ai/enhanced/enhanced/cities/'
+        etag = self.get(url)['ETag']
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            City.objects.create(name='Алматы', iata_code='ALA')
+
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_started_event_invalidates_event_validators(self):
+        user = get_user_model().objects.create(phone='+77012345679', email='e@example.com')
+        club = Club.objects.create(name='Шахматы', category=ClubCategory.objects.get(), creater=user)
+        start = timezone.now() + timedelta(hours=1)
+        event = ClubEvent.objects.create(club=club, title='Турнир', start_datetime=start,
+                                         end_datetime=start + timedelta(hours=2))
+        list_url, detail_url = '/api/v1/clubs/events/', f'/api/v1/clubs/events/{event.pk}/'
+        listed, detail = self.get(list_url), self.get(detail_url)
+        self.assertEqual(self.get(list_url, HTTP_IF_NONE_MATCH=listed['ETag']).status_code, 304)
+
+        later = start + timedelta(minutes=1)
+        with mock.patch('django.utils.timezone.now', return_value=later), \
+                mock.patch('clubs.http_cache.time.time', return_value=later.timestamp()):
+            response = self.get(list_url, HTTP_IF_NONE_MATCH=listed['ETag'])
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['results'], [])
+            self.assertGreater(parse_http_date(response['Last-Modified']), parse_http_date(listed['Last-Modified']))
+            self.assertEqual(self.get(detail_url, HTTP_IF_MODIFIED_SINCE=detail['Last-Modified']).status_code, 404)
+
+    @override_settings(CLUBS_API_CONDITIONAL_GET=None)
+    def test_disabled_for_local_memory_cache(self):
+        response = self.get(self.CATEGORIES_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+
+class ValuesSerializerTest(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(phone='+77012345671', password='password', email='v@example.com')
+        category = ClubCategory.objects.create(name='Спорт', is_active=True)
+        self.club = Club.objects.create(name='Шахматы', description='Турниры', category=category, creater=user,
+                                        logo='clubs/logos/chess.png', members_count=12)
+        Club.objects.create(name='Без логотипа', category=category, creater=user, is_private=True)
+        start = timezone.now() + timedelta(days=1)
+        ClubEvent.objects.create(club=self.club, title='Турнир', description='Блиц', banner='clubs/event_banners/t.jpg',
+                                 location='Алматы', start_datetime=start, end_datetime=start + timedelta(hours=2))
+        self.context = {'request': RequestFactory().get('/', secure=True)}
+
+    def assertSameData(self, model_serializer, values_serializer, queryset):
+        expected = model_serializer(queryset, many=True, context=self.context).data
+        actual = values_serializer(values_serializer.get_values(queryset), context=self.context).data
+        self.assertEqual(actual, expected)
+
+    def test_same_output_as_model_serializers(self):
+        self.assertSameData(ClubListSerializer, ClubListValuesSerializer, Club.objects.all())
+        self.assertSameData(ClubEventSerializer, ClubEventValuesSerializer, ClubEvent.objects.all())
+        self.assertSameData(ClubCategorySerializer, ClubCategoryValuesSerializer, ClubCategory.objects.all())
+
+    def test_list_endpoint_uses_values_rows(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/clubs/clubs/', secure=True, HTTP_ACCEPT='application/json')
+
+        # count и страница; в странице только столбцы списка, без полной модели
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('"activities"', queries[1]['sql'])
+
+        results = response.json()['results']
+        self.assertEqual([club['name'] for club in results], [club.name for club in Club.objects.all()])
+        self.assertEqual(results[[c['name'] for c in results].index('Шахматы')]['logo'],
+                         'https://testserver/media/clubs/logos/chess.png')
+
+
+class EventCalendarTest(TestCase):
+    URL = '/api/v1/clubs/events/calendar/'
+
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(phone='+77012345672', password='password', email='c@example.com')
+        sport = ClubCategory.objects.create(name='Спорт', is_active=True)
+        music = ClubCategory.objects.create(name='Музыка', is_active=True)
+        self.almaty = City.objects.create(name='Алматы', iata_code='ALA')
+        self.chess = Club.objects.create(name='Шахматы', category=sport, city=self.almaty, creater=user)
+        self.choir = Club.objects.create(name='Хор', category=music, creater=user)
+        self.tournament = self.event(self.chess, 'Турнир', (2026, 3, 30, 18), (2026, 4, 2, 18))
+        self.event(self.chess, 'Блиц', (2026, 4, 10, 12), (2026, 4, 10, 14))
+        self.event(self.choir, 'Концерт', (2026, 4, 10, 19), (2026, 4, 10, 21))
+        self.event(self.choir, 'Репетиция', (2026, 6, 1, 19), (2026, 6, 1, 21))
+
+    def event(self, club, title, start, end):
+        return ClubEvent.objects.create(
+            club=club, title=title, description='', banner='clubs/event_banners/e.jpg', location='Алматы',
+            start_datetime=timezone.make_aware(datetime(*start)), end_datetime=timezone.make_aware(datetime(*end)),
+        )
+
+    def get(self, url, **params):
+        return self.client.get(url, params, secure=True, HTTP_ACCEPT='application/json')
+
+    def test_window_includes_events_started_before_it(self):
+        data = self.get(self.URL, **{'from': '2026-04-01', 'to': '2026-05-01'}).json()
+
+        self.assertEqual([event['title'] for event in data['events']], ['Турнир', 'Блиц', 'Концерт'])
+        self.assertEqual(data['days'], {'2026-04-10': 2})
+        self.assertEqual(data['events'][0]['club'], {'id': str(self.chess.pk), 'name': 'Шахматы'})
+
+        filtered = self.get(self.URL, **{'from': '2026-04-01', 'to': '2026-05-01', 'city': str(self.almaty.pk)})
+        self.assertEqual([event['title'] for event in filtered.json()['events']], ['Турнир', 'Блиц'])
+
+    def test_month_buckets(self):
+        data = self.get(self.URL + 'months/', **{'from': '2026-03-01', 'to': '2026-07-01'}).json()
+
+        self.assertEqual(data['months'], [
+            {'month': '2026-03', 'count': 1}, {'month': '2026-04', 'count': 2},
+            {'month': '2026-05', 'count': 0}, {'month': '2026-06', 'count': 1},
+        ])
+
+    def test_invalid_queries(self):
+        self.assertEqual(self.get(self.URL, **{'from': '2026-13-01'}).status_code, 400)
+        self.assertEqual(self.get(self.URL, **{'from': '2026-04-01', 'to': '2026-03-01'}).status_code, 400)
+        self.assertEqual(self.get(self.URL, **{'from': '2026-01-01', 'to': '2027-01-01'}).status_code, 400)
+        self.assertEqual(self.get(self.URL, city='almaty').status_code, 400)
+        self.assertEqual(self.get(self.URL + '2026/13/').status_code, 400)
+
+    def test_month_view_is_cached_until_its_events_change(self):
+        url = self.URL + '2026/4/'
+        self.assertEqual(len(self.get(url).json()['events']), 3)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(url).json()['days'], {'2026-04-10': 2})
+
+        # Перенос из апреля в июнь сбрасывает оба месяца
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tournament.start_datetime = timezone.make_aware(datetime(2026, 6, 5, 18))
+            self.tournament.end_datetime = timezone.make_aware(datetime(2026, 6, 6, 18))
+            self.tournament.save()
+
+        self.assertEqual([event['title'] for event in self.get(url).json()['events']], ['Блиц', 'Концерт'])
+        self.assertEqual(self.get(self.URL + '2026/6/').json()['days'], {'2026-06-01': 1, '2026-06-05': 1})
+
+    @override_settings(CLUBS_API_CONDITIONAL_GET=True)
+    def test_default_window_validators_change_with_the_month(self):
+        march = timezone.make_aware(datetime(2026, 3, 15, 12))
+        with mock.patch('django.utils.timezone.now', return_value=march):
+            etag = self.client.get(self.URL, secure=True, HTTP_ACCEPT='application/json')['ETag']
+            explicit = self.get(self.URL, **{'from': '2026-04-01'})['ETag']
+
+        with mock.patch('django.utils.timezone.now', return_value=march + timedelta(days=30)):
+            response = self.client.get(self.URL, secure=True, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([event['title'] for event in response.json()['events']], ['Турнир', 'Блиц', 'Концерт'])
+            self.assertEqual(self.get(self.URL, **{'from': '2026-04-01'})['ETag'], explicit)
+
+    def test_upcoming_list_is_computed_per_request(self):
+        now = timezone.localtime()
+        started = self.event(self.choir, 'Началось', (now - timedelta(hours=1)).timetuple()[:4], (2100, 1, 1, 0))
+        upcoming = self.event(self.choir, 'Скоро', (now + timedelta(days=1)).timetuple()[:4], (2100, 1, 1, 0))
+
+        ids = [event['id'] for event in self.get('/api/v1/clubs/events/').json()['results']]
+
+        self.assertIn(str(upcoming.pk), ids)
+        self.assertNotIn(str(started.pk), ids)
+
+
+class GeoTest(TestCase):
+    URL = '/api/v1/clubs/clubs/nearby/'
+    CENTER = geo.Point(43.2380, 76.9450)
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(phone='+77012345673', password='password', email='g@example.com')
+        self.category = ClubCategory.objects.create(name='Спорт', is_active=True)
+        self.almaty = City.objects.create(name='Алматы', iata_code='ALA')
+
+    def club(self, name, latitude=None, longitude=None, **kwargs):
+        return Club.objects.create(name=name, category=self.category, creater=self.user,
+                                   latitude=latitude, longitude=longitude, **kwargs)
+
+    def get(self, **params):
+        return self.client.get(self.URL, params, secure=True, HTTP_ACCEPT='application/json')
+
+    def test_geohash(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(geo.point_geohash(None, 10.0), '')
+        self.assertEqual(self.club('Шахматы', 43.2380, 76.9450).geohash, geo.encode(43.2380, 76.9450))
+
+    def test_radius_matches_full_scan_across_cell_borders(self):
+        rng = random.Random(7)
+        clubs = [
+            Club(name=f'Клуб {i}', category=self.category, creater=self.user,
+                 latitude=self.CENTER.latitude + rng.uniform(-0.5, 0.5),
+                 longitude=self.CENTER.longitude + rng.uniform(-0.5, 0.5))
+            for i in range(200)
+        ]
+        for club in clubs:
+            club.geohash = geo.point_geohash(club.latitude, club.longitude)
+        Club.objects.bulk_create(clubs)
+
+        for radius in (0.5, 3, 12, 40):
+            expected = sorted(
+                club.pk for club in clubs
+                if geo.haversine_km(self.CENTER, geo.Point(club.latitude, club.longitude)) <= radius
+            )
+            found = geo.within_radius(Club.objects.all(), self.CENTER, radius)
+            self.assertEqual(sorted(pk for pk, _ in found), expected)
+            self.assertEqual([distance for _, distance in found], sorted(distance for _, distance in found))
+
+        nearest = geo.nearest(Club.objects.all(), self.CENTER, 5)
+        self.assertEqual(nearest, geo.within_radius(Club.objects.all(), self.CENTER, 100)[:5])
+
+    def test_nearby_api(self):
+        near = self.club('Шахматы', 43.2400, 76.9460)
+        farther = self.club('Футбол', 43.2700, 76.9450)
+        self.club('Астана', 51.1605, 71.4704)
+        self.club('Без адреса')
+
+        data = self.get(lat=43.2380, lon=76.9450, radius_km=10).json()
+        self.assertEqual([club['id'] for club in data['results']], [str(near.pk), str(farther.pk)])
+        self.assertAlmostEqual(data['results'][0]['distance_km'], 0.237, places=2)
+        self.assertEqual(data['results'][0]['category'], {'id': str(self.category.pk), 'name': 'Спорт'})
+
+        data = self.get(lat=43.2380, lon=76.9450, k=3).json()
+        self.assertEqual([club['name'] for club in data['results']], ['Шахматы', 'Футбол'])
+        with self.settings(CLUBS_GEO_MAX_RADIUS_KM=2000):
+            data = self.get(lat=43.2380, lon=76.9450, k=3).json()
+        self.assertEqual([club['name'] for club in data['results']], ['Шахматы', 'Футбол', 'Астана'])
+
+        self.assertEqual(self.get(lat=95, lon=76).status_code, 400)
+        self.assertEqual(self.get(lat='x', lon=76).status_code, 400)
+        self.assertEqual(self.get(lat=43, lon=76, k=0).status_code, 400)
+        self.assertEqual(self.get(lat=43, lon=76, radius_km=100000).status_code, 400)
+
+    def test_geocode_command(self):
+        club = self.club('Шахматы', city=self.almaty, address='г. Алматы, ул. Абая 10')
+        fallback = self.club('Футбол', city=self.almaty, address='стадион')
+        unknown = self.club('Хор')
+        event = ClubEvent.objects.create(
+            club=club, title='Турнир', description='', banner='clubs/event_banners/e.jpg', location='где-то',
+            start_datetime=timezone.now() + timedelta(days=1), end_datetime=timezone.now() + timedelta(days=2),
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'gazetteer.csv')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write('name,lat,lon,city\nАлматы,43.2380,76.9450,\nул. Абая 10,43.2400,76.9460,алматы\n')
+            call_command('geocode_clubs', path, stdout=StringIO())
+
+        self.almaty.refresh_from_db()
+        self.assertEqual((self.almaty.latitude, self.almaty.longitude), (43.2380, 76.9450))
+        club.refresh_from_db()
+        self.assertEqual((club.latitude, club.longitude, club.geohash), (43.2400, 76.9460, geo.encode(43.2400, 76.9460)))
+        fallback.refresh_from_db()
+        self.assertEqual((fallback.latitude, fallback.longitude), (43.2380, 76.9450))
+        unknown.refresh_from_db()
+        self.assertIsNone(unknown.latitude)
+        event.refresh_from_db()
+        self.assertEqual((event.latitude, event.geohash), (43.2400, club.geohash))
+        self.assertEqual(geo.city_point('ala'), geo.Point(43.2380, 76.9450))
+
+
+class ClubBulkOperationsTest(TestCase):
+    # 1x1 PNG
+    BANNER = (
+        b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f'
+        b'\x15\xc4\x89\x00\x00\x00\rIDATx\x9cc\xf8\xcf\xc0\xf0\x1f\x00\x05\x00\x01\xff\x89\x99=\x1d\x00'
+        b'\x00\x00\x00IEND\xaeB`\x82'
+    )
+
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.manager = User.objects.create_user(phone='+77012345674', password='password', email='m@example.com')
+        self.club = Club.objects.create(
+            name='Шахматы', category=ClubCategory.objects.create(name='Спорт', is_active=True),
+            creater=self.manager, is_private=True,
+        )
+        self.club.managers.add(self.manager)
+        self.client.force_login(self.manager)
+
+    def users(self, count, offset=0):
+        return [
+            get_user_model().objects.create_user(phone=f'+7701000{offset + i:04d}', email=f'u{offset + i}@example.com')
+            for i in range(count)
+        ]
+
+    def post(self, path, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        return self.client.post(f'/api/v1/clubs/clubs/{self.club.pk}/{path}', data, secure=True,
+                                HTTP_ACCEPT='application/json', **kwargs)
+
+    def approve(self, users):
+        requests = [ClubJoinRequest.objects.create(club=self.club, user=user) for user in users]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post('join_requests/bulk/', {'action': 'approve', 'ids': [str(r.pk) for r in requests]})
+        return response, len(queries)
+
+    def test_bulk_approve_uses_constant_queries_and_counts_members(self):
+        response, few_queries = self.approve(self.users(2))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['members_added'], 2)
+
+        response, many_queries = self.approve(self.users(30, offset=100))
+        self.assertEqual(many_queries, few_queries)
+        self.assertEqual(response.json(), {'processed': 30, 'members_added': 30, 'not_found': [], 'members_count': 32})
+        self.assertEqual(ClubJoinRequest.objects.filter(club=self.club, approved=True).count(), 32)
+
+        self.club.refresh_from_db()
+        self.assertEqual((self.club.members.count(), self.club.members_count), (32, 32))
+
+    def test_reject_and_unknown_ids(self):
+        request = ClubJoinRequest.objects.create(club=self.club, user=self.users(1)[0])
+        other = '00000000-0000-0000-0000-000000000001'
+
+        data = self.post('join_requests/bulk/', {'action': 'reject', 'ids': [str(request.pk), other]}).json()
+
+        self.assertEqual(data, {'processed': 1, 'members_added': 0, 'not_found': [other], 'members_count': 0})
+        request.refresh_from_db()
+        self.assertIs(request.approved, False)
+
+    def test_members_add_and_remove(self):
+        users = self.users(5)
+        ids = [str(user.pk) for user in users]
+
+        self.assertEqual(self.post('members/bulk/', {'action': 'add', 'user_ids': ids}).json()['members_count'], 5)
+        data = self.post('members/bulk/', {'action': 'remove', 'user_ids': ids[:3]}).json()
+        self.assertEqual((data['changed'], data['members_count']), (3, 2))
+        self.assertEqual(set(self.club.members.values_list('id', flat=True)), {users[3].pk, users[4].pk})
+
+    def test_only_managers(self):
+        self.client.force_login(self.users(1)[0])
+
+        response = self.post('members/bulk/', {'action': 'add', 'user_ids': [str(self.manager.pk)]})
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.club.members.count(), 0)
+
+    def test_recurring_events(self):
+        start = timezone.make_aware(datetime(2026, 1, 31, 19))
+        with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.post('events/recurring/', {
+                    'title': 'Блиц', 'description': 'Еженедельный блиц', 'location': 'Алматы',
+                    'banner': SimpleUploadedFile('blitz.png', self.BANNER, content_type='image/png'),
+                    'start_datetime': start.isoformat(), 'end_datetime': (start + timedelta(hours=2)).isoformat(),
+                    'repeat': 'monthly', 'count': 3,
+                }, content_type=MULTIPART_CONTENT)
+
+        self.assertEqual(response.status_code, 201, response.content)
+        events = ClubEvent.objects.filter(club=self.club).order_by('start_datetime')
+        self.assertEqual(
+            [timezone.localtime(event.start_datetime).date().isoformat() for event in events],
+            ['2026-01-31', '2026-02-28', '2026-03-31'],
+        )
+        self.assertEqual(len({event.banner.name for event in events}), 1)
+        self.assertTrue(all(event.end_datetime - event.start_datetime == timedelta(hours=2) for event in events))
@@ -56,7 +56,7 @@ class ClubEventListView(generic.ListView):
         Возвращает:
             QuerySet: Список событий клубов с аннотацией на прошедшие события.
         """
-        qs = models.ClubEvent.objects.annotate(
+        qs = models.ClubEvent.objects.select_related('club').annotate(
             datetime_passed=Case(
                 When(start_datetime__lt=timezone.now(), then=Value(True)),
                 default=Value(False),
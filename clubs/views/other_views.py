@@ -1,3 +1,4 @@
+from django.urls import reverse
 from django.views import generic
 from django.shortcuts import render
 from django.http import HttpResponse
@@ -46,22 +47,25 @@ class IndexView(generic.TemplateView):
         return context
 
 
-class EventCalendarView(generic.ListView):
+class EventCalendarView(generic.TemplateView):
     """
     View для отображения календаря событий клубов.
 
-    Этот класс отображает список всех событий клубов. События можно фильтровать и сортировать по необходимости в будущем.
+    Страница не загружает события сама: календарь запрашивает API только для видимого окна
+    (clubs/event_calendar.py, /api/v1/clubs/events/calendar/?from=&to=).
 
     Атрибуты:
-        model (models.Model): Модель события клуба для отображения.
-        context_object_name (str): Имя объекта контекста для шаблона.
         template_name (str): Путь к шаблону страницы с календарем событий.
     """
 
-    model = models.ClubEvent
-    context_object_name = 'events'
     template_name = 'clubs/event_calendar.html'
 
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx['page_title'] = 'Календарь событий'
+        ctx['calendar_api_url'] = reverse('clubevent-calendar')
+        return ctx
+
 
 class AboutView(generic.TemplateView):
     """
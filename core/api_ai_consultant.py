@@ -33,12 +33,18 @@ if not settings.configured:
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
     django.setup()
 
+import numpy as np
+
 from clubs.models import Club, ClubCategory, City
 from accounts.models import User
-from django.db.models import Q
+from ai_consultant.recommendations.club_catalog import ClubCatalog, get_club_catalog
 
 logger = logging.getLogger(__name__)
 
+SEARCH_FIELDS = ('name', 'description', 'activities', 'skills_developed')
+INTEREST_FIELDS = ('description', 'activities', 'skills_developed', 'target_audience')
+RECOMMENDATIONS_LIMIT = 20
+
 # Инициализация AI консультанта
 try:
     from ai_club_consultant import AIClubConsultant
@@ -168,26 +174,21 @@ def api_ai_clubs_search(request: HttpRequest) -> JsonResponse:
                 'message': 'Требуется параметр поиска (q или city)'
             }, status=400)
 
-        # Поиск клубов
-        clubs = Club.objects.filter(is_active=True)
+        # Поиск клубов по снимку каталога, из БД загружается только страница результатов
+        catalog = get_club_catalog()
+        mask = np.ones(len(catalog), dtype=bool)
 
         if query:
-            clubs = clubs.filter(
-                Q(name__icontains=query) |
-                Q(description__icontains=query) |
-                Q(activities__icontains=query) |
-                Q(skills_developed__icontains=query)
-            )
+            mask &= catalog.text_contains(SEARCH_FIELDS, query)
 
         if city:
-            clubs = clubs.filter(city__name__icontains=city)
+            mask &= catalog.city_matches(city)
 
-        clubs = clubs.select_related('city', 'category').prefetch_related('members')
-
-        total = clubs.count()
+        rows = np.flatnonzero(mask)
+        total = len(rows)
         clubs_list = []
 
-        for club in clubs[:limit]:
+        for club in catalog.fetch(rows[:limit]):
             club_data = {
                 'id': str(club.id),
                 'name': club.name,
@@ -297,43 +298,40 @@ def api_ai_clubs_recommend(request: HttpRequest) -> JsonResponse:
             except User.DoesNotExist:
                 pass
 
-        # Поиск клубов по критериям
-        clubs = Club.objects.filter(is_active=True)
+        # Кандидаты и баллы считаются по снимку каталога сразу для всех клубов
+        catalog = get_club_catalog()
+        mask = np.ones(len(catalog), dtype=bool)
 
-        if location:
-            clubs = clubs.filter(city__name__icontains=location)
+        location_mask = catalog.city_matches(location) if location else None
+        if location_mask is not None:
+            mask &= location_mask
 
-        if interests:
-            interests_filter = Q()
-            for interest in interests:
-                interests_filter |= (
-                    Q(description__icontains=interest) |
-                    Q(activities__icontains=interest) |
-                    Q(skills_developed__icontains=interest) |
-                    Q(target_audience__icontains=interest)
-                )
-            clubs = clubs.filter(interests_filter)
+        interest_matches = _match_interests(catalog, interests)
+        if interest_matches:
+            mask &= np.logical_or.reduce([
+                np.logical_or.reduce([fields[field] for field in INTEREST_FIELDS])
+                for _, fields in interest_matches
+            ])
 
-        clubs = clubs.select_related('city', 'category')[:20]
+        scores = _club_relevance_scores(catalog, interest_matches, location_mask)
+        rows = catalog.top_rows(scores, RECOMMENDATIONS_LIMIT, mask)
         recommendations = []
 
-        # Расчет релевантности для каждого клуба
-        for club in clubs:
-            relevance_score = _calculate_club_relevance(club, interests, location, preferences)
-            reasons = _generate_match_reasons(club, interests, location, preferences)
-
+        # Полные строки загружаются только для итогового top-k
+        for club in catalog.fetch(rows):
+            row = catalog.row(club.pk)
             recommendation = {
                 'club': {
                     'id': str(club.id),
                     'name': club.name,
                     'description': club.description[:200],
-                    'city': club.city.name if club.city else None,
-                    'category': club.category.name if club.category else None,
+                    'city': catalog.city_name(row),
+                    'category': catalog.category_name(row),
                     'members_count': club.members_count,
                     'logo': club.logo.url if club.logo else None
                 },
-                'relevance_score': relevance_score,
-                'reasons': reasons,
+                'relevance_score': float(scores[row]),
+                'reasons': _generate_match_reasons(catalog, row, interest_matches, location_mask),
                 'suggested_questions': [
                     f"Расскажи подробнее о {club.name}",
                     f"Какие мероприятия проводит {club.name}",
@@ -342,9 +340,6 @@ def api_ai_clubs_recommend(request: HttpRequest) -> JsonResponse:
             }
             recommendations.append(recommendation)
 
-        # Сортировка по релевантности
-        recommendations.sort(key=lambda x: x['relevance_score'], reverse=True)
-
         return JsonResponse({
             'status': 'success',
             'recommendations': recommendations,
@@ -460,68 +455,62 @@ def api_ai_club_create(request: HttpRequest) -> JsonResponse:
 
 # Вспомогательные функции
 
-def _calculate_club_relevance(club: Club, interests: list, location: str, preferences: dict) -> float:
-    """Расчет балла релевантности клуба"""
-    score = 0.0
+def _match_interests(catalog: ClubCatalog, interests: list) -> list:
+    """Маски совпадений каждого интереса по текстовым полям клубов: [(интерес, {поле: маска})]"""
+    return [
+        (interest, {field: catalog.columns[field].contains(interest) for field in INTEREST_FIELDS})
+        for interest in interests
+    ]
+
 
-    # Базовый балл за активность
-    if club.is_active:
-        score += 1.0
+def _club_relevance_scores(catalog: ClubCatalog, interest_matches: list,
+                           location_mask: Optional[np.ndarray]) -> np.ndarray:
+    """Баллы релевантности всех клубов каталога"""
+    # Базовый балл за активность (в каталоге только активные клубы)
+    scores = np.ones(len(catalog))
 
     # Баллы за соответствие локации
-    if location and club.city:
-        if location.lower() in club.city.name.lower():
-            score += 2.0
+    if location_mask is not None:
+        scores += 2.0 * location_mask
 
     # Баллы за соответствие интересам
-    if interests:
-        club_text = f"{club.description} {club.activities} {club.skills_developed}".lower()
-        for interest in interests:
-            if interest.lower() in club_text:
-                score += 1.5
+    for _, fields in interest_matches:
+        scores += 1.5 * (fields['description'] | fields['activities'] | fields['skills_developed'])
 
     # Баллы за популярность
-    if club.members_count > 50:
-        score += 2.0
-    elif club.members_count > 10:
-        score += 1.0
-
-    # Баллы за полноту профиля
-    completeness_score = 0
-    if club.description:
-        completeness_score += 1
-    if club.activities:
-        completeness_score += 0.5
-    if club.skills_developed:
-        completeness_score += 0.5
-    if club.logo:
-        completeness_score += 0.5
+    members = catalog.members_count
+    scores += np.where(members > 50, 2.0, np.where(members > 10, 1.0, 0.0))
 
-    score += (completeness_score / 2.5)  # Нормализация до 1 балла
+    # Баллы за полноту профиля (нормализованы до 1 балла при сборке каталога)
+    scores += catalog.completeness
 
-    return round(score, 1)
+    return np.round(scores, 1)
 
 
-def _generate_match_reasons(club: Club, interests: list, location: str, preferences: dict) -> list:
+def _generate_match_reasons(catalog: ClubCatalog, row: int, interest_matches: list,
+                            location_mask: Optional[np.ndarray]) -> list:
     """Генерация причин соответствия"""
     reasons = []
 
-    if location and club.city and location.lower() in club.city.name.lower():
-        reasons.append(f"📍 В вашем городе ({club.city.name})")
-
-    if interests:
-        club_text = f"{club.description} {club.activities}".lower()
-        matching_interests = [interest for interest in interests if interest.lower() in club_text]
-        if matching_interests:
-            reasons.append(f"🎯 По интересам: {', '.join(matching_interests[:2])}")
-
-    if club.members_count > 20:
-        reasons.append(f"👥 Популярный клуб ({club.members_count} участников)")
-    elif club.members_count > 5:
-        reasons.append(f"🤝 Активное сообщество ({club.members_count} участников)")
-
-    if club.category:
-        reasons.append(f"🏷️ {club.category.name}")
+    if location_mask is not None and location_mask[row]:
+        reasons.append(f"📍 В вашем городе ({catalog.city_name(row)})")
+
+    matching_interests = [
+        interest for interest, fields in interest_matches
+        if fields['description'][row] or fields['activities'][row]
+    ]
+    if matching_interests:
+        reasons.append(f"🎯 По интересам: {', '.join(matching_interests[:2])}")
+
+    members_count = int(catalog.members_count[row])
+    if members_count > 20:
+        reasons.append(f"👥 Популярный клуб ({members_count} участников)")
+    elif members_count > 5:
+        reasons.append(f"🤝 Активное сообщество ({members_count} участников)")
+
+    category = catalog.category_name(row)
+    if category is not None:
+        reasons.append(f"🏷️ {category}")
 
     return reasons[:3]  # Максимум 3 причины
 
@@ -20,11 +20,16 @@ from django.conf import settings
 from clubs.models import Club, ClubCategory, City
 from accounts.models import User
 from django.db.models import Q
+import numpy as np
 import uuid
 
+from ai_consultant.recommendations.club_catalog import get_club_catalog
+
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
+TOPIC_WORDS = ['музыка', 'танцы', 'спорт', 'игры', 'кино', 'книги']
+
 @require_http_methods(["GET"])
 def api_clubs(request):
     """Получение списка клубов с фильтрацией"""
@@ -191,40 +196,38 @@ def api_ai_chat(request):
 
 def find_relevant_clubs(user_message):
     """Поиск релевантных клубов на основе сообщения пользователя"""
-    clubs = Club.objects.filter(is_active=True)
+    catalog = get_club_catalog()
     user_message_lower = user_message.lower()
+    message_words = user_message_lower.split()[:5]
 
-    # Поиск по ключевым словам
-    relevant_clubs = []
-    for club in clubs:
-        relevance_score = 0
+    # Баллы считаются по снимку каталога сразу для всех клубов
+    scores = np.zeros(len(catalog), dtype=np.int64)
 
-        # Проверка названия
-        if any(word in club.name.lower() for word in ['музыка', 'танцы', 'спорт', 'игры', 'кино', 'книги']):
-            if any(word in user_message_lower for word in ['музыка', 'танцы', 'спорт', 'игры', 'кино', 'книги']):
-                relevance_score += 5
+    # Проверка названия
+    if any(word in user_message_lower for word in TOPIC_WORDS):
+        scores += 5 * catalog.columns['name'].contains_any(TOPIC_WORDS)
 
-        # Проверка описания
-        if club.description and any(word in club.description.lower() for word in user_message_lower.split()[:5]):
-            relevance_score += 3
+    # Проверка описания
+    scores += 3 * catalog.columns['description'].contains_any(message_words)
 
-        # Проверка деятельности
-        if club.activities and any(word in club.activities.lower() for word in user_message_lower.split()[:5]):
-            relevance_score += 2
+    # Проверка деятельности
+    scores += 2 * catalog.columns['activities'].contains_any(message_words)
 
-        if relevance_score > 0:
-            relevant_clubs.append({
-                'id': str(club.id),
-                'name': club.name,
-                'description': club.description[:150] + '...' if len(club.description) > 150 else club.description,
-                'city': club.city.name if club.city else 'Не указан',
-                'category': club.category.name if club.category else 'Не указана',
-                'score': relevance_score
-            })
+    # Сортировка по релевантности, из БД загружаются только итоговые клубы
+    rows = catalog.top_rows(scores, 5, scores > 0)
+    relevant_clubs = []
+    for club in catalog.fetch(rows, Club.objects.filter(is_active=True).only('id', 'description')):
+        row = catalog.row(club.pk)
+        relevant_clubs.append({
+            'id': str(club.id),
+            'name': catalog.names[row],
+            'description': club.description[:150] + '...' if len(club.description) > 150 else club.description,
+            'city': catalog.city_name(row) or 'Не указан',
+            'category': catalog.category_name(row) or 'Не указана',
+            'score': int(scores[row])
+        })
 
-    # Сортировка по релевантности
-    relevant_clubs.sort(key=lambda x: x['score'], reverse=True)
-    return relevant_clubs[:5]
+    return relevant_clubs
 
 def generate_ai_response(user_message, relevant_clubs, user_id):
     """Генерация AI ответа на основе контекста"""
@@ -8,9 +8,12 @@ class HTTPToHTTPSRedirectMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
 
+    # Проверки health/readiness идут от балансировщика напрямую по HTTP
+    EXEMPT_PREFIXES = ('/health/',)
+
     def __call__(self, request):
         # Если запрос пришел по HTTP
-        if not request.is_secure():
+        if not request.is_secure() and not request.path.startswith(self.EXEMPT_PREFIXES):
             # Получаем имя хоста из запроса
             host = request.get_host().split(':')[0]
             # Формируем HTTPS URL
@@ -0,0 +1,35 @@
+"""
+DRF парсер JSON на orjson (ai_consultant/utils/fast_json.py)
+"""
+
+import codecs
+
+from django.conf import settings
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from ai_consultant.utils import fast_json
+
+from .renderers import ORJSONRenderer
+
+
+class ORJSONParser(parsers.JSONParser):
+    """
+    Разбирает тело запроса orjson без промежуточного декодирования в str.
+
+    Тела в кодировке, отличной от UTF-8, сначала декодируются, как в JSONParser.
+    """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+
+        try:
+            body = stream.read()
+            if codecs.lookup(encoding).name != 'utf-8':
+                # Только текстовые кодировки: str.encode отвергает bz2_codec и подобные
+                ''.encode(encoding)
+                body = body.decode(encoding)
+            return fast_json.loads(body)
+        except (ValueError, LookupError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
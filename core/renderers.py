@@ -0,0 +1,32 @@
+"""
+DRF рендерер JSON на orjson (ai_consultant/utils/fast_json.py)
+"""
+
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+from ai_consultant.utils import fast_json
+
+JS_LINE_SEPARATORS = ('\u2028'.encode(), '\u2029'.encode())
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """
+    Компактный UTF-8 JSON через orjson; без orjson — стандартный json с теми же параметрами.
+
+    Типы вне JSON переводит encoders.JSONEncoder DRF, поэтому ответ совпадает с JSONRenderer.
+    Запрос с отступом (Accept: application/json; indent=4, browsable API) рендерит JSONRenderer.
+    """
+    default = staticmethod(fast_json.make_default(encoders.JSONEncoder()))
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = fast_json.dumps_bytes(data, default=self.default)
+        # Как и JSONRenderer, экранируем U+2028/U+2029, чтобы ответ оставался корректным JavaScript
+        if JS_LINE_SEPARATORS[0] in ret or JS_LINE_SEPARATORS[1] in ret:
+            ret = ret.replace(JS_LINE_SEPARATORS[0], b'\\u2028').replace(JS_LINE_SEPARATORS[1], b'\\u2029')
+        return ret
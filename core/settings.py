@@ -270,7 +270,16 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.TokenAuthentication',
-    )
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 # CKEditor Settings
@@ -293,7 +302,7 @@ OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', 'sk-proj-1twk7pkG0pl4F_mCH_Bw-Jxk9z
 
 # AI System Configuration from ai_settings.py
 # GPT-4o mini API Configuration
-OPENAI_API_BASE = "https://api.openai.com/v1"
+OPENAI_API_BASE = os.getenv('OPENAI_API_BASE', "https://api.openai.com/v1")
 OPENAI_MODEL = "gpt-4o-mini"
 OPENAI_TEMPERATURE = 0.7
 OPENAI_MAX_TOKENS = 1500
@@ -315,6 +324,9 @@ AI_CACHE_ENABLED = True
 
 # Context Configuration
 AI_CONTEXT_WINDOW = 10  # Number of previous messages to consider
+AI_CONTEXT_TOKEN_BUDGET = 6000  # Токенов на запрос: prompt + tools + ответ
+AI_SUMMARY_BATCH_SIZE = 6  # Сколько выпавших реплик копить перед обновлением резюме
+AI_SUMMARY_MAX_TOKENS = 300
 AI_RECOMMENDATION_LIMIT = 5  # Max recommendations per response
 AI_SEARCH_LIMIT = 20  # Max search results
 
@@ -322,6 +334,25 @@ AI_SEARCH_LIMIT = 20  # Max search results
 AI_RAG_ENABLED = True
 AI_RAG_SIMILARITY_THRESHOLD = 0.7
 AI_RAG_MAX_DOCUMENTS = 5
+RAG_MMR_LAMBDA = 0.7  # MMR: вес релевантности против разнообразия
+RAG_DUPLICATE_THRESHOLD = 0.95  # косинусная близость, с которой документ считается дубликатом
+
+# 🔤 Гибридный поиск: BM25 по лемматизированным токенам + dense, объединение RRF
+RAG_LEXICAL_INDEX_DIR = os.getenv('RAG_LEXICAL_INDEX_DIR', os.path.join(BASE_DIR, 'data', 'lexical_index'))
+RAG_RETRIEVAL_MODES = {}  # переопределение по коллекциям: {'faq': 'lexical', ...}; dense | lexical | hybrid
+RAG_LEXICAL_CANDIDATES = 20
+RAG_RRF_K = 60
+RAG_BM25_K1 = 1.5
+RAG_BM25_B = 0.75
+
+# 🗂️ Векторный индекс: 'chroma' (PersistentClient) или 'local' (memory-mapped поколения в процессе)
+RAG_VECTOR_BACKEND = os.getenv('RAG_VECTOR_BACKEND', 'chroma')
+RAG_VECTOR_INDEX_DIR = os.getenv('RAG_VECTOR_INDEX_DIR', os.path.join(BASE_DIR, 'data', 'vector_index'))
+RAG_VECTOR_ANN = 'auto'  # auto | faiss | hnswlib | exact
+RAG_VECTOR_ANN_MIN_SIZE = 1000  # меньше — точный поиск матричным произведением
+RAG_VECTOR_HNSW_M = 32
+RAG_VECTOR_HNSW_EF_CONSTRUCTION = 200
+RAG_VECTOR_HNSW_EF_SEARCH = 64
 
 # Logging Configuration
 AI_LOG_LEVEL = "INFO"
@@ -331,13 +362,70 @@ AI_LOG_RESPONSES = False  # Set to True for debugging
 # Error Handling
 AI_RETRY_ATTEMPTS = 3
 AI_RETRY_DELAY = 1  # seconds
+AI_RETRY_MAX_DELAY = 8  # seconds, потолок экспоненциальной задержки
 AI_FALLBACK_ENABLED = True
 
+# LLM gateway: circuit breaker, конкурентность и бюджет времени на вызов
+AI_CIRCUIT_FAILURE_THRESHOLD = 5
+AI_CIRCUIT_RESET_TIMEOUT = 30  # seconds
+AI_LLM_MAX_CONCURRENCY = 32    # одновременных запросов к OpenAI на процесс
+AI_LLM_QUEUE_TIMEOUT = 2       # seconds ожидания свободного слота
+AI_LLM_TIMEOUT_BUDGET = 45     # seconds на вызов вместе с повторами
+
+# LLM провайдер: openai | stub (детерминированная заглушка без сети, для тестов и нагрузки)
+AI_LLM_PROVIDER = os.getenv('AI_LLM_PROVIDER', 'openai')
+AI_STUB_SCRIPT = os.getenv('AI_STUB_SCRIPT')  # JSON сценарий ответов, см. ai_consultant/utils/llm_stub.py
+AI_STUB_LATENCY_DISTRIBUTION = os.getenv('AI_STUB_LATENCY_DISTRIBUTION', 'gaussian')
+AI_STUB_LATENCY_MS = float(os.getenv('AI_STUB_LATENCY_MS', '0'))
+AI_STUB_JITTER_MS = float(os.getenv('AI_STUB_JITTER_MS', '0'))
+
+# Статические промпты компилируются один раз на версию базы знаний (prompt caching)
+AI_PROMPT_VERSION = os.getenv('AI_PROMPT_VERSION', '')  # метка деплоя, меняет версию промптов
+AI_PROMPT_VERSION_TTL = 3600  # seconds, как часто перепроверять версию базы знаний
+
+# Матрица эмбеддингов клубов для content-based рекомендаций (memory-mapped .npy)
+AI_CLUB_EMBEDDINGS_DIR = os.getenv('AI_CLUB_EMBEDDINGS_DIR', os.path.join(BASE_DIR, 'data', 'club_embeddings'))
+AI_CLUB_EMBEDDINGS_SYNC_INTERVAL = 60  # seconds между инкрементальными обновлениями
+AI_CLUB_EMBEDDINGS_BATCH_SIZE = 256
+
+# Item-item collaborative filtering, обучается офлайн (manage.py build_cf_model)
+AI_CF_MODEL_PATH = os.getenv('AI_CF_MODEL_PATH', os.path.join(BASE_DIR, 'data', 'recommendations', 'item_cf.npz'))
+AI_CF_TOP_K = 50  # соседей на клуб
+
+# Журналы (ChatMessage, AISessionLog, AgentLog): помесячные партиции в PostgreSQL и архив
+AI_LOG_RETENTION_MONTHS = int(os.getenv('AI_LOG_RETENTION_MONTHS', '6'))
+AI_LOG_PARTITION_MONTHS_AHEAD = 2
+AI_LOG_ARCHIVE_DIR = os.getenv('AI_LOG_ARCHIVE_DIR', os.path.join(BASE_DIR, 'data', 'log_archive'))
+
+# 📝 Буферизованная запись AgentLog/AISessionLog (bulk_create в фоновом потоке)
+AI_LOG_BUFFER_ENABLED = os.getenv('AI_LOG_BUFFER_ENABLED', 'True').lower() == 'true'
+AI_LOG_BUFFER_SIZE = 10000
+AI_LOG_BUFFER_BATCH_SIZE = 500
+AI_LOG_BUFFER_FLUSH_MS = 500
+
+# 🔥 Прогрев моделей и индексов до fork воркеров gunicorn (ai_consultant/utils/warmup.py)
+AI_WARMUP_ENABLED = os.getenv('AI_WARMUP_ENABLED', 'False').lower() == 'true'
+AI_WARMUP_RESOURCES = None  # None — все зарегистрированные ресурсы
+AI_WARMUP_TORCH_THREADS = int(os.getenv('AI_WARMUP_TORCH_THREADS', '0')) or None
+
+# ⏱️ Бюджет импорта при старте: python manage.py import_budget (ai_consultant/utils/import_budget.py)
+AI_IMPORT_BUDGET_MS = int(os.getenv('AI_IMPORT_BUDGET_MS', '3000'))
+
+# 💬 Состояния диалогов создания клуба (ai_consultant/services/conversation_store.py)
+AI_CONVERSATION_STORE = os.getenv('AI_CONVERSATION_STORE', 'auto')  # auto | redis | db
+AI_CONVERSATION_REDIS_URL = os.getenv('AI_CONVERSATION_REDIS_URL') or None
+AI_CONVERSATION_TTL = 3600  # секунд, продлевается при каждом сообщении
+AI_CONVERSATION_REDIS_RETRY = 30  # секунд работы через базу после ошибки Redis
+
 # Performance Configuration
 AI_ASYNC_ENABLED = True
 AI_BATCH_PROCESSING_ENABLED = False
 AI_PARALLEL_REQUESTS = 5
 
+# Async (ASGI) chat: общий пул соединений AsyncOpenAI на процесс
+AI_ASYNC_MAX_CONNECTIONS = 200
+AI_ASYNC_MAX_KEEPALIVE = 50
+
 # Performance Optimizations for 2GB RAM Server
 # Disable migrations in production for better performance
 MIGRATION_MODULES = {}
@@ -48,6 +48,11 @@ CACHES = {
 SESSION_ENGINE = "django.contrib.sessions.backends.cache"
 SESSION_CACHE_ALIAS = "default"
 
+# Состояния диалогов ИИ консультанта, общие для всех воркеров
+AI_CONVERSATION_REDIS_URL = os.getenv(
+    'AI_CONVERSATION_REDIS_URL', f"redis://{os.getenv('REDIS_HOST', 'localhost')}:6379/2"
+)
+
 # PRODUCTION SECURITY SETTINGS
 SECURE_SSL_REDIRECT = True
 SECURE_HSTS_SECONDS = 31536000  # 1 год
@@ -42,6 +42,7 @@ urlpatterns = [
     path('api/ai/clubs/recommend/', api_ai_clubs_recommend, name='api_ai_clubs_recommend'),
     path('api/ai/club/create/', api_ai_club_create, name='api_ai_club_create'),
     path('api/ai/health/', api_ai_health, name='api_ai_health'),
+    path('health/', include('core.urls_health')),
 
     # API v1 - Clubs with Actionable AI
     path('api/v1/', include('core.urls_api_v1_actionable')),
@@ -7,6 +7,9 @@ urlpatterns = [
     # 🤖 Основной AI чат
     path('chat/', include('ai_consultant.api.urls')),
 
+    # 🚀 Чат v2 (синхронный и асинхронный ASGI эндпоинты)
+    path('', include('ai_consultant.api.urls_v2')),
+
     # 🎯 Простые AI эндпоинты (резервные)
     path('simple-chat/', include('core.simple_api_urls_new')),
 
@@ -12,6 +12,15 @@ def health_check(request):
     })
 
 
+def readiness_check(request):
+    """🔥 Readiness: 503 пока воркер не прогрет, отчет о времени загрузки ресурсов"""
+    from ai_consultant.utils.warmup import warmup_registry
+
+    report = warmup_registry.report()
+    return JsonResponse(report, status=200 if warmup_registry.is_ready() else 503)
+
+
 urlpatterns = [
     path('', health_check, name='health_check'),
+    path('ready/', readiness_check, name='readiness_check'),
 ]
\ No newline at end of file
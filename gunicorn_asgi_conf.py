@@ -0,0 +1,66 @@
+"""
+⚡ Production ASGI для UnitySphere AI
+Gunicorn + Uvicorn workers для асинхронного чата (core.asgi:application)
+
+Запуск:
+    gunicorn -c gunicorn_asgi_conf.py core.asgi:application
+
+Один воркер держит сотни одновременных ожиданий OpenAI, поэтому воркеров
+нужно меньше, чем в gunicorn_conf.py (gthread).
+"""
+
+import multiprocessing
+
+# 🔧 Gunicorn Config
+bind = "127.0.0.1:8002"  # Internal port (async chat)
+workers = multiprocessing.cpu_count() + 1
+worker_class = "uvicorn.workers.UvicornWorker"
+worker_connections = 1000
+max_requests = 1000
+max_requests_jitter = 50
+timeout = 60
+keepalive = 5
+
+# 📁 Paths
+chdir = "/var/www/myapp/eventsite"
+accesslog = "/var/log/gunicorn/access_asgi.log"
+errorlog = "/var/log/gunicorn/error_asgi.log"
+loglevel = "info"
+capture_output = True
+
+# 🔒 Security
+preload_app = False  # event loop и пул соединений создаются в каждом воркере
+daemon = False
+pidfile = "/var/run/gunicorn_asgi.pid"
+
+# 🚀 Performance
+worker_tmp_dir = "/dev/shm"
+limit_request_line = 4094
+limit_request_fields = 100
+limit_request_field_size = 8190
+
+# 📊 Monitoring
+statsd_host = "localhost:8125"
+statsd_prefix = "unitysphere.ai.asgi"
+
+# 🌐 Environment
+raw_env = [
+    "DJANGO_SETTINGS_MODULE=core.settings",
+    "DEBUG=False",
+    "AI_WARMUP_ENABLED=True",
+]
+
+# 🔄 Graceful shutdown
+graceful_timeout = 30
+
+
+def worker_exit(server, worker):
+    """Дописать буфер журналов перед завершением воркера"""
+    from ai_consultant.utils.log_buffer import get_log_buffer
+    get_log_buffer().shutdown()
+
+
+def post_worker_init(worker):
+    """Без preload_app прогрев идет в воркере до приема запросов"""
+    from ai_consultant.utils.warmup import warmup_registry
+    warmup_registry.warm_up()
@@ -43,8 +43,26 @@ statsd_prefix = "unitysphere.ai"
 raw_env = [
     "DJANGO_SETTINGS_MODULE=core.settings",
     "DEBUG=False",
+    "AI_WARMUP_ENABLED=True",
 ]
 
 # 🔄 Graceful shutdown
 graceful_timeout = 30
-keepalive = 2
\ No newline at end of file
+keepalive = 2
+
+
+def worker_exit(server, worker):
+    """Дописать буфер журналов перед завершением воркера"""
+    from ai_consultant.utils.log_buffer import get_log_buffer
+    get_log_buffer().shutdown()
+
+
+def when_ready(server):
+    """Прогрев моделей и индексов в мастере до fork: воркеры получают их copy-on-write"""
+    from ai_consultant.utils.warmup import warmup_registry
+    warmup_registry.warm_up_before_fork()
+
+
+def post_fork(server, worker):
+    from ai_consultant.utils.warmup import warmup_registry
+    warmup_registry.after_fork()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Локальный фейковый OpenAI сервер для нагрузочного тестирования чата.
+
+Отвечает на POST /v1/chat/completions по сценарию из ai_consultant/utils/llm_stub.py
+(текст, tool calls, stream=True через SSE) с заданным распределением задержки,
+не расходуя кредиты OpenAI. Запросы маршрутизатора (response_format=json_object)
+получают JSON с агентом orchestrator.
+
+Запуск:
+    python scripts/fake_openai_server.py --port 8999 --latency-ms 3000
+    python scripts/fake_openai_server.py --distribution lognormal --latency-ms 1200 --jitter-ms 600 \
+        --script stub_script.json --seed 42
+
+Django указывается на сервер через переменную окружения:
+    OPENAI_API_BASE=http://127.0.0.1:8999/v1
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_consultant.utils.llm_stub import LatencyModel, StubScript, build_completion, build_stream_chunks  # noqa: E402
+
+
+def write_json(writer, status, payload):
+    data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    writer.write(
+        f'HTTP/1.1 {status}\r\n'
+        f'Content-Type: application/json\r\n'
+        f'Content-Length: {len(data)}\r\n'
+        f'Connection: keep-alive\r\n\r\n'.encode('latin-1') + data
+    )
+
+
+async def write_stream(writer, body, reply, chunk_delay):
+    """Server-Sent Events в формате OpenAI (chunked transfer encoding)"""
+    writer.write(
+        b'HTTP/1.1 200 OK\r\n'
+        b'Content-Type: text/event-stream\r\n'
+        b'Transfer-Encoding: chunked\r\n'
+        b'Connection: keep-alive\r\n\r\n'
+    )
+    events = [f'data: {json.dumps(c, ensure_ascii=False)}\n\n' for c in build_stream_chunks(body, reply)]
+    events.append('data: [DONE]\n\n')
+    for event in events:
+        data = event.encode('utf-8')
+        writer.write(f'{len(data):x}\r\n'.encode('latin-1') + data + b'\r\n')
+        await writer.drain()
+        if chunk_delay:
+            await asyncio.sleep(chunk_delay)
+    writer.write(b'0\r\n\r\n')
+
+
+def make_handler(script, latency, chunk_delay):
+    async def handle(reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                raw_body = await reader.readexactly(length) if length else b'{}'
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+                if method == 'POST' and path.rstrip('/').endswith('/chat/completions'):
+                    body = json.loads(raw_body or b'{}')
+                    await asyncio.sleep(latency.sample())
+                    reply = script.respond(body)
+
+                    if body.get('stream'):
+                        await write_stream(writer, body, reply, chunk_delay)
+                    else:
+                        write_json(writer, '200 OK', build_completion(body, reply))
+                else:
+                    write_json(writer, '404 Not Found', {'error': {'message': 'not found'}})
+                await writer.drain()
+
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def serve(host, port, script, latency, chunk_delay):
+    server = await asyncio.start_server(make_handler(script, latency, chunk_delay), host, port, backlog=2048)
+    print(f"🤖 Fake OpenAI: http://{host}:{port}/v1 "
+          f"(latency {latency.kind} {latency.mean_ms}±{latency.jitter_ms} ms)")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Фейковый OpenAI сервер')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8999)
+    parser.add_argument('--latency-ms', type=float, default=3000)
+    parser.add_argument('--jitter-ms', type=float, default=500)
+    parser.add_argument('--distribution', choices=LatencyModel.KINDS, default='gaussian')
+    parser.add_argument('--seed', type=int, help='Фиксирует последовательность задержек')
+    parser.add_argument('--script', help='JSON сценарий ответов (по умолчанию встроенный)')
+    parser.add_argument('--chunk-delay-ms', type=float, default=20, help='Пауза между чанками stream=True')
+    args = parser.parse_args()
+
+    script = StubScript.from_file(args.script)
+    latency = LatencyModel(args.distribution, args.latency_ms, args.jitter_ms, seed=args.seed)
+
+    try:
+        asyncio.run(serve(args.host, args.port, script, latency, args.chunk_delay_ms / 1000.0))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Locust сценарий для чата и виджета против заглушки LLM.
+
+    pip install locust
+    python scripts/fake_openai_server.py --port 8999 --latency-ms 3000 &
+    OPENAI_API_BASE=http://127.0.0.1:8999/v1 gunicorn -c gunicorn_conf.py core.wsgi:application --bind 127.0.0.1:8001 &
+
+    LOADTEST_TOKEN=<DRF token> locust -f scripts/locustfile_chat.py --host http://127.0.0.1:8001 \\
+        --users 200 --spawn-rate 20 --run-time 5m --headless --csv loadtest_<release>
+
+p95 и RPS по каждому endpoint смотрите в loadtest_<release>_stats.csv;
+для DB contention используйте scripts/loadtest_chat.py --pg-dsn.
+"""
+import itertools
+import os
+
+from locust import HttpUser, between, task
+
+MESSAGES = itertools.cycle([
+    'Привет!',
+    'Найди клуб по шахматам в Алматы',
+    'Как создать свой клуб?',
+])
+
+
+class ChatUser(HttpUser):
+    """Авторизованный пользователь: диалог в одной сессии ChatAPIViewV2"""
+
+    wait_time = between(1, 3)
+    weight = 3
+
+    def on_start(self):
+        self.headers = {'Authorization': f"Token {os.environ['LOADTEST_TOKEN']}"}
+        self.session_id = None
+
+    @task
+    def chat_v2(self):
+        payload = {'message': next(MESSAGES)}
+        if self.session_id:
+            payload['session_id'] = self.session_id
+        with self.client.post('/api/v1/ai/chat/v2/', json=payload, headers=self.headers,
+                              name='chat_v2', catch_response=True) as response:
+            if response.status_code != 200:
+                response.failure(f'HTTP {response.status_code}')
+                return
+            self.session_id = response.json().get('session_id', self.session_id)
+
+
+class WidgetUser(HttpUser):
+    """Анонимный посетитель сайта с виджетом"""
+
+    wait_time = between(2, 5)
+    weight = 1
+
+    @task(3)
+    def widget_chat(self):
+        self.client.post('/api/ai/chat/', json={'message': next(MESSAGES)}, name='widget_chat')
+
+    @task(1)
+    def widget_consult(self):
+        self.client.post('/api/ai/consult/', json={'message': next(MESSAGES)}, name='widget_consult')
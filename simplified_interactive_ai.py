@@ -4,16 +4,14 @@ Simplified Interactive AI Consultant - Session-free version
 """
 
 import uuid
-import threading
-from datetime import datetime, timedelta
 from actionable_ai_consultant import ActionableAIConsultant
+from ai_consultant.services.conversation_store import get_conversation_store
 
 class SimplifiedInteractiveAIConsultant:
     """Упрощенный интерактивный AI консультант без сессий"""
 
-    # Хранилище состояний в памяти (в реальном приложении нужно использовать Redis или БД)
-    _states = {}
-    _states_lock = threading.Lock()
+    # Состояния хранятся в общем хранилище диалогов (Redis или БД), доступном всем воркерам
+    FLOW = 'simplified_interactive'
 
     def __init__(self):
         self.ai = ActionableAIConsultant()
@@ -455,55 +453,33 @@ class SimplifiedInteractiveAIConsultant:
 
         return final_response
 
-    def _cleanup_old_states(self):
-        """Очищаем старые состояния (старше 1 часа)"""
-        cutoff_time = datetime.now() - timedelta(hours=1)
-        with self._states_lock:
-            old_keys = [k for k, v in self._states.items() if v.get('last_activity', datetime.min) < cutoff_time]
-            for key in old_keys:
-                del self._states[key]
-
     def _get_or_create_state_id(self, state_id=None):
-        """Получаем или создаем новый ID состояния"""
-        if state_id and state_id in self._states:
-            with self._states_lock:
-                self._states[state_id]['last_activity'] = datetime.now()
+        """Получаем или создаем новый ID состояния (старые состояния удаляются по TTL хранилища)"""
+        if state_id and get_conversation_store().load(self.FLOW, state_id).exists:
             return state_id
 
         # Создаем новый ID состояния
         new_state_id = str(uuid.uuid4())
-        with self._states_lock:
-            self._states[new_state_id] = {
-                'step': None,
-                'data': {},
-                'last_activity': datetime.now()
-            }
+        self._save_state(new_state_id, {'step': None, 'data': {}})
         return new_state_id
 
     def _get_state(self, state_id):
         """Получаем состояние по ID"""
-        with self._states_lock:
-            return self._states.get(state_id, {'step': None, 'data': {}})
+        record = get_conversation_store().load(self.FLOW, state_id)
+        return {'step': record.stage or None, 'data': record.data}
 
     def _save_state(self, state_id, state):
-        """Сохраняем состояние"""
-        with self._states_lock:
-            self._states[state_id] = {
-                'step': state.get('step'),
-                'data': state.get('data', {}),
-                'last_activity': datetime.now()
-            }
+        """Сохраняем состояние (compare-and-set с повтором, продлевает TTL)"""
+        def replace(record):
+            record.stage = state.get('step') or ''
+            record.data = state.get('data', {})
+
+        get_conversation_store().update(self.FLOW, state_id, replace)
 
     def start_club_creation(self, message, state_id):
         """Начинаем процесс создания клуба с контекстом"""
         state_id = self._get_or_create_state_id(state_id)
-
-        with self._states_lock:
-            self._states[state_id] = {
-                'step': 'name',
-                'data': {},
-                'last_activity': datetime.now()
-            }
+        self._save_state(state_id, {'step': 'name', 'data': {}})
 
         # Получаем контекст сайта
         try:
@@ -763,9 +739,7 @@ class SimplifiedInteractiveAIConsultant:
             result = self.create_club(club_data, user_email)
             # Очищаем состояние после успешного создания
             if result and result.get('success'):
-                with self._states_lock:
-                    if state_id in self._states:
-                        del self._states[state_id]
+                get_conversation_store().delete(self.FLOW, state_id)
             return result
 
     def create_club(self, club_data, user_email):
@@ -1117,10 +1091,6 @@ class SimplifiedInteractiveAIConsultant:
         """Обработка сообщения пользователя с интерактивным созданием клуба"""
         message_lower = message.lower().strip()
 
-        # Очистка старых состояний (раз в 100 вызовов)
-        if len(self._states) % 100 == 0:
-            self._cleanup_old_states()
-
         # Проверяем, нужно ли создать новое состояние
         if not state_id:
             state_id = self._get_or_create_state_id()
@@ -2,123 +2,383 @@
 """
 🚀 Standalone AI Agent Server for Production
 Lightweight server with only the AI agent - no Django dependencies
+
+asyncio HTTP/1.1 server (standard library only):
+- keep-alive: idle connections are kept for AI_SERVER_KEEPALIVE seconds,
+  up to AI_SERVER_KEEPALIVE_REQUESTS requests per connection
+- bounded concurrency: get_ai_response runs in AI_SERVER_WORKERS threads,
+  at most AI_SERVER_MAX_QUEUE requests wait, the rest get 503 + Retry-After
+- request size limits: AI_SERVER_MAX_HEADER_BYTES (431), AI_SERVER_MAX_BODY_BYTES (413)
+- /health/ reports in-flight requests, queue depth and open connections
+- SIGTERM/SIGINT: stop accepting, finish in-flight requests (up to
+  AI_SERVER_DRAIN_TIMEOUT seconds), close idle keep-alive connections
+
+Load benchmark against the Django endpoint:
+    python scripts/loadtest_chat.py --scenarios standalone,agent --concurrency 100
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import argparse
+import asyncio
 import json
-import urllib.parse
-from datetime import datetime
-import sys
+import logging
 import os
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import formatdate
+from http import HTTPStatus
+
+PROJECT_DIR = os.environ.get('AI_SERVER_PROJECT_DIR', os.path.dirname(os.path.abspath(__file__)))
 
 # Add the project directory to Python path
-sys.path.insert(0, '/var/www/myapp/eventsite')
+sys.path.insert(0, PROJECT_DIR)
 
 # Import our lightweight AI agent
 from ai_consultant.agents.lightweight_production_agent import get_ai_response
 
-class AIHandler(BaseHTTPRequestHandler):
-    """🤖 HTTP handler for AI agent requests"""
-
-    def _set_json_headers(self, status=200):
-        """Set JSON response headers"""
-        self.send_response(status)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
-
-    def do_OPTIONS(self):
-        """Handle CORS preflight requests"""
-        self._set_json_headers()
-        self.wfile.write(json.dumps({'status': 'ok'}).encode())
-
-    def do_GET(self):
-        """Handle GET requests"""
-        if self.path == '/api/v1/ai/production/health/' or self.path == '/health/':
-            # Health check endpoint
-            response = {
-                'status': 'healthy',
-                'service': 'UnitySphere Lightweight AI Agent',
-                'version': '1.0.0',
-                'timestamp': datetime.utcnow().isoformat(),
-                'uptime': 'Ready'
-            }
-            self._set_json_headers()
-            self.wfile.write(json.dumps(response, ensure_ascii=False).encode())
+logger = logging.getLogger('standalone_ai_server')
+
+AGENT_PATHS = ('/api/v1/ai/production/agent/', '/api/agent')  # /api/agent — прокси core.api_views
+HEALTH_PATHS = ('/api/v1/ai/production/health/', '/health/', '/health')
+
+CORS_HEADERS = (
+    ('Access-Control-Allow-Origin', '*'),
+    ('Access-Control-Allow-Methods', 'GET, POST, OPTIONS'),
+    ('Access-Control-Allow-Headers', 'Content-Type'),
+)
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+class HTTPError(Exception):
+    """Ответ с ошибкой, после которого соединение закрывается"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class AIServer:
+    """🤖 HTTP server for AI agent requests"""
+
+    def __init__(self, host='127.0.0.1', port=8001, agent=get_ai_response,
+                 workers=None, max_queue=None, max_body_bytes=None, max_header_bytes=None,
+                 keepalive_timeout=None, keepalive_requests=None, request_timeout=None,
+                 drain_timeout=None, access_log=None):
+        self.host = host
+        self.port = port
+        self.agent = agent
+        self.workers = workers or env_int('AI_SERVER_WORKERS', 8)
+        self.max_queue = env_int('AI_SERVER_MAX_QUEUE', 64) if max_queue is None else max_queue
+        self.max_body_bytes = max_body_bytes or env_int('AI_SERVER_MAX_BODY_BYTES', 64 * 1024)
+        self.max_header_bytes = max_header_bytes or env_int('AI_SERVER_MAX_HEADER_BYTES', 16 * 1024)
+        self.keepalive_timeout = keepalive_timeout or env_float('AI_SERVER_KEEPALIVE', 15)
+        self.keepalive_requests = keepalive_requests or env_int('AI_SERVER_KEEPALIVE_REQUESTS', 1000)
+        self.request_timeout = request_timeout or env_float('AI_SERVER_REQUEST_TIMEOUT', 10)
+        self.drain_timeout = drain_timeout or env_float('AI_SERVER_DRAIN_TIMEOUT', 30)
+        if access_log is None:
+            access_log = os.environ.get('AI_SERVER_ACCESS_LOG', 'true').lower() == 'true'
+        self.access_log = access_log
+
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ai-agent')
+        self.server = None
+        self.started_at = time.monotonic()
+        self.draining = False
+        self.pending = 0          # запросы к агенту: выполняются + ждут потока
+        self.in_flight = 0        # запросы от чтения заголовков до отправки ответа
+        self.served = 0
+        self.rejected = 0
+        self.connections = set()
+        self.idle = set()         # keep-alive соединения в ожидании следующего запроса
+        self._stopped = None
+        self._drained = None
+
+    # 📊 Состояние
+
+    @property
+    def queue_depth(self):
+        return max(0, self.pending - self.workers)
+
+    def health(self):
+        return {
+            'status': 'draining' if self.draining else 'healthy',
+            'service': 'UnitySphere Lightweight AI Agent',
+            'version': '2.0.0',
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'uptime_seconds': round(time.monotonic() - self.started_at, 1),
+            'workers': self.workers,
+            'in_flight': self.in_flight,
+            'agent_running': min(self.pending, self.workers),
+            'queue_depth': self.queue_depth,
+            'queue_limit': self.max_queue,
+            'connections': len(self.connections),
+            'idle_connections': len(self.idle),
+            'served': self.served,
+            'rejected': self.rejected,
+        }
+
+    # 🚀 Жизненный цикл
+
+    async def start(self):
+        self._stopped = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        # limit ограничивает буфер StreamReader: заголовки длиннее — LimitOverrunError (431)
+        self.server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port,
+            limit=self.max_header_bytes, backlog=env_int('AI_SERVER_BACKLOG', 512),
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    def request_shutdown(self):
+        """Обработчик SIGTERM/SIGINT"""
+        if self._stopped is not None and not self._stopped.is_set():
+            logger.info('🛑 Shutdown requested, draining connections')
+            self._stopped.set()
+
+    async def serve_until_stopped(self):
+        await self._stopped.wait()
+        await self.shutdown()
+
+    async def shutdown(self):
+        """Перестать принимать соединения, дождаться текущих запросов и закрыть остальные"""
+        self.draining = True
+        self.server.close()
+        for writer in list(self.idle):
+            writer.close()
+
+        try:
+            await asyncio.wait_for(self._drained.wait(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f'⚠️ Drain timeout, {self.in_flight} requests still running')
+
+        for writer in list(self.connections):
+            writer.close()
+        await self.server.wait_closed()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        logger.info(f'✅ Server stopped, {self.served} requests served')
+
+    # 🔌 Соединение
+
+    async def _handle_connection(self, reader, writer):
+        self.connections.add(writer)
+        peer = writer.get_extra_info('peername')
+        peer = peer[0] if isinstance(peer, tuple) else str(peer)
+        requests_on_connection = 0
+        try:
+            while not self.draining:
+                self.idle.add(writer)
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b'\r\n\r\n'),
+                        self.keepalive_timeout if requests_on_connection else self.request_timeout,
+                    )
+                except asyncio.LimitOverrunError:
+                    self.idle.discard(writer)
+                    self._begin_request()
+                    try:
+                        await self._write_json(writer, 431, {'success': False, 'error': 'Request headers too large'},
+                                               keep_alive=False)
+                    finally:
+                        self._end_request()
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                finally:
+                    self.idle.discard(writer)
+
+                requests_on_connection += 1
+                self._begin_request()
+                try:
+                    keep_alive = await self._handle_request(reader, writer, head, peer, requests_on_connection)
+                finally:
+                    self._end_request()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.idle.discard(writer)
+            self.connections.discard(writer)
+            writer.close()
+
+    def _begin_request(self):
+        self.in_flight += 1
+        self._drained.clear()
+
+    def _end_request(self):
+        self.in_flight -= 1
+        if self.in_flight == 0:
+            self._drained.set()
+
+    async def _handle_request(self, reader, writer, head, peer, requests_on_connection):
+        """Один запрос; возвращает, оставить ли соединение открытым"""
+        started = time.perf_counter()
+        method, path, status = '-', '-', 500
+        try:
+            method, path, version, headers = self._parse_head(head)
+            keep_alive = self._wants_keep_alive(version, headers, requests_on_connection)
+            body = await self._read_body(reader, headers)
+            status, payload, extra = await self._dispatch(method, path, body)
+        except HTTPError as e:
+            keep_alive = False
+            status, payload, extra = e.status, {'success': False, 'error': e.message}, ()
+
+        await self._write_json(writer, status, payload, keep_alive and not self.draining, extra)
+        self.served += 1
+        if self.access_log:
+            logger.info(f'{peer} - "{method} {path}" {status} {(time.perf_counter() - started) * 1000:.1f}ms')
+        return keep_alive
+
+    @staticmethod
+    def _parse_head(head):
+        try:
+            lines = head.decode('latin-1').split('\r\n')
+            method, target, version = lines[0].split(' ', 2)
+        except ValueError:
+            raise HTTPError(400, 'Malformed request line')
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(':')
+            if not sep:
+                raise HTTPError(400, 'Malformed header')
+            headers[name.strip().lower()] = value.strip()
+        return method.upper(), target.split('?', 1)[0], version, headers
+
+    def _wants_keep_alive(self, version, headers, requests_on_connection):
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.1':
+            keep_alive = connection != 'close'
         else:
-            self._set_json_headers(404)
-            self.wfile.write(json.dumps({'error': 'Not found'}).encode())
-
-    def do_POST(self):
-        """Handle POST requests"""
-        if self.path == '/api/v1/ai/production/agent/':
-            # AI Agent endpoint
-            try:
-                # Get request body
-                content_length = int(self.headers.get('Content-Length', 0))
-                post_data = self.rfile.read(content_length)
-                data = json.loads(post_data.decode('utf-8'))
-
-                # Extract message and session_id
-                message = data.get('message', '').strip()
-                session_id = data.get('session_id', 'default')
-
-                if not message:
-                    self._set_json_headers(400)
-                    response = {
-                        'success': False,
-                        'error': 'Message is required',
-                        'timestamp': datetime.utcnow().isoformat()
-                    }
-                    self.wfile.write(json.dumps(response, ensure_ascii=False).encode())
-                    return
-
-                # Get AI response
-                ai_response = get_ai_response(message, session_id)
-
-                # Format response
-                response = {
-                    'success': True,
-                    'response': ai_response.get('response', ''),
-                    'state': ai_response.get('state', ''),
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'session_id': session_id
-                }
-
-                # Add quick_replies if available
-                if 'quick_replies' in ai_response:
-                    response['quick_replies'] = ai_response['quick_replies']
-
-                self._set_json_headers()
-                self.wfile.write(json.dumps(response, ensure_ascii=False).encode())
-
-            except json.JSONDecodeError:
-                self._set_json_headers(400)
-                response = {
-                    'success': False,
-                    'error': 'Invalid JSON format',
-                    'timestamp': datetime.utcnow().isoformat()
-                }
-                self.wfile.write(json.dumps(response, ensure_ascii=False).encode())
-
-            except Exception as e:
-                self._set_json_headers(500)
-                response = {
-                    'success': False,
-                    'error': str(e),
-                    'timestamp': datetime.utcnow().isoformat()
-                }
-                self.wfile.write(json.dumps(response, ensure_ascii=False).encode())
+            keep_alive = connection == 'keep-alive'
+        return keep_alive and requests_on_connection < self.keepalive_requests
+
+    async def _read_body(self, reader, headers):
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise HTTPError(411, 'Content-Length is required')
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(400, 'Invalid Content-Length')
+        if length < 0:
+            raise HTTPError(400, 'Invalid Content-Length')
+        if length > self.max_body_bytes:
+            raise HTTPError(413, f'Request body exceeds {self.max_body_bytes} bytes')
+        if not length:
+            return b''
+        try:
+            return await asyncio.wait_for(reader.readexactly(length), self.request_timeout)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            raise HTTPError(408, 'Request body timeout')
+
+    # 🧭 Маршруты
+
+    async def _dispatch(self, method, path, body):
+        if method == 'OPTIONS':
+            return 200, {'status': 'ok'}, ()
+        if path in HEALTH_PATHS:
+            if method != 'GET':
+                return 405, {'error': 'Method not allowed'}, (('Allow', 'GET'),)
+            return (503 if self.draining else 200), self.health(), ()
+        if path in AGENT_PATHS:
+            if method != 'POST':
+                return 405, {'error': 'Method not allowed'}, (('Allow', 'POST'),)
+            return await self._agent(body)
+        return 404, {'error': 'Not found'}, ()
+
+    async def _agent(self, body):
+        try:
+            data = json.loads(body.decode('utf-8') or '{}')
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return 400, self._error('Invalid JSON format'), ()
+        if not isinstance(data, dict):
+            return 400, self._error('Invalid JSON format'), ()
+
+        # Extract message and session_id
+        message = str(data.get('message', '')).strip()
+        session_id = str(data.get('session_id') or 'default')
+        if not message:
+            return 400, self._error('Message is required'), ()
+
+        # Backpressure: очередь к пулу агента ограничена
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            return 503, self._error('Server is busy, retry later'), (('Retry-After', '1'),)
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            ai_response = await loop.run_in_executor(self.executor, self.agent, message, session_id)
+        except Exception as e:
+            logger.error(f'❌ AI agent error: {e}')
+            return 500, self._error('Internal server error'), ()
+        finally:
+            self.pending -= 1
+
+        # Format response
+        response = {
+            'success': True,
+            'response': ai_response.get('response', ''),
+            'state': ai_response.get('state', ''),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'session_id': session_id
+        }
+
+        # Add quick_replies if available
+        if 'quick_replies' in ai_response:
+            response['quick_replies'] = ai_response['quick_replies']
+        return 200, response, ()
+
+    @staticmethod
+    def _error(message):
+        return {'success': False, 'error': message, 'timestamp': datetime.now(timezone.utc).isoformat()}
 
+    async def _write_json(self, writer, status, payload, keep_alive, extra_headers=()):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        headers = [
+            ('Date', formatdate(usegmt=True)),
+            ('Server', 'UnitySphere-AI'),
+            ('Content-Type', 'application/json; charset=utf-8'),
+            ('Content-Length', str(len(body))),
+            *CORS_HEADERS,
+            *extra_headers,
+        ]
+        if keep_alive:
+            headers += [('Connection', 'keep-alive'),
+                        ('Keep-Alive', f'timeout={int(self.keepalive_timeout)}, max={self.keepalive_requests}')]
         else:
-            self._set_json_headers(404)
-            self.wfile.write(json.dumps({'error': 'Not found'}).encode())
+            headers.append(('Connection', 'close'))
+
+        head = f'HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n'
+        head += ''.join(f'{name}: {value}\r\n' for name, value in headers) + '\r\n'
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+async def serve(host, port):
+    server = await AIServer(host, port).start()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, server.request_shutdown)
+
+    print(f"✅ Server started successfully")
+    print(f"📍 Listening on {host}:{server.port} ({server.workers} agent workers, queue {server.max_queue})")
+    print(f"🔧 PID: {os.getpid()}")
+    print("")
+    await server.serve_until_stopped()
 
-    def log_message(self, format, *args):
-        """Custom log format"""
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {self.address_string()} - {format % args}")
 
 def run_server(host='127.0.0.1', port=8001):
     """🚀 Run the standalone AI server"""
@@ -131,7 +391,7 @@ def run_server(host='127.0.0.1', port=8001):
     # Test AI agent before starting server
     print("🧪 Testing AI agent...")
     try:
-        test_response = get_ai_response('Привет', 'test')
+        test_response = get_ai_response('Привет', 'startup-self-test')
         if test_response and 'response' in test_response:
             print("✅ AI agent working correctly")
             print(f"Sample response: {test_response['response'][:50]}...")
@@ -142,31 +402,26 @@ def run_server(host='127.0.0.1', port=8001):
         print(f"❌ AI agent test failed: {e}")
         return
 
-    # Create and start server
-    server_address = (host, port)
-    httpd = HTTPServer(server_address, AIHandler)
-
-    print(f"✅ Server started successfully")
-    print(f"📍 Listening on {host}:{port}")
-    print(f"🔧 PID: {os.getpid()}")
-    print("")
-
     try:
-        httpd.serve_forever()
-    except KeyboardInterrupt:
-        print("\n🛑 Server stopped by user")
-        httpd.server_close()
+        asyncio.run(serve(host, port))
     except Exception as e:
         print(f"\n❌ Server error: {e}")
-        httpd.server_close()
+
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='UnitySphere standalone AI agent server')
+    parser.add_argument('--host', default=os.environ.get('AI_SERVER_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=env_int('AI_SERVER_PORT', 8001))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+
     # Ensure we're in the right directory
-    os.chdir('/var/www/myapp/eventsite')
+    os.chdir(PROJECT_DIR)
 
     # Activate virtual environment
-    activate_script = '/var/www/myapp/eventsite/venv/bin/activate_this.py'
+    activate_script = os.path.join(PROJECT_DIR, 'venv/bin/activate_this.py')
     if os.path.exists(activate_script):
         exec(open(activate_script).read())
 
-    run_server()
\ No newline at end of file
+    run_server(args.host, args.port)